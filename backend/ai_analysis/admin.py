@@ -0,0 +1,76 @@
+from django.contrib import admin
+
+from .cache import dedup_stats
+from .models import AnalysisJob, AnalysisLease, CorpusTerm, DocumentText, LLMUsage, RCAnalysis
+
+
+@admin.register(RCAnalysis)
+class RCAnalysisAdmin(admin.ModelAdmin):
+    """
+    Interface d'administration pour les analyses de RC, avec le taux de
+    reprise entre projets au RC identique
+    """
+    change_list_template = 'admin/ai_analysis/rcanalysis/change_list.html'
+    list_display = ('project', 'file_hash', 'model_name', 'prompt_version', 'dedup_source', 'created_at')
+    search_fields = ('project__name', 'file_hash')
+    list_filter = ('dedup_source', 'model_name', 'prompt_version', 'created_at')
+    exclude = ('analysis_data', 'summary_data')
+    ordering = ('-created_at',)
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {**(extra_context or {}), 'dedup_stats': dedup_stats()}
+        return super().changelist_view(request, extra_context=extra_context)
+
+
+@admin.register(DocumentText)
+class DocumentTextAdmin(admin.ModelAdmin):
+    """
+    Interface d'administration pour les textes extraits des documents de référence
+    """
+    list_display = ('document', 'char_count', 'content_hash', 'text_hash', 'dedup_source', 'updated_at')
+    search_fields = ('content_hash', 'text_hash')
+    list_filter = ('dedup_source', 'updated_at')
+    exclude = ('compressed_text',)
+    ordering = ('-updated_at',)
+
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    """
+    Interface d'administration pour les jobs d'analyse
+    """
+    list_display = ('id', 'project', 'status', 'progress', 'cached', 'created_at', 'finished_at')
+    list_filter = ('status', 'cached', 'created_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(AnalysisLease)
+class AnalysisLeaseAdmin(admin.ModelAdmin):
+    """
+    Interface d'administration pour les baux des analyses en cours
+    """
+    list_display = ('key', 'owner', 'acquired_at', 'expires_at')
+    search_fields = ('key', 'owner')
+    ordering = ('-acquired_at',)
+
+
+@admin.register(LLMUsage)
+class LLMUsageAdmin(admin.ModelAdmin):
+    """
+    Interface d'administration pour le registre des appels au LLM
+    """
+    list_display = ('created_at', 'project', 'operation', 'model_name', 'prompt_tokens', 'completion_tokens',
+                    'duration', 'queue_time', 'attempts', 'cost', 'cache_hit', 'success')
+    search_fields = ('project__name', 'operation', 'model_name')
+    list_filter = ('operation', 'model_name', 'cache_hit', 'success', 'created_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(CorpusTerm)
+class CorpusTermAdmin(admin.ModelAdmin):
+    """
+    Interface d'administration pour les termes du corpus et leurs fréquences documentaires
+    """
+    list_display = ('term', 'doc_freq')
+    search_fields = ('term',)
+    ordering = ('-doc_freq',)
@@ -4,30 +4,35 @@ Service d'analyse IA du contenu des documents
 Utilise GPT-4 pour analyser le texte et générer des insights
 """
 
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+import contextvars
+import logging
 import os
-import PyPDF2
-import openai
+import threading
 from django.conf import settings
 
-class AIService:
-    def __init__(self):
-        # Configuration OpenAI
-        openai.api_key = settings.OPENAI_API_KEY
-        self.model = settings.OPENAI_MODEL
+from .chunking import chunk_hash, chunk_key, count_tokens, split_along_layout, split_into_chunks
+from .llm_backends import LLMBackend, LLMError, get_llm_backend
+from .llm_dispatcher import LLMQueueFull
+from .outline import OutlineParser, iter_nodes, merge_outlines, parse_outline
+from .pdf_analyzer import PDFAnalyzer
+from .pdf_extraction import ExtractedDocument, extract_document
 
-    def analyze_text(self, text: str) -> Dict:
-        """
-        Analyse le texte avec GPT-4
-        """
-        try:
-            # Préparation du prompt
-            prompt = f"""En tant qu'expert en marchés publics, analyse le règlement de consultation suivant et propose une structure détaillée pour le mémoire technique.
+logger = logging.getLogger(__name__)
 
-Document RC :
-{text}
+# Version du prompt d'analyse : à incrémenter à chaque modification du prompt
+# ou du format de la structure produite, pour invalider les analyses déjà en cache
+PROMPT_VERSION = '3'
+
+SYSTEM_PROMPT = "Tu es un expert en rédaction de mémoires techniques. Ta tâche est de proposer une structure claire et logique pour le mémoire technique basée sur le RC fourni."
 
-Format de réponse attendu (avec numérotation claire) :
+# Prompt système de la rédaction des sections du mémoire (génération groupée)
+SECTION_SYSTEM_PROMPT = "Tu es un rédacteur expert de mémoires techniques pour les marchés publics de travaux. Tu rédiges des sections claires, concrètes et adaptées au projet."
+
+# Format de réponse demandé au modèle, commun aux prompts complet et découpé
+RESPONSE_FORMAT = """Format de réponse attendu (avec numérotation claire) :
 1. [Titre du chapitre] ([Nombre de points] points)
    1.1. [Sous-titre] ([Nombre de points] points)
       1.1.1. [Sous-sous-titre] ([Nombre de points] points)
@@ -52,107 +57,284 @@ Important :
 - Utiliser une numérotation claire et hiérarchique (1, 1.1, 1.1.1, etc.)
 """
 
-            print("Envoi de la requête à GPT-4...")
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "Tu es un expert en rédaction de mémoires techniques. Ta tâche est de proposer une structure claire et logique pour le mémoire technique basée sur le RC fourni."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000
-            )
-
-            print("Réponse reçue de GPT-4")
-            analysis = response.choices[0].message.content
-            print(f"Contenu de l'analyse : {analysis[:200]}...")
-
-            # Structuration de l'analyse
-            structure = self._extract_structure(analysis)
-            result = {
-                'structure': structure,
-                'exigences': [],
-                'contraintes': [],
-                'points_critiques': [],
-                'recommendations': []
-            }
-            print(f"Résultat structuré : {result}")
-            return result
 
-        except Exception as e:
-            print(f"Erreur détaillée lors de l'analyse avec GPT-4: {str(e)}")
-            return {
-                'structure': [],
-                'exigences': [],
-                'contraintes': [],
-                'points_critiques': [],
-                'recommendations': []
-            }
+class IncompleteAnalysis(LLMError):
+    """
+    Analyse découpée dont des extraits n'ont pas pu être analysés : la
+    structure fusionnée serait partielle, elle n'est ni retournée ni mise en cache
+    """
+
+    def __init__(self, failed: int, total: int):
+        super().__init__(f"{failed} extrait(s) sur {total} n'ont pas pu être analysés", status=502)
+        self.failed = failed
+        self.total = total
+
+
+def section_event(path: List[int], node: Dict) -> Dict:
+    """
+    Données transmises pour une section du plan en cours de génération
+    (ou rejouée depuis une analyse en cache, où numéro et points peuvent manquer)
+    """
+    return {
+        'path': path,
+        'number': node.get('number'),
+        'title': node.get('title', ''),
+        'points': node.get('points')
+    }
+
+
+class AIService:
+    def __init__(self, llm_backend: Optional[LLMBackend] = None):
+        # Backend LLM partagé du processus (client HTTP et connexions réutilisés)
+        self.llm = llm_backend or get_llm_backend()
+        self.model = settings.OPENAI_MODEL
+        self.prompt_version = PROMPT_VERSION
+        self.pdf_analyzer = PDFAnalyzer()
+
+    def _build_prompt(self, text: str) -> str:
+        """
+        Construit le prompt d'analyse d'un RC complet
+        """
+        return f"""En tant qu'expert en marchés publics, analyse le règlement de consultation suivant et propose une structure détaillée pour le mémoire technique.
+
+Document RC :
+{text}
+
+{RESPONSE_FORMAT}"""
+
+    def _build_chunk_prompt(self, text: str, index: int, total: int) -> str:
+        """
+        Construit le prompt d'analyse d'un extrait de RC (mode découpé)
+        """
+        return f"""En tant qu'expert en marchés publics, analyse l'extrait suivant d'un règlement de consultation (partie {index}/{total}) et relève les critères de jugement du mémoire technique qu'il contient.
+
+Extrait du RC :
+{text}
+
+{RESPONSE_FORMAT}- Si l'extrait ne contient aucun critère de jugement du mémoire technique, répondre uniquement : AUCUN
+"""
+
+    def _messages(self, prompt: str) -> List[Dict]:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _complete(self, prompt: str) -> str:
+        """
+        Envoie un prompt au modèle et retourne le texte de la réponse
+        """
+        response = self.llm.complete(
+            messages=self._messages(prompt),
+            model=self.model,
+            temperature=0.7,
+            max_tokens=2000
+        )
+        return response.content
+
+    def _build_result(self, structure: List[Dict]) -> Dict:
+        return {
+            'structure': structure,
+            'exigences': [],
+            'contraintes': [],
+            'points_critiques': [],
+            'recommendations': []
+        }
+
+    def analyze_text(self, text: str, previous_fragments: Optional[List[Dict]] = None) -> Dict:
+        """
+        Analyse le texte avec GPT-4.
+        Les RC trop longs pour un seul prompt sont analysés en mode découpé,
+        de même que les RC modificatifs (découpage de la version précédente,
+        previous_fragments, voir analyze_text_chunked).
+        Un RC analysé en un seul prompt laisse aussi son découpage en extraits
+        ('fragments', sans structure partielle) : son premier RC modificatif
+        est analysé extrait par extrait, les suivants ne renvoient au modèle
+        que les extraits modifiés.
+        """
+        if previous_fragments:
+            return self.analyze_text_chunked(text, previous_fragments)
+
+        token_count = count_tokens(text, self.model)
+        if token_count > settings.AI_ANALYSIS_CHUNK_THRESHOLD_TOKENS:
+            logger.info(f"RC de {token_count} tokens : analyse en mode découpé")
+            return self.analyze_text_chunked(text)
+
+        # Les erreurs du LLM (échéance dépassée, erreur persistante après les
+        # nouvelles tentatives de la politique des appels) sont propagées
+        analysis = self._complete(self._build_prompt(text))
+        logger.debug(f"Analyse reçue du modèle : {analysis[:200]}...")
+
+        # Structuration de l'analyse
+        result = self._build_result(self._extract_structure(analysis))
+        result['fragments'] = self._layout_fragments(text)
+        return result
+
+    def _layout_fragments(self, text: str) -> List[Dict]:
+        """
+        Découpage en extraits d'un RC analysé en un seul prompt (au moins un
+        extrait par section de premier niveau), sans structure partielle
+        """
+        chunks = split_into_chunks(text, settings.AI_ANALYSIS_CHUNK_MAX_TOKENS, self.model, self.pdf_analyzer)
+        return [{'key': chunk_key(chunk), 'hash': chunk_hash(chunk), 'structure': None} for chunk in chunks]
+
+    def stream_analysis(self, text: str, previous_fragments: Optional[List[Dict]] = None) -> Iterator[Tuple[str, Dict]]:
+        """
+        Analyse le texte en flux : chaque section du plan est produite
+        ('section', {chemin, numéro, intitulé, points}) dès que sa ligne est
+        complète dans la réponse du modèle, puis ('result', analyse complète)
+        termine le flux.
+        Les RC analysés en mode découpé (RC longs ou modificatifs) ne sont pas
+        diffusés en flux : leurs sections sont produites à la fin de l'analyse.
+        """
+        if previous_fragments or count_tokens(text, self.model) > settings.AI_ANALYSIS_CHUNK_THRESHOLD_TOKENS:
+            result = self.analyze_text_chunked(text, previous_fragments)
+            # Une structure partielle (extraits en échec) n'est pas diffusée
+            if not result['failed_fragments']:
+                for path, node in iter_nodes(result['structure']):
+                    yield 'section', section_event(path, node)
+            yield 'result', result
+            return
+
+        parser = OutlineParser()
+        pending = ''
+        for delta in self.llm.stream(self._messages(self._build_prompt(text)), model=self.model,
+                                     temperature=0.7, max_tokens=2000):
+            pending += delta
+            while '\n' in pending:
+                line, pending = pending.split('\n', 1)
+                added = parser.feed(line)
+                if added:
+                    yield 'section', section_event(*added)
+        added = parser.feed(pending)
+        if added:
+            yield 'section', section_event(*added)
+        result = self._build_result(parser.structure)
+        result['fragments'] = self._layout_fragments(text)
+        yield 'result', result
+
+    def analyze_text_chunked(self, text: str, previous_fragments: Optional[List[Dict]] = None) -> Dict:
+        """
+        Analyse en mode map-reduce : le texte est découpé aux frontières de
+        sections, les extraits sont analysés en parallèle (nombre de requêtes
+        simultanées borné) puis les structures partielles sont fusionnées.
+
+        Le résultat contient aussi 'fragments' : pour chaque extrait, sa clé
+        de frontière, l'empreinte de son texte et sa structure partielle.
+        Avec les fragments de la version précédente du RC, le même découpage
+        est repris et seuls les extraits dont le texte a changé, ou sans
+        structure partielle (version analysée en un seul prompt), sont envoyés
+        au modèle ('reanalysed_fragments' en donne le nombre).
+
+        Une erreur du LLM (échéance dépassée, file saturée, erreur persistante)
+        interrompt l'analyse : les extraits pas encore envoyés sont abandonnés
+        et l'erreur est propagée. Les autres échecs d'un extrait sont comptés
+        dans 'failed_fragments' (voir pipeline, qui refuse alors l'analyse).
+        """
+        max_tokens = settings.AI_ANALYSIS_CHUNK_MAX_TOKENS
+        if previous_fragments:
+            boundaries = [fragment['key'] for fragment in previous_fragments]
+            chunks = split_along_layout(text, boundaries, max_tokens, self.model, self.pdf_analyzer)
+        else:
+            chunks = split_into_chunks(text, max_tokens, self.model, self.pdf_analyzer)
+        total = len(chunks)
+
+        hashes = [chunk_hash(chunk) for chunk in chunks]
+        known = {
+            fragment['hash']: fragment['structure']
+            for fragment in previous_fragments or []
+            if fragment.get('structure') is not None
+        }
+        pending = [
+            (index, chunk) for index, (chunk, digest) in enumerate(zip(chunks, hashes), start=1)
+            if digest not in known
+        ]
+        logger.info(f"Analyse découpée en {total} extrait(s), dont {len(pending)} à analyser")
+
+        def analyze_chunk(index_chunk):
+            index, chunk = index_chunk
+            try:
+                answer = self._complete(self._build_chunk_prompt(chunk, index, total))
+                return self._extract_structure(answer)
+            except (LLMError, LLMQueueFull):
+                raise
+            except Exception as e:
+                logger.error(f"Erreur lors de l'analyse de l'extrait {index}/{total} : {str(e)}")
+                return None
+
+        # Chaque extrait est analysé dans une copie du contexte de l'appelant
+        # (priorité des appels au LLM, voir llm_dispatcher)
+        jobs = [(contextvars.copy_context(), item) for item in pending]
+        analysed = {}
+        if jobs:
+            max_workers = max(min(settings.AI_ANALYSIS_MAX_CONCURRENT_REQUESTS, len(jobs)), 1)
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='rc-chunk') as executor:
+                futures = [executor.submit(context.run, analyze_chunk, item) for context, item in jobs]
+                try:
+                    analysed = {index: future.result() for (index, _), future in zip(pending, futures)}
+                except BaseException:
+                    executor.shutdown(cancel_futures=True)
+                    raise
+
+        # Un extrait en échec (None) n'est pas réutilisé lors d'une prochaine analyse
+        structures = [
+            analysed[index] if index in analysed else known[digest]
+            for index, digest in enumerate(hashes, start=1)
+        ]
+        result = self._build_result(self._merge_structures([structure or [] for structure in structures]))
+        result['fragments'] = [
+            {'key': chunk_key(chunk), 'hash': digest, 'structure': structure}
+            for chunk, digest, structure in zip(chunks, hashes, structures)
+        ]
+        result['reanalysed_fragments'] = len(pending)
+        result['failed_fragments'] = sum(1 for structure in analysed.values() if structure is None)
+        return result
+
+    def _merge_structures(self, partial_structures: List[List[Dict]]) -> List[Dict]:
+        """
+        Fusionne les structures partielles des extraits : les sections de même
+        intitulé sont regroupées à chaque niveau, dans l'ordre de première
+        apparition, puis l'ensemble est renuméroté
+        """
+        return merge_outlines(partial_structures)
+
+    def extract_requirements(self, document: ExtractedDocument) -> Dict:
+        """
+        Extrait localement (spaCy, sans appel au LLM) les exigences, contraintes,
+        mots clés et thèmes du document
+        """
+        return self.pdf_analyzer.analyze_content(document.text, document)
 
     def _extract_text_from_pdf(self, pdf_path: str) -> str:
         """
         Extrait le texte d'un fichier PDF
         """
-        text = ""
         try:
-            with open(pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
-            return text
+            return extract_document(pdf_path).text
         except Exception as e:
             raise Exception(f"Erreur lors de l'extraction du texte du PDF: {str(e)}")
 
     def _extract_structure(self, analysis: str) -> List[Dict]:
         """
-        Extrait la structure proposée de l'analyse GPT-4
-        """
-        structure = []
-        current_chapter = None
-        current_subchapter = None
-        chapter_number = 0
-        subchapter_number = 0
-        
-        for line in analysis.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Détecter les chapitres principaux (commencent par un chiffre)
-            if line[0].isdigit() and '. ' in line and not line[2:].startswith('.'):
-                chapter_number += 1
-                subchapter_number = 0
-                # Extraire le titre sans les points
-                title = line.split('. ', 1)[1]
-                title = title.split(' (')[0]  # Supprimer les points
-                current_chapter = {
-                    'title': f"{chapter_number}. {title}",
-                    'subsections': []
-                }
-                structure.append(current_chapter)
-                current_subchapter = None
-                
-            # Détecter les sous-chapitres (commencent par un chiffre suivi d'un point)
-            elif line[0].isdigit() and '. ' in line and line[2:].startswith('.'):
-                subchapter_number += 1
-                # Extraire le titre sans les points
-                title = line.split('. ', 1)[1]
-                title = title.split(' (')[0]  # Supprimer les points
-                if current_chapter:
-                    current_subchapter = {
-                        'title': f"{chapter_number}.{subchapter_number}. {title}",
-                        'subsections': []
-                    }
-                    current_chapter['subsections'].append(current_subchapter)
-                
-            # Détecter les sous-sous-chapitres (commencent par des espaces)
-            elif line.startswith('      ') and current_subchapter:
-                # Extraire le titre sans les points
-                title = line.strip()
-                title = title.split(' (')[0]  # Supprimer les points
-                current_subchapter['subsections'].append(title)
-                
-        return structure
+        Extrait la structure proposée de l'analyse GPT-4 (arbre de sections
+        de profondeur quelconque, avec les points de chaque critère)
+        """
+        return parse_outline(analysis)
+
+    def draft_section(self, prompt: str) -> str:
+        """
+        Rédige le brouillon d'une section du mémoire (voir section_generation)
+        """
+        response = self.llm.complete(
+            messages=[
+                {"role": "system", "content": SECTION_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            model=self.model,
+            temperature=0.7,
+            max_tokens=settings.AI_SECTION_GENERATION_MAX_TOKENS
+        )
+        return response.content
 
     def generate_summary(self, structure: List[Dict], analysis: Dict) -> Dict:
         """
@@ -167,4 +349,44 @@ Important :
             'contraintes': analysis.get('contraintes', []),
             'points_critiques': analysis.get('points_critiques', []),
             'recommendations': analysis.get('recommendations', [])
-        } 
\ No newline at end of file
+        }
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_ai_service() -> AIService:
+    """
+    Retourne le service IA partagé du processus (créé au premier appel).
+    Le service est sans état par requête : backend LLM, analyseur PDF et
+    caches sont partagés entre les threads du worker.
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = AIService()
+        return _service
+
+
+def set_ai_service(service: Optional[AIService]) -> Optional[AIService]:
+    """
+    Remplace le service partagé (None : recréé au prochain appel) et
+    retourne le précédent
+    """
+    global _service
+    with _service_lock:
+        previous, _service = _service, service
+        return previous
+
+
+@contextmanager
+def override_ai_service(service: AIService):
+    """
+    Substitue temporairement le service partagé (tests, bouchons)
+    """
+    previous = set_ai_service(service)
+    try:
+        yield service
+    finally:
+        set_ai_service(previous)
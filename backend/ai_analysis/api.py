@@ -4,45 +4,83 @@ API pour l'analyse des documents
 Expose les endpoints pour l'analyse et la génération de sommaire
 """
 
-from rest_framework import viewsets, status
+from rest_framework import renderers, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-import os
+from django.urls import reverse
+import json
 import logging
-from projects.models import ReferenceDocument
+from datetime import date
+from projects.models import Project, ReferenceDocument
+from core.models import Projet
 
-from .ai_service import AIService
+from .ai_service import AIService, get_ai_service
+from .corpus_index import document_keywords, similar_tenders
+from .jobs import enqueue_rc_analysis
+from .llm_backends import LLMError, LLMTimeout
+from .llm_dispatcher import LLMQueueFull
+from .llm_policy import get_policy_metrics
+from .model_registry import registry
+from .models import AnalysisJob, DocumentText
+from .pipeline import analyze_project_rc, get_rc_file, stream_project_rc
+from .section_generation import GenerationInProgress, generate_sections, start_generation
+from .usage_ledger import ROLLUP_GROUPS, usage_rollup, usage_totals
+from .serializers import AnalysisJobSerializer
 
 # Configuration du logging
 logger = logging.getLogger(__name__)
 
-class DocumentAnalysisViewSet(viewsets.ViewSet):
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.ai_service = AIService()
 
-    def _get_rc_file(self, project_id: str) -> str:
-        """
-        Récupère le fichier RC du projet depuis la base de données
-        """
-        try:
-            # Récupérer le document RC du projet
-            rc_doc = get_object_or_404(
-                ReferenceDocument,
-                project_id=project_id,
-                type='RC'
-            )
-            
-            # Vérifier si le fichier existe
-            if not os.path.exists(rc_doc.file.path):
-                raise FileNotFoundError(f"Le fichier RC n'existe pas : {rc_doc.file.path}")
-            
-            return rc_doc.file.path
-            
-        except ReferenceDocument.DoesNotExist:
-            raise FileNotFoundError(f"Aucun document RC trouvé pour le projet {project_id}")
+def format_sse(event: str, data) -> str:
+    """
+    Formate un événement Server-Sent Events (données sérialisées en JSON)
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class EventStreamRenderer(renderers.BaseRenderer):
+    """
+    Permet de négocier 'text/event-stream' ; les réponses d'erreur DRF sont
+    alors transmises sous forme d'un événement 'error'.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return format_sse('error', data).encode(self.charset)
+
+
+def queue_full_response(error: LLMQueueFull) -> Response:
+    """
+    Réponse 429 d'une file d'appels au LLM saturée : position et délai de nouvelle tentative
+    """
+    response = Response(
+        {'error': str(error), 'queue_position': error.position, 'retry_after': error.retry_after},
+        status=status.HTTP_429_TOO_MANY_REQUESTS
+    )
+    response['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def llm_error_response(error: LLMError) -> Response:
+    """
+    Réponse d'un appel au LLM en échec : 504 si l'échéance est dépassée, 502 sinon
+    """
+    return Response(
+        {'error': f'Le modèle n\'a pas pu analyser le RC : {str(error)}'},
+        status=status.HTTP_504_GATEWAY_TIMEOUT if isinstance(error, LLMTimeout) else status.HTTP_502_BAD_GATEWAY
+    )
+
+
+class DocumentAnalysisViewSet(viewsets.ViewSet):
+    @property
+    def ai_service(self) -> AIService:
+        # Service partagé du processus, substituable dans les tests (override_ai_service)
+        return get_ai_service()
 
     @action(detail=True, methods=['post'])
     def analyze_rc(self, request, pk=None):
@@ -50,42 +88,22 @@ class DocumentAnalysisViewSet(viewsets.ViewSet):
         Analyse le RC d'un projet
         """
         try:
-            # Récupérer le chemin du fichier RC
-            project_id = pk
-            rc_path = self._get_rc_file(project_id)
-            
-            logger.info(f"Analyse du fichier RC : {rc_path}")
-            
-            # Extraire le texte du PDF
-            text = self.ai_service._extract_text_from_pdf(rc_path)
-            
-            # Analyser le contenu
-            analysis = self.ai_service.analyze_text(text)
-            
-            # Générer le sommaire
-            summary = self.ai_service.generate_summary(
-                analysis['structure'],
-                analysis
-            )
-            
-            # Structurer la réponse
-            response_data = {
-                'analysis': {
-                    'token_count': len(text.split()),
-                    'structure': analysis['structure'],
-                    'keywords': [],
-                },
-                'summary': summary
-            }
-            
+            response_data, cached, _ = analyze_project_rc(pk, self.ai_service)
+            response_data['cached'] = cached
             return Response(response_data)
-            
+
+        except LLMQueueFull as e:
+            logger.warning(f"Analyse du RC refusée : {str(e)}")
+            return queue_full_response(e)
         except FileNotFoundError as e:
             logger.error(f"Erreur FileNotFoundError : {str(e)}")
             return Response(
                 {'error': f'Le fichier RC n\'a pas été trouvé : {str(e)}'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        except LLMError as e:
+            logger.error(f"Analyse du RC interrompue par le LLM : {str(e)}")
+            return llm_error_response(e)
         except Exception as e:
             logger.error(f"Erreur lors de l'analyse du RC : {str(e)}")
             return Response(
@@ -93,38 +111,230 @@ class DocumentAnalysisViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=True, methods=['get', 'post'],
+            renderer_classes=[renderers.JSONRenderer, EventStreamRenderer])
+    def analyze_rc_stream(self, request, pk=None):
+        """
+        Analyse le RC d'un projet en Server-Sent Events : chaque chapitre,
+        sous-chapitre ou élément de la structure est envoyé dès sa génération,
+        l'événement 'result' porte la réponse complète de analyze_rc.
+        """
+        try:
+            get_rc_file(pk)
+        except FileNotFoundError as e:
+            logger.error(f"Erreur FileNotFoundError : {str(e)}")
+            return Response(
+                {'error': f'Le fichier RC n\'a pas été trouvé : {str(e)}'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        def events():
+            try:
+                for event, data in stream_project_rc(pk, self.ai_service):
+                    yield format_sse(event, data)
+            except LLMQueueFull as e:
+                yield format_sse('error', {
+                    'error': str(e), 'queue_position': e.position, 'retry_after': e.retry_after
+                })
+            except Exception as e:
+                # Les en-têtes sont déjà partis : l'erreur est transmise comme événement
+                logger.error(f"Erreur lors de l'analyse en flux du RC : {str(e)}")
+                yield format_sse('error', {'error': f'Erreur lors de l\'analyse du RC : {str(e)}'})
+
+        response = StreamingHttpResponse(events(), content_type='text/event-stream; charset=utf-8')
+        response['Cache-Control'] = 'no-cache'
+        # Désactive la mise en tampon de nginx pour cette réponse
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
     @action(detail=True, methods=['get'])
     def get_summary(self, request, pk=None):
         """
         Récupère le sommaire généré
         """
         try:
-            # Récupérer le chemin du fichier RC
-            project_id = pk
-            rc_path = self._get_rc_file(project_id)
-            
-            # Extraire le texte du PDF
-            text = self.ai_service._extract_text_from_pdf(rc_path)
-            
-            # Analyser le contenu
-            analysis = self.ai_service.analyze_text(text)
-            
-            # Générer le sommaire
-            summary = self.ai_service.generate_summary(
-                analysis['sections'],
-                analysis
-            )
-            
+            response_data, cached, _ = analyze_project_rc(pk, self.ai_service)
             return Response({
-                'summary': summary
+                'summary': response_data['summary'],
+                'cached': cached
             })
+        except LLMQueueFull as e:
+            return queue_full_response(e)
         except FileNotFoundError:
             return Response(
                 {'error': 'Le fichier RC n\'a pas été trouvé'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        except LLMError as e:
+            logger.error(f"Sommaire du RC interrompu par le LLM : {str(e)}")
+            return llm_error_response(e)
         except Exception as e:
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            ) 
\ No newline at end of file
+            )
+
+    def _stored_text(self, request, pk):
+        """
+        Texte enregistré du document du projet (paramètre type : RC par défaut, ou CCTP)
+        """
+        doc_type = request.query_params.get('type', 'RC')
+        document = ReferenceDocument.objects.filter(project_id=pk, type=doc_type).first()
+        return doc_type, DocumentText.objects.filter(document=document).first() if document else None
+
+    def _limit(self, request):
+        try:
+            return max(1, int(request.query_params['limit']))
+        except (KeyError, ValueError):
+            return None
+
+    @action(detail=True, methods=['get'])
+    def keywords(self, request, pk=None):
+        """
+        Termes clés du RC (ou du CCTP) pondérés par TF-IDF contre le corpus,
+        calculés depuis le vecteur de termes enregistré au dépôt
+        """
+        doc_type, stored = self._stored_text(request, pk)
+        if stored is None:
+            return Response(
+                {'error': f'Aucun texte enregistré pour le document {doc_type} du projet'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response({'document_type': doc_type, 'keywords': document_keywords(stored, self._limit(request))})
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """
+        Appels d'offres passés les plus proches du RC (ou du CCTP) du projet
+        """
+        doc_type, stored = self._stored_text(request, pk)
+        if stored is None:
+            return Response(
+                {'error': f'Aucun texte enregistré pour le document {doc_type} du projet'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response({'document_type': doc_type, 'similar': similar_tenders(stored, self._limit(request))})
+
+    @action(detail=True, methods=['post'])
+    def analyze_rc_async(self, request, pk=None):
+        """
+        Programme l'analyse du RC d'un projet et retourne immédiatement
+        l'identifiant du job à interroger
+        """
+        project = get_object_or_404(Project, pk=pk)
+        job = enqueue_rc_analysis(project.pk)
+        status_url = reverse('analysis-job-detail', kwargs={'pk': job.pk})
+        return Response(
+            {
+                'job_id': str(job.pk),
+                'status': job.status,
+                'status_url': request.build_absolute_uri(status_url)
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
+
+
+class MemoireGenerationViewSet(viewsets.ViewSet):
+    """
+    Génération groupée des brouillons des sections d'un mémoire (core.Projet)
+    """
+    @action(detail=True, methods=['get', 'post'],
+            renderer_classes=[renderers.JSONRenderer, EventStreamRenderer])
+    def generate_sections(self, request, pk=None):
+        """
+        Génère simultanément les brouillons de toutes les sections feuilles du
+        mémoire en Server-Sent Events : chaque section est enregistrée dans
+        GenerationIA et envoyée dès sa génération. Un lot interrompu est repris
+        sans régénérer les sections terminées ; ?restart=1 recommence le lot.
+        """
+        projet = get_object_or_404(Projet, pk=pk)
+        restart = request.query_params.get('restart') in ('1', 'true')
+        try:
+            lot = start_generation(projet, request.user, restart=restart)
+        except GenerationInProgress as e:
+            logger.warning(f"Génération groupée refusée : {str(e)}")
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+
+        def events():
+            try:
+                for event, data in generate_sections(lot, get_ai_service()):
+                    yield format_sse(event, data)
+            except Exception as e:
+                # Le lot est marqué incomplet : il sera repris au prochain appel
+                logger.error(f"Erreur lors de la génération groupée {lot.pk} : {str(e)}")
+                yield format_sse('error', {'error': f'Erreur lors de la génération des sections : {str(e)}'})
+
+        response = StreamingHttpResponse(events(), content_type='text/event-stream; charset=utf-8')
+        response['Cache-Control'] = 'no-cache'
+        # Désactive la mise en tampon de nginx pour cette réponse
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class LLMUsageViewSet(viewsets.ViewSet):
+    """
+    Agrégats du registre des appels au LLM : ?group_by=day|project|model|operation,
+    période (?since, ?until au format AAAA-MM-JJ) et ?project ; métriques de
+    la politique des appels du worker (policy)
+    """
+    def _filters(self, request):
+        filters = {'project_id': request.query_params.get('project')}
+        for name in ('since', 'until'):
+            value = request.query_params.get(name)
+            filters[name] = date.fromisoformat(value) if value else None
+        return filters
+
+    def list(self, request):
+        group_by = request.query_params.get('group_by', 'day')
+        if group_by not in ROLLUP_GROUPS:
+            return Response(
+                {'error': f"Regroupement inconnu : {group_by} (valeurs possibles : {', '.join(ROLLUP_GROUPS)})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            filters = self._filters(request)
+        except ValueError as e:
+            return Response({'error': f'Date invalide : {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'group_by': group_by, 'rows': usage_rollup(group_by, **filters)})
+
+    @action(detail=False, methods=['get'])
+    def policy(self, request):
+        """
+        Issues des appels au LLM du worker qui répond (nouvelles tentatives,
+        délais dépassés, doublons, replis) et latences observées par modèle
+        """
+        return Response(get_policy_metrics().snapshot())
+
+    @action(detail=False, methods=['get'])
+    def totals(self, request):
+        """
+        Totaux du registre sur la période
+        """
+        try:
+            filters = self._filters(request)
+        except ValueError as e:
+            return Response({'error': f'Date invalide : {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(usage_totals(**filters))
+
+
+class AnalysisJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Consultation de l'état des jobs d'analyse (statut, progression, résultat)
+    """
+    serializer_class = AnalysisJobSerializer
+
+    def get_queryset(self):
+        queryset = AnalysisJob.objects.select_related('analysis')
+        project_id = self.request.query_params.get('project')
+        if project_id:
+            queryset = queryset.filter(project_id=project_id)
+        return queryset
+
+
+class ModelRegistryViewSet(viewsets.ViewSet):
+    """
+    Métriques du registre des modèles du worker qui répond : modèles chargés,
+    temps de chargement et mémoire résidente
+    """
+    def list(self, request):
+        return Response(registry.stats())
@@ -7,4 +7,10 @@ from django.apps import AppConfig
 class AiAnalysisConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai_analysis'
-    verbose_name = 'Analyse IA' 
\ No newline at end of file
+    verbose_name = 'Analyse IA'
+
+    def ready(self):
+        """
+        Enregistre les signaux de l'application
+        """
+        from . import signals  # noqa: F401
@@ -0,0 +1,4 @@
+"""
+Benchmarks de la chaîne d'analyse IA.
+Chaque module se lance avec : python -m ai_analysis.benchmarks.<module>
+"""
@@ -0,0 +1,106 @@
+"""
+bench_extraction.py
+Benchmark mémoire et débit de l'extraction de texte des PDF
+Compare l'ancienne concaténation (text += page) à l'extraction page par page
+et à l'extraction parallèle sur un PDF synthétique volumineux.
+Note : tracemalloc ne mesure que le processus principal.
+
+Utilisation : python -m ai_analysis.benchmarks.bench_extraction --pages 300
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import PyPDF2
+
+from ai_analysis.pdf_extraction import iter_pages, iter_pages_parallel, join_pages
+from ai_analysis.benchmarks.synthetic_pdf import write_synthetic_pdf
+
+
+def legacy_concatenation(pdf_path: str) -> str:
+    """
+    Reproduit l'extraction d'origine : concaténation successive des pages
+    """
+    text = ""
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for page in reader.pages:
+            text += page.extract_text() + "\n"
+    return text
+
+
+def joined_extraction(pdf_path: str) -> str:
+    """
+    Extraction page par page assemblée en une seule jointure
+    """
+    return join_pages(iter_pages(pdf_path)).text
+
+
+def parallel_extraction(pdf_path: str, workers: int) -> str:
+    """
+    Extraction des plages de pages dans un pool de processus
+    """
+    return join_pages(iter_pages_parallel(pdf_path, workers=workers, min_pages=0)).text
+
+
+def streaming_consumption(pdf_path: str) -> int:
+    """
+    Consommation en flux : chaque page est traitée puis libérée
+    """
+    total = 0
+    for _, page_text in iter_pages(pdf_path):
+        total += len(page_text)
+    return total
+
+
+def measure(func, pdf_path: str, page_count: int) -> dict:
+    """
+    Mesure la durée puis, lors d'une seconde exécution (tracemalloc ralentit
+    fortement le code), le pic mémoire Python d'une méthode d'extraction
+    """
+    started = time.perf_counter()
+    func(pdf_path)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    func(pdf_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'seconds': round(elapsed, 4),
+        'pages_per_second': round(page_count / elapsed, 1) if elapsed else None,
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run(page_count: int, workers: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = write_synthetic_pdf(os.path.join(tmp_dir, 'synthetic.pdf'), page_count)
+        return {
+            'pages': page_count,
+            'file_size_kb': round(os.path.getsize(pdf_path) / 1024, 1),
+            'legacy_concatenation': measure(legacy_concatenation, pdf_path, page_count),
+            'joined_extraction': measure(joined_extraction, pdf_path, page_count),
+            'streaming_consumption': measure(streaming_consumption, pdf_path, page_count),
+            'parallel_extraction': dict(
+                measure(lambda path: parallel_extraction(path, workers), pdf_path, page_count),
+                workers=workers
+            ),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'extraction de texte des PDF")
+    parser.add_argument('--pages', type=int, default=300, help='Nombre de pages du PDF synthétique')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Nombre de processus pour l'extraction parallèle")
+    args = parser.parse_args()
+    print(json.dumps(run(args.pages, args.workers), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+bench_llm_backend.py
+Benchmark hors ligne du client LLM contre le serveur stub local
+Compare une session HTTP partagée (connexions keep-alive réutilisées) à une
+connexion neuve par appel, avec une latence de réponse simulée.
+
+Utilisation : python -m ai_analysis.benchmarks.bench_llm_backend --requests 200 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from ai_analysis.llm_backends import OpenAIBackend, StubBackend
+from ai_analysis.llm_stub_server import StubServer
+
+MESSAGES = [{'role': 'user', 'content': 'Analyse le règlement de consultation.'}]
+
+
+async def _burst(make_backend, request_count: int, concurrency: int, shared: bool):
+    semaphore = asyncio.Semaphore(concurrency)
+    shared_backend = make_backend() if shared else None
+
+    async def one_call():
+        async with semaphore:
+            backend = shared_backend or make_backend()
+            try:
+                await backend.acomplete(MESSAGES, model='bench')
+            finally:
+                if not shared:
+                    await backend.aclose()
+
+    await asyncio.gather(*(one_call() for _ in range(request_count)))
+    if shared_backend:
+        await shared_backend.aclose()
+
+
+def measure(server: StubServer, request_count: int, concurrency: int, shared: bool) -> dict:
+    runner = StubBackend()
+
+    def make_backend():
+        return OpenAIBackend(api_key='bench', api_base=server.api_base, pool_size=concurrency)
+
+    started = time.perf_counter()
+    runner.run(_burst(make_backend, request_count, concurrency, shared))
+    elapsed = time.perf_counter() - started
+    return {
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(request_count / elapsed, 1),
+    }
+
+
+def run(request_count: int, concurrency: int, latency: float) -> dict:
+    with StubServer(StubBackend(latency=latency)) as server:
+        return {
+            'requests': request_count,
+            'concurrency': concurrency,
+            'latency_seconds': latency,
+            'pooled_session': measure(server, request_count, concurrency, shared=True),
+            'fresh_connection_per_call': measure(server, request_count, concurrency, shared=False),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du client LLM contre le serveur stub')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.05, help='Latence simulée par réponse (secondes)')
+    args = parser.parse_args()
+    print(json.dumps(run(args.requests, args.concurrency, args.latency), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+bench_outline.py
+Micro-benchmark de l'analyse du plan renvoyé par le modèle
+Compare l'ancien analyseur (plusieurs split() par ligne, trois niveaux au
+plus) à l'analyseur en une passe de outline.py sur des plans générés de
+tailles croissantes ; le temps par entrée doit rester constant.
+
+Utilisation : python -m ai_analysis.benchmarks.bench_outline --entries 1000 10000 100000
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Dict, List
+
+from ai_analysis.outline import parse_outline, render_outline
+
+
+def generate_outline(rng: random.Random, entry_count: int, max_depth: int = 6) -> List[Dict]:
+    """
+    Génère un plan aléatoire de entry_count nœuds (profondeur bornée),
+    avec des points entiers, décimaux ou absents
+    """
+    structure = []
+    stack = []
+    for index in range(entry_count):
+        depth = rng.randint(1, min(len(stack) + 1, max_depth))
+        del stack[depth - 1:]
+        siblings = stack[-1]['subsections'] if stack else structure
+        number = f"{stack[-1]['number']}.{len(siblings) + 1}" if stack else str(len(siblings) + 1)
+        node = {
+            'number': number,
+            'title': f"{number}. Critère {index} (sous-critère)",
+            'points': rng.choice([None, rng.randint(1, 100), rng.randint(1, 40) + 0.5]),
+            'subsections': []
+        }
+        siblings.append(node)
+        stack.append(node)
+    return structure
+
+
+def legacy_extract_structure(analysis: str) -> List[Dict]:
+    """
+    Reproduit l'analyseur d'origine de AIService._extract_structure
+    """
+    structure = []
+    current_chapter = None
+    current_subchapter = None
+    chapter_number = 0
+    subchapter_number = 0
+    for line in analysis.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if line[0].isdigit() and '. ' in line and not line[2:].startswith('.'):
+            chapter_number += 1
+            subchapter_number = 0
+            title = line.split('. ', 1)[1].split(' (')[0]
+            current_chapter = {'title': f"{chapter_number}. {title}", 'subsections': []}
+            structure.append(current_chapter)
+            current_subchapter = None
+        elif line[0].isdigit() and '. ' in line and line[2:].startswith('.'):
+            subchapter_number += 1
+            title = line.split('. ', 1)[1].split(' (')[0]
+            if current_chapter:
+                current_subchapter = {
+                    'title': f"{chapter_number}.{subchapter_number}. {title}",
+                    'subsections': []
+                }
+                current_chapter['subsections'].append(current_subchapter)
+        elif line.startswith('      ') and current_subchapter:
+            current_subchapter['subsections'].append(line.strip().split(' (')[0])
+    return structure
+
+
+def _best_of(function, text: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(text)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run(entry_counts: List[int], repeat: int = 3, seed: int = 2024) -> List[Dict]:
+    rng = random.Random(seed)
+    results = []
+    for entry_count in entry_counts:
+        text = render_outline(generate_outline(rng, entry_count))
+        legacy = _best_of(legacy_extract_structure, text, repeat)
+        single_pass = _best_of(parse_outline, text, repeat)
+        results.append({
+            'entries': entry_count,
+            'legacy_seconds': round(legacy, 4),
+            'single_pass_seconds': round(single_pass, 4),
+            'single_pass_microseconds_per_entry': round(single_pass / entry_count * 1e6, 2),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark de l'analyse du plan")
+    parser.add_argument('--entries', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.entries, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
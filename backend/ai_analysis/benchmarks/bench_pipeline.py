@@ -0,0 +1,319 @@
+"""
+bench_pipeline.py
+Benchmark de bout en bout de la chaîne d'analyse des RC
+Pour chaque taille de document (RC ou CCTP synthétique de 5 à 500 pages),
+mesure :
+- le débit d'extraction du texte (pages par seconde, en série et en parallèle) ;
+- le débit de la détection des sections (PDFAnalyzer.identify_sections) ;
+- le débit de l'analyse du plan renvoyé par le modèle (AIService._extract_structure) ;
+- la latence de l'endpoint analyze_rc (dépôt du RC compris à part), le LLM
+  étant remplacé par un StubBackend à latence configurable.
+
+La mesure de bout en bout s'exécute sur une base de test créée pour
+l'occasion (comme le lanceur de tests) : la base de développement n'est pas
+modifiée. Les résultats sont produits en JSON avec la version du code, pour
+comparer deux versions (--compare : rapport nouvelle / ancienne mesure).
+
+Utilisation : python -m ai_analysis.benchmarks.bench_pipeline --pages 5 50 500 --llm-latency 0.5
+              python -m ai_analysis.benchmarks.bench_pipeline --output v2.json --compare v1.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import django
+
+from ai_analysis.ai_service import AIService, override_ai_service
+from ai_analysis.benchmarks.bench_outline import generate_outline
+from ai_analysis.benchmarks.synthetic_pdf import GENERATORS, build_pdf
+from ai_analysis.llm_backends import StubBackend
+from ai_analysis.outline import render_outline
+from ai_analysis.pdf_analyzer import PDFAnalyzer
+from ai_analysis.pdf_extraction import ExtractedDocument, iter_pages, iter_pages_parallel, join_pages
+
+MIN_PAGES = 5
+MAX_PAGES = 500
+# Durée minimale de mesure des micro-benchmarks (répétitions jusqu'à l'atteindre)
+MIN_MEASURE_SECONDS = 0.5
+OUTLINE_ENTRIES = 200
+
+
+def _throughput(function: Callable[[], object], units: int) -> Dict:
+    """
+    Répète function jusqu'à MIN_MEASURE_SECONDS et retourne le débit en unités par seconde
+    """
+    repetitions = 0
+    started = time.perf_counter()
+    while True:
+        function()
+        repetitions += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_MEASURE_SECONDS:
+            break
+    return {
+        'repetitions': repetitions,
+        'seconds_per_call': round(elapsed / repetitions, 6),
+        'per_second': round(units * repetitions / elapsed, 1),
+    }
+
+
+def _percentile(samples: List[float], percentile: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * percentile / 100))]
+
+
+def bench_extraction(pdf_path: str, page_count: int, workers: int) -> Tuple[Dict, ExtractedDocument]:
+    results = {}
+    for name, pages in (('serial', lambda: iter_pages(pdf_path)),
+                        ('parallel', lambda: iter_pages_parallel(pdf_path, workers=workers))):
+        started = time.perf_counter()
+        document = join_pages(pages())
+        elapsed = time.perf_counter() - started
+        results[f'{name}_seconds'] = round(elapsed, 4)
+        results[f'{name}_pages_per_second'] = round(page_count / elapsed, 1) if elapsed else None
+    results['workers'] = workers
+    results['characters'] = len(document.text)
+    return results, document
+
+
+def bench_sections(text: str) -> Dict:
+    analyzer = PDFAnalyzer()
+    sections = analyzer.identify_sections(text)
+    measure = _throughput(lambda: analyzer.identify_sections(text), len(sections))
+    return {
+        'sections': len(sections),
+        'seconds_per_call': measure['seconds_per_call'],
+        'sections_per_second': measure['per_second'],
+        'megabytes_per_second': round(len(text.encode('utf-8')) / measure['seconds_per_call'] / 1e6, 1),
+    }
+
+
+def bench_outline(service: AIService, entries: int = OUTLINE_ENTRIES) -> Dict:
+    answer = render_outline(generate_outline(random.Random(0), entries))
+    measure = _throughput(lambda: service._extract_structure(answer), entries)
+    return {
+        'entries': entries,
+        'seconds_per_call': measure['seconds_per_call'],
+        'entries_per_second': measure['per_second'],
+    }
+
+
+class BenchmarkDatabase:
+    """
+    Base de test temporaire (migrations appliquées, tables non gérées
+    MOA/MOE créées) pour la mesure de bout en bout
+    """
+
+    def __enter__(self):
+        from django.db import connection
+        from django.test.utils import setup_test_environment, teardown_test_environment
+        from moas.models import MOA, MOE
+
+        self._teardown_environment = teardown_test_environment
+        setup_test_environment()
+        self.old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        with connection.schema_editor() as editor:
+            for model in (MOA, MOE):
+                editor.create_model(model)
+        return self
+
+    def __exit__(self, *exc_info):
+        from django.db import connection
+
+        connection.creation.destroy_test_db(self.old_name, verbosity=0)
+        self._teardown_environment()
+
+
+def bench_analyze_rc(pdf_bytes: bytes, runs: int, llm_latency: float, token_latency: float) -> Dict:
+    """
+    Latence de l'endpoint analyze_rc : dépôt du RC (extraction du texte au
+    dépôt) puis analyses successives, le cache étant vidé avant chacune ;
+    une dernière requête mesure la réponse servie depuis le cache
+    """
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    # Modèles importés après django.setup() (voir main)
+    from ai_analysis.models import RCAnalysis
+    from projects.models import Project, ReferenceDocument
+    from users.models import User
+
+    backend = StubBackend(latency=llm_latency, token_latency=token_latency)
+    media_root = tempfile.mkdtemp()
+    try:
+        with override_settings(MEDIA_ROOT=media_root), override_ai_service(AIService(llm_backend=backend)):
+            user = User.objects.filter(email='bench@example.com').first() or User.objects.create_user(
+                email='bench@example.com', password='BenchPass123!', role='WRITER'
+            )
+            client = APIClient()
+            client.force_authenticate(user=user)
+            project = Project.objects.create(name='Benchmark')
+
+            started = time.perf_counter()
+            ReferenceDocument.objects.create(project=project, type='RC',
+                                             file=SimpleUploadedFile('rc.pdf', pdf_bytes))
+            upload_seconds = time.perf_counter() - started
+
+            url = f'/api/analysis/{project.id}/analyze_rc/'
+            latencies = []
+            for _ in range(runs):
+                RCAnalysis.objects.filter(project=project).delete()
+                started = time.perf_counter()
+                response = client.post(url)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise RuntimeError(f"analyze_rc a répondu {response.status_code} : {response.data}")
+            llm_calls = backend.calls
+
+            started = time.perf_counter()
+            client.post(url)
+            cached_seconds = time.perf_counter() - started
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+
+    return {
+        'runs': runs,
+        'llm_latency': llm_latency,
+        'llm_calls_per_analysis': round(llm_calls / runs, 1),
+        'upload_seconds': round(upload_seconds, 4),
+        'p50_seconds': round(_percentile(latencies, 50), 4),
+        'max_seconds': round(max(latencies), 4),
+        'cached_seconds': round(cached_seconds, 4),
+    }
+
+
+def run(page_counts: List[int], doc_type: str = 'RC', runs: int = 3, llm_latency: float = 0.5,
+        token_latency: float = 0.0, workers: Optional[int] = None, end_to_end: bool = True) -> Dict:
+    workers = workers or os.cpu_count() or 1
+    service = AIService(llm_backend=StubBackend())
+    documents = {
+        page_count: build_pdf(GENERATORS[doc_type](page_count)) for page_count in page_counts
+    }
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for page_count, pdf_bytes in documents.items():
+            pdf_path = os.path.join(tmp_dir, f'{doc_type.lower()}_{page_count}.pdf')
+            with open(pdf_path, 'wb') as file:
+                file.write(pdf_bytes)
+            extraction, document = bench_extraction(pdf_path, page_count, workers)
+            results.append({
+                'pages': page_count,
+                'file_size_kb': round(len(pdf_bytes) / 1024, 1),
+                'extraction': extraction,
+                'identify_sections': bench_sections(document.text),
+                'extract_structure': bench_outline(service),
+            })
+
+    if end_to_end:
+        with BenchmarkDatabase():
+            for result in results:
+                result['analyze_rc'] = bench_analyze_rc(documents[result['pages']], runs, llm_latency, token_latency)
+
+    return {
+        'meta': _metadata(),
+        'config': {
+            'doc_type': doc_type,
+            'pages': page_counts,
+            'runs': runs,
+            'llm_latency': llm_latency,
+            'token_latency': token_latency,
+            'workers': workers,
+        },
+        'results': results,
+    }
+
+
+def _metadata() -> Dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def _numeric_leaves(data: Dict, prefix: str = '') -> Dict[str, float]:
+    leaves = {}
+    for key, value in data.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            leaves.update(_numeric_leaves(value, f'{name}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            leaves[name] = value
+    return leaves
+
+
+def compare(current: Dict, baseline: Dict) -> Dict:
+    """
+    Rapport nouvelle / ancienne mesure pour chaque métrique numérique des
+    documents de même taille (au-dessus de 1 : débit meilleur ou latence pire)
+    """
+    previous = {result['pages']: _numeric_leaves(result) for result in baseline.get('results', [])}
+    ratios = {}
+    for result in current['results']:
+        before = previous.get(result['pages'])
+        if before is None:
+            continue
+        ratios[str(result['pages'])] = {
+            name: round(value / before[name], 3)
+            for name, value in _numeric_leaves(result).items()
+            if name != 'pages' and before.get(name)
+        }
+    return {'baseline_commit': baseline.get('meta', {}).get('commit'), 'ratios': ratios}
+
+
+def _page_count(value: str) -> int:
+    page_count = int(value)
+    if not MIN_PAGES <= page_count <= MAX_PAGES:
+        raise argparse.ArgumentTypeError(f'nombre de pages entre {MIN_PAGES} et {MAX_PAGES}')
+    return page_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de bout en bout de la chaîne d'analyse des RC")
+    parser.add_argument('--pages', type=_page_count, nargs='+', default=[5, 50, 500])
+    parser.add_argument('--type', dest='doc_type', choices=['RC', 'CCTP'], default='RC')
+    parser.add_argument('--runs', type=int, default=3, help='analyses mesurées par taille de document')
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='latence simulée par appel au LLM (s)')
+    parser.add_argument('--token-latency', type=float, default=0.0, help='latence simulée par token diffusé (s)')
+    parser.add_argument('--workers', type=int, default=None, help="processus de l'extraction parallèle")
+    parser.add_argument('--no-end-to-end', action='store_true', help="sans la mesure de l'endpoint analyze_rc")
+    parser.add_argument('--output', help='fichier JSON des résultats (sortie standard sinon)')
+    parser.add_argument('--compare', help="fichier JSON d'une mesure précédente")
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    django.setup()
+
+    report = run(args.pages, args.doc_type, args.runs, args.llm_latency, args.token_latency,
+                 args.workers, end_to_end=not args.no_end_to_end)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            report['comparison'] = compare(report, json.load(file))
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
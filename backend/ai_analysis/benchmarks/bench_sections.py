@@ -0,0 +1,99 @@
+"""
+bench_sections.py
+Benchmark de la détection des sections sur un CCTP volumineux
+Compare l'ancienne détection (trois re.match non compilés par ligne) à
+l'expression précompilée de PDFAnalyzer, puis la récupération du texte
+d'une section par nouveau parcours du document à la lecture dans l'index
+des sections.
+
+Utilisation : python -m ai_analysis.benchmarks.bench_sections --pages 2000
+"""
+
+import argparse
+import json
+import re
+import time
+from typing import Dict, List
+
+from ai_analysis.benchmarks.synthetic_pdf import LINES_PER_PAGE, generate_document_pages
+from ai_analysis.pdf_analyzer import PDFAnalyzer
+from ai_analysis.pdf_extraction import join_pages
+
+LEGACY_PATTERNS = [
+    r'^(\d+\.\d+\.\d+)\s+(.+)$',
+    r'^(\d+\.\d+)\s+(.+)$',
+    r'^(\d+)\s+(.+)$',
+]
+
+
+def legacy_identify_sections(text: str) -> List[Dict]:
+    """
+    Reproduit la détection d'origine de PDFAnalyzer.identify_sections
+    """
+    sections = []
+    for line in text.split('\n'):
+        for pattern in LEGACY_PATTERNS:
+            match = re.match(pattern, line.strip())
+            if match:
+                number = match.group(1)
+                sections.append({'number': number, 'title': match.group(2), 'level': len(number.split('.'))})
+                break
+    return sections
+
+
+def legacy_section_text(text: str, number: str) -> str:
+    """
+    Retrouve le texte d'une section en reparcourant tout le document
+    """
+    blocks = PDFAnalyzer().split_sections(text)
+    for block in blocks:
+        if block.startswith(f'{number} '):
+            return block
+    return ''
+
+
+def _timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - started, result
+
+
+def run(page_count: int, lookups: int = 20) -> Dict:
+    document = join_pages(enumerate(
+        ('\n'.join(lines) for lines in generate_document_pages(page_count, LINES_PER_PAGE)), start=1
+    ))
+    text = document.text
+    analyzer = PDFAnalyzer()
+
+    legacy_seconds, legacy_sections = _timed(legacy_identify_sections, text)
+    compiled_seconds, sections = _timed(analyzer.identify_sections, text)
+    index_seconds, index = _timed(analyzer.build_section_index, text, document.page_offsets)
+    assert sections == legacy_sections
+
+    numbers = [section['number'] for section in index.sections]
+    targets = [numbers[(i * 7919) % len(numbers)] for i in range(lookups)]
+    rescan_seconds, _ = _timed(lambda: [legacy_section_text(text, number) for number in targets])
+    lookup_seconds, _ = _timed(lambda: [index.section_text(text, number) for number in targets])
+
+    return {
+        'pages': page_count,
+        'lines': text.count('\n'),
+        'sections': len(sections),
+        'legacy_identify_seconds': round(legacy_seconds, 4),
+        'compiled_identify_seconds': round(compiled_seconds, 4),
+        'build_index_seconds': round(index_seconds, 4),
+        f'rescan_{lookups}_lookups_seconds': round(rescan_seconds, 4),
+        f'index_{lookups}_lookups_seconds': round(lookup_seconds, 6),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la détection des sections')
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--lookups', type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.pages, args.lookups), indent=2))
+
+
+if __name__ == '__main__':
+    main()
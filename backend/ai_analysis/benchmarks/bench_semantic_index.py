@@ -0,0 +1,108 @@
+"""
+bench_semantic_index.py
+Benchmark de la recherche sémantique de la bibliothèque
+Remplit un index temporaire de vecteurs aléatoires normalisés (dimension
+du modèle par défaut), puis mesure la latence des recherches top-k :
+médiane, p99 et maximum. Avec --with-model, l'encodage de la requête par
+le modèle transformers est inclus dans la mesure (requêtes toutes
+différentes, sans effet du cache).
+
+Mesure aussi l'appariement d'un plan complet (--sections intitulés
+comparés à tout l'index par un seul produit matriciel, voir
+bibliotheque_mt.suggestions).
+
+Utilisation : python -m ai_analysis.benchmarks.bench_semantic_index --elements 100000
+              python -m ai_analysis.benchmarks.bench_semantic_index --elements 50000 --sections 60
+"""
+
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from bibliotheque_mt.semantic_index import EmbeddingIndex
+
+DEFAULT_DIM = 384
+
+
+def _percentile(samples: List[float], percentile: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * percentile / 100))]
+
+
+def run(element_count: int, queries: int = 500, k: int = 10, dim: int = DEFAULT_DIM,
+        with_model: bool = False, sections: int = 60) -> Dict:
+    embedder = None
+    if with_model:
+        from bibliotheque_mt.semantic_index import TextEmbedder
+        embedder = TextEmbedder()
+        dim = embedder.dim
+
+    rng = np.random.default_rng(0)
+    directory = tempfile.mkdtemp()
+    try:
+        index = EmbeddingIndex(directory, dim)
+        started = time.perf_counter()
+        for start in range(0, element_count, 10000):
+            count = min(10000, element_count - start)
+            index.upsert(range(start, start + count), rng.standard_normal((count, dim), dtype=np.float32))
+        build_seconds = time.perf_counter() - started
+
+        latencies = []
+        for query_number in range(queries):
+            started = time.perf_counter()
+            if embedder is not None:
+                vector = embedder.embed([f"Mesures de sécurité du chantier numéro {query_number}"])[0]
+            else:
+                vector = rng.standard_normal(dim, dtype=np.float32)
+            index.search(vector, k=k)
+            latencies.append(time.perf_counter() - started)
+
+        # Plan complet : encodage des intitulés en une passe puis un seul produit matriciel
+        outline_latencies = []
+        for outline_number in range(20):
+            started = time.perf_counter()
+            if embedder is not None:
+                titles = [f"Chapitre {outline_number}.{section} : moyens humains et matériels" for section in range(sections)]
+                vectors = embedder.embed(titles, batch_size=len(titles))
+            else:
+                vectors = rng.standard_normal((sections, dim), dtype=np.float32)
+            index.search_many(vectors, k=k)
+            outline_latencies.append(time.perf_counter() - started)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        'elements': element_count,
+        'dim': dim,
+        'k': k,
+        'queries': queries,
+        'with_model': with_model,
+        'build_seconds': round(build_seconds, 3),
+        'p50_ms': round(_percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(_percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2),
+        'sections': sections,
+        'outline_p50_ms': round(_percentile(outline_latencies, 50) * 1000, 2),
+        'outline_max_ms': round(max(outline_latencies) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la recherche sémantique de la bibliothèque')
+    parser.add_argument('--elements', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--sections', type=int, default=60, help="nombre d'intitulés du plan apparié")
+    parser.add_argument('--with-model', action='store_true',
+                        help="inclut l'encodage de la requête par le modèle transformers")
+    args = parser.parse_args()
+    print(json.dumps(run(args.elements, args.queries, args.k, with_model=args.with_model, sections=args.sections), indent=2))
+
+
+if __name__ == '__main__':
+    main()
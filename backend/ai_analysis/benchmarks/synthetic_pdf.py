@@ -0,0 +1,147 @@
+"""
+synthetic_pdf.py
+Génération de PDF synthétiques (RC et CCTP) pour les benchmarks et les tests
+Écrit directement la structure PDF (police Helvetica standard, encodage
+WinAnsi) sans dépendance externe, de façon à ce que PyPDF2 puisse en
+extraire le texte.
+"""
+
+from typing import List, Sequence
+
+# Nombre de lignes par page et interligne (en points)
+LINES_PER_PAGE = 50
+LINE_HEIGHT = 14
+
+
+def _escape(line: str) -> bytes:
+    """
+    Encode une ligne de texte pour un opérateur Tj
+    """
+    encoded = line.encode('cp1252', errors='replace')
+    return encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def _content_stream(lines: Sequence[str]) -> bytes:
+    parts = [b'BT /F1 10 Tf ', str(LINE_HEIGHT).encode(), b' TL 50 800 Td']
+    for line in lines:
+        parts.append(b' (' + _escape(line) + b') Tj T*')
+    parts.append(b' ET')
+    return b''.join(parts)
+
+
+def build_pdf(pages: Sequence[Sequence[str]]) -> bytes:
+    """
+    Construit un PDF dont chaque page contient les lignes données
+    """
+    page_count = len(pages)
+    # Objets : 1 catalogue, 2 arbre des pages, 3 police, puis (page, contenu) par page
+    objects: List[bytes] = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [' + b' '.join(
+            f'{4 + 2 * i} 0 R'.encode() for i in range(page_count)
+        ) + b'] /Count ' + str(page_count).encode() + b' >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+    ]
+    for i, lines in enumerate(pages):
+        content_id = 5 + 2 * i
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents ' + f'{content_id} 0 R'.encode() + b' >>'
+        )
+        stream = _content_stream(lines)
+        objects.append(
+            b'<< /Length ' + str(len(stream)).encode() + b' >>\nstream\n' + stream + b'\nendstream'
+        )
+
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f'{number} 0 obj\n'.encode() + body + b'\nendobj\n'
+
+    xref_offset = len(output)
+    output += f'xref\n0 {len(objects) + 1}\n'.encode()
+    output += b'0000000000 65535 f \n'
+    for offset in offsets:
+        output += f'{offset:010d} 00000 n \n'.encode()
+    output += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n'.encode()
+    return bytes(output)
+
+
+def generate_document_pages(page_count: int, lines_per_page: int = LINES_PER_PAGE) -> List[List[str]]:
+    """
+    Génère le texte d'un document type CCTP : un article numéroté par page,
+    suivi de paragraphes de prescriptions
+    """
+    pages = []
+    for page_number in range(1, page_count + 1):
+        chapter = (page_number - 1) // 10 + 1
+        article = (page_number - 1) % 10 + 1
+        lines = [f'{chapter}.{article} Prescriptions techniques de l\'article {chapter}.{article}']
+        for line_number in range(1, lines_per_page):
+            lines.append(
+                f'L\'entrepreneur doit fournir les matériaux conformes à la norme NF EN {1000 + line_number} '
+                f'(page {page_number}, ligne {line_number}).'
+            )
+        pages.append(lines)
+    return pages
+
+
+# Articles d'un règlement de consultation, répétés pour atteindre le nombre de pages
+RC_ARTICLES = [
+    'Objet de la consultation',
+    'Conditions de la consultation',
+    'Contenu du dossier de consultation',
+    'Présentation des candidatures et des offres',
+    'Jugement des offres',
+    'Conditions d\'envoi et de remise des plis',
+]
+# Critères de jugement (numérotés sous l'article de jugement)
+RC_CRITERIA = [
+    ('1', 'Valeur technique (60 points)'),
+    ('1.1', 'Méthodologie d\'exécution des travaux (30 points)'),
+    ('1.2', 'Moyens humains et matériels affectés au chantier (20 points)'),
+    ('1.3', 'Mesures prises en matière de sécurité et d\'environnement (10 points)'),
+    ('2', 'Prix des prestations (40 points)'),
+]
+JUDGEMENT_ARTICLE = 5
+
+
+def generate_rc_pages(page_count: int, lines_per_page: int = LINES_PER_PAGE) -> List[List[str]]:
+    """
+    Génère le texte d'un document type RC : un article numéroté par page,
+    l'article de jugement des offres (5e page, ou dernière page d'un RC plus
+    court) portant les critères de jugement et leurs points
+    """
+    judgement_page = min(JUDGEMENT_ARTICLE, page_count)
+    pages = []
+    for page_number in range(1, page_count + 1):
+        title = RC_ARTICLES[(page_number - 1) % len(RC_ARTICLES)]
+        lines = [f'{page_number} {title}']
+        if page_number == judgement_page:
+            lines.append('Les offres sont jugées sur les critères pondérés suivants :')
+            lines.extend(f'{page_number}.{number} {criterion}' for number, criterion in RC_CRITERIA)
+        while len(lines) < lines_per_page:
+            lines.append(
+                f'Le candidat se conforme aux dispositions de l\'article {page_number} du présent '
+                f'règlement (page {page_number}, ligne {len(lines)}).'
+            )
+        pages.append(lines)
+    return pages
+
+
+# Générateurs de pages par type de document
+GENERATORS = {
+    'CCTP': generate_document_pages,
+    'RC': generate_rc_pages,
+}
+
+
+def write_synthetic_pdf(path: str, page_count: int, lines_per_page: int = LINES_PER_PAGE,
+                        doc_type: str = 'CCTP') -> str:
+    """
+    Écrit un PDF synthétique (RC ou CCTP) de page_count pages et retourne son chemin
+    """
+    with open(path, 'wb') as file:
+        file.write(build_pdf(GENERATORS[doc_type](page_count, lines_per_page)))
+    return path
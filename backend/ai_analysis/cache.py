@@ -0,0 +1,173 @@
+"""
+cache.py
+Cache des analyses de RC
+Les résultats sont stockés dans RCAnalysis et identifiés par l'empreinte
+SHA-256 du fichier RC, le nom du modèle et la version du prompt.
+
+Les appels d'offres allotis donnent un projet par lot avec le même RC : une
+analyse absente du projet est d'abord cherchée dans les autres projets dont
+le RC a la même empreinte (fichier identique) ou le même texte normalisé
+(voir DocumentText.text_hash), puis copiée dans le projet sans appel au LLM.
+"""
+
+import hashlib
+import logging
+from typing import Dict, List, Optional
+
+from django.db import IntegrityError
+from django.db.models import Count, Q
+
+from .models import DocumentText, RCAnalysis
+
+logger = logging.getLogger(__name__)
+
+# Taille des blocs lus pour le calcul de l'empreinte (1 Mo)
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def compute_file_hash(file_path: str) -> str:
+    """
+    Calcule l'empreinte SHA-256 d'un fichier, lu par blocs
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_cached_analysis(project_id, file_hash: str, model_name: str, prompt_version: str) -> Optional[RCAnalysis]:
+    """
+    Retourne l'analyse en cache pour ce RC, ou None si absente.
+    Une analyse d'un autre projet au RC identique est copiée dans ce projet.
+    """
+    cache_key = {'file_hash': file_hash, 'model_name': model_name, 'prompt_version': prompt_version}
+    cached = RCAnalysis.objects.filter(project_id=project_id, **cache_key).first()
+    if cached or not file_hash:
+        return cached
+    return share_analysis(project_id, file_hash, model_name, prompt_version)
+
+
+def equivalent_file_hashes(file_hash: str):
+    """
+    Empreintes des fichiers dont le texte normalisé est identique à celui de
+    ce fichier (requête, évaluée comme sous-requête)
+    """
+    text_hashes = DocumentText.objects.filter(content_hash=file_hash).exclude(text_hash='').values('text_hash')
+    return DocumentText.objects.filter(text_hash__in=text_hashes).values('content_hash')
+
+
+def share_analysis(project_id, file_hash: str, model_name: str, prompt_version: str) -> Optional[RCAnalysis]:
+    """
+    Cherche l'analyse d'un autre projet dont le RC est identique (même
+    fichier, sinon même texte normalisé) et la copie dans ce projet.
+    Retourne None si aucun projet ne partage ce RC.
+    """
+    candidates = RCAnalysis.objects.filter(
+        model_name=model_name, prompt_version=prompt_version
+    ).exclude(project_id=project_id)
+
+    source = candidates.filter(file_hash=file_hash).first()
+    dedup_source = 'file'
+    if source is None:
+        source = candidates.filter(file_hash__in=equivalent_file_hashes(file_hash)).first()
+        dedup_source = 'text'
+    if source is None:
+        return None
+
+    logger.info(
+        f"Analyse RC reprise du projet {source.project_id} pour le projet {project_id} "
+        f"({dedup_source} identique, empreinte {file_hash[:12]})"
+    )
+    return save_analysis(project_id, file_hash, model_name, prompt_version, {
+        'analysis_data': source.analysis_data,
+        'summary_data': source.summary_data,
+        'fragments': source.fragments,
+        'dedup_source': dedup_source,
+    })
+
+
+def save_analysis(project_id, file_hash: str, model_name: str, prompt_version: str, values: Dict) -> RCAnalysis:
+    """
+    Crée ou met à jour l'analyse du projet pour cette clé de cache (unique,
+    voir RCAnalysis). Si une analyse simultanée a créé la ligne entre la
+    lecture et l'insertion, l'insertion est rejouée comme une mise à jour.
+    """
+    lookup = {
+        'project_id': project_id,
+        'file_hash': file_hash,
+        'model_name': model_name,
+        'prompt_version': prompt_version,
+    }
+    try:
+        analysis, _ = RCAnalysis.objects.update_or_create(defaults=values, **lookup)
+    except IntegrityError:
+        logger.info(f"Analyse RC enregistrée simultanément (projet {project_id}, empreinte {file_hash[:12]}) : mise à jour")
+        analysis, _ = RCAnalysis.objects.update_or_create(defaults=values, **lookup)
+    return analysis
+
+
+def store_analysis(project_id, file_hash: str, model_name: str, prompt_version: str,
+                   analysis_data: Dict, summary_data: Dict, fragments: Optional[List[Dict]] = None) -> RCAnalysis:
+    """
+    Enregistre (ou remplace) l'analyse d'un RC dans le cache, avec son
+    découpage en extraits (et leurs structures partielles s'il y en a)
+    """
+    return save_analysis(project_id, file_hash, model_name, prompt_version, {
+        'analysis_data': analysis_data,
+        'summary_data': summary_data,
+        'fragments': fragments or [],
+        'dedup_source': '',
+    })
+
+
+def get_previous_analysis(project_id, file_hash: str, model_name: str, prompt_version: str) -> Optional[RCAnalysis]:
+    """
+    Retourne la dernière analyse d'une version précédente du RC du projet
+    comportant un découpage en extraits (base de l'analyse d'un RC modificatif)
+    """
+    previous = RCAnalysis.objects.filter(
+        project_id=project_id, model_name=model_name, prompt_version=prompt_version
+    ).exclude(file_hash=file_hash).order_by('-updated_at').first()
+    return previous if previous and previous.fragments else None
+
+
+def invalidate_project_analyses(project_id, keep_hash: Optional[str] = None, keep_previous: bool = False) -> int:
+    """
+    Supprime les analyses en cache d'un projet.
+    Si keep_hash est fourni, les analyses de ce fichier sont conservées.
+    Avec keep_previous, la dernière analyse d'un autre fichier est
+    conservée comme base de l'analyse incrémentale du RC modificatif.
+    """
+    queryset = RCAnalysis.objects.filter(project_id=project_id)
+    if keep_hash:
+        queryset = queryset.exclude(file_hash=keep_hash)
+    if keep_previous:
+        previous = queryset.order_by('-updated_at').first()
+        if previous and previous.fragments:
+            queryset = queryset.exclude(pk=previous.pk)
+    deleted, _ = queryset.delete()
+    if deleted:
+        logger.info(f"{deleted} analyse(s) RC invalidée(s) pour le projet {project_id}")
+    return deleted
+
+
+def dedup_stats() -> Dict:
+    """
+    Taux de reprise entre projets : part des analyses de RC et des textes
+    extraits copiés depuis un autre projet au lieu d'être recalculés
+    """
+    stats = {}
+    for name, model in (('analyses', RCAnalysis), ('texts', DocumentText)):
+        counts = model.objects.aggregate(
+            total=Count('pk'),
+            file=Count('pk', filter=Q(dedup_source='file')),
+            text=Count('pk', filter=Q(dedup_source='text')),
+        )
+        shared = counts['file'] + counts['text']
+        stats[name] = {
+            **counts,
+            'shared': shared,
+            'hit_rate': round(shared / counts['total'], 4) if counts['total'] else 0.0,
+        }
+    return stats
@@ -0,0 +1,142 @@
+"""
+chunking.py
+Comptage des tokens et découpage des RC longs pour l'analyse map-reduce
+Le texte est découpé aux frontières de sections détectées par PDFAnalyzer,
+puis les sections consécutives sont regroupées en extraits ne dépassant pas
+le budget de tokens. Chaque section de premier niveau commence un nouvel
+extrait : une modification ne touche ainsi que les extraits de sa section.
+
+Pour un RC modificatif, le découpage de la version précédente est repris
+(split_along_layout) : les extraits dont le texte n'a pas changé sont
+reproduits à l'identique et leur analyse peut être réutilisée.
+"""
+
+import hashlib
+from typing import List, Sequence
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken est optionnel : on se rabat sur une estimation
+    tiktoken = None
+
+# Estimation utilisée sans tiktoken : environ 4 caractères par token
+CHARS_PER_TOKEN = 4
+
+_encodings = {}
+
+
+def _get_encoding(model: str):
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding('cl100k_base')
+    return _encodings[model]
+
+
+def count_tokens(text: str, model: str = '') -> int:
+    """
+    Compte les tokens d'un texte pour le modèle donné
+    (estimation par le nombre de caractères si tiktoken n'est pas installé)
+    """
+    if tiktoken is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(_get_encoding(model).encode(text))
+
+
+def _split_oversized(block: str, max_tokens: int, model: str) -> List[str]:
+    """
+    Découpe ligne par ligne une section trop longue pour un seul extrait
+    """
+    pieces = []
+    current = []
+    current_tokens = 0
+    for line in block.split('\n'):
+        line_tokens = count_tokens(line, model) + 1
+        if current and current_tokens + line_tokens > max_tokens:
+            pieces.append('\n'.join(current))
+            current = []
+            current_tokens = 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        pieces.append('\n'.join(current))
+    return pieces
+
+
+def _is_top_level(block: str, pdf_analyzer) -> bool:
+    """
+    Le bloc commence-t-il par un titre de section de premier niveau ("3 Titre") ?
+    """
+    match = pdf_analyzer.section_re.match(block)
+    return bool(match) and '.' not in match.group(1)
+
+
+def split_into_chunks(text: str, max_tokens: int, model: str, pdf_analyzer) -> List[str]:
+    """
+    Découpe le texte en extraits d'au plus max_tokens tokens, en coupant
+    de préférence aux frontières de sections (toujours à celles de premier niveau)
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for block in pdf_analyzer.split_sections(text):
+        if current and _is_top_level(block, pdf_analyzer):
+            chunks.append('\n'.join(current))
+            current = []
+            current_tokens = 0
+        block_tokens = count_tokens(block, model)
+        if block_tokens > max_tokens:
+            pieces = _split_oversized(block, max_tokens, model)
+        else:
+            pieces = [block]
+
+        for piece in pieces:
+            piece_tokens = block_tokens if len(pieces) == 1 else count_tokens(piece, model)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append('\n'.join(current))
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += piece_tokens
+
+    if current:
+        chunks.append('\n'.join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def chunk_key(chunk: str) -> str:
+    """
+    Clé de frontière d'un extrait : sa première ligne (titre de section)
+    """
+    return chunk.split('\n', 1)[0].strip()
+
+
+def chunk_hash(chunk: str) -> str:
+    return hashlib.sha256(chunk.encode('utf-8')).hexdigest()
+
+
+def split_along_layout(text: str, boundaries: Sequence[str], max_tokens: int, model: str,
+                       pdf_analyzer) -> List[str]:
+    """
+    Découpe le texte en reprenant les frontières d'extraits d'une version
+    précédente (clés de chunk_key) : un nouvel extrait commence à chaque
+    section dont le titre ouvrait un extrait. Les extraits dont le texte n'a
+    pas changé sont ainsi identiques à ceux de la version précédente ; ceux
+    qui dépassent le budget de tokens sont redécoupés.
+    """
+    boundary_keys = set(boundaries)
+    groups: List[List[str]] = [[]]
+    for block in pdf_analyzer.split_sections(text):
+        if groups[-1] and chunk_key(block) in boundary_keys:
+            groups.append([])
+        groups[-1].append(block)
+
+    chunks = []
+    for group in groups:
+        chunk = '\n'.join(group)
+        if count_tokens(chunk, model) > max_tokens:
+            chunks.extend(split_into_chunks(chunk, max_tokens, model, pdf_analyzer))
+        elif chunk.strip():
+            chunks.append(chunk)
+    return chunks
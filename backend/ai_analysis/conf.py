@@ -0,0 +1,20 @@
+"""
+conf.py
+Lecture des réglages de l'application d'analyse IA
+Les modules utilisables hors Django (extraction PDF, registre des modèles,
+extraction des exigences, benchmarks) lisent leurs réglages par setting().
+"""
+
+
+def setting(name: str, default):
+    """
+    Lit un réglage Django s'il est configuré, sinon retourne default (le
+    module appelant reste utilisable hors Django)
+    """
+    try:
+        from django.conf import settings
+        if settings.configured:
+            return getattr(settings, name, default)
+    except ImportError:
+        pass
+    return default
@@ -0,0 +1,323 @@
+"""
+corpus_index.py
+Index TF-IDF du corpus des documents de référence (RC et CCTP)
+Chaque texte enregistré (DocumentText) est découpé en termes et indexé dans
+un vecteur creux (TermVector : identifiants des termes triés et nombres
+d'occurrences, en tableaux NumPy). Les fréquences documentaires des termes
+(CorpusTerm.doc_freq) sont tenues à jour à chaque indexation ou suppression
+d'un document, par différence entre l'ancien et le nouvel ensemble de termes,
+sans recalcul du corpus.
+
+- document_keywords : termes clés d'un document, pondérés par TF-IDF contre
+  le corpus (quelques requêtes, sans relire le PDF) ;
+- similar_tenders : appels d'offres passés les plus proches d'un document
+  (similarité cosinus sur la matrice creuse du corpus, gardée en mémoire et
+  reconstruite lorsque le corpus change).
+"""
+
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max
+
+from projects.models import Project
+
+from .models import CorpusTerm, DocumentText, TermVector
+
+logger = logging.getLogger(__name__)
+
+# Mots de trois lettres ou plus, sans chiffres (les élisions l', d', qu' sont séparées)
+TERM_RE = re.compile(r'[^\W\d_]{3,}')
+MAX_TERM_LENGTH = 100
+# Taille des lots des requêtes sur les termes (limite des paramètres SQL)
+QUERY_BATCH_SIZE = 500
+# Occurrences minimales d'un terme clé dans le document (écarte les coquilles d'OCR)
+MIN_KEYWORD_COUNT = 2
+
+STOPWORDS = frozenset("""
+    les des une uns unes aux par pour dans sur sous avec sans entre vers chez est sont sera seront
+    été être étant avoir ont aura auront avait qui que quoi dont où son sa ses leur leurs notre nos
+    votre vos cet cette ces celui celle ceux celles tout tous toute toutes autre autres même mêmes
+    plus moins très peu pas non ainsi alors aussi donc car mais puis comme lors selon après avant
+    pendant depuis jusqu elle elles ils lui eux nous vous doit doivent devra devront peut peuvent
+    pourra pourront faire fait faite faits être cas chaque tel telle tels telles article articles
+    page pages présent présente présents présentes ci dessus dessous suivant suivante suivants
+    suivantes chacun chacune quel quelle quels quelles afin toutefois notamment ceci cela
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Termes d'un texte : mots en minuscules de trois lettres ou plus, hors mots vides
+    """
+    return [term for term in TERM_RE.findall(text.casefold())
+            if term not in STOPWORDS and len(term) <= MAX_TERM_LENGTH]
+
+
+def term_frequencies(text: str) -> Counter:
+    return Counter(tokenize(text))
+
+
+def idf(doc_freq, corpus_size: int):
+    """
+    Fréquence documentaire inverse lissée : log((1 + N) / (1 + df)) + 1
+    """
+    return np.log((1.0 + corpus_size) / (1.0 + np.asarray(doc_freq, dtype=np.float64))) + 1.0
+
+
+def tf(counts):
+    """
+    Poids sous-linéaire des occurrences : 1 + log(tf)
+    """
+    return 1.0 + np.log(np.asarray(counts, dtype=np.float64))
+
+
+def unpack(vector: TermVector) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Identifiants des termes et nombres d'occurrences d'un vecteur stocké
+    """
+    return (np.frombuffer(bytes(vector.term_ids), dtype=np.int64),
+            np.frombuffer(bytes(vector.term_counts), dtype=np.int32))
+
+
+def _batches(items: List, size: int = QUERY_BATCH_SIZE) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _term_ids(terms: List[str]) -> Dict[str, int]:
+    """
+    Identifiants des termes, créés au besoin
+    """
+    CorpusTerm.objects.bulk_create([CorpusTerm(term=term) for term in terms],
+                                   ignore_conflicts=True, batch_size=QUERY_BATCH_SIZE)
+    ids = {}
+    for batch in _batches(terms):
+        ids.update(CorpusTerm.objects.filter(term__in=batch).values_list('term', 'id'))
+    return ids
+
+
+def _shift_doc_freq(term_ids: Iterable[int], delta: int):
+    """
+    Ajoute delta à la fréquence documentaire des termes (mise à jour atomique en base)
+    """
+    for batch in _batches(sorted(int(term_id) for term_id in term_ids)):
+        CorpusTerm.objects.filter(id__in=batch).update(doc_freq=F('doc_freq') + delta)
+
+
+def index_document_text(stored: DocumentText) -> TermVector:
+    """
+    Indexe le texte d'un document ; seuls les termes apparus ou disparus
+    depuis l'indexation précédente modifient les fréquences documentaires
+    """
+    existing = TermVector.objects.filter(text=stored).first()
+    if existing and existing.content_hash == stored.content_hash:
+        return existing
+
+    counts = term_frequencies(stored.text)
+    with transaction.atomic():
+        # Vecteur précédent relu sous verrou : deux indexations simultanées du
+        # même texte ne retirent ni n'ajoutent deux fois ses termes
+        existing = TermVector.objects.select_for_update().filter(text=stored).first()
+        if existing and existing.content_hash == stored.content_hash:
+            return existing
+        ids = _term_ids(list(counts))
+        pairs = sorted((ids[term], count) for term, count in counts.items())
+        term_ids = np.array([term_id for term_id, _ in pairs], dtype=np.int64)
+        term_counts = np.array([count for _, count in pairs], dtype=np.int32)
+
+        previous = set(unpack(existing)[0].tolist()) if existing else set()
+        current = set(term_ids.tolist())
+        _shift_doc_freq(current - previous, 1)
+        _shift_doc_freq(previous - current, -1)
+
+        vector, _ = TermVector.objects.update_or_create(
+            text=stored,
+            defaults={
+                'content_hash': stored.content_hash,
+                'term_ids': term_ids.tobytes(),
+                'term_counts': term_counts.tobytes(),
+                'term_total': int(term_counts.sum()),
+            }
+        )
+    logger.info(f"Texte {stored.pk} indexé : {len(term_ids)} termes distincts")
+    return vector
+
+
+def forget_term_vector(vector: TermVector):
+    """
+    Retire un vecteur supprimé des fréquences documentaires
+    """
+    _shift_doc_freq(unpack(vector)[0].tolist(), -1)
+
+
+def get_term_vector(stored: DocumentText) -> TermVector:
+    """
+    Vecteur du texte, indexé au besoin (texte enregistré avant l'index, ou remplacé)
+    """
+    vector = TermVector.objects.filter(text=stored).first()
+    if vector and vector.content_hash == stored.content_hash:
+        return vector
+    return index_document_text(stored)
+
+
+def document_keywords(stored: DocumentText, limit: Optional[int] = None) -> List[Dict]:
+    """
+    Termes clés du document, du plus au moins caractéristique :
+    [{'term', 'weight' (TF-IDF), 'count' (occurrences)}]
+    """
+    limit = limit or settings.AI_KEYWORDS_COUNT
+    term_ids, term_counts = unpack(get_term_vector(stored))
+    frequent = term_counts >= MIN_KEYWORD_COUNT
+    if frequent.any():
+        term_ids, term_counts = term_ids[frequent], term_counts[frequent]
+    if not len(term_ids):
+        return []
+
+    doc_freq = {}
+    for batch in _batches(term_ids.tolist()):
+        doc_freq.update(CorpusTerm.objects.filter(id__in=batch).values_list('id', 'doc_freq'))
+    corpus_size = TermVector.objects.count()
+    weights = tf(term_counts) * idf([doc_freq.get(term_id, 1) for term_id in term_ids.tolist()], corpus_size)
+
+    top = np.argsort(-weights, kind='stable')[:limit]
+    terms = dict(CorpusTerm.objects.filter(id__in=term_ids[top].tolist()).values_list('id', 'term'))
+    return [
+        {'term': terms[int(term_ids[i])], 'weight': round(float(weights[i]), 4), 'count': int(term_counts[i])}
+        for i in top if int(term_ids[i]) in terms
+    ]
+
+
+class CorpusMatrix:
+    """
+    Matrice creuse TF-IDF normalisée du corpus, au format CSR (indptr,
+    indices, data), avec le document, le projet et le type de chaque ligne
+    """
+
+    def __init__(self, version: Tuple):
+        self.version = version
+        vectors = list(TermVector.objects.values_list(
+            'text_id', 'text__document__project_id', 'text__document__type', 'term_ids', 'term_counts'
+        ))
+        self.rows = [(text_id, project_id, doc_type) for text_id, project_id, doc_type, _, _ in vectors]
+
+        doc_freq = dict(CorpusTerm.objects.filter(doc_freq__gt=0).values_list('id', 'doc_freq'))
+        self.vocabulary_size = max(doc_freq, default=0) + 1
+        self.idf = np.ones(self.vocabulary_size)
+        if doc_freq:
+            self.idf[list(doc_freq)] = idf(list(doc_freq.values()), len(vectors))
+
+        indices, data, indptr = [], [], [0]
+        for *_, raw_ids, raw_counts in vectors:
+            term_ids = np.frombuffer(bytes(raw_ids), dtype=np.int64)
+            term_counts = np.frombuffer(bytes(raw_counts), dtype=np.int32)
+            weights = self.weigh(term_ids, term_counts)
+            indices.append(term_ids)
+            data.append(weights)
+            indptr.append(indptr[-1] + len(term_ids))
+        self.indices = np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64)
+        self.data = np.concatenate(data) if data else np.zeros(0)
+        self.indptr = np.array(indptr, dtype=np.int64)
+
+    def weigh(self, term_ids: np.ndarray, term_counts: np.ndarray) -> np.ndarray:
+        """
+        Poids TF-IDF normalisés (norme euclidienne 1) d'un vecteur ; un terme
+        inconnu du corpus prend l'idf d'un terme présent dans un seul document
+        """
+        known = term_ids < self.vocabulary_size
+        term_idf = np.full(len(term_ids), math.log((1.0 + len(self.rows)) / 2.0) + 1.0)
+        term_idf[known] = self.idf[term_ids[known]]
+        weights = tf(term_counts) * term_idf
+        norm = np.linalg.norm(weights)
+        return weights / norm if norm else weights
+
+    def similarities(self, term_ids: np.ndarray, term_counts: np.ndarray) -> np.ndarray:
+        """
+        Similarité cosinus du vecteur avec chaque document du corpus
+        """
+        if not len(self.rows) or not len(term_ids):
+            return np.zeros(len(self.rows))
+        query = np.zeros(max(self.vocabulary_size, int(term_ids.max()) + 1))
+        query[term_ids] = self.weigh(term_ids, term_counts)
+        products = self.data * query[self.indices]
+        # Somme par ligne ; une ligne vide (document sans terme) a une similarité nulle
+        sums = np.concatenate(([0.0], np.cumsum(products)))
+        return sums[self.indptr[1:]] - sums[self.indptr[:-1]]
+
+
+_matrix = None
+_matrix_lock = threading.Lock()
+
+
+def corpus_version() -> Tuple:
+    """
+    Version du corpus : change à chaque indexation ou suppression d'un document
+    """
+    state = TermVector.objects.aggregate(count=Count('id'), last=Max('updated_at'), last_id=Max('id'))
+    return state['count'], state['last'], state['last_id']
+
+
+def get_corpus_matrix() -> CorpusMatrix:
+    """
+    Retourne la matrice du corpus du processus, reconstruite si le corpus a changé
+    """
+    global _matrix
+    version = corpus_version()
+    with _matrix_lock:
+        if _matrix is None or _matrix.version != version:
+            _matrix = CorpusMatrix(version)
+        return _matrix
+
+
+def similar_tenders(stored: DocumentText, limit: Optional[int] = None) -> List[Dict]:
+    """
+    Appels d'offres passés les plus proches du document : un résultat par
+    projet (son document le plus proche), le projet du document exclu.
+    [{'project_id', 'project_name', 'document_type', 'score'}]
+    """
+    limit = limit or settings.AI_SIMILAR_TENDERS_COUNT
+    project_id = stored.document.project_id
+    matrix = get_corpus_matrix()
+    scores = matrix.similarities(*unpack(get_term_vector(stored)))
+
+    best = {}
+    for i in np.argsort(-scores, kind='stable'):
+        _, row_project, doc_type = matrix.rows[i]
+        if scores[i] <= 0 or row_project == project_id or row_project in best:
+            continue
+        best[row_project] = (doc_type, float(scores[i]))
+        if len(best) >= limit:
+            break
+
+    names = dict(Project.objects.filter(id__in=list(best)).values_list('id', 'name'))
+    return [
+        {'project_id': row_project, 'project_name': names.get(row_project, ''),
+         'document_type': doc_type, 'score': round(score, 4)}
+        for row_project, (doc_type, score) in best.items()
+    ]
+
+
+def rebuild_corpus_index() -> int:
+    """
+    Réindexe tout le corpus et recalcule les fréquences documentaires
+    (réparation ; en fonctionnement normal l'index est tenu à jour document
+    par document). Retourne le nombre de textes indexés.
+    """
+    with transaction.atomic():
+        # Suppression sans signal post_delete : les fréquences sont remises à zéro
+        # ci-dessous plutôt que décrémentées document par document
+        vectors = TermVector.objects.all()
+        vectors._raw_delete(vectors.db)
+        CorpusTerm.objects.update(doc_freq=0)
+    indexed = 0
+    for stored in DocumentText.objects.iterator():
+        index_document_text(stored)
+        indexed += 1
+    return indexed
@@ -0,0 +1,172 @@
+"""
+jobs.py
+Jobs d'analyse asynchrones des RC
+Un job est créé par l'API puis exécuté hors du thread de la requête, selon
+le mode défini par AI_ANALYSIS_JOB_MODE :
+- 'thread' : pool de threads dans le processus (aucun broker nécessaire)
+- 'celery' : tâche Celery envoyée au broker (redis)
+- 'eager'  : exécution immédiate et synchrone (tests)
+
+Les mêmes modes exécutent les traitements des documents déposés
+(enregistrement du texte extrait, indexation TF-IDF), programmés par les
+signaux une fois la transaction validée.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from projects.models import ReferenceDocument
+
+from .corpus_index import index_document_text
+from .models import AnalysisJob, DocumentText
+from .pipeline import analyze_project_rc
+from .text_store import store_document_text
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """
+    Retourne le pool de threads partagé du processus (créé au premier appel)
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.AI_ANALYSIS_JOB_WORKERS,
+                thread_name_prefix='rc-analysis'
+            )
+        return _executor
+
+
+def _update_job(job_id, **fields):
+    """
+    Met à jour les champs d'un job sans recharger l'objet
+    """
+    fields['updated_at'] = timezone.now()
+    AnalysisJob.objects.filter(pk=job_id).update(**fields)
+
+
+def run_analysis_job(job_id):
+    """
+    Exécute un job d'analyse : extraction, analyse IA puis enregistrement
+    du résultat dans RCAnalysis
+    """
+    try:
+        job = AnalysisJob.objects.get(pk=job_id)
+    except AnalysisJob.DoesNotExist:
+        logger.error(f"Job d'analyse introuvable : {job_id}")
+        return
+
+    def on_step(step, progress):
+        _update_job(job_id, status=step, progress=progress)
+
+    try:
+        # Le job attend son tour dans la file des appels au LLM, sans être refusé
+        _, cached, record = analyze_project_rc(job.project_id, on_step=on_step, admit=False)
+        if record is None:
+            _update_job(
+                job_id, status='failed', progress=100, finished_at=timezone.now(),
+                error="L'analyse n'a produit aucune structure"
+            )
+            return
+        _update_job(
+            job_id, status='done', progress=100, finished_at=timezone.now(),
+            analysis=record, cached=cached
+        )
+    except Exception as e:
+        logger.error(f"Erreur lors du job d'analyse {job_id} : {str(e)}")
+        _update_job(job_id, status='failed', progress=100, finished_at=timezone.now(), error=str(e))
+
+
+def store_text_job(document_id):
+    """
+    Extrait et enregistre le texte d'un document déposé (RC ou CCTP).
+    En cas d'échec, les étapes suivantes extrairont le texte du PDF.
+    """
+    document = ReferenceDocument.objects.filter(pk=document_id).first()
+    if document is None or not document.file:
+        return
+    try:
+        store_document_text(document)
+    except Exception as e:
+        logger.warning(f"Impossible d'enregistrer le texte du document {document_id} : {str(e)}")
+
+
+def index_text_job(text_id):
+    """
+    Indexe le texte enregistré dans le corpus TF-IDF
+    """
+    stored = DocumentText.objects.filter(pk=text_id).first()
+    if stored is None:
+        return
+    try:
+        index_document_text(stored)
+    except Exception as e:
+        logger.warning(f"Impossible d'indexer le texte {text_id} : {str(e)}")
+
+
+def _run_in_thread(func, *args):
+    """
+    Point d'entrée des threads du pool : les connexions à la base sont
+    propres à chaque thread et doivent être fermées après usage
+    """
+    close_old_connections()
+    try:
+        func(*args)
+    finally:
+        close_old_connections()
+
+
+def _dispatch(func, task_name, *args):
+    """
+    Exécute func(*args) selon le mode configuré ; task_name est la tâche
+    Celery correspondante (tasks.py)
+    """
+    mode = settings.AI_ANALYSIS_JOB_MODE
+    if mode == 'eager':
+        func(*args)
+    elif mode == 'celery':
+        from . import tasks
+        getattr(tasks, task_name).delay(*args)
+    else:
+        _get_executor().submit(_run_in_thread, func, *args)
+
+
+def dispatch_job(job_id):
+    """
+    Envoie un job au mode d'exécution configuré
+    """
+    _dispatch(run_analysis_job, 'run_analysis_job_task', str(job_id))
+
+
+def dispatch_text_storage(document_id):
+    """
+    Programme l'enregistrement du texte d'un document déposé
+    """
+    _dispatch(store_text_job, 'store_text_task', document_id)
+
+
+def dispatch_text_indexing(text_id):
+    """
+    Programme l'indexation TF-IDF d'un texte enregistré
+    """
+    _dispatch(index_text_job, 'index_text_task', text_id)
+
+
+def enqueue_rc_analysis(project_id) -> AnalysisJob:
+    """
+    Crée un job d'analyse pour le RC du projet et le programme
+    une fois la transaction validée
+    """
+    job = AnalysisJob.objects.create(project_id=project_id)
+    transaction.on_commit(lambda: dispatch_job(job.pk))
+    return job
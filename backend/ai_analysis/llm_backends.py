@@ -0,0 +1,773 @@
+"""
+llm_backends.py
+Backends d'accès aux modèles de langage (LLM)
+- OpenAIBackend : client asynchrone vers l'API Chat Completions, avec une
+  session HTTP partagée (connexions keep-alive réutilisées d'un appel à l'autre)
+- StubBackend : backend local déterministe qui rejoue des réponses préenregistrées
+  avec une latence configurable (tests, benchmarks hors ligne)
+- RateLimitedBackend : enveloppe un backend pour faire passer chaque appel par
+  le répartiteur (file par priorité, budgets par minute, voir llm_dispatcher)
+- PolicyBackend : applique la politique des appels (échéance, nouvelles
+  tentatives, requêtes dupliquées, modèle de repli, voir llm_policy) ; placé
+  au-dessus de RateLimitedBackend, chaque requête passe par la file et
+  l'échéance ne court pas pendant l'attente
+- MeteredBackend : enregistre chaque appel dans le registre des appels au LLM
+  (tokens, durée, attente dans la file, requêtes envoyées, voir usage_ledger)
+
+Chaque backend sait aussi produire la réponse en flux (astream / stream),
+morceau de texte par morceau de texte.
+
+Les vues Django étant synchrones, chaque backend possède une boucle asyncio
+dans un thread dédié : complete() y soumet la coroutine et attend le résultat.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from django.conf import settings
+
+from .chunking import count_tokens
+from .llm_dispatcher import LLMDispatcher, get_llm_dispatcher
+from .llm_policy import CallPolicy, PolicyMetrics, get_policy_metrics, is_retryable_status
+from .usage_ledger import call_context, note_attempt, note_queue_time, record_usage
+
+logger = logging.getLogger(__name__)
+
+# Signalé par RateLimitedBackend à la sortie de la file de la requête en cours (voir PolicyBackend._admit)
+_admission: ContextVar[Optional[asyncio.Event]] = ContextVar('llm_admission', default=None)
+
+
+class LLMError(Exception):
+    """
+    Erreur renvoyée par un backend LLM (status : code HTTP, si disponible ;
+    retry_after : délai demandé par le fournisseur avant une nouvelle tentative)
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class LLMTimeout(LLMError):
+    """
+    Échéance d'un appel au LLM dépassée (voir llm_policy)
+    """
+
+    def __init__(self, message: str):
+        super().__init__(message, status=504)
+
+
+class LLMResponse:
+    """
+    Réponse d'un appel au modèle
+    """
+
+    def __init__(self, content: str, model: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+        self.content = content
+        self.model = model
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class EventLoopThread:
+    """
+    Boucle asyncio exécutée dans un thread démon, démarrée au premier usage.
+    Après un fork (workers gunicorn), la boucle est recréée dans le processus fils.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._loop = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._pid = os.getpid()
+                thread = threading.Thread(target=self._loop.run_forever, name=self.name, daemon=True)
+                thread.start()
+            return self._loop
+
+    def run(self, coroutine, timeout: Optional[float] = None):
+        """
+        Exécute une coroutine sur la boucle et attend son résultat
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.get_loop())
+        return future.result(timeout)
+
+
+class LLMBackend:
+    """
+    Interface commune des backends LLM.
+    Les sous-classes implémentent acomplete() ; complete() en est la version synchrone.
+    """
+    name = 'base'
+
+    def __init__(self):
+        self.loop_thread = EventLoopThread(f'llm-{self.name}')
+
+    async def acomplete(self, messages: List[Dict], model: str, temperature: float = 0.7,
+                        max_tokens: int = 2000) -> LLMResponse:
+        raise NotImplementedError
+
+    def complete(self, messages: List[Dict], model: str, temperature: float = 0.7,
+                 max_tokens: int = 2000) -> LLMResponse:
+        return self.loop_thread.run(self.acomplete(messages, model, temperature, max_tokens))
+
+    async def astream(self, messages: List[Dict], model: str, temperature: float = 0.7,
+                      max_tokens: int = 2000) -> AsyncIterator[str]:
+        """
+        Produit la réponse du modèle morceau par morceau
+        """
+        raise NotImplementedError
+        yield  # pragma: no cover
+
+    def stream(self, messages: List[Dict], model: str, temperature: float = 0.7,
+               max_tokens: int = 2000) -> Iterator[str]:
+        """
+        Version synchrone de astream() : les morceaux produits sur la boucle du
+        backend sont transmis par une file. Si le consommateur s'arrête (client
+        déconnecté), la requête en cours est annulée.
+        """
+        chunks = queue.Queue()
+        end = object()
+
+        async def pump():
+            try:
+                async for delta in self.astream(messages, model, temperature, max_tokens):
+                    chunks.put(delta)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                chunks.put(end)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self.loop_thread.get_loop())
+        try:
+            while True:
+                item = chunks.get()
+                if item is end:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
+    def run(self, coroutine):
+        """
+        Exécute une coroutine quelconque sur la boucle du backend
+        """
+        return self.loop_thread.run(coroutine)
+
+    async def aclose(self):
+        pass
+
+
+class OpenAIBackend(LLMBackend):
+    """
+    Client asynchrone de l'API Chat Completions d'OpenAI (ou d'un serveur compatible).
+    La session aiohttp est créée une fois puis réutilisée : les connexions TLS
+    restent ouvertes entre deux analyses. Comme la boucle, elle est recréée
+    après un fork (session du processus maître liée à une boucle arrêtée).
+    """
+    name = 'openai'
+
+    def __init__(self, api_key: str, api_base: str = 'https://api.openai.com/v1',
+                 pool_size: int = 10, timeout: float = 120):
+        super().__init__()
+        self.api_key = api_key
+        self.api_base = api_base.rstrip('/')
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = None
+        self._session_pid = None
+
+    async def _get_session(self):
+        import aiohttp
+
+        if self._session is None or self._session.closed or self._session_pid != os.getpid():
+            self._session_pid = os.getpid()
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'Authorization': f'Bearer {self.api_key}'}
+            )
+        return self._session
+
+    async def acomplete(self, messages: List[Dict], model: str, temperature: float = 0.7,
+                        max_tokens: int = 2000) -> LLMResponse:
+        import aiohttp
+
+        session = await self._get_session()
+        payload = {
+            'model': model,
+            'messages': messages,
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+        }
+        try:
+            async with session.post(f'{self.api_base}/chat/completions', json=payload) as response:
+                body = await response.text()
+                if response.status >= 400:
+                    raise self._http_error(response, body)
+                data = json.loads(body)
+        except aiohttp.ClientError as e:
+            raise LLMError(f"Erreur de connexion à l'API LLM : {str(e) or type(e).__name__}") from e
+
+        usage = data.get('usage') or {}
+        return LLMResponse(
+            content=data['choices'][0]['message']['content'],
+            model=data.get('model', model),
+            prompt_tokens=usage.get('prompt_tokens', 0),
+            completion_tokens=usage.get('completion_tokens', 0),
+        )
+
+    async def astream(self, messages: List[Dict], model: str, temperature: float = 0.7,
+                      max_tokens: int = 2000) -> AsyncIterator[str]:
+        import aiohttp
+
+        session = await self._get_session()
+        payload = {
+            'model': model,
+            'messages': messages,
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+            'stream': True,
+        }
+        try:
+            async with session.post(f'{self.api_base}/chat/completions', json=payload) as response:
+                if response.status >= 400:
+                    raise self._http_error(response, await response.text())
+                # Réponse au format Server-Sent Events : une ligne "data: {...}" par morceau
+                async for raw_line in response.content:
+                    line = raw_line.decode('utf-8').strip()
+                    if not line.startswith('data:'):
+                        continue
+                    data = line[len('data:'):].strip()
+                    if data == '[DONE]':
+                        break
+                    delta = json.loads(data)['choices'][0].get('delta', {}).get('content')
+                    if delta:
+                        yield delta
+        except aiohttp.ClientError as e:
+            raise LLMError(f"Erreur de connexion à l'API LLM : {str(e) or type(e).__name__}") from e
+
+    @classmethod
+    def _http_error(cls, response, body: str) -> LLMError:
+        """
+        Erreur HTTP de l'API, avec le délai Retry-After éventuel (en secondes)
+        """
+        try:
+            retry_after = float(response.headers.get('Retry-After', ''))
+        except ValueError:
+            retry_after = None
+        return LLMError(
+            f"Erreur {response.status} de l'API LLM : {cls._error_message(body)}",
+            status=response.status, retry_after=retry_after
+        )
+
+    @staticmethod
+    def _error_message(body: str) -> str:
+        """
+        Extrait le message d'erreur de la réponse (JSON OpenAI ou texte brut d'un proxy)
+        """
+        try:
+            return json.loads(body)['error']['message']
+        except (ValueError, KeyError, TypeError):
+            return body[:200]
+
+    async def aclose(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+class StubBackend(LLMBackend):
+    """
+    Backend local déterministe : chaque règle (motif, réponse) est testée dans
+    l'ordre sur le dernier message, la première dont le motif est contenu dans
+    le message fournit la réponse ; sinon la réponse par défaut est utilisée.
+
+    Pour tester la politique des appels, des incidents sont injectés appel
+    par appel (faults, dans l'ordre des appels) : None pour un appel normal,
+    un code HTTP (int) pour une erreur, une durée (float) pour une latence
+    supplémentaire. model_latency fixe la latence de certains modèles.
+    """
+    name = 'stub'
+
+    DEFAULT_COMPLETION = (
+        "1. Valeur technique (60 points)\n"
+        "   1.1. Méthodologie d'exécution (30 points)\n"
+        "   1.2. Moyens humains et matériels (30 points)\n"
+        "2. Délais d'exécution (40 points)"
+    )
+
+    # Découpage des réponses en morceaux pour la simulation du flux
+    STREAM_PIECE_RE = re.compile(r'\S+\s*|\s+')
+
+    def __init__(self, rules: Optional[List] = None, default: Optional[str] = None, latency: float = 0.0,
+                 token_latency: float = 0.0, faults: Optional[List] = None,
+                 model_latency: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self.rules = rules or []
+        self.default = default if default is not None else self.DEFAULT_COMPLETION
+        self.latency = latency
+        self.token_latency = token_latency
+        self.faults = list(faults or [])
+        self.model_latency = model_latency or {}
+        self.calls = 0
+
+    @classmethod
+    def from_file(cls, path: str, latency: float = 0.0) -> 'StubBackend':
+        """
+        Charge les réponses depuis un fichier JSON :
+        {"default": "...", "rules": [["motif", "réponse"], ...]}
+        """
+        with open(path, encoding='utf-8') as file:
+            data = json.load(file)
+        return cls(rules=data.get('rules', []), default=data.get('default'), latency=latency)
+
+    def select(self, messages: List[Dict]) -> str:
+        prompt = messages[-1]['content'] if messages else ''
+        for pattern, completion in self.rules:
+            if pattern in prompt:
+                return completion
+        return self.default
+
+    async def _start_call(self, model: str):
+        """
+        Compte l'appel, attend sa latence et lève l'erreur injectée éventuelle
+        """
+        self.calls += 1
+        fault = self.faults.pop(0) if self.faults else None
+        latency = self.model_latency.get(model, self.latency)
+        if isinstance(fault, float):
+            latency += fault
+        if latency:
+            await asyncio.sleep(latency)
+        if isinstance(fault, int):
+            raise LLMError(f"Erreur {fault} simulée par le backend stub", status=fault)
+
+    async def acomplete(self, messages: List[Dict], model: str, temperature: float = 0.7,
+                        max_tokens: int = 2000) -> LLMResponse:
+        await self._start_call(model)
+        content = self.select(messages)
+        prompt_text = '\n'.join(message['content'] for message in messages)
+        return LLMResponse(
+            content=content,
+            model=model,
+            prompt_tokens=count_tokens(prompt_text, model),
+            completion_tokens=count_tokens(content, model),
+        )
+
+    async def astream(self, messages: List[Dict], model: str, temperature: float = 0.7,
+                      max_tokens: int = 2000) -> AsyncIterator[str]:
+        """
+        Rejoue la réponse mot par mot : latence initiale puis token_latency par morceau
+        """
+        await self._start_call(model)
+        for piece in self.STREAM_PIECE_RE.findall(self.select(messages)):
+            if self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            yield piece
+
+
+class RateLimitedBackend(LLMBackend):
+    """
+    Fait attendre chaque appel du backend enveloppé dans le répartiteur :
+    tokens estimés (prompt + max_tokens) réservés avant l'appel, puis
+    l'écart avec l'usage réel restitué au budget. Les nouvelles tentatives
+    et doublons de la politique des appels (PolicyBackend, qui enveloppe ce
+    backend) repassent chacun par la file.
+    """
+
+    def __init__(self, backend: LLMBackend, dispatcher: LLMDispatcher):
+        self.backend = backend
+        self.dispatcher = dispatcher
+        self.name = backend.name
+        # Même boucle que le backend : sa session HTTP reste attachée à une seule boucle
+        self.loop_thread = backend.loop_thread
+
+    def __getattr__(self, name):
+        # Attributs propres au backend enveloppé (ex. calls du StubBackend)
+        if name == 'backend':
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    @staticmethod
+    def _prompt_tokens(messages: List[Dict], model: str) -> int:
+        return count_tokens('\n'.join(message['content'] for message in messages), model)
+
+    @staticmethod
+    def _admitted(started: float):
+        note_queue_time(time.monotonic() - started)
+        admission = _admission.get()
+        if admission is not None:
+            admission.set()
+
+    async def acomplete(self, messages: List[Dict], model: str, temperature: float = 0.7,
+                        max_tokens: int = 2000) -> LLMResponse:
+        reserved = self._prompt_tokens(messages, model) + max_tokens
+        started = time.monotonic()
+        await self.dispatcher.acquire(reserved)
+        self._admitted(started)
+        response = await self.backend.acomplete(messages, model, temperature, max_tokens)
+        if response.total_tokens:
+            await self.dispatcher.refund(reserved - response.total_tokens)
+        return response
+
+    async def astream(self, messages: List[Dict], model: str, temperature: float = 0.7,
+                      max_tokens: int = 2000) -> AsyncIterator[str]:
+        prompt_tokens = self._prompt_tokens(messages, model)
+        reserved = prompt_tokens + max_tokens
+        started = time.monotonic()
+        await self.dispatcher.acquire(reserved)
+        self._admitted(started)
+        deltas = []
+        try:
+            async for delta in self.backend.astream(messages, model, temperature, max_tokens):
+                deltas.append(delta)
+                yield delta
+        finally:
+            await self.dispatcher.refund(reserved - prompt_tokens - count_tokens(''.join(deltas), model))
+
+    async def aclose(self):
+        await self.backend.aclose()
+
+
+class PolicyBackend(LLMBackend):
+    """
+    Applique la politique des appels (voir llm_policy) au backend enveloppé :
+    échéance de l'appel et délai de chaque tentative, nouvelles tentatives
+    sur erreur transitoire, requête dupliquée au-delà du p95 des latences et
+    modèle de repli à l'approche de l'échéance.
+    En flux, les nouvelles tentatives ne sont possibles qu'avant le premier
+    morceau reçu ; l'échéance s'applique ensuite à chaque morceau.
+    Chaque requête envoyée (tentative ou doublon) passe par la file du
+    répartiteur si le backend enveloppé est cadencé, et est comptée dans le
+    registre (note_attempt) ; l'attente d'une tentative dans la file n'est
+    comptée ni dans l'échéance ni dans les latences qui fixent le seuil de duplication.
+    """
+
+    def __init__(self, backend: LLMBackend, policy: Optional[CallPolicy] = None,
+                 metrics: Optional[PolicyMetrics] = None):
+        self.backend = backend
+        self.policy = policy or CallPolicy()
+        self.metrics = metrics or get_policy_metrics()
+        self.name = backend.name
+        self.loop_thread = backend.loop_thread
+
+    def __getattr__(self, name):
+        # Attributs propres au backend enveloppé (dispatcher, calls du StubBackend...)
+        if name == 'backend':
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    def _attempt_model(self, model: str, remaining: float) -> str:
+        attempt_model = self.policy.model_for(model, remaining)
+        if attempt_model != model:
+            self.metrics.incr('fallbacks')
+            logger.warning(f"Échéance proche ({remaining:.1f} s) : appel au modèle de repli {attempt_model}")
+        return attempt_model
+
+    async def _retry_or_raise(self, error: Exception, attempt: int, deadline: float):
+        """
+        Attend avant la tentative suivante, ou relève l'erreur si elle n'est pas
+        transitoire, si les tentatives sont épuisées ou si l'échéance serait dépassée
+        """
+        loop = asyncio.get_running_loop()
+        if isinstance(error, asyncio.TimeoutError):
+            self.metrics.incr('timeouts')
+            error = LLMTimeout(f"Délai de la tentative dépassé ({self.policy.attempt_timeout:g} s)")
+        if not (isinstance(error, LLMError) and is_retryable_status(error.status)) \
+                or attempt >= self.policy.max_retries:
+            raise error
+        delay = self.policy.retry_delay(attempt, error.retry_after)
+        if loop.time() + delay >= deadline:
+            self.metrics.incr('deadline_exceeded')
+            raise LLMTimeout(f"Échéance de l'appel au LLM dépassée après {attempt + 1} tentatives : {str(error)}")
+        self.metrics.incr('retries')
+        logger.warning(f"Appel au LLM en échec ({str(error)}), nouvelle tentative dans {delay:.1f} s")
+        await asyncio.sleep(delay)
+
+    async def _admit(self, request) -> asyncio.Task:
+        """
+        Lance une requête et attend sa sortie de la file du répartiteur (ou
+        son issue si elle est refusée) : le délai de la tentative ne court qu'à partir de là
+        """
+        admission = asyncio.Event()
+
+        async def run():
+            _admission.set(admission)
+            return await request
+
+        note_attempt()
+        task = asyncio.ensure_future(run())
+        if getattr(self.backend, 'dispatcher', None) is None:
+            return task
+        admitted = asyncio.ensure_future(admission.wait())
+        try:
+            await asyncio.wait({task, admitted}, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        finally:
+            admitted.cancel()
+        return task
+
+    async def _hedged(self, primary: asyncio.Task, messages: List[Dict], model: str, temperature: float,
+                      max_tokens: int) -> LLMResponse:
+        """
+        Tentative doublée d'une seconde requête si la première dépasse le seuil
+        de duplication : la première réponse obtenue l'emporte
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        tasks = [primary]
+        try:
+            hedge_delay = self.policy.hedge_delay(model, self.metrics.latencies)
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+                if not done:
+                    self.metrics.incr('hedges')
+                    note_attempt(hedge=True)
+                    tasks.append(asyncio.ensure_future(
+                        self.backend.acomplete(messages, model, temperature, max_tokens)
+                    ))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.metrics.incr('hedge_wins')
+                        self.metrics.latencies.add(model, loop.time() - started)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def acomplete(self, messages: List[Dict], model: str, temperature: float = 0.7,
+                        max_tokens: int = 2000) -> LLMResponse:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.policy.deadline
+        self.metrics.incr('calls')
+        attempt = 0
+        while True:
+            attempt_model = self._attempt_model(model, deadline - loop.time())
+            queued = loop.time()
+            primary = await self._admit(self.backend.acomplete(messages, attempt_model, temperature, max_tokens))
+            deadline += loop.time() - queued
+            try:
+                response = await asyncio.wait_for(
+                    self._hedged(primary, messages, attempt_model, temperature, max_tokens),
+                    min(self.policy.attempt_timeout, deadline - loop.time())
+                )
+                self.metrics.incr('successes')
+                return response
+            except (LLMError, asyncio.TimeoutError) as e:
+                try:
+                    await self._retry_or_raise(e, attempt, deadline)
+                except Exception:
+                    self.metrics.incr('failures')
+                    raise
+            attempt += 1
+
+    async def astream(self, messages: List[Dict], model: str, temperature: float = 0.7,
+                      max_tokens: int = 2000) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.policy.deadline
+        self.metrics.incr('calls')
+        attempt = 0
+        while True:
+            attempt_model = self._attempt_model(model, deadline - loop.time())
+            chunks = self.backend.astream(messages, attempt_model, temperature, max_tokens)
+            queued = loop.time()
+            first_chunk = await self._admit(chunks.__anext__())
+            deadline += loop.time() - queued
+            try:
+                first = await asyncio.wait_for(first_chunk, min(self.policy.attempt_timeout, deadline - loop.time()))
+                break
+            except StopAsyncIteration:
+                self.metrics.incr('successes')
+                return
+            except (LLMError, asyncio.TimeoutError) as e:
+                await chunks.aclose()
+                try:
+                    await self._retry_or_raise(e, attempt, deadline)
+                except Exception:
+                    self.metrics.incr('failures')
+                    raise
+            attempt += 1
+
+        try:
+            yield first
+            while True:
+                try:
+                    delta = await asyncio.wait_for(chunks.__anext__(), max(deadline - loop.time(), 0))
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    self.metrics.incr('deadline_exceeded')
+                    self.metrics.incr('failures')
+                    raise LLMTimeout("Échéance de l'appel au LLM dépassée pendant la réponse en flux")
+                yield delta
+            self.metrics.incr('successes')
+        finally:
+            await chunks.aclose()
+
+    async def aclose(self):
+        await self.backend.aclose()
+
+
+class MeteredBackend(LLMBackend):
+    """
+    Enregistre chaque appel du backend enveloppé dans le registre des appels
+    au LLM : tokens, durée totale, attente dans la file du répartiteur (si le
+    backend enveloppé est cadencé), requêtes envoyées et erreur éventuelle.
+    Le prompt de la requête perdante d'un doublon, facturé lui aussi, est
+    ajouté aux tokens du prompt. L'écriture est faite en arrière-plan (voir usage_ledger).
+    """
+
+    def __init__(self, backend: LLMBackend):
+        self.backend = backend
+        self.name = backend.name
+        self.loop_thread = backend.loop_thread
+
+    def __getattr__(self, name):
+        # Attributs propres au backend enveloppé (dispatcher, calls du StubBackend...)
+        if name == 'backend':
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    async def acomplete(self, messages: List[Dict], model: str, temperature: float = 0.7,
+                        max_tokens: int = 2000) -> LLMResponse:
+        return await self.backend.acomplete(messages, model, temperature, max_tokens)
+
+    async def astream(self, messages: List[Dict], model: str, temperature: float = 0.7,
+                      max_tokens: int = 2000) -> AsyncIterator[str]:
+        async for delta in self.backend.astream(messages, model, temperature, max_tokens):
+            yield delta
+
+    # Les mesures sont prises dans le thread appelant : le contexte (projet,
+    # opération, mesures de l'appel) est transmis à la boucle du backend et
+    # l'entrée est enregistrée hors de la boucle
+    def complete(self, messages: List[Dict], model: str, temperature: float = 0.7,
+                 max_tokens: int = 2000) -> LLMResponse:
+        context, metrics = call_context()
+        started = time.monotonic()
+        try:
+            response = context.run(self.backend.complete, messages, model, temperature, max_tokens)
+        except Exception as e:
+            record_usage(model_name=model, duration=time.monotonic() - started,
+                         queue_time=metrics['queue_time'], attempts=max(metrics['attempts'], 1),
+                         hedges=metrics['hedges'], error=str(e) or type(e).__name__)
+            raise
+        record_usage(
+            model_name=response.model or model,
+            prompt_tokens=response.prompt_tokens * (1 + metrics['hedges']),
+            completion_tokens=response.completion_tokens,
+            duration=time.monotonic() - started,
+            queue_time=metrics['queue_time'],
+            attempts=max(metrics['attempts'], 1),
+            hedges=metrics['hedges'],
+        )
+        return response
+
+    def stream(self, messages: List[Dict], model: str, temperature: float = 0.7,
+               max_tokens: int = 2000) -> Iterator[str]:
+        # Le flux ne rapporte pas l'usage : les tokens sont comptés localement
+        context, metrics = call_context()
+        started = time.monotonic()
+        deltas = []
+        error = ''
+        chunks = self.backend.stream(messages, model, temperature, max_tokens)
+        try:
+            while True:
+                try:
+                    delta = context.run(next, chunks)
+                except StopIteration:
+                    break
+                deltas.append(delta)
+                yield delta
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            raise
+        finally:
+            context.run(chunks.close)
+            record_usage(
+                model_name=model,
+                prompt_tokens=RateLimitedBackend._prompt_tokens(messages, model),
+                completion_tokens=count_tokens(''.join(deltas), model),
+                duration=time.monotonic() - started,
+                queue_time=metrics['queue_time'],
+                attempts=max(metrics['attempts'], 1),
+                streamed=True,
+                error=error,
+            )
+
+    async def aclose(self):
+        await self.backend.aclose()
+
+
+def create_llm_backend(name: Optional[str] = None) -> LLMBackend:
+    """
+    Crée le backend LLM configuré par AI_LLM_BACKEND ('openai' ou 'stub'),
+    cadencé par le répartiteur des appels s'il est activé, soumis à la
+    politique des appels (llm_policy), chaque appel étant enregistré dans le
+    registre des appels au LLM
+    """
+    backend = _create_backend(name)
+    dispatcher = get_llm_dispatcher()
+    if dispatcher:
+        backend = RateLimitedBackend(backend, dispatcher)
+    # Chaque tentative et chaque doublon de la politique passent par la file
+    return MeteredBackend(PolicyBackend(backend))
+
+
+def _create_backend(name: Optional[str] = None) -> LLMBackend:
+    name = name or settings.AI_LLM_BACKEND
+    if name == 'stub':
+        if settings.AI_LLM_STUB_RESPONSES:
+            return StubBackend.from_file(settings.AI_LLM_STUB_RESPONSES, latency=settings.AI_LLM_STUB_LATENCY)
+        return StubBackend(latency=settings.AI_LLM_STUB_LATENCY)
+    if name == 'openai':
+        return OpenAIBackend(
+            api_key=settings.OPENAI_API_KEY,
+            api_base=settings.OPENAI_API_BASE,
+            pool_size=settings.AI_LLM_POOL_SIZE,
+            timeout=settings.AI_LLM_TIMEOUT,
+        )
+    raise ValueError(f"Backend LLM inconnu : {name}")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_llm_backend() -> LLMBackend:
+    """
+    Retourne le backend LLM partagé du processus (créé au premier appel)
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_llm_backend()
+        return _backend
@@ -0,0 +1,401 @@
+"""
+llm_dispatcher.py
+Répartiteur central des appels sortants vers le LLM
+Chaque appel prend un ticket dans une file d'attente ordonnée par priorité,
+puis attend d'être en tête de file et que le budget du fournisseur le
+permette. Le budget est tenu par deux seaux à jetons, remplis en continu :
+- requêtes par minute (AI_LLM_REQUESTS_PER_MINUTE)
+- tokens par minute (AI_LLM_TOKENS_PER_MINUTE), estimés avant l'appel
+  (prompt + max_tokens) puis corrigés d'après l'usage réel
+
+La priorité est la date de remise de l'offre du projet : les consultations
+dont l'échéance est la plus proche passent en premier, à priorité égale
+dans l'ordre d'arrivée. Lorsque la file dépasse AI_LLM_MAX_QUEUE, les
+nouvelles analyses sont refusées (LLMQueueFull, avec la position dans la
+file et un délai de nouvelle tentative).
+
+L'état est partagé entre les workers gunicorn par redis
+(AI_LLM_RATE_LIMIT_STORE='redis') ou tenu en mémoire pour un déploiement
+en un seul processus ('memory') : avec plusieurs workers, chacun tiendrait
+ses propres seaux et le budget réel serait multiplié par leur nombre (voir
+check_worker_store). Les appels au store redis sont bloquants : depuis la
+boucle asyncio des backends, ils sont exécutés dans un thread.
+"""
+
+import asyncio
+import bisect
+import itertools
+import logging
+import math
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, time as datetime_time, timezone
+from typing import Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Priorité des appels sans échéance connue : après toutes les dates de remise
+DEFAULT_PRIORITY = datetime(9999, 12, 31, tzinfo=timezone.utc).timestamp()
+# Intervalle maximal entre deux vérifications d'un ticket en attente (secondes)
+POLL_INTERVAL = 0.25
+# Durée de vie d'un ticket redis non rafraîchi (worker arrêté pendant l'attente)
+TICKET_TTL = 30
+
+_priority: ContextVar[float] = ContextVar('llm_priority', default=DEFAULT_PRIORITY)
+
+
+class LLMQueueFull(Exception):
+    """
+    Levée lorsque la file des appels au LLM est saturée (ou que l'attente
+    dépasse AI_LLM_QUEUE_TIMEOUT) : position dans la file et délai conseillé
+    avant une nouvelle tentative, en secondes
+    """
+
+    def __init__(self, message: str, position: int, retry_after: int):
+        super().__init__(message)
+        self.position = position
+        self.retry_after = retry_after
+
+
+def project_priority(project) -> float:
+    """
+    Priorité d'un projet : date de remise de l'offre (plus petite = plus urgente)
+    """
+    delivery_date: Optional[date] = getattr(project, 'offer_delivery_date', None)
+    if delivery_date is None:
+        return DEFAULT_PRIORITY
+    return datetime.combine(delivery_date, datetime_time.min, tzinfo=timezone.utc).timestamp()
+
+
+@contextmanager
+def llm_priority(priority: float):
+    """
+    Applique une priorité aux appels au LLM faits dans ce contexte (le
+    contexte est transmis à la boucle asyncio des backends)
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> float:
+    return _priority.get()
+
+
+class MemoryRateStore:
+    """
+    File et seaux à jetons tenus en mémoire (un seul processus)
+    """
+    blocking = False
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._lock = threading.Lock()
+        self._queue = []  # (priorité, numéro d'arrivée, ticket), trié
+        self._entries = {}
+        self._counter = itertools.count()
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def enqueue(self, priority: float) -> str:
+        ticket = uuid.uuid4().hex
+        entry = (priority, next(self._counter), ticket)
+        with self._lock:
+            bisect.insort(self._queue, entry)
+            self._entries[ticket] = entry
+        return ticket
+
+    def try_acquire(self, ticket: str, tokens: int) -> Tuple[Optional[bool], int, float]:
+        """
+        Retourne (accordé, position dans la file à partir de 0, attente estimée en secondes) ;
+        accordé vaut None si le ticket n'est plus dans la file
+        """
+        with self._lock:
+            entry = self._entries.get(ticket)
+            if entry is None:
+                return None, 0, 0.0
+            self._refill()
+            position = bisect.bisect_left(self._queue, entry)
+            if position > 0:
+                return False, position, 0.0
+            tokens = min(tokens, self.tokens_per_minute)
+            if self._requests >= 1 and self._tokens >= tokens:
+                self._requests -= 1
+                self._tokens -= tokens
+                self._queue.pop(0)
+                del self._entries[ticket]
+                return True, 0, 0.0
+            wait = max((1 - self._requests) * 60 / self.requests_per_minute,
+                       (tokens - self._tokens) * 60 / self.tokens_per_minute)
+            return False, 0, wait
+
+    def cancel(self, ticket: str):
+        with self._lock:
+            entry = self._entries.pop(ticket, None)
+            if entry is not None:
+                self._queue.remove(entry)
+
+    def refund(self, tokens: int):
+        """
+        Restitue (ou prélève, si négatif) des tokens après correction de l'estimation
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.tokens_per_minute, self._tokens + tokens)
+
+    def count_ahead(self, priority: float) -> int:
+        """
+        Nombre de tickets en attente qui passeront avant cette priorité
+        """
+        with self._lock:
+            return bisect.bisect_right(self._queue, (priority, math.inf, ''))
+
+    def queue_length(self) -> int:
+        return len(self._queue)
+
+
+# Horloge du serveur redis, commune à tous les workers
+REDIS_NOW = "local t = redis.call('TIME') local now = tonumber(t[1]) + tonumber(t[2]) / 1000000 "
+
+ENQUEUE_SCRIPT = REDIS_NOW + """
+local seq = redis.call('INCR', KEYS[3])
+local member = string.format('%020d', seq) .. ':' .. ARGV[2]
+redis.call('ZADD', KEYS[1], ARGV[1], member)
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[3]), member)
+return member
+"""
+
+ACQUIRE_SCRIPT = REDIS_NOW + """
+local queue, beats, bucket = KEYS[1], KEYS[2], KEYS[3]
+local ticket, tokens = ARGV[1], tonumber(ARGV[2])
+local rpm, tpm, ttl = tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5])
+-- Tickets abandonnés (worker arrêté pendant l'attente) : retirés de la file
+for _, expired in ipairs(redis.call('ZRANGEBYSCORE', beats, '-inf', now)) do
+    redis.call('ZREM', queue, expired)
+    redis.call('ZREM', beats, expired)
+end
+if not redis.call('ZSCORE', queue, ticket) then
+    return {-1, 0, '0'}
+end
+redis.call('ZADD', beats, now + ttl, ticket)
+local state = redis.call('HMGET', bucket, 'requests', 'tokens', 'updated')
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+local requests = math.min(rpm, (tonumber(state[1]) or rpm) + elapsed * rpm / 60)
+local available = math.min(tpm, (tonumber(state[2]) or tpm) + elapsed * tpm / 60)
+redis.call('HSET', bucket, 'requests', requests, 'tokens', available, 'updated', now)
+local position = redis.call('ZRANK', queue, ticket)
+if position > 0 then
+    return {0, position, '0'}
+end
+tokens = math.min(tokens, tpm)
+if requests >= 1 and available >= tokens then
+    redis.call('HSET', bucket, 'requests', requests - 1, 'tokens', available - tokens)
+    redis.call('ZREM', queue, ticket)
+    redis.call('ZREM', beats, ticket)
+    return {1, 0, '0'}
+end
+return {0, 0, tostring(math.max((1 - requests) * 60 / rpm, (tokens - available) * 60 / tpm))}
+"""
+
+REFUND_SCRIPT = """
+local available = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if available then
+    redis.call('HSET', KEYS[1], 'tokens', math.min(tonumber(ARGV[2]), available + tonumber(ARGV[1])))
+end
+"""
+
+
+class RedisRateStore:
+    """
+    File et seaux à jetons partagés par redis entre les workers : chaque
+    opération est un script Lua exécuté atomiquement, sur l'horloge du
+    serveur redis
+    """
+    blocking = True
+
+    def __init__(self, url: str, requests_per_minute: float, tokens_per_minute: float,
+                 prefix: str = 'memtech:llm'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.queue_key = f'{prefix}:queue'
+        self.beats_key = f'{prefix}:heartbeats'
+        self.bucket_key = f'{prefix}:bucket'
+        self.counter_key = f'{prefix}:counter'
+        self._enqueue = self.client.register_script(ENQUEUE_SCRIPT)
+        self._acquire = self.client.register_script(ACQUIRE_SCRIPT)
+        self._refund = self.client.register_script(REFUND_SCRIPT)
+
+    def enqueue(self, priority: float) -> str:
+        member = self._enqueue(
+            keys=[self.queue_key, self.beats_key, self.counter_key],
+            args=[priority, uuid.uuid4().hex, TICKET_TTL]
+        )
+        return member.decode() if isinstance(member, bytes) else member
+
+    def try_acquire(self, ticket: str, tokens: int) -> Tuple[Optional[bool], int, float]:
+        granted, position, wait = self._acquire(
+            keys=[self.queue_key, self.beats_key, self.bucket_key],
+            args=[ticket, tokens, self.requests_per_minute, self.tokens_per_minute, TICKET_TTL]
+        )
+        if granted == -1:
+            return None, 0, 0.0
+        return bool(granted), int(position), float(wait)
+
+    def cancel(self, ticket: str):
+        pipeline = self.client.pipeline()
+        pipeline.zrem(self.queue_key, ticket)
+        pipeline.zrem(self.beats_key, ticket)
+        pipeline.execute()
+
+    def refund(self, tokens: int):
+        self._refund(keys=[self.bucket_key], args=[tokens, self.tokens_per_minute])
+
+    def count_ahead(self, priority: float) -> int:
+        return self.client.zcount(self.queue_key, '-inf', priority)
+
+    def queue_length(self) -> int:
+        return self.client.zcard(self.queue_key)
+
+
+class LLMDispatcher:
+    """
+    Admission et cadencement des appels au LLM selon la file et les budgets du store
+    """
+
+    def __init__(self, store, max_queue: int = 50, queue_timeout: float = 300):
+        self.store = store
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+    def retry_after(self, position: int) -> int:
+        """
+        Délai estimé avant qu'une position de la file soit servie (secondes)
+        """
+        return max(1, math.ceil(position * 60 / self.store.requests_per_minute))
+
+    def admit(self, priority: float) -> int:
+        """
+        Vérifie qu'une nouvelle analyse peut entrer dans la file et retourne
+        sa position estimée (1 = servie immédiatement)
+        """
+        queue_length = self.store.queue_length()
+        if queue_length >= self.max_queue:
+            position = queue_length + 1
+            raise LLMQueueFull(
+                f"File d'attente des appels au modèle saturée ({position - 1} appels en attente)",
+                position=position, retry_after=self.retry_after(position)
+            )
+        return self.store.count_ahead(priority) + 1
+
+    async def _call(self, method, *args):
+        """
+        Appelle une méthode du store depuis la boucle asyncio, dans un thread
+        si elle est bloquante (redis) pour ne pas arrêter les autres appels
+        """
+        if not self.store.blocking:
+            return method(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, method, *args)
+
+    async def acquire(self, tokens: int, priority: Optional[float] = None):
+        """
+        Attend le tour et le budget de l'appel (priorité du contexte par défaut)
+        """
+        priority = current_priority() if priority is None else priority
+        ticket = await self._call(self.store.enqueue, priority)
+        deadline = time.monotonic() + self.queue_timeout
+        try:
+            while True:
+                granted, position, wait = await self._call(self.store.try_acquire, ticket, tokens)
+                if granted:
+                    return
+                if granted is None:
+                    # Ticket expiré (attente interrompue trop longtemps) : remis en file
+                    ticket = await self._call(self.store.enqueue, priority)
+                    continue
+                if time.monotonic() > deadline:
+                    raise LLMQueueFull(
+                        f"Délai d'attente de la file des appels au modèle dépassé (position {position + 1})",
+                        position=position + 1, retry_after=self.retry_after(position + 1)
+                    )
+                # Derrière d'autres tickets, l'attente dépend des appels qui précèdent
+                delay = POLL_INTERVAL if position > 0 else min(max(wait, 0.01), POLL_INTERVAL)
+                await asyncio.sleep(delay)
+        except BaseException:
+            # Retrait du ticket mené à son terme même si l'appel est annulé entre-temps
+            await asyncio.shield(self._call(self.store.cancel, ticket))
+            raise
+
+    async def refund(self, tokens: int):
+        if tokens:
+            await self._call(self.store.refund, tokens)
+
+
+def create_llm_dispatcher(store_name: Optional[str] = None) -> Optional[LLMDispatcher]:
+    """
+    Crée le répartiteur configuré par AI_LLM_RATE_LIMIT_STORE ('memory', 'redis'
+    ou 'none' pour ne pas limiter les appels)
+    """
+    store_name = store_name or settings.AI_LLM_RATE_LIMIT_STORE
+    requests_per_minute = settings.AI_LLM_REQUESTS_PER_MINUTE
+    tokens_per_minute = settings.AI_LLM_TOKENS_PER_MINUTE
+    if store_name == 'none':
+        return None
+    if store_name == 'memory':
+        store = MemoryRateStore(requests_per_minute, tokens_per_minute)
+    elif store_name == 'redis':
+        store = RedisRateStore(settings.AI_LLM_RATE_LIMIT_REDIS_URL, requests_per_minute, tokens_per_minute)
+    else:
+        raise ValueError(f"Store de limitation des appels LLM inconnu : {store_name}")
+    return LLMDispatcher(store, max_queue=settings.AI_LLM_MAX_QUEUE, queue_timeout=settings.AI_LLM_QUEUE_TIMEOUT)
+
+
+def check_worker_store(workers: int) -> bool:
+    """
+    Signale un store en mémoire utilisé par plusieurs workers : chacun tient
+    alors ses propres seaux et le budget du fournisseur est dépassé d'autant.
+    Retourne False dans ce cas.
+    """
+    if workers > 1 and settings.AI_LLM_RATE_LIMIT_STORE == 'memory':
+        logger.warning(
+            f"Répartiteur des appels au LLM en mémoire avec {workers} workers : budgets de "
+            f"{settings.AI_LLM_REQUESTS_PER_MINUTE:g} requêtes/min appliqués par worker "
+            f"(AI_LLM_RATE_LIMIT_STORE='redis' pour les partager)"
+        )
+        return False
+    return True
+
+
+_dispatcher = None
+_dispatcher_created = False
+_dispatcher_lock = threading.Lock()
+
+
+def get_llm_dispatcher() -> Optional[LLMDispatcher]:
+    """
+    Retourne le répartiteur partagé du processus (None si les appels ne sont pas limités)
+    """
+    global _dispatcher, _dispatcher_created
+    with _dispatcher_lock:
+        if not _dispatcher_created:
+            _dispatcher = create_llm_dispatcher()
+            _dispatcher_created = True
+        return _dispatcher
@@ -0,0 +1,161 @@
+"""
+llm_policy.py
+Politique des appels au LLM : échéance, nouvelles tentatives, requêtes
+dupliquées et modèle de repli (appliquée par PolicyBackend, voir llm_backends)
+
+- chaque appel a une échéance (AI_LLM_DEADLINE) et chaque tentative un
+  délai (AI_LLM_ATTEMPT_TIMEOUT) ; chaque tentative et chaque doublon passe
+  par la file du répartiteur, dont l'attente n'est pas comptée dans l'échéance ;
+- les erreurs 429, 5xx et les erreurs réseau ou délais dépassés sont retentés
+  (AI_LLM_MAX_RETRIES) après une attente exponentielle avec gigue, au moins
+  égale au Retry-After renvoyé par le fournisseur ;
+- avec AI_LLM_HEDGE, une tentative qui dépasse le p95 des latences observées
+  pour le modèle est doublée d'une seconde requête identique : la première
+  réponse l'emporte, l'autre est annulée ;
+- lorsque le temps restant ne permet plus une tentative complète, le modèle
+  de repli (AI_LLM_FALLBACK_MODEL) est utilisé.
+
+Chaque issue est comptée dans les métriques du processus (get_policy_metrics).
+"""
+
+import random
+import threading
+from collections import Counter, defaultdict, deque
+from typing import Dict, Optional
+
+from django.conf import settings
+
+# Nombre de latences conservées par modèle pour le calcul du seuil de duplication
+LATENCY_WINDOW = 200
+
+# Codes HTTP retentés : limite de débit et erreurs du fournisseur
+RETRYABLE_STATUSES = {408, 409, 429}
+
+
+def is_retryable_status(status: Optional[int]) -> bool:
+    """
+    Erreur transitoire : limite de débit, erreur du fournisseur, ou erreur
+    réseau (sans code HTTP)
+    """
+    return status is None or status in RETRYABLE_STATUSES or status >= 500
+
+
+class LatencyTracker:
+    """
+    Latences récentes des tentatives réussies, par modèle
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def add(self, model: str, seconds: float):
+        with self._lock:
+            self._samples[model].append(seconds)
+
+    def percentile(self, model: str, percentile: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(model, ()))
+        if len(samples) < max(min_samples, 1):
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * percentile / 100))]
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            models = list(self._samples)
+        return {
+            model: {
+                'samples': len(self._samples[model]),
+                'p50': self.percentile(model, 50),
+                'p95': self.percentile(model, 95),
+            }
+            for model in models
+        }
+
+
+class PolicyMetrics:
+    """
+    Compteurs des issues des appels : appels, réussites, échecs, nouvelles
+    tentatives, délais dépassés, échéances manquées, requêtes dupliquées (et
+    gagnées par le doublon), bascules sur le modèle de repli
+    """
+    OUTCOMES = ('calls', 'successes', 'failures', 'retries', 'timeouts', 'deadline_exceeded',
+                'hedges', 'hedge_wins', 'fallbacks')
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self.latencies = LatencyTracker()
+
+    def incr(self, outcome: str, count: int = 1):
+        with self._lock:
+            self._counts[outcome] += count
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = {outcome: self._counts[outcome] for outcome in self.OUTCOMES}
+        return {**counts, 'latency': self.latencies.snapshot()}
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+        self.latencies = LatencyTracker()
+
+
+class CallPolicy:
+    """
+    Paramètres de la politique des appels (par défaut ceux des settings)
+    """
+
+    def __init__(self, deadline: Optional[float] = None, attempt_timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None, retry_base_delay: Optional[float] = None,
+                 retry_max_delay: Optional[float] = None, hedge: Optional[bool] = None,
+                 hedge_percentile: Optional[float] = None, hedge_min_samples: Optional[int] = None,
+                 fallback_model: Optional[str] = None):
+        def setting(value, name):
+            return getattr(settings, name) if value is None else value
+
+        self.deadline = setting(deadline, 'AI_LLM_DEADLINE')
+        self.attempt_timeout = setting(attempt_timeout, 'AI_LLM_ATTEMPT_TIMEOUT')
+        self.max_retries = setting(max_retries, 'AI_LLM_MAX_RETRIES')
+        self.retry_base_delay = setting(retry_base_delay, 'AI_LLM_RETRY_BASE_DELAY')
+        self.retry_max_delay = setting(retry_max_delay, 'AI_LLM_RETRY_MAX_DELAY')
+        self.hedge = setting(hedge, 'AI_LLM_HEDGE')
+        self.hedge_percentile = setting(hedge_percentile, 'AI_LLM_HEDGE_PERCENTILE')
+        self.hedge_min_samples = setting(hedge_min_samples, 'AI_LLM_HEDGE_MIN_SAMPLES')
+        self.fallback_model = setting(fallback_model, 'AI_LLM_FALLBACK_MODEL')
+
+    def retry_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Attente avant la tentative suivante : exponentielle avec gigue, au
+        moins égale au délai demandé par le fournisseur
+        """
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+        return max(delay, retry_after or 0.0)
+
+    def model_for(self, model: str, remaining: float) -> str:
+        """
+        Modèle de la tentative : le modèle de repli lorsque le temps restant
+        ne permet plus une tentative complète du modèle demandé
+        """
+        if self.fallback_model and self.fallback_model != model and remaining < self.attempt_timeout:
+            return self.fallback_model
+        return model
+
+    def hedge_delay(self, model: str, latencies: LatencyTracker) -> Optional[float]:
+        """
+        Délai après lequel une tentative est doublée (None : pas de duplication)
+        """
+        if not self.hedge:
+            return None
+        return latencies.percentile(model, self.hedge_percentile, self.hedge_min_samples)
+
+
+_metrics = PolicyMetrics()
+
+
+def get_policy_metrics() -> PolicyMetrics:
+    """
+    Retourne les métriques de la politique des appels du processus
+    """
+    return _metrics
@@ -0,0 +1,154 @@
+"""
+llm_stub_server.py
+Serveur HTTP local compatible avec l'API Chat Completions
+Rejoue les réponses d'un StubBackend avec une latence configurable et des
+erreurs injectées, pour tester OpenAIBackend (pool de connexions, délais,
+politique des appels) sans appel réseau externe.
+
+Utilisation : python -m ai_analysis.llm_stub_server --port 8765 --latency 0.5
+puis OPENAI_API_BASE=http://127.0.0.1:8765/v1
+"""
+
+import argparse
+import json
+import time
+
+from aiohttp import web
+
+from .llm_backends import EventLoopThread, LLMError, StubBackend
+
+
+def create_app(backend: StubBackend) -> web.Application:
+    """
+    Crée l'application aiohttp exposant /v1/chat/completions
+    """
+    async def chat_completions(request):
+        payload = await request.json()
+        try:
+            if payload.get('stream'):
+                return await stream_completion(request, payload)
+            response = await backend.acomplete(
+                payload.get('messages', []),
+                payload.get('model', 'stub'),
+                payload.get('temperature', 0.7),
+                payload.get('max_tokens', 2000),
+            )
+        except LLMError as e:
+            # Erreur injectée (faults) : renvoyée comme le ferait l'API
+            return web.json_response({'error': {'message': str(e)}}, status=e.status or 500)
+        return web.json_response({
+            'id': f'stub-{backend.calls}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': response.model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': response.content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': response.prompt_tokens,
+                'completion_tokens': response.completion_tokens,
+                'total_tokens': response.total_tokens,
+            },
+        })
+
+    async def stream_completion(request, payload):
+        chunks = backend.astream(payload.get('messages', []), payload.get('model', 'stub'))
+        # Premier morceau attendu avant l'envoi des en-têtes : une erreur injectée reste une réponse HTTP d'erreur
+        try:
+            first = [await chunks.__anext__()]
+        except StopAsyncIteration:
+            first = []
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        for delta in first:
+            chunk = {'choices': [{'index': 0, 'delta': {'content': delta}}]}
+            await response.write(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+        async for delta in chunks:
+            chunk = {'choices': [{'index': 0, 'delta': {'content': delta}}]}
+            await response.write(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+        await response.write(b'data: [DONE]\n\n')
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app['backend'] = backend
+    app.router.add_post('/v1/chat/completions', chat_completions)
+    return app
+
+
+class StubServer:
+    """
+    Serveur stub démarré dans un thread en arrière-plan (tests et benchmarks)
+    """
+
+    def __init__(self, backend: StubBackend, host: str = '127.0.0.1', port: int = 0):
+        self.backend = backend
+        self.host = host
+        self.port = port
+        self.loop_thread = EventLoopThread('llm-stub-server')
+        self._runner = None
+
+    @property
+    def api_base(self) -> str:
+        return f'http://{self.host}:{self.port}/v1'
+
+    async def _start(self):
+        self._runner = web.AppRunner(create_app(self.backend))
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Port attribué par le système lorsque port=0
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def start(self) -> 'StubServer':
+        self.loop_thread.run(self._start())
+        return self
+
+    def stop(self):
+        if self._runner is not None:
+            self.loop_thread.run(self._runner.cleanup())
+            self._runner = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def parse_fault(value: str):
+    """
+    Incident d'un appel : None (appel normal), code HTTP (int) ou latence supplémentaire (float)
+    """
+    value = value.strip()
+    if not value:
+        return None
+    return float(value) if '.' in value else int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serveur LLM local rejouant des réponses préenregistrées')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Latence simulée par réponse (secondes)')
+    parser.add_argument('--token-latency', type=float, default=0.0,
+                        help='Délai entre deux morceaux en mode flux (secondes)')
+    parser.add_argument('--responses', help='Fichier JSON des réponses (voir StubBackend.from_file)')
+    parser.add_argument('--faults', default='',
+                        help="Incidents des appels successifs, séparés par des virgules : code HTTP (429), "
+                             "latence supplémentaire en secondes (2.5) ou vide pour un appel normal")
+    args = parser.parse_args()
+
+    if args.responses:
+        backend = StubBackend.from_file(args.responses, latency=args.latency)
+    else:
+        backend = StubBackend(latency=args.latency)
+    backend.token_latency = args.token_latency
+    backend.faults = [parse_fault(fault) for fault in args.faults.split(',')] if args.faults else []
+    web.run_app(create_app(backend), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
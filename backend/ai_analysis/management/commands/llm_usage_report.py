@@ -0,0 +1,63 @@
+"""
+Agrège le registre des appels au LLM par jour, projet, modèle ou opération
+Utilisation : python manage.py llm_usage_report [--by day|project|model|operation] [--days 30]
+              [--project ID] [--json]
+"""
+
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ai_analysis.usage_ledger import ROLLUP_GROUPS, get_usage_ledger, usage_rollup, usage_totals
+
+COLUMNS = [
+    ('calls', 'appels'),
+    ('cache_hits', 'cache'),
+    ('errors', 'erreurs'),
+    ('attempts', 'requêtes'),
+    ('prompt_tokens', 'tokens prompt'),
+    ('completion_tokens', 'tokens réponse'),
+    ('cost', 'coût'),
+    ('avg_duration', 'durée moy. (s)'),
+    ('max_duration', 'durée max (s)'),
+    ('total_duration', 'durée totale (s)'),
+    ('avg_queue_time', 'attente moy. (s)'),
+]
+
+
+class Command(BaseCommand):
+    help = "Agrège le registre des appels au LLM (tokens, coût, durées) par jour, projet, modèle ou opération"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--by', choices=list(ROLLUP_GROUPS), default='day')
+        parser.add_argument('--days', type=int, default=30, help='période couverte (jours, 0 = tout le registre)')
+        parser.add_argument('--project', type=int, default=None)
+        parser.add_argument('--json', action='store_true', help='sortie JSON')
+
+    def _label(self, row, group_by):
+        if group_by == 'project':
+            return f"{row['project_name'] or '(sans projet)'} [{row['project_id']}]"
+        return str(row[{'day': 'day', 'model': 'model_name', 'operation': 'operation'}[group_by]] or '-')
+
+    def handle(self, *args, **options):
+        # Les entrées en attente d'écriture dans ce processus sont incluses
+        get_usage_ledger().flush()
+        since = timezone.localdate() - timedelta(days=options['days']) if options['days'] else None
+        rows = usage_rollup(options['by'], since=since, project_id=options['project'])
+        totals = usage_totals(since=since, project_id=options['project'])
+
+        if options['json']:
+            self.stdout.write(json.dumps({'group_by': options['by'], 'rows': rows, 'totals': totals}, indent=2))
+            return
+
+        header = [options['by']] + [title for _, title in COLUMNS]
+        lines = [[self._label(row, options['by'])] + [str(row[key]) for key, _ in COLUMNS] for row in rows]
+        lines.append(['total'] + [str(totals[key]) for key, _ in COLUMNS])
+        widths = [max(len(line[index]) for line in [header] + lines) for index in range(len(header))]
+        for line in [header] + lines:
+            self.stdout.write('  '.join(value.ljust(width) for value, width in zip(line, widths)))
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['calls']} appels, {totals['total_tokens']} tokens, coût estimé {totals['cost']:.2f}"
+        ))
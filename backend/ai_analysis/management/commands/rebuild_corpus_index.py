@@ -0,0 +1,19 @@
+"""
+Réindexe le corpus TF-IDF des documents de référence
+Utilisation : python manage.py rebuild_corpus_index
+(textes enregistrés avant l'index, ou réparation des fréquences documentaires)
+"""
+
+from django.core.management.base import BaseCommand
+
+from ai_analysis.corpus_index import rebuild_corpus_index
+from ai_analysis.models import CorpusTerm
+
+
+class Command(BaseCommand):
+    help = "Réindexe tous les textes des documents de référence et recalcule les fréquences documentaires"
+
+    def handle(self, *args, **options):
+        indexed = rebuild_corpus_index()
+        terms = CorpusTerm.objects.filter(doc_freq__gt=0).count()
+        self.stdout.write(self.style.SUCCESS(f"{indexed} textes indexés, {terms} termes dans le corpus"))
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.3 on 2026-10-17 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_analysis', '0001_initial'),
+        ('projects', '0006_remove_projectdocument_author_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rcanalysis',
+            name='file_hash',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='Empreinte SHA-256 du RC'),
+        ),
+        migrations.AddField(
+            model_name='rcanalysis',
+            name='model_name',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Modèle'),
+        ),
+        migrations.AddField(
+            model_name='rcanalysis',
+            name='prompt_version',
+            field=models.CharField(blank=True, default='', max_length=20, verbose_name='Version du prompt'),
+        ),
+        migrations.AddIndex(
+            model_name='rcanalysis',
+            index=models.Index(fields=['file_hash', 'model_name', 'prompt_version'], name='rcanalysis_cache_key_idx'),
+        ),
+    ]
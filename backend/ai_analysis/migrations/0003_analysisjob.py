@@ -0,0 +1,36 @@
+# Generated by Django 5.0.3 on 2026-10-17 16:07
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_analysis', '0002_rcanalysis_cache_key'),
+        ('projects', '0006_remove_projectdocument_author_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', "En file d'attente"), ('extracting', 'Extraction du texte'), ('analyzing', 'Analyse IA'), ('done', 'Terminé'), ('failed', 'Échec')], default='queued', max_length=20, verbose_name='Statut')),
+                ('progress', models.PositiveSmallIntegerField(default=0, verbose_name='Progression')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Erreur')),
+                ('cached', models.BooleanField(default=False, verbose_name='Servi depuis le cache')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('analysis', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='ai_analysis.rcanalysis')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analysis_jobs', to='projects.project')),
+            ],
+            options={
+                'verbose_name': "job d'analyse",
+                'verbose_name_plural': "jobs d'analyse",
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
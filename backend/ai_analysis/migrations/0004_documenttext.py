@@ -0,0 +1,33 @@
+# Generated by Django 5.0.3 on 2026-10-17 17:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_analysis', '0003_analysisjob'),
+        ('projects', '0006_remove_projectdocument_author_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, verbose_name='Empreinte SHA-256 du fichier')),
+                ('compressed_text', models.BinaryField(verbose_name='Texte compressé')),
+                ('page_offsets', models.JSONField(default=list, verbose_name='Positions de début de page')),
+                ('sections', models.JSONField(default=list, verbose_name='Sections détectées')),
+                ('char_count', models.PositiveIntegerField(default=0, verbose_name='Nombre de caractères')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='text_store', to='projects.referencedocument')),
+            ],
+            options={
+                'verbose_name': 'texte de document',
+                'verbose_name_plural': 'textes de documents',
+            },
+        ),
+    ]
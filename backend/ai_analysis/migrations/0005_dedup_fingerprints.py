@@ -0,0 +1,33 @@
+# Generated by Django 5.0.3 on 2026-10-17 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_analysis', '0004_documenttext'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rcanalysis',
+            name='dedup_source',
+            field=models.CharField(blank=True, choices=[('', 'Calculé pour ce projet'), ('file', 'Fichier identique'), ('text', 'Texte identique')], default='', max_length=10, verbose_name="Reprise d'un autre projet"),
+        ),
+        migrations.AlterField(
+            model_name='documenttext',
+            name='content_hash',
+            field=models.CharField(db_index=True, max_length=64, verbose_name='Empreinte SHA-256 du fichier'),
+        ),
+        migrations.AddField(
+            model_name='documenttext',
+            name='text_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64, verbose_name='Empreinte SHA-256 du texte normalisé'),
+        ),
+        migrations.AddField(
+            model_name='documenttext',
+            name='dedup_source',
+            field=models.CharField(blank=True, choices=[('', 'Calculé pour ce projet'), ('file', 'Fichier identique'), ('text', 'Texte identique')], default='', max_length=10, verbose_name="Reprise d'un autre document"),
+        ),
+    ]
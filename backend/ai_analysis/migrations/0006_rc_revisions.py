@@ -0,0 +1,23 @@
+# Generated by Django 5.0.3 on 2026-10-17 19:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_analysis', '0005_dedup_fingerprints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rcanalysis',
+            name='fragments',
+            field=models.JSONField(blank=True, default=list, verbose_name='Extraits analysés'),
+        ),
+        migrations.AddField(
+            model_name='documenttext',
+            name='revision_diff',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Modifications depuis le fichier précédent'),
+        ),
+    ]
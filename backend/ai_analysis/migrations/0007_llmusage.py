@@ -0,0 +1,40 @@
+# Generated by Django 5.0.3 on 2026-10-17 21:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_analysis', '0006_rc_revisions'),
+        ('projects', '0006_remove_projectdocument_author_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.CharField(blank=True, default='', max_length=50, verbose_name='Opération')),
+                ('model_name', models.CharField(blank=True, default='', max_length=100, verbose_name='Modèle')),
+                ('prompt_tokens', models.PositiveIntegerField(default=0, verbose_name='Tokens du prompt')),
+                ('completion_tokens', models.PositiveIntegerField(default=0, verbose_name='Tokens de la réponse')),
+                ('duration', models.FloatField(default=0.0, verbose_name="Durée de l'appel (s)")),
+                ('queue_time', models.FloatField(default=0.0, verbose_name='Attente dans la file (s)')),
+                ('cost', models.FloatField(default=0.0, verbose_name='Coût estimé')),
+                ('cache_hit', models.BooleanField(default=False, verbose_name='Servi depuis le cache')),
+                ('streamed', models.BooleanField(default=False, verbose_name='Réponse en flux')),
+                ('success', models.BooleanField(default=True, verbose_name='Réussi')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Erreur')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='llm_usage', to='projects.project')),
+            ],
+            options={
+                'verbose_name': 'appel au LLM',
+                'verbose_name_plural': 'appels au LLM',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
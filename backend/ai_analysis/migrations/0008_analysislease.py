@@ -0,0 +1,29 @@
+# Generated by Django 5.0.3 on 2026-10-17 23:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_analysis', '0007_llmusage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True, verbose_name="Clé de l'analyse")),
+                ('owner', models.CharField(max_length=100, verbose_name='Détenteur')),
+                ('expires_at', models.DateTimeField(verbose_name='Expiration')),
+                ('acquired_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Acquis le')),
+            ],
+            options={
+                'verbose_name': "bail d'analyse",
+                'verbose_name_plural': "baux d'analyse",
+                'ordering': ['-acquired_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.3 on 2026-10-18 09:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_analysis', '0008_analysislease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorpusTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100, unique=True, verbose_name='Terme')),
+                ('doc_freq', models.IntegerField(default=0, verbose_name='Nombre de documents')),
+            ],
+            options={
+                'verbose_name': 'terme du corpus',
+                'verbose_name_plural': 'termes du corpus',
+            },
+        ),
+        migrations.CreateModel(
+            name='TermVector',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, verbose_name='Empreinte SHA-256 du fichier')),
+                ('term_ids', models.BinaryField(verbose_name='Identifiants des termes')),
+                ('term_counts', models.BinaryField(verbose_name='Occurrences des termes')),
+                ('term_total', models.PositiveIntegerField(default=0, verbose_name='Nombre de termes')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('text', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='term_vector', to='ai_analysis.documenttext')),
+            ],
+            options={
+                'verbose_name': 'vecteur de termes',
+                'verbose_name_plural': 'vecteurs de termes',
+            },
+        ),
+    ]
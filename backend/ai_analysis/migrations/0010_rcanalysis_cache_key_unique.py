@@ -0,0 +1,38 @@
+# Generated by Django 5.0.3 on 2026-10-19 10:20
+
+from django.db import migrations, models
+
+
+def remove_duplicate_analyses(apps, schema_editor):
+    """
+    Ne conserve que l'analyse la plus récente de chaque projet et clé de cache
+    avant la création de la contrainte d'unicité
+    """
+    RCAnalysis = apps.get_model('ai_analysis', 'RCAnalysis')
+    seen = set()
+    duplicates = []
+    for analysis in RCAnalysis.objects.order_by('-updated_at', '-pk').only(
+        'pk', 'project_id', 'file_hash', 'model_name', 'prompt_version'
+    ):
+        key = (analysis.project_id, analysis.file_hash, analysis.model_name, analysis.prompt_version)
+        if key in seen:
+            duplicates.append(analysis.pk)
+        else:
+            seen.add(key)
+    if duplicates:
+        RCAnalysis.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_analysis', '0009_corpus_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_analyses, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='rcanalysis',
+            constraint=models.UniqueConstraint(fields=('project', 'file_hash', 'model_name', 'prompt_version'), name='rcanalysis_cache_key_unique'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.3 on 2026-10-19 15:40
+
+from django.db import migrations, models
+
+
+def clear_cache_hit_attempts(apps, schema_editor):
+    """
+    Les analyses servies depuis le cache n'ont envoyé aucune requête
+    """
+    LLMUsage = apps.get_model('ai_analysis', 'LLMUsage')
+    LLMUsage.objects.filter(cache_hit=True).update(attempts=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_analysis', '0010_rcanalysis_cache_key_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='llmusage',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='Requêtes envoyées'),
+        ),
+        migrations.AddField(
+            model_name='llmusage',
+            name='hedges',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Requêtes dupliquées'),
+        ),
+        migrations.RunPython(clear_cache_hit_attempts, migrations.RunPython.noop),
+    ]
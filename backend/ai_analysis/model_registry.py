@@ -0,0 +1,140 @@
+"""
+model_registry.py
+Registre des modèles lourds (spaCy, transformers) du processus
+Chaque modèle est déclaré avec sa fonction de chargement puis chargé une
+seule fois, au premier usage ou à l'avance (preload). Préchargés dans le
+processus maître de gunicorn ou de Celery avant le fork, les modèles sont
+partagés par les workers en copie sur écriture au lieu d'être chargés par
+chacun.
+
+Le temps de chargement et la mémoire résidente (RSS) ajoutée par chaque
+modèle sont mesurés et exposés par stats().
+
+Avec AI_MODELS_ENABLED=False (workers web), le chargement est refusé :
+les traitements NLP sont alors envoyés aux workers Celery dédiés.
+"""
+
+import logging
+import os
+import resource
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from .conf import setting
+
+logger = logging.getLogger(__name__)
+
+
+class ModelsDisabled(Exception):
+    """
+    Levée lorsqu'un modèle est demandé dans un processus qui ne doit pas en charger
+    """
+
+
+def current_rss() -> int:
+    """
+    Retourne la mémoire résidente du processus en octets
+    (/proc sous Linux, sinon le pic mesuré par getrusage)
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss est en kilo-octets sous Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ModelRegistry:
+    """
+    Modèles du processus, chargés une seule fois chacun
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable] = {}
+        self._models: Dict[str, object] = {}
+        self._stats: Dict[str, Dict] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.enabled: Optional[bool] = None
+
+    def register(self, name: str, loader: Callable):
+        """
+        Déclare un modèle et sa fonction de chargement (sans le charger)
+        """
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+
+    def is_enabled(self) -> bool:
+        if self.enabled is not None:
+            return self.enabled
+        return setting('AI_MODELS_ENABLED', True)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def get(self, name: str):
+        """
+        Retourne le modèle, chargé au premier appel
+        """
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if not self.is_enabled():
+            raise ModelsDisabled(f"Chargement du modèle {name} désactivé dans ce processus (AI_MODELS_ENABLED)")
+        if name not in self._loaders:
+            raise KeyError(f"Modèle inconnu : {name}")
+
+        with self._locks[name]:
+            if name not in self._models:
+                rss_before = current_rss()
+                started = time.perf_counter()
+                self._models[name] = self._loaders[name]()
+                self._stats[name] = {
+                    'load_seconds': round(time.perf_counter() - started, 3),
+                    'rss_delta_bytes': current_rss() - rss_before,
+                    'pid': os.getpid(),
+                }
+                logger.info(
+                    f"Modèle {name} chargé en {self._stats[name]['load_seconds']} s "
+                    f"(+{self._stats[name]['rss_delta_bytes'] // (1024 * 1024)} Mo)"
+                )
+            return self._models[name]
+
+    def preload(self, names: Optional[Iterable[str]] = None):
+        """
+        Charge à l'avance les modèles indiqués (tous les modèles déclarés par défaut).
+        Un modèle indisponible est signalé sans interrompre le démarrage.
+        """
+        for name in list(names if names is not None else self._loaders):
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.warning(f"Préchargement du modèle {name} impossible : {str(e)}")
+
+    def stats(self) -> Dict:
+        """
+        État des modèles déclarés : chargement, temps de chargement et RSS ajoutée,
+        avec la mémoire résidente actuelle du processus
+        """
+        return {
+            'pid': os.getpid(),
+            'enabled': self.is_enabled(),
+            'rss_bytes': current_rss(),
+            'models': {
+                name: {'loaded': name in self._models, **self._stats.get(name, {})}
+                for name in self._loaders
+            },
+        }
+
+    def unload(self, name: str):
+        """
+        Oublie un modèle chargé (tests)
+        """
+        with self._lock:
+            self._models.pop(name, None)
+            self._stats.pop(name, None)
+
+
+registry = ModelRegistry()
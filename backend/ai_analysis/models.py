@@ -3,23 +3,225 @@ models.py
 Modèles pour l'application d'analyse IA
 """
 
+import uuid
+import zlib
+
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+# Origine d'un résultat repris d'un autre projet (lots d'un même appel d'offres)
+DEDUP_SOURCE_CHOICES = [
+    ('', _('Calculé pour ce projet')),
+    ('file', _('Fichier identique')),
+    ('text', _('Texte identique')),
+]
+
+
 class RCAnalysis(models.Model):
     """
-    Modèle pour stocker les analyses de RC
+    Modèle pour stocker les analyses de RC.
+    Sert de cache de résultats : une analyse est identifiée par l'empreinte
+    SHA-256 du fichier RC, le modèle utilisé et la version du prompt.
+    dedup_source indique une analyse reprise d'un autre projet dont le RC
+    est identique (fichier ou texte normalisé). fragments conserve le
+    découpage du RC en extraits et leurs structures partielles (absentes
+    pour une analyse en un seul prompt), réutilisés lors de l'analyse d'un
+    RC modificatif.
+    Une seule analyse par projet et clé de cache (contrainte
+    rcanalysis_cache_key_unique).
     """
     project = models.ForeignKey('projects.Project', on_delete=models.CASCADE, related_name='rc_analyses')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    file_hash = models.CharField(_('Empreinte SHA-256 du RC'), max_length=64, blank=True, default='')
+    model_name = models.CharField(_('Modèle'), max_length=100, blank=True, default='')
+    prompt_version = models.CharField(_('Version du prompt'), max_length=20, blank=True, default='')
     analysis_data = models.JSONField()
     summary_data = models.JSONField()
+    fragments = models.JSONField(_('Extraits analysés'), default=list, blank=True)
+    dedup_source = models.CharField(_('Reprise d\'un autre projet'), max_length=10, blank=True, default='',
+                                    choices=DEDUP_SOURCE_CHOICES)
 
     class Meta:
         verbose_name = _('analyse de RC')
         verbose_name_plural = _('analyses de RC')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['file_hash', 'model_name', 'prompt_version'], name='rcanalysis_cache_key_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['project', 'file_hash', 'model_name', 'prompt_version'],
+                name='rcanalysis_cache_key_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Analyse RC - {self.project.name} ({self.created_at})"
+
+
+class AnalysisJob(models.Model):
+    """
+    Job d'analyse asynchrone d'un RC.
+    Le résultat est enregistré dans RCAnalysis ; le job ne conserve que
+    l'état d'avancement et, le cas échéant, le message d'erreur.
+    """
+    STATUS_CHOICES = [
+        ('queued', _('En file d\'attente')),
+        ('extracting', _('Extraction du texte')),
+        ('analyzing', _('Analyse IA')),
+        ('done', _('Terminé')),
+        ('failed', _('Échec')),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey('projects.Project', on_delete=models.CASCADE, related_name='analysis_jobs')
+    status = models.CharField(_('Statut'), max_length=20, choices=STATUS_CHOICES, default='queued')
+    progress = models.PositiveSmallIntegerField(_('Progression'), default=0)
+    error = models.TextField(_('Erreur'), blank=True, default='')
+    analysis = models.ForeignKey(RCAnalysis, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    cached = models.BooleanField(_('Servi depuis le cache'), default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('job d\'analyse')
+        verbose_name_plural = _('jobs d\'analyse')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Job {self.id} - projet {self.project_id} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+
+class DocumentText(models.Model):
+    """
+    Texte extrait d'un document de référence (RC ou CCTP) au moment du dépôt.
+    Le texte normalisé est stocké compressé, avec la position de début de
+    chaque page et les sections détectées ; content_hash est l'empreinte
+    SHA-256 du fichier source, qui permet de détecter un texte périmé, et
+    text_hash celle du texte normalisé, qui rapproche deux exports différents
+    d'un même RC. revision_diff décrit les pages et sections modifiées par
+    rapport au fichier précédent lorsque le document a été remplacé.
+    """
+    document = models.OneToOneField('projects.ReferenceDocument', on_delete=models.CASCADE, related_name='text_store')
+    content_hash = models.CharField(_('Empreinte SHA-256 du fichier'), max_length=64, db_index=True)
+    text_hash = models.CharField(_('Empreinte SHA-256 du texte normalisé'), max_length=64, blank=True,
+                                 default='', db_index=True)
+    compressed_text = models.BinaryField(_('Texte compressé'))
+    page_offsets = models.JSONField(_('Positions de début de page'), default=list)
+    sections = models.JSONField(_('Sections détectées'), default=list)
+    char_count = models.PositiveIntegerField(_('Nombre de caractères'), default=0)
+    revision_diff = models.JSONField(_('Modifications depuis le fichier précédent'), default=dict, blank=True)
+    dedup_source = models.CharField(_('Reprise d\'un autre document'), max_length=10, blank=True, default='',
+                                    choices=DEDUP_SOURCE_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('texte de document')
+        verbose_name_plural = _('textes de documents')
+
+    def __str__(self):
+        return f"Texte - {self.document} ({self.char_count} caractères)"
+
+    @property
+    def text(self) -> str:
+        return zlib.decompress(bytes(self.compressed_text)).decode('utf-8')
+
+
+class LLMUsage(models.Model):
+    """
+    Entrée du registre des appels au LLM : tokens, durée de l'appel, attente
+    dans la file du répartiteur, requêtes envoyées (nouvelles tentatives et
+    doublons compris), modèle et coût estimé (AI_LLM_PRICING).
+    Une analyse servie depuis le cache est enregistrée sans appel (cache_hit).
+    L'écriture est faite en arrière-plan (voir usage_ledger).
+    """
+    project = models.ForeignKey('projects.Project', on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='llm_usage')
+    operation = models.CharField(_('Opération'), max_length=50, blank=True, default='')
+    model_name = models.CharField(_('Modèle'), max_length=100, blank=True, default='')
+    prompt_tokens = models.PositiveIntegerField(_('Tokens du prompt'), default=0)
+    completion_tokens = models.PositiveIntegerField(_('Tokens de la réponse'), default=0)
+    duration = models.FloatField(_('Durée de l\'appel (s)'), default=0.0)
+    queue_time = models.FloatField(_('Attente dans la file (s)'), default=0.0)
+    attempts = models.PositiveSmallIntegerField(_('Requêtes envoyées'), default=1)
+    hedges = models.PositiveSmallIntegerField(_('Requêtes dupliquées'), default=0)
+    cost = models.FloatField(_('Coût estimé'), default=0.0)
+    cache_hit = models.BooleanField(_('Servi depuis le cache'), default=False)
+    streamed = models.BooleanField(_('Réponse en flux'), default=False)
+    success = models.BooleanField(_('Réussi'), default=True)
+    error = models.TextField(_('Erreur'), blank=True, default='')
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = _('appel au LLM')
+        verbose_name_plural = _('appels au LLM')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.operation or 'appel'} - {self.model_name} ({self.prompt_tokens + self.completion_tokens} tokens)"
+
+
+class AnalysisLease(models.Model):
+    """
+    Bail d'une analyse de RC en cours (voir single_flight) : un seul
+    processus analyse un même RC à la fois, les appels simultanés attendent
+    son résultat. Le bail expire s'il n'est plus renouvelé (processus arrêté).
+    """
+    key = models.CharField(_('Clé de l\'analyse'), max_length=255, unique=True)
+    owner = models.CharField(_('Détenteur'), max_length=100)
+    expires_at = models.DateTimeField(_('Expiration'))
+    acquired_at = models.DateTimeField(_('Acquis le'), default=timezone.now)
+
+    class Meta:
+        verbose_name = _('bail d\'analyse')
+        verbose_name_plural = _('baux d\'analyse')
+        ordering = ['-acquired_at']
+
+    def __str__(self):
+        return f"{self.key} ({self.owner})"
+
+
+class CorpusTerm(models.Model):
+    """
+    Terme du corpus des documents de référence et nombre de documents qui le
+    contiennent (fréquence documentaire, tenue à jour à chaque indexation ou
+    suppression d'un document, voir corpus_index)
+    """
+    term = models.CharField(_('Terme'), max_length=100, unique=True)
+    doc_freq = models.IntegerField(_('Nombre de documents'), default=0)
+
+    class Meta:
+        verbose_name = _('terme du corpus')
+        verbose_name_plural = _('termes du corpus')
+
+    def __str__(self):
+        return f"{self.term} ({self.doc_freq})"
+
+
+class TermVector(models.Model):
+    """
+    Vecteur creux des occurrences des termes d'un texte de document :
+    identifiants des termes (CorpusTerm, triés) et nombres d'occurrences,
+    stockés en tableaux NumPy. content_hash est l'empreinte du fichier indexé.
+    """
+    text = models.OneToOneField(DocumentText, on_delete=models.CASCADE, related_name='term_vector')
+    content_hash = models.CharField(_('Empreinte SHA-256 du fichier'), max_length=64)
+    term_ids = models.BinaryField(_('Identifiants des termes'))
+    term_counts = models.BinaryField(_('Occurrences des termes'))
+    term_total = models.PositiveIntegerField(_('Nombre de termes'), default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('vecteur de termes')
+        verbose_name_plural = _('vecteurs de termes')
 
     def __str__(self):
-        return f"Analyse RC - {self.project.name} ({self.created_at})" 
\ No newline at end of file
+        return f"Vecteur - {self.text} ({self.term_total} termes)"
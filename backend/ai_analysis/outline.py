@@ -0,0 +1,176 @@
+"""
+outline.py
+Analyse du plan de mémoire proposé par le modèle
+Le plan est lu en une seule passe, ligne par ligne, avec une expression
+régulière précompilée : chaque ligne numérotée ("2.1.3. Titre (10 points)")
+devient un nœud de l'arbre, à n'importe quelle profondeur, et les points
+indiqués entre parenthèses sont conservés comme pondération numérique.
+
+Chaque nœud est un dictionnaire :
+    {'number': '2.1', 'title': '2.1. Titre', 'points': 10, 'subsections': [...]}
+La numérotation est recalculée d'après la position du nœud dans l'arbre.
+"""
+
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Numérotation en tête de ligne : "1", "1.", "1)", "12.3.4."
+OUTLINE_LINE_RE = re.compile(r'(?P<indent>[ \t]*)(?P<number>\d+(?:\.\d+)*)[.)]?[ \t]+(?P<title>\S.*)')
+# Ligne non numérotée (éventuellement précédée d'une puce), rattachée au nœud courant si indentée
+BULLET_LINE_RE = re.compile(r'(?P<indent>[ \t]+)(?:[-*•][ \t]+)?(?P<title>\S.*)')
+# Points en fin d'intitulé : "(10 points)", "(10 pts)", "(2,5 points)", "(10 %)"
+POINTS_RE = re.compile(r'[ \t]*\([ \t]*(?P<points>\d+(?:[.,]\d+)?)[ \t]*(?:points?|pts?|%)[ \t]*\)[ \t]*$', re.IGNORECASE)
+
+Points = Optional[Union[int, float]]
+
+
+def parse_points(title: str) -> Tuple[str, Points]:
+    """
+    Sépare l'intitulé et les points indiqués en fin de ligne
+    ("Méthodologie (30 points)" -> ("Méthodologie", 30))
+    """
+    match = POINTS_RE.search(title) if title.endswith(')') else None
+    if not match:
+        return title.strip(), None
+    value = float(match.group('points').replace(',', '.'))
+    points = int(value) if value.is_integer() else value
+    return title[:match.start()].strip(), points
+
+
+def make_node(number: str, title: str, points: Points = None) -> Dict:
+    return {
+        'number': number,
+        'title': f"{number}. {title}",
+        'points': points,
+        'subsections': []
+    }
+
+
+def strip_number(title: str) -> str:
+    """
+    Retire la numérotation d'un intitulé de nœud ("2.1. Titre" -> "Titre")
+    """
+    match = OUTLINE_LINE_RE.fullmatch(title)
+    return match.group('title').strip() if match else title.strip()
+
+
+class OutlineParser:
+    """
+    Construit l'arbre du plan ligne par ligne. feed() retourne le nœud
+    ajouté et son chemin (indices depuis la racine), ce qui permet de
+    transmettre le plan au fur et à mesure de la génération.
+
+    La pile contient le chemin du dernier nœud ajouté : chaque ligne est
+    traitée en temps constant amorti, l'analyse est donc linéaire.
+    """
+
+    def __init__(self):
+        self.structure: List[Dict] = []
+        # Pile des (niveau, nœud, chemin) du dernier nœud ajouté
+        self._stack: List[Tuple[int, Dict, List[int]]] = []
+
+    def feed(self, line: str) -> Optional[Tuple[List[int], Dict]]:
+        """
+        Traite une ligne complète ; retourne (chemin, nœud) si un nœud a été ajouté
+        """
+        line = line.rstrip()
+        if not line:
+            return None
+        match = OUTLINE_LINE_RE.match(line)
+        if match:
+            level = match.group('number').count('.') + 1
+            title = match.group('title')
+        else:
+            # Ligne indentée sans numéro : élément du nœud courant
+            match = BULLET_LINE_RE.fullmatch(line)
+            if not match or not self._stack:
+                return None
+            level = self._stack[-1][0] + 1
+            title = match.group('title')
+
+        while self._stack and self._stack[-1][0] >= level:
+            self._stack.pop()
+
+        if self._stack:
+            _, parent, parent_path = self._stack[-1]
+            siblings = parent['subsections']
+            number = f"{parent['number']}.{len(siblings) + 1}"
+        else:
+            siblings, parent_path = self.structure, []
+            number = str(len(siblings) + 1)
+
+        path = parent_path + [len(siblings)]
+        node = make_node(number, *parse_points(title))
+        siblings.append(node)
+        self._stack.append((level, node, path))
+        return list(path), node
+
+    def feed_lines(self, lines: Iterable[str]) -> List[Dict]:
+        for line in lines:
+            self.feed(line)
+        return self.structure
+
+
+def parse_outline(text: str) -> List[Dict]:
+    """
+    Analyse un plan complet et retourne l'arbre des nœuds
+    """
+    return OutlineParser().feed_lines(text.split('\n'))
+
+
+def iter_nodes(structure: List[Dict], path: Tuple[int, ...] = ()) -> Iterator[Tuple[List[int], Dict]]:
+    """
+    Parcourt l'arbre en profondeur, dans l'ordre du document : (chemin, nœud)
+    """
+    for index, node in enumerate(structure):
+        node_path = path + (index,)
+        yield list(node_path), node
+        yield from iter_nodes(node['subsections'], node_path)
+
+
+def merge_outlines(outlines: Iterable[List[Dict]]) -> List[Dict]:
+    """
+    Fusionne plusieurs arbres : les nœuds de même intitulé (à numérotation
+    près) sont regroupés à chaque niveau, dans l'ordre de première apparition,
+    puis l'ensemble est renuméroté. Les points du premier nœud qui en indique
+    sont conservés.
+    """
+    merged: List[Dict] = []
+
+    def merge_into(target: List[Dict], index: Dict[str, Dict], nodes: List[Dict]):
+        for node in nodes:
+            title = strip_number(node['title'])
+            existing = index.get(title.lower())
+            if existing is None:
+                existing = {'title': title, 'points': node.get('points'), 'subsections': [], '_index': {}}
+                index[title.lower()] = existing
+                target.append(existing)
+            elif existing['points'] is None:
+                existing['points'] = node.get('points')
+            merge_into(existing['subsections'], existing['_index'], node['subsections'])
+
+    def finalize(nodes: List[Dict], prefix: str = ''):
+        for position, node in enumerate(nodes, start=1):
+            del node['_index']
+            number = f"{prefix}.{position}" if prefix else str(position)
+            node.update(make_node(number, node['title'], node['points']), subsections=node['subsections'])
+            finalize(node['subsections'], number)
+
+    root_index: Dict[str, Dict] = {}
+    for outline in outlines:
+        merge_into(merged, root_index, outline)
+    finalize(merged)
+    return merged
+
+
+def render_outline(structure: List[Dict], indent: str = '   ') -> str:
+    """
+    Produit le texte d'un plan au format demandé au modèle (inverse de parse_outline)
+    """
+    lines = []
+    for path, node in iter_nodes(structure):
+        title = strip_number(node['title'])
+        if node['points'] is not None:
+            title = f"{title} ({node['points']} points)"
+        lines.append(f"{indent * (len(path) - 1)}{node['number']}. {title}")
+    return '\n'.join(lines)
@@ -4,85 +4,192 @@ Service d'analyse des documents PDF
 Extrait le texte et identifie les sections du document
 """
 
-import os
-import PyPDF2
+import logging
 import re
-from typing import Dict, List, Tuple
+from bisect import bisect_right
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .pdf_extraction import ExtractedDocument, extract_document, iter_pages
+from .requirement_extraction import NLPUnavailable, extract_requirements
+
+logger = logging.getLogger(__name__)
+
+# Titre de section en début de ligne : "1 Titre", "1.1 Titre" ou "1.1.1 Titre".
+# Une seule expression précompilée, appliquée à tout le texte en une passe.
+SECTION_RE = re.compile(r'^[ \t]*(\d+(?:\.\d+){0,2})[ \t]+(\S.*?)[ \t]*$', re.MULTILINE)
+
+
+class SectionIndex:
+    """
+    Index des sections d'un texte : pour chaque section, position de début
+    (début de la ligne de titre), position de fin (début de la section
+    suivante de même niveau ou de niveau supérieur, ou fin du texte) et
+    pages couvertes.
+
+    sections est une liste de dictionnaires
+    {'number', 'title', 'level', 'start', 'end', 'pages': [première, dernière]},
+    sérialisable tel quel (voir text_store).
+    """
+
+    def __init__(self, sections: List[Dict]):
+        self.sections = sections
+        self._starts = [section['start'] for section in sections]
+        # En cas de numéro répété, la première occurrence est retenue
+        self._by_number = {}
+        for section in sections:
+            self._by_number.setdefault(section['number'], section)
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def span(self, number: str) -> Optional[Tuple[int, int, List[int]]]:
+        """
+        Retourne (début, fin, pages) de la section de ce numéro, ou None
+        """
+        section = self._by_number.get(number)
+        if section is None:
+            return None
+        return section['start'], section['end'], section['pages']
+
+    def section_text(self, text: str, number: str) -> Optional[str]:
+        """
+        Retourne le texte de la section (titre et sous-sections compris)
+        """
+        span = self.span(number)
+        return text[span[0]:span[1]] if span else None
+
+    def section_at(self, offset: int) -> Optional[Dict]:
+        """
+        Retourne la section dont le titre précède au plus près la position donnée
+        """
+        index = bisect_right(self._starts, offset) - 1
+        return self.sections[index] if index >= 0 else None
+
 
 class PDFAnalyzer:
     def __init__(self):
-        self.section_patterns = [
-            r'^(\d+\.\d+\.\d+)\s+(.+)$',  # 1.1.1 Titre
-            r'^(\d+\.\d+)\s+(.+)$',       # 1.1 Titre
-            r'^(\d+)\s+(.+)$',            # 1 Titre
-        ]
+        self.section_re = SECTION_RE
 
     def extract_text(self, pdf_path: str) -> str:
         """
         Extrait le texte d'un fichier PDF
         """
-        if not os.path.exists(pdf_path):
-            raise FileNotFoundError(f"Le fichier {pdf_path} n'existe pas")
+        return extract_document(pdf_path).text
 
-        text = ""
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-        return text
+    def iter_pages(self, pdf_path: str) -> Iterator[Tuple[int, str]]:
+        """
+        Produit les pages du PDF une par une : (numéro de page, texte)
+        """
+        return iter_pages(pdf_path)
 
-    def identify_sections(self, text: str) -> List[Dict[str, str]]:
+    def build_section_index(self, text: str, page_offsets: Optional[List[int]] = None) -> SectionIndex:
         """
-        Identifie les sections et sous-sections dans le texte
+        Détecte les sections en une passe et calcule leurs positions de début
+        et de fin ; page_offsets (voir ExtractedDocument) permet d'y associer
+        les pages couvertes
         """
         sections = []
-        lines = text.split('\n')
+        # Sections dont la fin n'est pas encore connue, du niveau le plus haut au plus bas
+        open_sections = []
+        for match in self.section_re.finditer(text):
+            number = match.group(1)
+            level = number.count('.') + 1
+            start = match.start()
+            while open_sections and open_sections[-1]['level'] >= level:
+                open_sections.pop()['end'] = start
+            section = {
+                'number': number,
+                'title': match.group(2),
+                'level': level,
+                'start': start,
+                'end': len(text),
+            }
+            sections.append(section)
+            open_sections.append(section)
+
+        for section in sections:
+            section['pages'] = self._page_range(page_offsets, section['start'], section['end'])
+        return SectionIndex(sections)
 
-        for line in lines:
-            for pattern in self.section_patterns:
-                match = re.match(pattern, line.strip())
-                if match:
-                    number = match.group(1)
-                    title = match.group(2)
-                    level = len(number.split('.'))
-                    sections.append({
-                        'number': number,
-                        'title': title,
-                        'level': level
-                    })
-                    break
+    @staticmethod
+    def _page_range(page_offsets: Optional[List[int]], start: int, end: int) -> List[int]:
+        if not page_offsets:
+            return []
+        first = max(bisect_right(page_offsets, start), 1)
+        last = max(bisect_right(page_offsets, max(end - 1, start)), first)
+        return [first, last]
+
+    def identify_sections(self, text: str) -> List[Dict[str, str]]:
+        """
+        Identifie les sections et sous-sections dans le texte
+        """
+        return [
+            {'number': match.group(1), 'title': match.group(2), 'level': match.group(1).count('.') + 1}
+            for match in self.section_re.finditer(text)
+        ]
 
-        return sections
+    def split_sections(self, text: str) -> List[str]:
+        """
+        Découpe le texte en blocs commençant chacun par un titre de section
+        (le premier bloc contient le texte précédant la première section)
+        """
+        boundaries = [match.start() for match in self.section_re.finditer(text) if match.start() > 0]
+        blocks = []
+        start = 0
+        for boundary in boundaries:
+            # Le saut de ligne qui précède le titre sépare les blocs
+            blocks.append(text[start:boundary - 1])
+            start = boundary
+        blocks.append(text[start:])
+        return blocks
 
-    def analyze_document(self, pdf_path: str) -> Dict:
+    def analyze_document(self, pdf_path: str, document: Optional[ExtractedDocument] = None,
+                         sections: Optional[List[Dict]] = None) -> Dict:
         """
-        Analyse complète du document PDF
+        Analyse complète du document PDF.
+        Le texte et les sections déjà enregistrés (voir text_store) peuvent être
+        fournis pour éviter de réextraire le PDF.
         """
         try:
             # Extraction du texte
-            text = self.extract_text(pdf_path)
+            if document is None:
+                document = extract_document(pdf_path)
+            text = document.text
             
-            # Identification des sections
-            sections = self.identify_sections(text)
+            # Identification des sections et de leurs positions
+            if sections is None:
+                sections = self.build_section_index(text, document.page_offsets).sections
             
             # Analyse du contenu
-            content_analysis = self.analyze_content(text)
+            content_analysis = self.analyze_content(text, document)
             
             return {
                 'sections': sections,
                 'content_analysis': content_analysis,
-                'raw_text': text
+                'raw_text': text,
+                'page_offsets': document.page_offsets
             }
         except Exception as e:
             raise Exception(f"Erreur lors de l'analyse du document: {str(e)}")
 
-    def analyze_content(self, text: str) -> Dict:
+    def analyze_content(self, text: str, document: Optional[ExtractedDocument] = None) -> Dict:
         """
-        Analyse le contenu du document pour identifier les exigences
+        Analyse le contenu du document pour identifier les exigences, les
+        contraintes, les mots clés et les thèmes (extraction locale spaCy).
+        Les positions de page de document permettent de rattacher chaque
+        exigence à sa page.
         """
-        # TODO: Implémenter l'analyse du contenu avec IA
-        return {
-            'exigences': [],
-            'mots_cles': [],
-            'themes': []
-        } 
\ No newline at end of file
+        if document is not None:
+            pages = [(number, document.page_text(number)) for number in range(1, document.page_count + 1)]
+        else:
+            pages = [(1, text)]
+        try:
+            return extract_requirements(pages)
+        except NLPUnavailable as e:
+            logger.warning(f"Extraction des exigences indisponible : {str(e)}")
+            return {
+                'exigences': [],
+                'contraintes': [],
+                'mots_cles': [],
+                'themes': []
+            }
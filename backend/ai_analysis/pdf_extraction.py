@@ -0,0 +1,185 @@
+"""
+pdf_extraction.py
+Extraction du texte des PDF page par page
+Module partagé par AIService et PDFAnalyzer : les pages sont produites
+à la demande sous forme de tuples (numéro de page, texte), et le texte
+complet est assemblé en une seule passe avec les positions de début de
+chaque page.
+Les gros documents sont découpés en plages de pages extraites en parallèle
+dans un pool de processus, puis réassemblées dans l'ordre. Le pool est
+partagé par toutes les extractions du processus (PDF_EXTRACTION_WORKERS
+processus au plus) et ses processus sont lancés par un serveur dédié
+(forkserver) : un fork du worker web, qui exécute plusieurs threads,
+risquerait de bloquer les processus enfants.
+"""
+
+import multiprocessing
+import os
+import threading
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import PyPDF2
+
+from .conf import setting
+
+# Valeurs par défaut, surchargeables par les réglages Django du même nom
+DEFAULT_WORKERS = os.cpu_count() or 1
+# En dessous de ce nombre de pages, l'extraction reste séquentielle
+DEFAULT_PARALLEL_MIN_PAGES = 40
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    Retourne le pool de processus partagé du processus courant (créé au
+    premier appel, recréé après un fork ou si un processus du pool est mort)
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid() or getattr(_pool, '_broken', False):
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _pool = ProcessPoolExecutor(
+                max_workers=setting('PDF_EXTRACTION_WORKERS', DEFAULT_WORKERS),
+                mp_context=multiprocessing.get_context(method),
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def iter_pages(pdf_path: str) -> Iterator[Tuple[int, str]]:
+    """
+    Produit les pages d'un PDF une par une : (numéro de page à partir de 1, texte)
+    """
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"Le fichier {pdf_path} n'existe pas")
+
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for page_number, page in enumerate(reader.pages, start=1):
+            yield page_number, page.extract_text() or ''
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """
+    Extrait les pages [start, end[ (indices à partir de 0) dans un processus du pool
+    """
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return [
+            (index + 1, reader.pages[index].extract_text() or '')
+            for index in range(start, end)
+        ]
+
+
+def count_pages(pdf_path: str) -> int:
+    """
+    Retourne le nombre de pages d'un PDF sans en extraire le texte
+    """
+    with open(pdf_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def split_page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """
+    Découpe les pages en plages contiguës : deux plages par processus
+    pour lisser les écarts de durée entre pages
+    """
+    range_count = max(min(page_count, workers * 2), 1)
+    size, remainder = divmod(page_count, range_count)
+    ranges = []
+    start = 0
+    for index in range(range_count):
+        end = start + size + (1 if index < remainder else 0)
+        if end > start:
+            ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def iter_pages_parallel(pdf_path: str, workers: Optional[int] = None,
+                        min_pages: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Produit les pages d'un PDF dans l'ordre en extrayant les plages de pages
+    dans le pool de processus partagé. Les petits documents, ou un seul processus
+    configuré, sont traités séquentiellement par iter_pages.
+    """
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"Le fichier {pdf_path} n'existe pas")
+
+    workers = workers or setting('PDF_EXTRACTION_WORKERS', DEFAULT_WORKERS)
+    min_pages = min_pages if min_pages is not None else setting(
+        'PDF_EXTRACTION_PARALLEL_MIN_PAGES', DEFAULT_PARALLEL_MIN_PAGES
+    )
+
+    page_count = count_pages(pdf_path)
+    if workers <= 1 or page_count < min_pages:
+        yield from iter_pages(pdf_path)
+        return
+
+    ranges = split_page_ranges(page_count, workers)
+    starts, ends = zip(*ranges)
+    # map conserve l'ordre des plages : les pages sont réassemblées dans l'ordre
+    for pages in _get_pool().map(_extract_page_range, [pdf_path] * len(ranges), starts, ends):
+        yield from pages
+
+
+class ExtractedDocument:
+    """
+    Texte complet d'un document et position de début de chaque page.
+    page_offsets[i] est la position (en caractères) du début de la page i + 1.
+    """
+
+    def __init__(self, text: str, page_offsets: List[int]):
+        self.text = text
+        self.page_offsets = page_offsets
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_offsets)
+
+    def page_for_offset(self, offset: int) -> int:
+        """
+        Retourne le numéro de page (à partir de 1) contenant la position donnée
+        """
+        if not self.page_offsets:
+            return 0
+        return max(bisect_right(self.page_offsets, offset), 1)
+
+    def page_text(self, page_number: int) -> str:
+        """
+        Retourne le texte d'une page (numérotée à partir de 1)
+        """
+        start = self.page_offsets[page_number - 1]
+        end = self.page_offsets[page_number] if page_number < self.page_count else len(self.text)
+        return self.text[start:end]
+
+
+def join_pages(pages: Iterable[Tuple[int, str]]) -> ExtractedDocument:
+    """
+    Assemble des pages (numéro, texte) en un document, chaque page étant
+    suivie d'un saut de ligne. Les morceaux sont collectés puis joints en
+    une seule fois pour éviter les recopies successives du texte.
+    """
+    parts = []
+    page_offsets = []
+    offset = 0
+    for _, page_text in pages:
+        page_offsets.append(offset)
+        parts.append(page_text)
+        parts.append('\n')
+        offset += len(page_text) + 1
+    return ExtractedDocument(''.join(parts), page_offsets)
+
+
+def extract_document(pdf_path: str, workers: Optional[int] = None) -> ExtractedDocument:
+    """
+    Extrait le texte complet d'un PDF avec les positions de début de page,
+    en parallèle pour les documents volumineux
+    """
+    return join_pages(iter_pages_parallel(pdf_path, workers=workers))
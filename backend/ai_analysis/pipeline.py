@@ -0,0 +1,335 @@
+"""
+pipeline.py
+Chaîne d'analyse du RC d'un projet
+Partagée entre l'API synchrone et les jobs d'analyse asynchrones
+"""
+
+import os
+import logging
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from bibliotheque_mt.suggestions import attach_suggestions
+from projects.models import ReferenceDocument
+
+from .ai_service import AIService, IncompleteAnalysis, get_ai_service, section_event
+from .cache import compute_file_hash, get_cached_analysis, get_previous_analysis, store_analysis
+from .corpus_index import document_keywords
+from .llm_dispatcher import get_llm_dispatcher, llm_priority, project_priority
+from .models import DocumentText, RCAnalysis
+from .outline import iter_nodes
+from .pdf_extraction import ExtractedDocument
+from .prompt_compaction import compact_document
+from .single_flight import SingleFlight, analysis_key
+from .text_store import get_document_text, store_document_text, to_extracted_document
+from .usage_ledger import llm_usage, record_usage
+
+logger = logging.getLogger(__name__)
+
+# Opération des analyses de RC dans le registre des appels au LLM
+USAGE_OPERATION = 'analyze_rc'
+
+
+def get_rc_document(project_id) -> ReferenceDocument:
+    """
+    Récupère le document RC du projet et vérifie que son fichier existe
+    """
+    try:
+        rc_doc = ReferenceDocument.objects.get(project_id=project_id, type='RC')
+    except ReferenceDocument.DoesNotExist:
+        raise FileNotFoundError(f"Aucun document RC trouvé pour le projet {project_id}")
+
+    # Vérifier si le fichier existe
+    if not os.path.exists(rc_doc.file.path):
+        raise FileNotFoundError(f"Le fichier RC n'existe pas : {rc_doc.file.path}")
+
+    return rc_doc
+
+
+def get_rc_file(project_id) -> str:
+    """
+    Récupère le chemin du fichier RC du projet depuis la base de données
+    """
+    return get_rc_document(project_id).file.path
+
+
+def get_rc_stored_text(rc_doc: ReferenceDocument, file_hash: str) -> DocumentText:
+    """
+    Retourne le texte enregistré du RC, rempli après le dépôt du fichier.
+    Si l'enregistrement différé n'a pas encore eu lieu, le texte est extrait
+    et enregistré ici : normalisation et découpage en pages sont ceux du
+    stockage.
+    """
+    stored = get_document_text(rc_doc, file_hash)
+    if stored is None:
+        logger.info(f"Texte du RC {rc_doc.pk} absent du stockage : extraction depuis le PDF")
+        stored = store_document_text(rc_doc, file_hash)
+    return stored
+
+
+def get_rc_text(rc_doc: ReferenceDocument, file_hash: str) -> ExtractedDocument:
+    """
+    Retourne le texte du RC avec les positions de page (voir get_rc_stored_text)
+    """
+    return to_extracted_document(get_rc_stored_text(rc_doc, file_hash))
+
+
+def rc_keywords(stored: Optional[DocumentText], fallback: List[str]) -> List[str]:
+    """
+    Termes clés du RC pondérés par TF-IDF contre le corpus des documents de
+    référence (voir corpus_index) ; sans texte enregistré, fallback (termes
+    les plus fréquents de l'extraction locale)
+    """
+    if stored is None:
+        return fallback
+    return [keyword['term'] for keyword in document_keywords(stored)] or fallback
+
+
+def cached_analysis_data(cached: RCAnalysis, rc_doc: ReferenceDocument, file_hash: str) -> Dict:
+    """
+    Analyse en cache, complétée des termes clés si elle a été enregistrée sans
+    """
+    if cached.analysis_data.get('keywords'):
+        return cached.analysis_data
+    return {**cached.analysis_data, 'keywords': rc_keywords(get_document_text(rc_doc, file_hash), [])}
+
+
+def revision_changes(stored: DocumentText, analysis: Dict, incremental: bool) -> Dict:
+    """
+    Modifications d'un RC modificatif par rapport à la version précédente :
+    pages et sections modifiées (relevées à l'enregistrement du texte, voir
+    text_store) et, pour une analyse incrémentale, nombre d'extraits renvoyés
+    au LLM.
+    Dictionnaire vide pour un premier RC.
+    """
+    changes = dict(stored.revision_diff) if stored.revision_diff else {}
+    if incremental:
+        changes['fragments'] = len(analysis['fragments'])
+        changes['reanalysed_fragments'] = analysis['reanalysed_fragments']
+    return changes
+
+
+def ensure_complete(analysis: Dict) -> None:
+    """
+    Refuse une analyse découpée dont des extraits n'ont pas pu être analysés
+    (IncompleteAnalysis) : sa structure est partielle et ne doit pas être
+    mise en cache
+    """
+    failed = analysis.get('failed_fragments')
+    if failed:
+        raise IncompleteAnalysis(failed, len(analysis['fragments']))
+
+
+def rc_analysis_flight(project_id, file_hash: str, model_name: str, prompt_version: str) -> SingleFlight:
+    """
+    Regroupe les analyses simultanées d'un même RC : un seul appel (tous
+    workers confondus) mène l'analyse, les autres attendent qu'elle
+    apparaisse dans le cache
+    """
+    return SingleFlight(
+        analysis_key(project_id, file_hash, model_name, prompt_version),
+        lambda: get_cached_analysis(project_id, file_hash, model_name, prompt_version)
+    )
+
+
+def admit_analysis(priority: float) -> int:
+    """
+    Vérifie que la file des appels au LLM peut accueillir une nouvelle
+    analyse (LLMQueueFull sinon) et retourne sa position estimée
+    """
+    dispatcher = get_llm_dispatcher()
+    return dispatcher.admit(priority) if dispatcher else 1
+
+
+def cached_response(cached: RCAnalysis, rc_doc: ReferenceDocument, file_hash: str, model_name: str) -> Dict:
+    """
+    Réponse d'une analyse servie depuis le cache (enregistrée sans appel
+    dans le registre du LLM)
+    """
+    record_usage(model_name=model_name, cache_hit=True, project_id=rc_doc.project_id, operation=USAGE_OPERATION)
+    logger.info(f"Analyse RC servie depuis le cache (projet {rc_doc.project_id}, empreinte {file_hash[:12]})")
+    return {
+        'analysis': cached_analysis_data(cached, rc_doc, file_hash),
+        'summary': attach_suggestions(cached.summary_data)
+    }
+
+
+def prepare_analysis(rc_doc: ReferenceDocument, file_hash: str, model_name: str) -> Dict:
+    """
+    Texte du RC (enregistré, voir get_rc_stored_text) et prompt compacté
+    (en-têtes, pieds de page et clauses types retirés) : {'stored',
+    'document', 'prompt_text', 'compaction'}
+    """
+    stored = get_rc_stored_text(rc_doc, file_hash)
+    document = to_extracted_document(stored)
+    prompt_text, compaction = compact_document(document, model_name)
+    return {'stored': stored, 'document': document, 'prompt_text': prompt_text, 'compaction': compaction}
+
+
+def finalize_analysis(ai_service: AIService, rc_doc: ReferenceDocument, file_hash: str, prepared: Dict,
+                      analysis: Dict, incremental: bool) -> Tuple[Dict, Optional[RCAnalysis]]:
+    """
+    Complète l'analyse du LLM (exigences et termes clés extraits localement,
+    sommaire, modifications d'un RC modificatif) et la met en cache.
+
+    Une analyse découpée incomplète lève IncompleteAnalysis ; une structure
+    vide signale un échec de l'analyse et n'est pas mise en cache.
+    Retourne les données de réponse et l'enregistrement RCAnalysis (None si
+    l'analyse n'a pas été mise en cache).
+    """
+    ensure_complete(analysis)
+    requirements = ai_service.extract_requirements(prepared['document'])
+    analysis = {**analysis, 'exigences': requirements['exigences'], 'contraintes': requirements['contraintes']}
+    summary = ai_service.generate_summary(analysis['structure'], analysis)
+
+    response_data = {
+        'analysis': {
+            'token_count': prepared['compaction']['tokens_before'],
+            'structure': analysis['structure'],
+            'keywords': rc_keywords(prepared['stored'], requirements['mots_cles']),
+            'compaction': prepared['compaction'],
+        },
+        'summary': summary
+    }
+    changes = revision_changes(prepared['stored'], analysis, incremental)
+    if changes:
+        response_data['analysis']['changes'] = changes
+
+    record = None
+    if analysis['structure']:
+        record = store_analysis(
+            rc_doc.project_id, file_hash, ai_service.model, ai_service.prompt_version,
+            response_data['analysis'], summary, analysis.get('fragments')
+        )
+
+    # Les suggestions dépendent de l'état de la bibliothèque : jointes à la réponse, pas au cache
+    response_data['summary'] = attach_suggestions(summary)
+    return response_data, record
+
+
+def analyze_project_rc(project_id, ai_service: Optional[AIService] = None,
+                       on_step: Optional[Callable[[str, int], None]] = None,
+                       admit: bool = True) -> Tuple[Dict, bool, Optional[RCAnalysis]]:
+    """
+    Analyse le RC d'un projet en s'appuyant sur le cache RCAnalysis.
+
+    on_step(étape, progression) est appelé à chaque changement d'étape
+    ('extracting', 'analyzing') avec une progression en pourcentage.
+
+    Les appels au LLM passent par le répartiteur avec la priorité du projet
+    (date de remise de l'offre). Avec admit, une file saturée lève
+    LLMQueueFull avant toute extraction ; les jobs asynchrones attendent
+    leur tour sans contrôle d'admission.
+
+    Pour un RC modificatif, seuls les extraits dont le texte a changé depuis
+    la version précédente sont renvoyés au LLM ; la réponse décrit les
+    modifications dans analysis['changes'].
+
+    Les analyses simultanées d'un même RC sont regroupées (rc_analysis_flight) :
+    un appel arrivé pendant l'analyse attend son résultat et le reçoit comme
+    une analyse en cache.
+
+    Une analyse découpée dont des extraits ont échoué lève IncompleteAnalysis
+    sans être mise en cache.
+
+    Retourne les données de réponse, un booléen indiquant si le cache a servi
+    et l'enregistrement RCAnalysis correspondant (None si l'analyse a échoué).
+    """
+    ai_service = ai_service or get_ai_service()
+    notify = on_step or (lambda step, progress: None)
+
+    rc_doc = get_rc_document(project_id)
+    file_hash = compute_file_hash(rc_doc.file.path)
+    model_name = ai_service.model
+    prompt_version = ai_service.prompt_version
+
+    cached = get_cached_analysis(project_id, file_hash, model_name, prompt_version)
+    flight = rc_analysis_flight(project_id, file_hash, model_name, prompt_version)
+    if not cached:
+        # Un appel simultané peut déjà analyser ce RC : son résultat est alors partagé
+        cached = flight.join()
+    if cached:
+        return cached_response(cached, rc_doc, file_hash, model_name), True, cached
+
+    with flight:
+        priority = project_priority(rc_doc.project)
+        if admit:
+            admit_analysis(priority)
+        previous = get_previous_analysis(project_id, file_hash, model_name, prompt_version)
+        previous_fragments = previous.fragments if previous else None
+
+        logger.info(f"Analyse du fichier RC : {rc_doc.file.path}")
+
+        notify('extracting', 10)
+        prepared = prepare_analysis(rc_doc, file_hash, model_name)
+
+        notify('analyzing', 40)
+        with llm_priority(priority), llm_usage(rc_doc.project_id, USAGE_OPERATION):
+            analysis = ai_service.analyze_text(prepared['prompt_text'], previous_fragments)
+
+        response_data, record = finalize_analysis(
+            ai_service, rc_doc, file_hash, prepared, analysis, incremental=bool(previous_fragments)
+        )
+        return response_data, False, record
+
+
+def stream_project_rc(project_id, ai_service: Optional[AIService] = None) -> Iterator[Tuple[str, Dict]]:
+    """
+    Variante en flux de analyze_project_rc : produit des événements (type, données)
+    au fur et à mesure de l'analyse.
+
+    - ('status', {'step': ...}) à chaque changement d'étape ; ('status',
+      {'step': 'queued', 'position': n}) si d'autres appels au LLM passent avant ;
+      ('status', {'step': 'waiting'}) si un appel simultané analyse déjà ce RC
+    - ('section', ...) dès qu'une section du plan est générée
+    - ('result', réponse complète) pour terminer, avec le drapeau 'cached'
+
+    Le résultat est complété et mis en cache comme pour l'analyse synchrone
+    (finalize_analysis).
+    """
+    ai_service = ai_service or get_ai_service()
+
+    rc_doc = get_rc_document(project_id)
+    file_hash = compute_file_hash(rc_doc.file.path)
+    model_name = ai_service.model
+    prompt_version = ai_service.prompt_version
+
+    cached = get_cached_analysis(project_id, file_hash, model_name, prompt_version)
+    flight = rc_analysis_flight(project_id, file_hash, model_name, prompt_version)
+    if not cached:
+        if not flight.acquire():
+            # Un appel simultané analyse déjà ce RC : attente de son résultat
+            yield 'status', {'step': 'waiting'}
+        cached = flight.join()
+    if cached:
+        response_data = cached_response(cached, rc_doc, file_hash, model_name)
+        for path, node in iter_nodes(response_data['analysis'].get('structure', [])):
+            yield 'section', section_event(path, node)
+        yield 'result', {**response_data, 'cached': True}
+        return
+
+    with flight:
+        priority = project_priority(rc_doc.project)
+        position = admit_analysis(priority)
+        previous = get_previous_analysis(project_id, file_hash, model_name, prompt_version)
+        previous_fragments = previous.fragments if previous else None
+
+        logger.info(f"Analyse en flux du fichier RC : {rc_doc.file.path}")
+
+        yield 'status', {'step': 'extracting'}
+        prepared = prepare_analysis(rc_doc, file_hash, model_name)
+
+        if position > 1:
+            yield 'status', {'step': 'queued', 'position': position}
+        yield 'status', {'step': 'analyzing'}
+        analysis = None
+        with llm_priority(priority), llm_usage(rc_doc.project_id, USAGE_OPERATION):
+            for event, data in ai_service.stream_analysis(prepared['prompt_text'], previous_fragments):
+                if event == 'result':
+                    analysis = data
+                else:
+                    yield event, data
+
+        response_data, _ = finalize_analysis(
+            ai_service, rc_doc, file_hash, prepared, analysis, incremental=bool(previous_fragments)
+        )
+        yield 'result', {**response_data, 'cached': False}
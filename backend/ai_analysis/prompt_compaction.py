@@ -0,0 +1,149 @@
+"""
+prompt_compaction.py
+Compaction du texte des RC avant les appels au LLM
+Le texte extrait par PyPDF2 répète sur chaque page l'en-tête de l'acheteur,
+le pied de page, le numéro de page et des clauses types (références au CCAG,
+mentions RGPD). Ces lignes sont retirées du prompt :
+- lignes récurrentes : lignes situées en haut ou en bas de page (premières et
+  dernières lignes non vides) qui se répètent, chiffres ignorés, sur au moins
+  la moitié des pages ; la première occurrence est conservée ;
+- numéros de page ('Page 3/12', '3 / 12', '- 3 -') en haut ou en bas de page ;
+- clauses types : lignes correspondant à AI_PROMPT_BOILERPLATE_PATTERNS.
+Les lignes portant des critères de jugement, des points, des pourcentages ou
+des dérogations ne sont jamais retirées. Les espaces sont ensuite réduits.
+
+Le texte compacté sert uniquement au prompt : les exigences et les sections
+(avec leurs pages) restent extraites du texte complet.
+"""
+
+import logging
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .chunking import count_tokens
+from .pdf_extraction import ExtractedDocument
+
+logger = logging.getLogger(__name__)
+
+# Nombre minimal de pages pour rechercher des lignes récurrentes
+MIN_PAGES = 3
+# Part des pages sur lesquelles une ligne de bord doit se répéter
+RECURRING_PAGE_RATIO = 0.5
+
+# Lignes jamais retirées : critères de jugement, pondérations, dérogations
+PROTECTED_RE = re.compile(r'crit[èe]re|pond[ée]ration|\bpoints?\b|\d\s*%|d[ée]rog', re.IGNORECASE)
+PAGE_NUMBER_RE = re.compile(r'^[-–\s]*(page\s*)?#+(\s*(/|sur|of)\s*#+)?[-–\s]*$')
+DIGITS_RE = re.compile(r'\d+')
+SPACES_RE = re.compile(r'[ \t\u00a0]+')
+BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+
+def _normalize(line: str) -> str:
+    """
+    Forme de comparaison d'une ligne : casse et espaces ignorés, chiffres remplacés par '#'
+    """
+    return DIGITS_RE.sub('#', SPACES_RE.sub(' ', line).strip().casefold())
+
+
+def _edge_indexes(lines: List[str], edge_lines: int) -> List[int]:
+    """
+    Positions des premières et dernières lignes non vides d'une page
+    """
+    filled = [index for index, line in enumerate(lines) if line.strip()]
+    return sorted(set(filled[:edge_lines] + filled[-edge_lines:]))
+
+
+class PromptCompactor:
+    """
+    Retire les lignes répétées et les clauses types du texte d'un document
+    """
+
+    def __init__(self, patterns: Optional[List[str]] = None, edge_lines: Optional[int] = None):
+        patterns = settings.AI_PROMPT_BOILERPLATE_PATTERNS if patterns is None else patterns
+        self.boilerplate = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+        self.edge_lines = settings.AI_PROMPT_EDGE_LINES if edge_lines is None else edge_lines
+
+    def _pages(self, document: ExtractedDocument) -> List[List[str]]:
+        if not document.page_offsets:
+            return [document.text.split('\n')]
+        return [document.page_text(number).split('\n') for number in range(1, document.page_count + 1)]
+
+    def _recurring(self, pages: List[List[str]]) -> set:
+        """
+        Formes normalisées des lignes de bord répétées sur assez de pages
+        """
+        if len(pages) < MIN_PAGES:
+            return set()
+        counts = Counter()
+        for lines in pages:
+            counts.update({_normalize(lines[index]) for index in _edge_indexes(lines, self.edge_lines)})
+        threshold = max(2, math.ceil(len(pages) * RECURRING_PAGE_RATIO))
+        return {line for line, count in counts.items() if count >= threshold}
+
+    def _is_boilerplate(self, line: str) -> bool:
+        return any(pattern.search(line) for pattern in self.boilerplate)
+
+    def compact(self, document: ExtractedDocument) -> Tuple[str, Dict[str, int]]:
+        """
+        Retourne le texte compacté et le nombre de lignes retirées par motif
+        ('recurring', 'page_numbers', 'boilerplate')
+        """
+        pages = self._pages(document)
+        recurring = self._recurring(pages)
+        seen = set()
+        removed = Counter({'recurring': 0, 'page_numbers': 0, 'boilerplate': 0})
+        kept_pages = []
+        for lines in pages:
+            edges = set(_edge_indexes(lines, self.edge_lines))
+            kept = []
+            for index, line in enumerate(lines):
+                line = SPACES_RE.sub(' ', line).strip()
+                if not line or PROTECTED_RE.search(line):
+                    kept.append(line)
+                    continue
+                if index in edges:
+                    normalized = _normalize(line)
+                    if PAGE_NUMBER_RE.match(normalized):
+                        removed['page_numbers'] += 1
+                        continue
+                    if normalized in recurring:
+                        if normalized in seen:
+                            removed['recurring'] += 1
+                            continue
+                        seen.add(normalized)
+                if self._is_boilerplate(line):
+                    removed['boilerplate'] += 1
+                    continue
+                kept.append(line)
+            kept_pages.append('\n'.join(kept))
+        text = BLANK_LINES_RE.sub('\n\n', '\n'.join(kept_pages)).strip() + '\n'
+        return text, dict(removed)
+
+
+def compact_document(document: ExtractedDocument, model: str = '') -> Tuple[str, Dict]:
+    """
+    Compacte le texte d'un document pour le prompt et retourne le texte et
+    la réduction obtenue : tokens avant et après, taux de réduction et
+    lignes retirées par motif. Sans AI_PROMPT_COMPACTION, le texte est inchangé.
+    """
+    tokens_before = count_tokens(document.text, model)
+    if not settings.AI_PROMPT_COMPACTION:
+        text, removed = document.text, {}
+    else:
+        text, removed = PromptCompactor().compact(document)
+    tokens_after = count_tokens(text, model)
+    stats = {
+        'tokens_before': tokens_before,
+        'tokens_after': tokens_after,
+        'reduction': round(1 - tokens_after / tokens_before, 3) if tokens_before else 0.0,
+        'removed_lines': removed,
+    }
+    logger.info(
+        f"Prompt compacté : {tokens_before} -> {tokens_after} tokens "
+        f"(-{stats['reduction']:.0%}, lignes retirées : {removed})"
+    )
+    return text, stats
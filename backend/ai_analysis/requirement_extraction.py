@@ -0,0 +1,247 @@
+"""
+requirement_extraction.py
+Extraction locale des exigences d'un document (sans appel au LLM)
+Le texte est découpé en phrases, rattachées à leur page, puis traité par
+lots avec nlp.pipe (spaCy, modèle fr_core_news_lg). Seuls les composants
+utiles sont chargés (étiquetage morphologique) ; un Matcher repère :
+- les obligations : "doit", "devra", "est tenu de", "obligatoire"...
+- les contraintes : interdictions, limites ("au plus tard", "maximum")...
+Les termes clés sont les noms les plus fréquents, regroupés par thème.
+
+Le modèle est chargé une seule fois par processus (get_nlp, via le
+registre des modèles). Dans un processus sans modèles (AI_MODELS_ENABLED=False),
+l'extraction est confiée aux workers Celery de la file AI_NLP_QUEUE.
+"""
+
+import logging
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .conf import setting
+from .model_registry import registry
+
+logger = logging.getLogger(__name__)
+
+# Valeurs par défaut, surchargeables par les réglages Django AI_NLP_*
+DEFAULT_MODEL = 'fr_core_news_lg'
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_N_PROCESS = 1
+
+# Composants inutiles à l'extraction : seuls tok2vec et morphologizer sont conservés
+EXCLUDED_COMPONENTS = ['parser', 'ner', 'lemmatizer', 'attribute_ruler', 'senter']
+
+# Phrases : fin de phrase, paragraphe ou début d'élément de liste
+SENTENCE_BOUNDARY_RE = re.compile(r'(?<=[.;!?])\s+|\n\s*\n|\n(?=[ \t]*(?:[-•*]|\d+(?:\.\d+)*[.)]?[ \t]))')
+WHITESPACE_RE = re.compile(r'\s+')
+# Phrases trop courtes pour porter une exigence
+MIN_SENTENCE_LENGTH = 15
+
+DEVOIR_FORMS = ['doit', 'doivent', 'devra', 'devront', 'devrait', 'devraient']
+TENU_FORMS = ['tenu', 'tenue', 'tenus', 'tenues']
+
+OBLIGATION_PATTERNS = [
+    [{'LOWER': {'IN': DEVOIR_FORMS}}],
+    [{'LOWER': {'IN': TENU_FORMS}}, {'LOWER': {'IN': ['de', "d'", 'à']}}],
+    [{'LOWER': {'IN': ['obligatoire', 'obligatoires', 'obligatoirement', 'impérativement']}}],
+    [{'LOWER': 'il'}, {'LOWER': {'IN': ['appartient', 'appartiendra', 'incombe', 'incombera']}}],
+    [{'LOWER': 'à'}, {'LOWER': 'la'}, {'LOWER': 'charge'}, {'LOWER': {'IN': ['de', 'du', 'des', "d'"]}}],
+]
+
+CONSTRAINT_PATTERNS = [
+    [{'LOWER': {'IN': ['interdit', 'interdite', 'interdits', 'interdites',
+                       'proscrit', 'proscrite', 'proscrits', 'proscrites']}}],
+    [{'LOWER': {'IN': ['ne', "n'"]}}, {'LOWER': {'IN': DEVOIR_FORMS}}, {'LOWER': {'IN': ['pas', 'jamais', 'en']}}],
+    [{'LOWER': {'IN': ['maximum', 'minimum', 'maximal', 'maximale', 'minimal', 'minimale']}}],
+    [{'LOWER': 'au'}, {'LOWER': {'IN': ['plus', 'moins', 'minimum', 'maximum']}}],
+    [{'LOWER': {'IN': ['ne', "n'"]}}, {'LOWER': 'pas'}, {'LOWER': {'IN': ['dépasser', 'excéder']}}],
+    [{'LOWER': {'IN': ['délai', 'délais']}}, {'LOWER': {'IN': ['de', "d'", 'maximum', 'maximal']}}],
+]
+
+# Lexique des thèmes : un terme clé est rattaché à un thème par son préfixe
+THEME_LEXICON = {
+    'sécurité': ('sécurit', 'risque', 'protection', 'prévention', 'danger', 'accident', 'incendie'),
+    'environnement': ('environnement', 'déchet', 'bruit', 'pollution', 'nuisance', 'recyclage', 'énergie'),
+    'qualité': ('qualité', 'contrôle', 'essai', 'conformité', 'norme', 'réception', 'certificat'),
+    'délais': ('délai', 'planning', 'calendrier', 'durée', 'phasage', 'échéance'),
+    'moyens': ('personnel', 'matériel', 'équipe', 'moyen', 'engin', 'encadrement', 'effectif'),
+    'matériaux': ('matériau', 'béton', 'acier', 'enrobé', 'fourniture', 'produit', 'granulat'),
+}
+
+KEY_TERM_POS = {'NOUN', 'PROPN'}
+KEY_TERM_COUNT = 20
+MIN_KEY_TERM_LENGTH = 4
+
+
+class NLPUnavailable(Exception):
+    """
+    Levée lorsque spaCy ou le modèle configuré ne peut pas être chargé
+    """
+
+
+def load_nlp(model_name: Optional[str] = None):
+    """
+    Charge le modèle spaCy sans les composants inutiles à l'extraction
+    """
+    try:
+        import spacy
+    except ImportError as e:
+        raise NLPUnavailable(f"spaCy n'est pas installé : {str(e)}")
+    model_name = model_name or setting('AI_NLP_MODEL', DEFAULT_MODEL)
+    try:
+        return spacy.load(model_name, exclude=EXCLUDED_COMPONENTS)
+    except OSError as e:
+        raise NLPUnavailable(f"Modèle spaCy {model_name} indisponible : {str(e)}")
+
+
+registry.register('spacy', load_nlp)
+
+
+def get_nlp():
+    """
+    Retourne le modèle spaCy du processus (chargé au premier appel, ou
+    préchargé avant le fork, voir model_registry)
+    """
+    return registry.get('spacy')
+
+
+def iter_sentences(pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[str, int]]:
+    """
+    Découpe les pages en phrases : (phrase sur une ligne, numéro de page)
+    """
+    for page_number, page_text in pages:
+        for sentence in SENTENCE_BOUNDARY_RE.split(page_text):
+            sentence = WHITESPACE_RE.sub(' ', sentence).strip()
+            if len(sentence) >= MIN_SENTENCE_LENGTH:
+                yield sentence, page_number
+
+
+class RequirementExtractor:
+    """
+    Extrait exigences, contraintes, termes clés et thèmes d'un document.
+    nlp peut être fourni (tests, modèle préchargé) ; sinon le modèle du
+    processus est utilisé.
+    """
+
+    def __init__(self, nlp=None, batch_size: Optional[int] = None, n_process: Optional[int] = None):
+        # Chargé en premier : lève NLPUnavailable si spaCy est absent
+        self.nlp = nlp or get_nlp()
+        from spacy.matcher import Matcher
+
+        self.batch_size = batch_size or setting('AI_NLP_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        self.n_process = n_process or setting('AI_NLP_N_PROCESS', DEFAULT_N_PROCESS)
+        self.matcher = Matcher(self.nlp.vocab)
+        self.matcher.add('OBLIGATION', OBLIGATION_PATTERNS)
+        self.matcher.add('CONTRAINTE', CONSTRAINT_PATTERNS)
+        self._obligation = self.nlp.vocab.strings['OBLIGATION']
+
+    def extract(self, pages: Iterable[Tuple[int, str]]) -> Dict:
+        """
+        Traite les pages (numéro, texte) et retourne
+        {'exigences', 'contraintes', 'mots_cles', 'themes'}
+        """
+        exigences = []
+        contraintes = []
+        terms = Counter()
+
+        docs = self.nlp.pipe(
+            iter_sentences(pages), as_tuples=True,
+            batch_size=self.batch_size, n_process=self.n_process
+        )
+        for doc, page_number in docs:
+            terms.update(self._key_terms(doc))
+            obligation, constraint = self._match(doc)
+            if obligation:
+                exigences.append({'text': doc.text, 'page': page_number, 'trigger': obligation})
+            if constraint:
+                contraintes.append({'text': doc.text, 'page': page_number, 'trigger': constraint})
+
+        return {
+            'exigences': exigences,
+            'contraintes': contraintes,
+            'mots_cles': [term for term, _ in terms.most_common(KEY_TERM_COUNT)],
+            'themes': self._themes(terms),
+        }
+
+    def _match(self, doc) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Retourne le premier déclencheur d'obligation et de contrainte de la phrase.
+        Une obligation niée ("ne doit pas") est une contrainte.
+        """
+        obligations = []
+        constraint = None
+        constrained_tokens = set()
+        for match_id, start, end in self.matcher(doc):
+            span = doc[start:end]
+            if match_id == self._obligation:
+                # "le devoir" : un nom n'est pas un déclencheur d'obligation
+                if span[0].pos_ not in KEY_TERM_POS:
+                    obligations.append(span)
+            else:
+                constraint = constraint or span.text.lower()
+                constrained_tokens.update(range(start, end))
+        obligation = next(
+            (span.text.lower() for span in obligations if span.start not in constrained_tokens), None
+        )
+        return obligation, constraint
+
+    @staticmethod
+    def _key_terms(doc) -> Iterator[str]:
+        # Sans étiquetage morphologique (modèle vierge), tous les mots sont candidats
+        tagged = doc.has_annotation('POS')
+        for token in doc:
+            if tagged and token.pos_ not in KEY_TERM_POS:
+                continue
+            if token.is_alpha and not token.is_stop and len(token.text) >= MIN_KEY_TERM_LENGTH:
+                yield token.lower_
+
+    @staticmethod
+    def _themes(terms: Counter) -> List[Dict]:
+        scores = Counter()
+        for term, count in terms.items():
+            for theme, prefixes in THEME_LEXICON.items():
+                if term.startswith(prefixes):
+                    scores[theme] += count
+        return [{'theme': theme, 'score': score} for theme, score in scores.most_common()]
+
+
+_extractor = None
+_extractor_lock = threading.Lock()
+
+
+def get_extractor() -> RequirementExtractor:
+    """
+    Retourne l'extracteur partagé du processus (modèle chargé une seule fois)
+    """
+    global _extractor
+    with _extractor_lock:
+        if _extractor is None:
+            _extractor = RequirementExtractor()
+        return _extractor
+
+
+def extract_requirements(pages: Iterable[Tuple[int, str]]) -> Dict:
+    """
+    Extrait les exigences des pages avec l'extracteur du processus, ou
+    dans un worker NLP dédié si ce processus ne charge pas de modèles
+    """
+    if not registry.is_enabled():
+        return extract_requirements_remote(pages)
+    return get_extractor().extract(pages)
+
+
+def extract_requirements_remote(pages: Iterable[Tuple[int, str]]) -> Dict:
+    """
+    Envoie l'extraction à la file Celery des workers NLP et attend le résultat
+    """
+    from .tasks import extract_requirements_task
+
+    try:
+        result = extract_requirements_task.apply_async(
+            args=[[[number, text] for number, text in pages]],
+            queue=setting('AI_NLP_QUEUE', 'nlp')
+        )
+        return result.get(timeout=setting('AI_NLP_TASK_TIMEOUT', 120))
+    except Exception as e:
+        raise NLPUnavailable(f"Worker NLP indisponible : {str(e)}")
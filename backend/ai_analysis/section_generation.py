@@ -0,0 +1,222 @@
+"""
+section_generation.py
+Génération groupée des brouillons de toutes les sections d'un mémoire (core.Projet)
+Chaque section feuille est rédigée par un appel au LLM ; les appels sont
+lancés simultanément (au plus AI_SECTION_GENERATION_CONCURRENCY) et chaque
+brouillon est enregistré dans GenerationIA dès sa réception, rattaché au lot
+(GenerationGroupee). La durée totale est ainsi celle de la section la plus
+lente plutôt que la somme des sections.
+
+Chaque brouillon est enregistré par le thread qui l'a reçu : si le client
+se déconnecte, les appels déjà partis vont à leur terme et leurs brouillons
+sont conservés, seuls les appels non commencés sont annulés. Un lot
+interrompu (arrêt du processus, client déconnecté) est repris au prochain
+appel : les sections déjà générées dans le lot ne sont pas régénérées.
+"""
+
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import GenerationGroupee, GenerationIA, Projet, Section
+
+from .ai_service import AIService, get_ai_service
+from .usage_ledger import llm_usage
+
+logger = logging.getLogger(__name__)
+
+# Opération de la génération groupée dans le registre des appels au LLM
+USAGE_OPERATION = 'generate_sections'
+
+# Lots dont la génération peut être reprise
+RESUMABLE_STATUSES = ('EN_COURS', 'INCOMPLETE')
+
+
+class GenerationInProgress(Exception):
+    """
+    Un lot de génération du projet progresse encore dans un autre processus
+    """
+
+
+def leaf_sections(projet: Projet) -> Tuple[List[Section], Dict[int, Section]]:
+    """
+    Retourne les sections feuilles du projet (sans sous-sections), dans
+    l'ordre du mémoire, et toutes les sections par identifiant
+    """
+    sections = list(projet.sections.all())
+    by_id = {section.pk: section for section in sections}
+    parents = {section.parent_id for section in sections if section.parent_id}
+    return [section for section in sections if section.pk not in parents], by_id
+
+
+def section_path(section: Section, by_id: Dict[int, Section]) -> List[str]:
+    """
+    Intitulés des sections parentes, de la racine à la section
+    """
+    path = []
+    current = section
+    while current is not None:
+        path.append(current.titre)
+        current = by_id.get(current.parent_id)
+    return path[::-1]
+
+
+def build_section_prompt(projet: Projet, section: Section, path: List[str]) -> str:
+    """
+    Construit le prompt de rédaction d'une section du mémoire
+    """
+    existing = f"\nNotes ou contenu existant de la section :\n{section.contenu}\n" if section.contenu.strip() else ''
+    return f"""Rédige la section suivante du mémoire technique du projet « {projet.titre} ».
+
+Description du projet :
+{projet.description}
+
+Section à rédiger : {' > '.join(path)}
+{existing}
+Rédige uniquement le contenu de cette section (sans répéter son intitulé), en paragraphes structurés."""
+
+
+def start_generation(projet: Projet, auteur, restart: bool = False) -> GenerationGroupee:
+    """
+    Reprend le lot inachevé du projet ou en crée un nouveau.
+    Lève GenerationInProgress si le lot en cours a progressé récemment
+    (AI_SECTION_GENERATION_STALE_SECONDS). Avec restart, le lot inachevé
+    est abandonné et toutes les sections sont régénérées.
+    """
+    stale_before = timezone.now() - timedelta(seconds=settings.AI_SECTION_GENERATION_STALE_SECONDS)
+    with transaction.atomic():
+        lot = GenerationGroupee.objects.select_for_update().filter(
+            projet=projet, statut__in=RESUMABLE_STATUSES
+        ).first()
+        if lot and lot.statut == 'EN_COURS' and lot.date_modification > stale_before:
+            raise GenerationInProgress(f"Une génération des sections du projet {projet.pk} est déjà en cours")
+        if lot and not restart:
+            lot.statut = 'EN_COURS'
+            lot.save(update_fields=['statut', 'date_modification'])
+            logger.info(f"Reprise de la génération groupée {lot.pk} ({lot.terminees}/{lot.total} sections)")
+            return lot
+        if lot:
+            lot.statut = 'ABANDONNEE'
+            lot.date_fin = timezone.now()
+            lot.save(update_fields=['statut', 'date_fin', 'date_modification'])
+        return GenerationGroupee.objects.create(projet=projet, auteur=auteur)
+
+
+# Les enregistrements des threads sont faits un à un (SQLite n'accepte qu'un
+# écrivain à la fois ; ils sont brefs au regard des appels au LLM)
+_write_lock = threading.Lock()
+
+
+def _update_lot(lot_id, **fields):
+    """
+    Met à jour les champs d'un lot sans recharger l'objet (date_modification
+    sert de signal de progression)
+    """
+    fields['date_modification'] = timezone.now()
+    GenerationGroupee.objects.filter(pk=lot_id).update(**fields)
+
+
+def draft_and_save(lot: GenerationGroupee, section: Section, prompt: str, ai_service: AIService) -> GenerationIA:
+    """
+    Rédige le brouillon d'une section et l'enregistre aussitôt dans le lot
+    (exécuté dans les threads de generate_sections : les connexions à la
+    base propres au thread sont fermées après usage)
+    """
+    close_old_connections()
+    try:
+        content = ai_service.draft_section(prompt)
+        with _write_lock:
+            generation = GenerationIA.objects.create(
+                projet_id=lot.projet_id, section=section, auteur_id=lot.auteur_id, lot=lot,
+                prompt=prompt, contenu_genere=content
+            )
+            _update_lot(lot.pk, terminees=F('terminees') + 1)
+        return generation
+    finally:
+        close_old_connections()
+
+
+def generate_sections(lot: GenerationGroupee, ai_service: Optional[AIService] = None) -> Iterator[Tuple[str, Dict]]:
+    """
+    Génère les brouillons des sections feuilles du projet du lot qui n'ont
+    pas encore été générées dans ce lot, et produit des événements :
+
+    - ('status', {'lot', 'total', 'completed', 'resumed'}) au démarrage
+    - ('section', {'section', 'titre', 'generation', 'completed', 'total'})
+      dès qu'une section est enregistrée, dans l'ordre d'achèvement
+    - ('section_error', {'section', 'titre', 'error'}) pour une section en échec
+    - ('result', {'lot', 'statut', 'completed', 'total', 'failed'}) pour terminer
+
+    Les appels au LLM et les enregistrements sont faits dans des threads
+    (draft_and_save) ; le flux ne fait que relayer leurs résultats. S'il est
+    abandonné, les appels non commencés sont annulés, ceux en cours sont
+    enregistrés à leur retour et le lot passe à l'état incomplet, repris au
+    prochain appel.
+    """
+    ai_service = ai_service or get_ai_service()
+    projet = lot.projet
+
+    sections, by_id = leaf_sections(projet)
+    done = set(lot.generations.values_list('section_id', flat=True))
+    pending = [section for section in sections if section.pk not in done]
+    completed = len(sections) - len(pending)
+    _update_lot(lot.pk, total=len(sections), terminees=completed)
+    yield 'status', {'lot': lot.pk, 'total': len(sections), 'completed': completed, 'resumed': bool(done)}
+
+    failed = []
+    finished = False
+    if pending:
+        max_workers = max(min(settings.AI_SECTION_GENERATION_CONCURRENCY, len(pending)), 1)
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='section-draft')
+        try:
+            # Chaque appel s'exécute dans une copie du contexte (priorité et registre des appels au LLM)
+            with llm_usage(operation=USAGE_OPERATION):
+                futures = {
+                    executor.submit(
+                        contextvars.copy_context().run, draft_and_save, lot, section,
+                        build_section_prompt(projet, section, section_path(section, by_id)), ai_service
+                    ): section
+                    for section in pending
+                }
+            for future in as_completed(futures):
+                section = futures[future]
+                try:
+                    generation = future.result()
+                except Exception as e:
+                    logger.error(f"Erreur lors de la génération de la section {section.pk} : {str(e)}")
+                    failed.append(section.pk)
+                    yield 'section_error', {'section': section.pk, 'titre': section.titre, 'error': str(e)}
+                    continue
+
+                completed += 1
+                yield 'section', {
+                    'section': section.pk,
+                    'titre': section.titre,
+                    'generation': generation.pk,
+                    'completed': completed,
+                    'total': len(sections),
+                }
+            finished = True
+        finally:
+            # Flux abandonné : les appels non commencés ne sont pas envoyés
+            executor.shutdown(wait=False, cancel_futures=True)
+            if not finished:
+                _update_lot(lot.pk, statut='INCOMPLETE')
+
+    statut = 'INCOMPLETE' if failed else 'TERMINEE'
+    _update_lot(lot.pk, statut=statut, date_fin=timezone.now())
+    yield 'result', {
+        'lot': lot.pk,
+        'statut': statut,
+        'completed': completed,
+        'total': len(sections),
+        'failed': failed,
+    }
@@ -0,0 +1,32 @@
+"""
+serializers.py
+Sérialiseurs pour l'API d'analyse
+"""
+
+from rest_framework import serializers
+
+from .models import AnalysisJob
+
+
+class AnalysisJobSerializer(serializers.ModelSerializer):
+    """
+    Sérialiseur des jobs d'analyse : état d'avancement et résultat une fois terminé
+    """
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AnalysisJob
+        fields = [
+            'id', 'project', 'status', 'status_display', 'progress',
+            'error', 'cached', 'created_at', 'updated_at', 'finished_at', 'result'
+        ]
+        read_only_fields = fields
+
+    def get_result(self, obj):
+        if obj.status != 'done' or obj.analysis is None:
+            return None
+        return {
+            'analysis': obj.analysis.analysis_data,
+            'summary': obj.analysis.summary_data
+        }
@@ -0,0 +1,74 @@
+"""
+signals.py
+Signaux de l'application d'analyse IA
+Invalide le cache des analyses lorsqu'un nouveau RC est déposé,
+enregistre le texte extrait de chaque document de référence et tient à jour
+l'index TF-IDF du corpus.
+L'extraction et l'indexation ont lieu après la validation de la transaction,
+hors de la requête, selon le mode des jobs (voir jobs.py).
+"""
+
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from projects.models import ReferenceDocument
+
+from .cache import compute_file_hash, invalidate_project_analyses
+from .corpus_index import forget_term_vector
+from .jobs import dispatch_text_indexing, dispatch_text_storage
+from .models import DocumentText, TermVector
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=ReferenceDocument)
+def invalidate_rc_analyses(sender, instance, **kwargs):
+    """
+    Supprime les analyses en cache du projet dont l'empreinte ne correspond
+    plus au RC qui vient d'être enregistré. La dernière analyse de l'ancien
+    fichier est conservée pour l'analyse incrémentale d'un RC
+    modificatif.
+    """
+    if instance.type != 'RC':
+        return
+
+    keep_hash = None
+    try:
+        keep_hash = compute_file_hash(instance.file.path)
+    except Exception as e:
+        logger.warning(f"Impossible de calculer l'empreinte du RC {instance.pk} : {str(e)}")
+
+    invalidate_project_analyses(instance.project_id, keep_hash=keep_hash, keep_previous=True)
+
+
+@receiver(post_save, sender=ReferenceDocument)
+def store_reference_text(sender, instance, **kwargs):
+    """
+    Programme l'extraction et l'enregistrement du texte du document déposé
+    (RC ou CCTP) une fois la transaction validée. En cas d'échec, les étapes suivantes extrairont le texte du PDF.
+    """
+    if not instance.file:
+        return
+    document_id = instance.pk
+    transaction.on_commit(lambda: dispatch_text_storage(document_id))
+
+
+@receiver(post_save, sender=DocumentText)
+def index_reference_text(sender, instance, **kwargs):
+    """
+    Programme l'indexation du texte enregistré dans le corpus TF-IDF (fréquences
+    documentaires mises à jour pour les seuls termes ajoutés ou retirés)
+    """
+    text_id = instance.pk
+    transaction.on_commit(lambda: dispatch_text_indexing(text_id))
+
+
+@receiver(post_delete, sender=TermVector)
+def unindex_reference_text(sender, instance, **kwargs):
+    """
+    Retire des fréquences documentaires les termes d'un document supprimé
+    """
+    forget_term_vector(instance)
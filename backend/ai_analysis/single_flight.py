@@ -0,0 +1,169 @@
+"""
+single_flight.py
+Regroupement des analyses simultanées d'un même RC
+Lorsque plusieurs membres de l'équipe ouvrent un projet qui vient d'être
+créé, chaque page lance analyze_rc ou get_summary pour le même RC. Le
+premier appel prend un bail (AnalysisLease) sur la clé de l'analyse (projet,
+empreinte du RC, modèle, version du prompt) et mène l'analyse ; les appels
+simultanés attendent que le résultat apparaisse dans le cache RCAnalysis.
+
+Le bail est en base pour être partagé par tous les workers gunicorn. Il est
+renouvelé en arrière-plan pendant l'analyse (AI_ANALYSIS_LEASE_SECONDS) :
+un bail qui n'est plus renouvelé (processus arrêté) expire et l'appel suivant
+le reprend. Si l'analyse échoue sans résultat, le bail est libéré et l'un
+des appels en attente la relance. Un appel qui attend au-delà de
+AI_ANALYSIS_LEASE_WAIT_SECONDS mène l'analyse lui-même, sans bail.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+
+from .models import AnalysisLease
+
+logger = logging.getLogger(__name__)
+
+
+def analysis_key(project_id, file_hash: str, model_name: str, prompt_version: str) -> str:
+    """
+    Clé du bail d'une analyse de RC (mêmes éléments que la clé du cache)
+    """
+    return f"rc:{project_id}:{file_hash}:{model_name}:{prompt_version}"[:255]
+
+
+def _owner_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+
+
+class SingleFlight:
+    """
+    Participation d'un appel à une analyse partagée : fetch() retourne le
+    résultat s'il est disponible (cache), None sinon.
+
+    join() fait de l'appel le détenteur du bail (retourne None : l'analyse
+    est à mener, dans le bloc with qui libère le bail) ou retourne le
+    résultat produit par le détenteur pendant l'attente. Au-delà de timeout
+    secondes d'attente, join() retourne None sans le bail : l'analyse est
+    menée en parallèle de celle du détenteur.
+    """
+
+    def __init__(self, key: str, fetch: Callable[[], Optional[Any]], ttl: Optional[float] = None,
+                 poll_interval: Optional[float] = None, timeout: Optional[float] = None):
+        self.key = key
+        self.fetch = fetch
+        self.ttl = ttl if ttl is not None else settings.AI_ANALYSIS_LEASE_SECONDS
+        self.poll_interval = poll_interval if poll_interval is not None else settings.AI_ANALYSIS_LEASE_POLL_SECONDS
+        self.timeout = timeout if timeout is not None else settings.AI_ANALYSIS_LEASE_WAIT_SECONDS
+        self.owner = _owner_id()
+        self.leader = False
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def _expiry(self):
+        return timezone.now() + timedelta(seconds=self.ttl)
+
+    def acquire(self) -> bool:
+        """
+        Prend le bail s'il est libre ou expiré (sans attendre)
+        """
+        if self.leader:
+            return True
+        now = timezone.now()
+        # Reprise d'un bail expiré : la mise à jour conditionnelle est atomique entre workers
+        taken = AnalysisLease.objects.filter(key=self.key, expires_at__lte=now).update(
+            owner=self.owner, expires_at=self._expiry(), acquired_at=now
+        )
+        if taken:
+            logger.warning(f"Bail expiré repris pour l'analyse {self.key}")
+        else:
+            try:
+                with transaction.atomic():
+                    AnalysisLease.objects.create(key=self.key, owner=self.owner, expires_at=self._expiry())
+            except IntegrityError:
+                return False
+        self.leader = True
+        self._start_heartbeat()
+        return True
+
+    def _start_heartbeat(self):
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._renew_until_released,
+                                           name='analysis-lease', daemon=True)
+        self._heartbeat.start()
+
+    def _renew_until_released(self):
+        try:
+            while not self._stop.wait(self.ttl / 3):
+                renewed = AnalysisLease.objects.filter(key=self.key, owner=self.owner).update(
+                    expires_at=self._expiry()
+                )
+                if not renewed:
+                    logger.warning(f"Bail perdu pendant l'analyse {self.key}")
+                    return
+        finally:
+            # Les connexions à la base sont propres à chaque thread
+            connections.close_all()
+
+    def release(self):
+        if not self.leader:
+            return
+        self._stop.set()
+        # Un renouvellement en cours ne doit pas survivre à la suppression du bail
+        if self._heartbeat is not None and self._heartbeat is not threading.current_thread():
+            self._heartbeat.join()
+        self._heartbeat = None
+        self.leader = False
+        AnalysisLease.objects.filter(key=self.key, owner=self.owner).delete()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        Attend le résultat du détenteur du bail ; retourne None si le bail
+        est libéré ou expiré sans résultat, ou après timeout secondes
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            result = self.fetch()
+            if result is not None:
+                return result
+            if not AnalysisLease.objects.filter(key=self.key, expires_at__gt=timezone.now()).exists():
+                return None
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+    def join(self) -> Optional[Any]:
+        """
+        Prend le bail (None) ou retourne le résultat de l'analyse menée par
+        un autre appel ; None sans le bail si l'attente dépasse timeout
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if self.acquire():
+                # Le détenteur précédent a pu terminer entre la lecture du cache et la prise du bail
+                result = self.fetch()
+                if result is not None:
+                    self.release()
+                return result
+            result = self.wait(max(deadline - time.monotonic(), 0))
+            if result is not None:
+                logger.info(f"Analyse {self.key} partagée avec un appel simultané")
+                return result
+            if time.monotonic() >= deadline:
+                logger.warning(f"Attente de l'analyse {self.key} abandonnée après {self.timeout:g} s : "
+                               f"analyse menée sans bail")
+                return None
+
+    def __enter__(self) -> 'SingleFlight':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
@@ -0,0 +1,61 @@
+"""
+tasks.py
+Tâches Celery de l'application d'analyse IA
+- run_analysis_job, store_text, index_text : utilisées lorsque
+  AI_ANALYSIS_JOB_MODE vaut 'celery'
+- extract_requirements : traitements NLP des processus sans modèles
+  (AI_MODELS_ENABLED=False), exécutés par les workers de la file AI_NLP_QUEUE :
+  celery -A backend worker -Q nlp
+
+Les modèles listés dans AI_MODELS_PRELOAD sont chargés dans le processus
+principal du worker, avant le fork des processus enfants.
+"""
+
+from celery import shared_task
+from celery.signals import worker_init
+from django.conf import settings
+
+from .jobs import index_text_job, run_analysis_job, store_text_job
+from .model_registry import registry
+from .requirement_extraction import get_extractor
+
+
+@shared_task(name='ai_analysis.run_analysis_job')
+def run_analysis_job_task(job_id):
+    """
+    Exécute un job d'analyse de RC dans un worker Celery
+    """
+    run_analysis_job(job_id)
+
+
+@shared_task(name='ai_analysis.store_text')
+def store_text_task(document_id):
+    """
+    Enregistre le texte d'un document déposé dans un worker Celery
+    """
+    store_text_job(document_id)
+
+
+@shared_task(name='ai_analysis.index_text')
+def index_text_task(text_id):
+    """
+    Indexe un texte enregistré dans le corpus TF-IDF dans un worker Celery
+    """
+    index_text_job(text_id)
+
+
+@shared_task(name='ai_analysis.extract_requirements')
+def extract_requirements_task(pages):
+    """
+    Extrait localement les exigences des pages [numéro, texte]
+    """
+    return get_extractor().extract((number, text) for number, text in pages)
+
+
+@worker_init.connect
+def preload_models(**kwargs):
+    """
+    Précharge les modèles dans le processus principal du worker (avant le fork)
+    """
+    if settings.AI_MODELS_PRELOAD and registry.is_enabled():
+        registry.preload(settings.AI_MODELS_PRELOAD)
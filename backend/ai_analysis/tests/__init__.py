@@ -0,0 +1,4 @@
+"""
+Package de tests pour l'application d'analyse IA.
+Contient les tests unitaires et d'intégration.
+"""
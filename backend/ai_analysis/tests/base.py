@@ -0,0 +1,24 @@
+"""
+Outils communs aux tests de l'application d'analyse IA.
+"""
+
+from django.db import connection
+
+from moas.models import MOA, MOE
+
+
+class UnmanagedTablesMixin:
+    """
+    Crée les tables des modèles non gérés par Django (MOA, MOE) dans la base
+    de test : elles sont référencées par Project mais absentes des migrations.
+    """
+    unmanaged_models = (MOA, MOE)
+
+    @classmethod
+    def setUpClass(cls):
+        existing_tables = connection.introspection.table_names()
+        with connection.schema_editor() as editor:
+            for model in cls.unmanaged_models:
+                if model._meta.db_table not in existing_tables:
+                    editor.create_model(model)
+        super().setUpClass()
@@ -0,0 +1,222 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, transaction
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from projects.models import Project, ReferenceDocument
+from ai_analysis.models import DocumentText, RCAnalysis
+from ai_analysis.ai_service import AIService
+from ai_analysis.cache import dedup_stats, get_cached_analysis, store_analysis
+from ai_analysis.tests.base import UnmanagedTablesMixin
+from ai_analysis.text_store import get_document_text
+from ai_analysis.tests.test_chunked_analysis import build_rc
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+ANALYSIS = {
+    'structure': [{'title': '1. Valeur technique', 'subsections': []}],
+    'exigences': [],
+    'contraintes': [],
+    'points_critiques': [],
+    'recommendations': []
+}
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class RCAnalysisCacheTests(UnmanagedTablesMixin, APITestCase):
+    """
+    Tests du cache des analyses de RC.
+    Vérifie qu'un RC inchangé n'est ni réextrait ni renvoyé au LLM.
+    """
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        """Création d'un projet avec son RC"""
+        self.user = User.objects.create_user(
+            email='test@example.com', password='TestPass123!', role='WRITER'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Projet test')
+        self.rc = ReferenceDocument.objects.create(
+            project=self.project, type='RC',
+            file=SimpleUploadedFile('rc.pdf', b'%PDF-1.4 contenu v1')
+        )
+        self.url = f'/api/analysis/{self.project.id}/analyze_rc/'
+
+    def _patch_service(self):
+        extract = mock.patch('ai_analysis.text_store.iter_pages_parallel', return_value=[(1, 'texte du RC')])
+        analyze = mock.patch.object(AIService, 'analyze_text', return_value=ANALYSIS)
+        return extract, analyze
+
+    def test_second_call_is_served_from_cache(self):
+        """Le second appel ne réextrait pas le PDF et n'appelle pas le LLM"""
+        extract, analyze = self._patch_service()
+        with extract as extract_mock, analyze as analyze_mock:
+            first = self.client.post(self.url)
+            second = self.client.post(self.url)
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertFalse(first.data['cached'])
+        self.assertTrue(second.data['cached'])
+        self.assertEqual(second.data['analysis'], first.data['analysis'])
+        self.assertEqual(extract_mock.call_count, 1)
+        self.assertEqual(analyze_mock.call_count, 1)
+
+    def test_stored_text_is_read_once_per_analysis(self):
+        """Texte, termes clés et modifications de l'analyse proviennent d'une seule lecture du stockage"""
+        extract, analyze = self._patch_service()
+        with extract, analyze, \
+                mock.patch('ai_analysis.pipeline.get_document_text', wraps=get_document_text) as read_text:
+            response = self.client.post(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(read_text.call_count, 1)
+
+    def test_get_summary_uses_cache(self):
+        """get_summary réutilise l'analyse produite par analyze_rc"""
+        extract, analyze = self._patch_service()
+        with extract, analyze as analyze_mock:
+            self.client.post(self.url)
+            response = self.client.get(f'/api/analysis/{self.project.id}/get_summary/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['cached'])
+        self.assertEqual(response.data['summary']['structure'], ANALYSIS['structure'])
+        self.assertEqual(analyze_mock.call_count, 1)
+
+    def test_new_rc_upload_invalidates_cache(self):
+        """Le dépôt d'un nouveau RC supprime les analyses de l'ancien fichier"""
+        extract, analyze = self._patch_service()
+        with extract, analyze:
+            self.client.post(self.url)
+        self.assertEqual(RCAnalysis.objects.filter(project=self.project).count(), 1)
+
+        self.rc.file = SimpleUploadedFile('rc_v2.pdf', b'%PDF-1.4 contenu v2')
+        self.rc.save()
+        self.assertEqual(RCAnalysis.objects.filter(project=self.project).count(), 0)
+
+    @override_settings(AI_ANALYSIS_CHUNK_THRESHOLD_TOKENS=1000, AI_ANALYSIS_CHUNK_MAX_TOKENS=800)
+    def test_amended_rc_only_reanalyses_changed_chunks(self):
+        """Un RC modificatif ne renvoie au LLM que les extraits modifiés"""
+        texts = iter([build_rc(30), build_rc(30, amended=7)])
+        with mock.patch('ai_analysis.text_store.iter_pages_parallel', side_effect=lambda path: [(1, next(texts))]), \
+                mock.patch.object(AIService, '_complete', return_value='1. Valeur technique (60 points)') as complete:
+            first = self.client.post(self.url)
+            chunk_count = complete.call_count
+            self.rc.file = SimpleUploadedFile('rc_modificatif.pdf', b'%PDF-1.4 contenu v2')
+            self.rc.save()
+            complete.reset_mock()
+            second = self.client.post(self.url)
+
+        self.assertGreater(chunk_count, 5)
+        self.assertEqual(complete.call_count, 1)
+        self.assertFalse(second.data['cached'])
+        self.assertEqual(second.data['analysis']['structure'], first.data['analysis']['structure'])
+        self.assertEqual(second.data['analysis']['changes']['reanalysed_fragments'], 1)
+        self.assertEqual(second.data['analysis']['changes']['fragments'], chunk_count)
+
+    def test_failed_analysis_is_not_cached(self):
+        """Une analyse vide (échec du LLM) n'est pas mise en cache"""
+        empty = dict(ANALYSIS, structure=[])
+        with mock.patch('ai_analysis.text_store.iter_pages_parallel', return_value=[(1, 'texte')]), \
+                mock.patch.object(AIService, 'analyze_text', return_value=empty):
+            self.client.post(self.url)
+        self.assertFalse(RCAnalysis.objects.exists())
+
+    def test_partial_chunked_analysis_is_refused(self):
+        """Une analyse découpée dont un extrait a échoué répond 502 sans être mise en cache"""
+        partial = dict(ANALYSIS, fragments=[{'key': 'a', 'hash': 'h', 'structure': None}] * 3, failed_fragments=1)
+        with mock.patch('ai_analysis.text_store.iter_pages_parallel', return_value=[(1, 'texte')]), \
+                mock.patch.object(AIService, 'analyze_text', return_value=partial):
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_502_BAD_GATEWAY)
+        self.assertIn('1 extrait(s) sur 3', response.data['error'])
+        self.assertFalse(RCAnalysis.objects.exists())
+
+    def test_cache_key_is_unique_per_project(self):
+        """Deux analyses simultanées du même RC ne laissent qu'une ligne"""
+        key = (self.project.id, 'a' * 64, 'gpt-4', '3')
+        store_analysis(*key, ANALYSIS, {})
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            RCAnalysis.objects.create(project=self.project, file_hash='a' * 64, model_name='gpt-4',
+                                      prompt_version='3', analysis_data={}, summary_data={})
+
+        # L'autre analyse insère sa ligne entre la lecture et l'insertion : rejouée en mise à jour
+        real = RCAnalysis.objects.update_or_create
+        attempts = []
+
+        def racing_update_or_create(**kwargs):
+            attempts.append(kwargs)
+            if len(attempts) == 1:
+                raise IntegrityError('doublon')
+            return real(**kwargs)
+
+        with mock.patch.object(RCAnalysis.objects, 'update_or_create', side_effect=racing_update_or_create):
+            stored = store_analysis(*key, {'structure': []}, {'title': 'v2'})
+
+        self.assertEqual(RCAnalysis.objects.filter(project=self.project).count(), 1)
+        self.assertEqual(stored.summary_data, {'title': 'v2'})
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class CrossProjectDedupTests(UnmanagedTablesMixin, APITestCase):
+    """
+    Tests du partage des analyses entre projets au RC identique (lots d'un
+    même appel d'offres).
+    """
+    def setUp(self):
+        self.user = User.objects.create_superuser(email='admin@example.com', password='TestPass123!')
+        self.client.force_authenticate(user=self.user)
+        self.lots = [Project.objects.create(name=f'Lot {number}') for number in (1, 2)]
+
+    def _upload(self, project, content=b'%PDF-1.4 RC commun'):
+        return ReferenceDocument.objects.create(
+            project=project, type='RC', file=SimpleUploadedFile('rc.pdf', content)
+        )
+
+    def test_identical_rc_is_analysed_once_for_all_lots(self):
+        """Le second lot reprend l'analyse du premier sans appeler le LLM"""
+        for lot in self.lots:
+            self._upload(lot)
+        with mock.patch('ai_analysis.text_store.iter_pages_parallel', return_value=[(1, 'texte du RC')]), \
+                mock.patch.object(AIService, 'analyze_text', return_value=ANALYSIS) as analyze:
+            first = self.client.post(f'/api/analysis/{self.lots[0].id}/analyze_rc/')
+            second = self.client.post(f'/api/analysis/{self.lots[1].id}/analyze_rc/')
+
+        self.assertEqual(analyze.call_count, 1)
+        self.assertTrue(second.data['cached'])
+        self.assertEqual(second.data['analysis'], first.data['analysis'])
+        shared = RCAnalysis.objects.get(project=self.lots[1])
+        self.assertEqual(shared.dedup_source, 'file')
+        self.assertEqual(dedup_stats()['analyses']['hit_rate'], 0.5)
+
+    def test_same_text_in_a_different_file_is_shared(self):
+        """Deux exports différents d'un même RC partagent l'analyse"""
+        documents = [self._upload(lot, content) for lot, content in zip(self.lots, (b'%PDF-1.4 a', b'%PDF-1.4 b'))]
+        for document, content_hash in zip(documents, ('a' * 64, 'b' * 64)):
+            DocumentText.objects.update_or_create(document=document, defaults={
+                'content_hash': content_hash, 'text_hash': 'c' * 64, 'compressed_text': b'',
+            })
+        RCAnalysis.objects.create(project=self.lots[0], file_hash='a' * 64, model_name='m', prompt_version='v1',
+                                  analysis_data={'structure': []}, summary_data={})
+
+        shared = get_cached_analysis(self.lots[1].id, 'b' * 64, 'm', 'v1')
+
+        self.assertEqual(shared.project, self.lots[1])
+        self.assertEqual(shared.dedup_source, 'text')
+        self.assertIsNone(get_cached_analysis(self.lots[1].id, 'b' * 64, 'm', 'v2'))
+
+    def test_admin_shows_the_hit_rate(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/admin/ai_analysis/rcanalysis/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, 'Taux de reprise')
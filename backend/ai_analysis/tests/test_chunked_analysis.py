@@ -0,0 +1,160 @@
+import re
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ai_analysis.ai_service import AIService
+from ai_analysis.llm_backends import LLMTimeout
+from ai_analysis.chunking import count_tokens, split_along_layout, split_into_chunks
+from ai_analysis.outline import parse_outline
+from ai_analysis.pdf_analyzer import PDFAnalyzer
+
+
+def build_rc(section_count: int, lines_per_section: int = 40, amended: int = 0) -> str:
+    lines = []
+    for number in range(1, section_count + 1):
+        lines.append(f'{number} Article {number}')
+        lines.extend(f'Clause {number}.{line} du règlement de consultation.' for line in range(lines_per_section))
+        if number == amended:
+            lines.append('Clause ajoutée par le RC modificatif.')
+    return '\n'.join(lines)
+
+
+class ChunkingTests(SimpleTestCase):
+    """
+    Tests du découpage des RC aux frontières de sections.
+    """
+    def test_chunks_respect_budget_and_section_boundaries(self):
+        text = build_rc(20)
+        chunks = split_into_chunks(text, 800, '', PDFAnalyzer())
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(count_tokens(chunk), 800)
+            self.assertRegex(chunk.split('\n', 1)[0], r'^\d+ Article \d+$')
+        self.assertEqual('\n'.join(chunks), text)
+
+    def test_layout_of_previous_version_is_kept(self):
+        """Seul l'extrait contenant la modification diffère de la version précédente"""
+        previous = split_into_chunks(build_rc(20), 800, '', PDFAnalyzer())
+        boundaries = [chunk.split('\n', 1)[0] for chunk in previous]
+        amended = split_along_layout(build_rc(20, amended=1), boundaries, 800, '', PDFAnalyzer())
+
+        self.assertEqual(len(amended), len(previous))
+        self.assertNotEqual(amended[0], previous[0])
+        self.assertEqual(amended[1:], previous[1:])
+
+    def test_oversized_section_is_split_by_lines(self):
+        text = build_rc(1, lines_per_section=500)
+        chunks = split_into_chunks(text, 500, '', PDFAnalyzer())
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(count_tokens(chunk) <= 500 for chunk in chunks))
+
+
+@override_settings(
+    AI_ANALYSIS_CHUNK_THRESHOLD_TOKENS=1000,
+    AI_ANALYSIS_CHUNK_MAX_TOKENS=800,
+    AI_ANALYSIS_MAX_CONCURRENT_REQUESTS=3
+)
+class ChunkedAnalysisTests(SimpleTestCase):
+    """
+    Tests de l'analyse map-reduce : requêtes simultanées bornées et fusion des structures.
+    """
+    def setUp(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def fake_complete(self, prompt):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.02)
+        with self.lock:
+            self.in_flight -= 1
+        part = int(re.search(r'partie (\d+)/', prompt).group(1))
+        if part % 2:
+            return "1. Valeur technique (60 points)"
+        return "1. Valeur technique (60 points)\n2. Délais (40 points)"
+
+    def test_long_text_is_analyzed_in_chunks_and_merged(self):
+        service = AIService()
+        with mock.patch.object(AIService, '_complete', side_effect=self.fake_complete) as complete:
+            result = service.analyze_text(build_rc(30))
+
+        self.assertGreater(complete.call_count, 3)
+        self.assertLessEqual(self.max_in_flight, 3)
+        titles = [chapter['title'] for chapter in result['structure']]
+        self.assertEqual(titles, ['1. Valeur technique', '2. Délais'])
+
+    def test_short_text_uses_single_prompt(self):
+        service = AIService()
+        with mock.patch.object(AIService, '_complete', return_value='1. Valeur technique (100 points)') as complete:
+            result = service.analyze_text('1 Article court')
+        complete.assert_called_once()
+        self.assertEqual(result['structure'][0]['title'], '1. Valeur technique')
+        self.assertEqual(result['fragments'], [{'key': '1 Article court', 'hash': mock.ANY, 'structure': None}])
+
+    def test_amended_short_rc_is_analysed_by_section_then_reused(self):
+        """Un RC court garde son découpage par section : ses RC modificatifs réutilisent les sections inchangées"""
+        service = AIService()
+        with mock.patch.object(AIService, '_complete', return_value='1. Valeur technique (60 points)'):
+            previous = service.analyze_text(build_rc(4, lines_per_section=5))
+        self.assertEqual(len(previous['fragments']), 4)
+
+        with mock.patch.object(AIService, '_complete', side_effect=self.fake_complete) as complete:
+            first = service.analyze_text(build_rc(4, lines_per_section=5, amended=2), previous['fragments'])
+            self.assertEqual(complete.call_count, 4)
+            complete.reset_mock()
+            second = service.analyze_text(build_rc(4, lines_per_section=5, amended=3), first['fragments'])
+
+        self.assertEqual(complete.call_count, 2)
+        self.assertEqual(second['reanalysed_fragments'], 2)
+        self.assertEqual(second['structure'], first['structure'])
+
+    def test_llm_error_aborts_the_chunked_analysis(self):
+        """Une erreur du LLM sur un extrait est propagée sans envoyer les extraits restants"""
+        def timeout_on_second_part(prompt):
+            if 'partie 2/' in prompt:
+                raise LLMTimeout('échéance dépassée')
+            return self.fake_complete(prompt)
+
+        with override_settings(AI_ANALYSIS_MAX_CONCURRENT_REQUESTS=1), \
+                mock.patch.object(AIService, '_complete', side_effect=timeout_on_second_part) as complete, \
+                self.assertRaises(LLMTimeout):
+            AIService().analyze_text(build_rc(30))
+        total = int(re.search(r'partie \d+/(\d+)', complete.call_args.args[0]).group(1))
+        self.assertLess(complete.call_count, total)
+
+    def test_failed_chunks_are_counted(self):
+        """Un extrait dont la réponse n'a pas pu être exploitée est compté dans failed_fragments"""
+        service = AIService()
+        with mock.patch.object(AIService, '_complete', side_effect=self.fake_complete), \
+                mock.patch.object(AIService, '_extract_structure', side_effect=[ValueError('réponse illisible')] + [[]] * 50):
+            result = service.analyze_text(build_rc(30))
+        self.assertEqual(result['failed_fragments'], 1)
+
+    def test_merge_structures_renumbers_and_deduplicates(self):
+        merged = AIService()._merge_structures([
+            parse_outline("1. Valeur technique (60 points)\n   1.1. Méthodologie\n      1.1.1. a"),
+            parse_outline("1. Valeur technique\n   1.1. Méthodologie (30 points)\n      1.1.1. a\n      1.1.2. b\n"
+                          "2. Prix (40 points)"),
+        ])
+        self.assertEqual(merged, parse_outline(
+            "1. Valeur technique (60 points)\n   1.1. Méthodologie (30 points)\n      1.1.1. a\n      1.1.2. b\n"
+            "2. Prix (40 points)"
+        ))
+
+    def test_amended_rc_only_sends_changed_chunks(self):
+        """Un RC modificatif réutilise les extraits inchangés de l'analyse précédente"""
+        service = AIService()
+        with mock.patch.object(AIService, '_complete', side_effect=self.fake_complete) as complete:
+            previous = service.analyze_text(build_rc(30))
+            complete.reset_mock()
+            result = service.analyze_text(build_rc(30, amended=12), previous['fragments'])
+
+        complete.assert_called_once()
+        self.assertEqual(result['reanalysed_fragments'], 1)
+        self.assertEqual(len(result['fragments']), len(previous['fragments']))
+        self.assertEqual(result['structure'], previous['structure'])
@@ -0,0 +1,140 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from projects.models import Project, ReferenceDocument
+from ai_analysis.ai_service import AIService
+from ai_analysis.benchmarks.synthetic_pdf import build_pdf
+from ai_analysis.corpus_index import rebuild_corpus_index, tokenize
+from ai_analysis.models import CorpusTerm, TermVector
+from ai_analysis.tests.base import UnmanagedTablesMixin
+from ai_analysis.tests.test_cache import ANALYSIS
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+COMMON = "Les travaux du marché sont exécutés selon le planning du chantier."
+TOPICS = {
+    'voirie': "Réfection de la voirie : chaussée, enrobés et bordures de la voirie communale.",
+    'assainissement': "Pose des canalisations d'assainissement et raccordement au réseau d'assainissement.",
+    'école': "Construction de l'école : salles de classe, préau et restaurant scolaire de l'école.",
+}
+
+
+def rc_pdf(topic: str, pages: int = 2) -> bytes:
+    return build_pdf([[COMMON, TOPICS[topic], TOPICS[topic]] for _ in range(pages)])
+
+
+def doc_freq(term: str) -> int:
+    return CorpusTerm.objects.get(term=term).doc_freq
+
+
+class TokenizeTests(SimpleTestCase):
+    """
+    Tests du découpage des textes en termes.
+    """
+    def test_stopwords_elisions_and_numbers_are_dropped(self):
+        self.assertEqual(
+            tokenize("L'entreprise devra réaliser les travaux d'assainissement en 2024."),
+            ['entreprise', 'réaliser', 'travaux', 'assainissement']
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, AI_ANALYSIS_JOB_MODE='eager')
+class CorpusIndexTests(UnmanagedTablesMixin, APITestCase):
+    """
+    Tests de l'index TF-IDF du corpus : fréquences documentaires tenues à
+    jour au dépôt, termes clés et appels d'offres similaires.
+    """
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com', password='TestPass123!', role='WRITER'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.projects = {}
+        for topic in TOPICS:
+            self.projects[topic] = self._upload(Project.objects.create(name=f'Projet {topic}'), topic)
+
+    def _upload(self, project, topic: str) -> ReferenceDocument:
+        with self.captureOnCommitCallbacks(execute=True):
+            ReferenceDocument.objects.create(
+                project=project, type='RC', file=SimpleUploadedFile('rc.pdf', rc_pdf(topic))
+            )
+        return project
+
+    def test_document_frequencies_follow_uploads_and_deletions(self):
+        self.assertEqual(TermVector.objects.count(), 3)
+        self.assertEqual(doc_freq('travaux'), 3)
+        self.assertEqual(doc_freq('voirie'), 1)
+
+        ReferenceDocument.objects.filter(project=self.projects['voirie']).delete()
+
+        self.assertEqual(doc_freq('travaux'), 2)
+        self.assertEqual(doc_freq('voirie'), 0)
+
+    def test_replaced_document_only_shifts_changed_terms(self):
+        rc = ReferenceDocument.objects.get(project=self.projects['école'])
+        rc.file = SimpleUploadedFile('rc.pdf', rc_pdf('voirie'))
+        with self.captureOnCommitCallbacks(execute=True):
+            rc.save()
+
+        self.assertEqual(doc_freq('voirie'), 2)
+        self.assertEqual(doc_freq('école'), 0)
+        self.assertEqual(doc_freq('travaux'), 3)
+
+    def test_rebuild_recomputes_the_same_frequencies(self):
+        before = dict(CorpusTerm.objects.values_list('term', 'doc_freq'))
+        CorpusTerm.objects.update(doc_freq=42)
+
+        self.assertEqual(rebuild_corpus_index(), 3)
+        self.assertEqual(dict(CorpusTerm.objects.values_list('term', 'doc_freq')), before)
+
+    def test_rebuild_does_not_forget_vectors_one_by_one(self):
+        with mock.patch('ai_analysis.signals.forget_term_vector') as forget:
+            rebuild_corpus_index()
+
+        forget.assert_not_called()
+        self.assertEqual(doc_freq('travaux'), 3)
+
+    def test_keywords_rank_distinctive_terms_first(self):
+        response = self.client.get(f"/api/analysis/{self.projects['voirie'].id}/keywords/", {'limit': 3})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        terms = [keyword['term'] for keyword in response.data['keywords']]
+        self.assertEqual(terms[0], 'voirie')
+        self.assertEqual(len(terms), 3)
+        self.assertNotIn('travaux', terms)
+
+    def test_keywords_of_a_project_without_text(self):
+        project = Project.objects.create(name='Sans document')
+        response = self.client.get(f'/api/analysis/{project.id}/keywords/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_similar_tenders_exclude_the_project_itself(self):
+        twin = self._upload(Project.objects.create(name='Voirie 2025'), 'voirie')
+
+        response = self.client.get(f"/api/analysis/{self.projects['voirie'].id}/similar/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        similar = response.data['similar']
+        self.assertEqual(similar[0]['project_id'], twin.id)
+        self.assertAlmostEqual(similar[0]['score'], 1.0, places=3)
+        self.assertNotIn(self.projects['voirie'].id, [tender['project_id'] for tender in similar])
+
+    def test_analyze_rc_returns_corpus_keywords(self):
+        project = self.projects['assainissement']
+        with mock.patch.object(AIService, 'analyze_text', return_value=ANALYSIS):
+            response = self.client.post(f'/api/analysis/{project.id}/analyze_rc/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['analysis']['keywords'][0], 'assainissement')
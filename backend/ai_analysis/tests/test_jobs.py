@@ -0,0 +1,75 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from projects.models import Project, ReferenceDocument
+from ai_analysis.models import AnalysisJob
+from ai_analysis.ai_service import AIService
+from ai_analysis.tests.base import UnmanagedTablesMixin
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+ANALYSIS = {
+    'structure': [{'title': '1. Valeur technique', 'subsections': []}],
+    'exigences': [],
+    'contraintes': [],
+    'points_critiques': [],
+    'recommendations': []
+}
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, AI_ANALYSIS_JOB_MODE='eager')
+class AnalysisJobTests(UnmanagedTablesMixin, APITestCase):
+    """
+    Tests des jobs d'analyse asynchrones (exécutés en mode 'eager').
+    """
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        """Création d'un projet avec son RC"""
+        self.user = User.objects.create_user(
+            email='test@example.com', password='TestPass123!', role='WRITER'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Projet test')
+        ReferenceDocument.objects.create(
+            project=self.project, type='RC',
+            file=SimpleUploadedFile('rc.pdf', b'%PDF-1.4 contenu')
+        )
+        self.url = f'/api/analysis/{self.project.id}/analyze_rc_async/'
+
+    def test_job_is_accepted_then_completed(self):
+        """Le POST retourne 202 et le job aboutit avec le résultat de l'analyse"""
+        with mock.patch('ai_analysis.text_store.iter_pages_parallel', return_value=[(1, 'texte')]), \
+                mock.patch.object(AIService, 'analyze_text', return_value=ANALYSIS), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'queued')
+
+        job_response = self.client.get(f"/api/analysis-jobs/{response.data['job_id']}/")
+        self.assertEqual(job_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(job_response.data['status'], 'done')
+        self.assertEqual(job_response.data['progress'], 100)
+        self.assertEqual(job_response.data['result']['analysis']['structure'], ANALYSIS['structure'])
+
+    def test_job_failure_is_reported(self):
+        """Une erreur pendant l'analyse passe le job en échec avec le message"""
+        with mock.patch('ai_analysis.text_store.iter_pages_parallel', side_effect=Exception('PDF illisible')), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url)
+
+        job = AnalysisJob.objects.get(pk=response.data['job_id'])
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('PDF illisible', job.error)
+        self.assertIsNone(job.analysis)
@@ -0,0 +1,89 @@
+import asyncio
+import os
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ai_analysis.ai_service import AIService
+from ai_analysis.llm_backends import LLMError, OpenAIBackend, StubBackend
+from ai_analysis.llm_stub_server import StubServer
+
+MESSAGES = [{'role': 'user', 'content': 'Analyse le RC : lot 2 voirie'}]
+
+
+class StubBackendTests(SimpleTestCase):
+    """
+    Tests du backend local déterministe.
+    """
+    def test_rules_are_replayed_deterministically(self):
+        backend = StubBackend(rules=[('voirie', '1. Voirie (100 points)')], default='AUCUN')
+        first = backend.complete(MESSAGES, model='stub-model')
+        second = backend.complete(MESSAGES, model='stub-model')
+        self.assertEqual(first.content, '1. Voirie (100 points)')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(backend.complete([{'role': 'user', 'content': 'autre'}], model='m').content, 'AUCUN')
+        self.assertGreater(first.prompt_tokens, 0)
+
+    def test_concurrent_calls_overlap_their_latency(self):
+        """Les appels simultanés se recouvrent : la durée totale reste proche d'une latence"""
+        backend = StubBackend(latency=0.2)
+
+        async def burst():
+            return await asyncio.gather(*(backend.acomplete(MESSAGES, model='m') for _ in range(10)))
+
+        started = time.perf_counter()
+        responses = backend.run(burst())
+        elapsed = time.perf_counter() - started
+        self.assertEqual(len(responses), 10)
+        self.assertLess(elapsed, 1.0)
+
+    def test_ai_service_runs_offline_with_stub(self):
+        service = AIService(llm_backend=StubBackend())
+        result = service.analyze_text('1 Article unique du règlement')
+        self.assertEqual(result['structure'][0]['title'], '1. Valeur technique')
+
+
+class OpenAIBackendTests(SimpleTestCase):
+    """
+    Tests du client asynchrone contre le serveur stub local.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = StubServer(StubBackend(rules=[('voirie', '1. Voirie (100 points)')])).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def test_completion_over_http_reuses_session(self):
+        backend = OpenAIBackend(api_key='test', api_base=self.server.api_base, pool_size=2)
+        first = backend.complete(MESSAGES, model='gpt-test')
+        session = backend._session
+        second = backend.complete(MESSAGES, model='gpt-test')
+        self.assertEqual(first.content, '1. Voirie (100 points)')
+        self.assertEqual(second.completion_tokens, first.completion_tokens)
+        self.assertIs(backend._session, session)
+        backend.run(backend.aclose())
+
+    def test_session_is_recreated_after_fork(self):
+        """Un worker forké n'hérite pas de la session liée à la boucle du processus maître"""
+        backend = OpenAIBackend(api_key='test', api_base=self.server.api_base)
+        backend.complete(MESSAGES, model='gpt-test')
+        parent_session, parent_loop = backend._session, backend.loop_thread.get_loop()
+
+        with mock.patch('ai_analysis.llm_backends.os.getpid', return_value=os.getpid() + 1):
+            response = backend.complete(MESSAGES, model='gpt-test')
+            self.assertIsNot(backend._session, parent_session)
+            self.assertEqual(response.content, '1. Voirie (100 points)')
+            backend.run(backend.aclose())
+        asyncio.run_coroutine_threadsafe(parent_session.close(), parent_loop).result()
+
+    def test_http_errors_raise_llm_error_with_status(self):
+        backend = OpenAIBackend(api_key='test', api_base=self.server.api_base.replace('/v1', '/absent'))
+        with self.assertRaises(LLMError) as context:
+            backend.complete(MESSAGES, model='gpt-test')
+        self.assertEqual(context.exception.status, 404)
+        backend.run(backend.aclose())
@@ -0,0 +1,236 @@
+import asyncio
+import shutil
+import tempfile
+import threading
+from datetime import date
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from projects.models import Project, ReferenceDocument
+from ai_analysis.ai_service import AIService
+from ai_analysis.llm_backends import RateLimitedBackend, StubBackend
+from ai_analysis.llm_dispatcher import (
+    DEFAULT_PRIORITY, POLL_INTERVAL, LLMDispatcher, LLMQueueFull, MemoryRateStore, RedisRateStore,
+    check_worker_store, current_priority, llm_priority, project_priority
+)
+from ai_analysis.tests.base import UnmanagedTablesMixin
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+MESSAGES = [{'role': 'user', 'content': 'Analyse le RC'}]
+
+
+def redis_available() -> bool:
+    try:
+        import redis
+        return redis.Redis.from_url(settings.CELERY_BROKER_URL, socket_connect_timeout=0.2).ping()
+    except Exception:
+        return False
+
+
+class RateStoreTestsMixin:
+    """
+    Comportement commun aux stores en mémoire et redis.
+    """
+    def make_store(self, requests_per_minute=60, tokens_per_minute=1000):
+        raise NotImplementedError
+
+    def test_most_urgent_ticket_is_served_first(self):
+        store = self.make_store()
+        late = store.enqueue(priority=300)
+        urgent = store.enqueue(priority=100)
+        middle = store.enqueue(priority=200)
+
+        self.assertEqual(store.try_acquire(late, 10)[:2], (False, 2))
+        self.assertEqual(store.try_acquire(middle, 10)[:2], (False, 1))
+        self.assertTrue(store.try_acquire(urgent, 10)[0])
+        self.assertTrue(store.try_acquire(middle, 10)[0])
+        self.assertTrue(store.try_acquire(late, 10)[0])
+        self.assertEqual(store.queue_length(), 0)
+
+    def test_equal_priorities_are_served_in_arrival_order(self):
+        store = self.make_store()
+        first, second = store.enqueue(priority=100), store.enqueue(priority=100)
+        self.assertEqual(store.try_acquire(second, 10)[:2], (False, 1))
+        self.assertTrue(store.try_acquire(first, 10)[0])
+
+    def test_token_budget_makes_the_call_wait(self):
+        store = self.make_store(tokens_per_minute=100)
+        self.assertTrue(store.try_acquire(store.enqueue(priority=1), 80)[0])
+
+        ticket = store.enqueue(priority=1)
+        granted, position, wait = store.try_acquire(ticket, 80)
+        self.assertFalse(granted)
+        self.assertEqual(position, 0)
+        # 60 tokens manquants à 100 tokens par minute : environ 36 secondes
+        self.assertAlmostEqual(wait, 36, delta=1)
+
+        store.refund(70)
+        self.assertTrue(store.try_acquire(ticket, 80)[0])
+
+    def test_cancelled_ticket_leaves_the_queue(self):
+        store = self.make_store()
+        first, second = store.enqueue(priority=1), store.enqueue(priority=2)
+        store.cancel(first)
+        self.assertEqual(store.count_ahead(priority=5), 1)
+        self.assertTrue(store.try_acquire(second, 10)[0])
+
+
+class MemoryRateStoreTests(RateStoreTestsMixin, SimpleTestCase):
+    """
+    Tests de la file et des seaux à jetons en mémoire.
+    """
+    def make_store(self, requests_per_minute=60, tokens_per_minute=1000):
+        return MemoryRateStore(requests_per_minute, tokens_per_minute)
+
+
+@skipUnless(redis_available(), 'serveur redis indisponible')
+class RedisRateStoreTests(RateStoreTestsMixin, SimpleTestCase):
+    """
+    Tests de la file et des seaux à jetons partagés par redis.
+    """
+    def make_store(self, requests_per_minute=60, tokens_per_minute=1000):
+        store = RedisRateStore(settings.CELERY_BROKER_URL, requests_per_minute, tokens_per_minute,
+                               prefix=f'memtech:test:{self.id()}')
+        store.client.delete(store.queue_key, store.beats_key, store.bucket_key, store.counter_key)
+        return store
+
+
+class LLMDispatcherTests(SimpleTestCase):
+    """
+    Tests de l'admission et du cadencement des appels au LLM.
+    """
+    def test_project_priority_follows_the_delivery_date(self):
+        soon = project_priority(mock.Mock(offer_delivery_date=date(2025, 3, 1)))
+        later = project_priority(mock.Mock(offer_delivery_date=date(2025, 6, 1)))
+        self.assertLess(soon, later)
+        self.assertEqual(project_priority(mock.Mock(offer_delivery_date=None)), DEFAULT_PRIORITY)
+
+    def test_full_queue_rejects_new_analyses_with_position(self):
+        dispatcher = LLMDispatcher(MemoryRateStore(60, 1000), max_queue=2)
+        self.assertEqual(dispatcher.admit(priority=1), 1)
+        dispatcher.store.enqueue(priority=1)
+        self.assertEqual(dispatcher.admit(priority=2), 2)
+        dispatcher.store.enqueue(priority=1)
+
+        with mock.patch.object(dispatcher.store, 'queue_length', wraps=dispatcher.store.queue_length) as length, \
+                self.assertRaises(LLMQueueFull) as raised:
+            dispatcher.admit(priority=1)
+        self.assertEqual(raised.exception.position, 3)
+        self.assertEqual(raised.exception.retry_after, 3)
+        length.assert_called_once()
+
+    def test_memory_store_shared_by_several_workers_is_reported(self):
+        with override_settings(AI_LLM_RATE_LIMIT_STORE='memory'), \
+                self.assertLogs('ai_analysis.llm_dispatcher', level='WARNING'):
+            self.assertFalse(check_worker_store(3))
+        with override_settings(AI_LLM_RATE_LIMIT_STORE='redis'):
+            self.assertTrue(check_worker_store(3))
+        with override_settings(AI_LLM_RATE_LIMIT_STORE='memory'):
+            self.assertTrue(check_worker_store(1))
+
+    def test_backend_calls_reserve_then_correct_their_tokens(self):
+        dispatcher = LLMDispatcher(MemoryRateStore(60, 100000))
+        backend = RateLimitedBackend(StubBackend(), dispatcher)
+
+        response = backend.complete(MESSAGES, model='m', max_tokens=2000)
+
+        self.assertEqual(backend.calls, 1)
+        # Seul l'usage réel reste décompté (au remplissage près)
+        self.assertGreater(dispatcher.store._tokens, 100000 - 2 * response.total_tokens)
+
+    def test_ticket_behind_others_waits_the_poll_interval(self):
+        store = MemoryRateStore(60, 1000)
+        store.enqueue(priority=1)
+        dispatcher = LLMDispatcher(store)
+        delays = []
+
+        async def sleep(delay):
+            delays.append(delay)
+            if len(delays) == 3:
+                raise RuntimeError('arrêt du test')
+
+        with mock.patch('ai_analysis.llm_dispatcher.asyncio.sleep', sleep):
+            with self.assertRaises(RuntimeError):
+                asyncio.run(dispatcher.acquire(10, priority=2))
+
+        self.assertEqual(delays, [POLL_INTERVAL] * 3)
+        self.assertEqual(store.queue_length(), 1)
+
+    def test_blocking_store_is_called_outside_the_event_loop(self):
+        threads = []
+
+        class BlockingStore(MemoryRateStore):
+            blocking = True
+
+            def try_acquire(self, ticket, tokens):
+                threads.append(threading.get_ident())
+                return super().try_acquire(ticket, tokens)
+
+        async def acquire():
+            await LLMDispatcher(BlockingStore(60, 1000)).acquire(10)
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(acquire())
+
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], loop_thread)
+
+    def test_priority_of_the_context_reaches_the_dispatcher(self):
+        dispatcher = LLMDispatcher(MemoryRateStore(60, 100000))
+        priorities = []
+        original = dispatcher.acquire
+
+        async def acquire(tokens, priority=None):
+            priorities.append(current_priority())
+            await original(tokens, priority)
+
+        dispatcher.acquire = acquire
+        backend = RateLimitedBackend(StubBackend(), dispatcher)
+        with llm_priority(42.0):
+            backend.complete(MESSAGES, model='m')
+            list(backend.stream(MESSAGES, model='m'))
+        backend.complete(MESSAGES, model='m')
+
+        self.assertEqual(priorities, [42.0, 42.0, DEFAULT_PRIORITY])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class AnalyzeRCBackpressureTests(UnmanagedTablesMixin, APITestCase):
+    """
+    Tests du refus des analyses lorsque la file des appels au LLM est saturée.
+    """
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com', password='TestPass123!', role='WRITER'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Projet test', offer_delivery_date=date(2025, 3, 1))
+        ReferenceDocument.objects.create(
+            project=self.project, type='RC',
+            file=SimpleUploadedFile('rc.pdf', b'%PDF-1.4 contenu')
+        )
+
+    def test_saturated_queue_returns_429_with_position(self):
+        dispatcher = LLMDispatcher(MemoryRateStore(60, 1000), max_queue=1)
+        dispatcher.store.enqueue(priority=0)
+
+        with mock.patch('ai_analysis.pipeline.get_llm_dispatcher', return_value=dispatcher), \
+                mock.patch.object(AIService, 'analyze_text') as analyze:
+            response = self.client.post(f'/api/analysis/{self.project.id}/analyze_rc/')
+
+        analyze.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response.data['queue_position'], 2)
+        self.assertEqual(response['Retry-After'], '2')
@@ -0,0 +1,244 @@
+import asyncio
+import shutil
+import socket
+import tempfile
+import time
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from projects.models import Project, ReferenceDocument
+from ai_analysis.ai_service import AIService, override_ai_service
+from ai_analysis.llm_backends import (
+    LLMError, LLMTimeout, MeteredBackend, OpenAIBackend, PolicyBackend, RateLimitedBackend, StubBackend,
+    create_llm_backend
+)
+from ai_analysis.llm_dispatcher import LLMDispatcher, MemoryRateStore
+from ai_analysis.llm_policy import CallPolicy, PolicyMetrics
+from ai_analysis.llm_stub_server import StubServer
+from ai_analysis.tests.base import UnmanagedTablesMixin
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+MESSAGES = [{'role': 'user', 'content': 'Analyse le RC'}]
+
+
+def policy_backend(stub, **options):
+    """
+    PolicyBackend à attentes courtes autour d'un backend (métriques propres au test)
+    """
+    options = {'deadline': 5, 'attempt_timeout': 1, 'max_retries': 3, 'retry_base_delay': 0.01,
+               'retry_max_delay': 0.05, 'hedge': False, 'fallback_model': '', **options}
+    return PolicyBackend(stub, CallPolicy(**options), PolicyMetrics())
+
+
+class CallPolicyTests(SimpleTestCase):
+    """
+    Tests de la politique des appels contre le backend stub à incidents injectés.
+    """
+    def test_transient_errors_are_retried(self):
+        backend = policy_backend(StubBackend(faults=[429, 503]))
+
+        backend.complete(MESSAGES, model='gpt')
+
+        self.assertEqual(backend.calls, 3)
+        metrics = backend.metrics.snapshot()
+        self.assertEqual((metrics['retries'], metrics['successes'], metrics['failures']), (2, 1, 0))
+
+    def test_client_errors_are_not_retried(self):
+        backend = policy_backend(StubBackend(faults=[400]))
+
+        with self.assertRaises(LLMError) as raised:
+            backend.complete(MESSAGES, model='gpt')
+
+        self.assertEqual(raised.exception.status, 400)
+        self.assertEqual(backend.calls, 1)
+        self.assertEqual(backend.metrics.snapshot()['failures'], 1)
+
+    def test_retry_waits_at_least_the_retry_after_delay(self):
+        policy = CallPolicy(retry_base_delay=0.01, retry_max_delay=0.05)
+        self.assertGreaterEqual(policy.retry_delay(0, retry_after=2.0), 2.0)
+        self.assertLessEqual(policy.retry_delay(10), 0.05)
+
+    def test_stuck_attempt_is_abandoned_and_retried(self):
+        backend = policy_backend(StubBackend(faults=[5.0]), attempt_timeout=0.2)
+
+        started = time.perf_counter()
+        backend.complete(MESSAGES, model='gpt')
+
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertEqual(backend.metrics.snapshot()['timeouts'], 1)
+
+    def test_deadline_bounds_the_whole_call(self):
+        backend = policy_backend(StubBackend(latency=5), attempt_timeout=0.2, deadline=0.5)
+
+        started = time.perf_counter()
+        with self.assertRaises(LLMTimeout):
+            backend.complete(MESSAGES, model='gpt')
+
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertEqual(backend.metrics.snapshot()['deadline_exceeded'], 1)
+
+    def test_fallback_model_is_used_when_the_deadline_is_close(self):
+        stub = StubBackend(model_latency={'gpt-4': 5, 'gpt-4o-mini': 0.01})
+        backend = policy_backend(stub, attempt_timeout=0.3, deadline=0.5, fallback_model='gpt-4o-mini')
+
+        response = backend.complete(MESSAGES, model='gpt-4')
+
+        self.assertEqual(response.model, 'gpt-4o-mini')
+        self.assertEqual(backend.metrics.snapshot()['fallbacks'], 1)
+
+    def test_slow_attempt_is_hedged_after_the_p95_latency(self):
+        stub = StubBackend(latency=0.05)
+        backend = policy_backend(stub, hedge=True, hedge_min_samples=5)
+        for _ in range(5):
+            backend.complete(MESSAGES, model='gpt')
+
+        # Première requête bloquée : le doublon lancé après le p95 répond
+        stub.faults = [5.0]
+        started = time.perf_counter()
+        backend.complete(MESSAGES, model='gpt')
+
+        self.assertLess(time.perf_counter() - started, 1)
+        metrics = backend.metrics.snapshot()
+        self.assertEqual((metrics['hedges'], metrics['hedge_wins']), (1, 1))
+        self.assertEqual(metrics['latency']['gpt']['samples'], 6)
+
+    def test_stream_is_retried_before_the_first_chunk(self):
+        backend = policy_backend(StubBackend(faults=[503]))
+
+        text = ''.join(backend.stream(MESSAGES, model='gpt'))
+
+        self.assertEqual(text, StubBackend.DEFAULT_COMPLETION)
+        self.assertEqual(backend.metrics.snapshot()['retries'], 1)
+
+
+class QueuedPolicyTests(SimpleTestCase):
+    """
+    Tests de la politique des appels placée au-dessus du répartiteur : chaque
+    requête passe par la file, dont l'attente n'entame pas l'échéance.
+    """
+    def rate_limited(self, stub, queue_wait=0.0, **options):
+        dispatcher = LLMDispatcher(MemoryRateStore(600, 100000))
+        self.acquired = 0
+        original = dispatcher.acquire
+
+        async def acquire(tokens, priority=None):
+            self.acquired += 1
+            await asyncio.sleep(queue_wait)
+            await original(tokens, priority)
+
+        dispatcher.acquire = acquire
+        return policy_backend(RateLimitedBackend(stub, dispatcher), **options)
+
+    def test_policy_is_applied_around_the_rate_limiter(self):
+        with mock.patch('ai_analysis.llm_backends.get_llm_dispatcher',
+                        return_value=LLMDispatcher(MemoryRateStore(60, 1000))):
+            backend = create_llm_backend('stub')
+
+        self.assertIsInstance(backend, MeteredBackend)
+        self.assertIsInstance(backend.backend, PolicyBackend)
+        self.assertIsInstance(backend.backend.backend, RateLimitedBackend)
+
+    def test_queue_wait_does_not_count_against_the_deadline(self):
+        backend = self.rate_limited(StubBackend(latency=0.05), queue_wait=0.5, deadline=0.3, attempt_timeout=0.2)
+
+        response = backend.complete(MESSAGES, model='gpt')
+        text = ''.join(backend.stream(MESSAGES, model='gpt'))
+
+        self.assertEqual(response.content, StubBackend.DEFAULT_COMPLETION)
+        self.assertEqual(text, StubBackend.DEFAULT_COMPLETION)
+        metrics = backend.metrics.snapshot()
+        self.assertEqual((metrics['deadline_exceeded'], metrics['timeouts']), (0, 0))
+
+    def test_each_retry_is_queued(self):
+        backend = self.rate_limited(StubBackend(faults=[503, 429]))
+
+        backend.complete(MESSAGES, model='gpt')
+        ''.join(backend.stream(MESSAGES, model='gpt'))
+
+        self.assertEqual(backend.calls, 4)
+        self.assertEqual(self.acquired, 4)
+
+    def test_hedged_request_is_queued(self):
+        stub = StubBackend(latency=0.05)
+        backend = self.rate_limited(stub, hedge=True, hedge_min_samples=5)
+        for _ in range(5):
+            backend.complete(MESSAGES, model='gpt')
+
+        stub.faults = [5.0]
+        backend.complete(MESSAGES, model='gpt')
+
+        self.assertEqual(backend.metrics.snapshot()['hedges'], 1)
+        self.assertEqual(self.acquired, 7)
+
+
+class OpenAIPolicyTests(SimpleTestCase):
+    """
+    Tests de la politique des appels sur le client HTTP contre le serveur stub local.
+    """
+    def test_http_errors_of_the_stub_server_are_retried(self):
+        with StubServer(StubBackend(faults=[503, 429])) as server:
+            openai = OpenAIBackend(api_key='test', api_base=server.api_base)
+            backend = policy_backend(openai)
+            response = backend.complete(MESSAGES, model='gpt-test')
+            backend.run(openai.aclose())
+
+        self.assertEqual(response.content, StubBackend.DEFAULT_COMPLETION)
+        self.assertEqual(server.backend.calls, 3)
+        self.assertEqual(backend.metrics.snapshot()['retries'], 2)
+
+    def test_connection_errors_of_the_stream_are_llm_errors(self):
+        # Port libéré aussitôt réservé : la connexion est refusée
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        openai = OpenAIBackend(api_key='test', api_base=f'http://127.0.0.1:{port}/v1')
+
+        with self.assertRaises(LLMError):
+            list(openai.stream(MESSAGES, model='gpt-test'))
+        openai.run(openai.aclose())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class AnalyzeRCDeadlineTests(UnmanagedTablesMixin, APITestCase):
+    """
+    Tests de la réponse de analyze_rc lorsque le LLM ne répond pas à temps.
+    """
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com', password='TestPass123!', role='WRITER'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Projet test')
+        ReferenceDocument.objects.create(
+            project=self.project, type='RC', file=SimpleUploadedFile('rc.pdf', b'%PDF-1.4 contenu')
+        )
+
+    def test_missed_deadline_returns_504_instead_of_an_empty_structure(self):
+        backend = policy_backend(StubBackend(latency=5), attempt_timeout=0.2, deadline=0.3)
+
+        with override_ai_service(AIService(llm_backend=backend)), \
+                mock.patch('ai_analysis.text_store.iter_pages_parallel', return_value=[(1, 'texte du RC')]):
+            response = self.client.post(f'/api/analysis/{self.project.id}/analyze_rc/')
+
+        self.assertEqual(response.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
+
+    def test_llm_errors_of_the_summary_return_504_or_502(self):
+        for backend, expected in ((policy_backend(StubBackend(latency=5), attempt_timeout=0.2, deadline=0.3),
+                                   status.HTTP_504_GATEWAY_TIMEOUT),
+                                  (policy_backend(StubBackend(faults=[400])), status.HTTP_502_BAD_GATEWAY)):
+            with override_ai_service(AIService(llm_backend=backend)), \
+                    mock.patch('ai_analysis.text_store.iter_pages_parallel', return_value=[(1, 'texte du RC')]):
+                response = self.client.get(f'/api/analysis/{self.project.id}/get_summary/')
+
+            self.assertEqual(response.status_code, expected)
@@ -0,0 +1,74 @@
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from ai_analysis.model_registry import ModelRegistry, ModelsDisabled
+from ai_analysis.requirement_extraction import extract_requirements
+
+
+class ModelRegistryTests(SimpleTestCase):
+    """
+    Tests du registre des modèles du processus.
+    """
+    def setUp(self):
+        self.loads = 0
+        self.registry = ModelRegistry()
+        self.registry.register('fake', self.load_fake)
+
+    def load_fake(self):
+        self.loads += 1
+        return object()
+
+    def test_model_is_loaded_once_across_threads(self):
+        models = []
+        threads = [threading.Thread(target=lambda: models.append(self.registry.get('fake'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(len({id(model) for model in models}), 1)
+        stats = self.registry.stats()['models']['fake']
+        self.assertTrue(stats['loaded'])
+        self.assertIn('load_seconds', stats)
+        self.assertIn('rss_delta_bytes', stats)
+
+    def test_preload_is_eager_and_tolerates_failures(self):
+        self.registry.register('broken', mock.Mock(side_effect=OSError('modèle absent')))
+        self.registry.preload()
+        self.assertTrue(self.registry.is_loaded('fake'))
+        self.assertFalse(self.registry.is_loaded('broken'))
+
+    @override_settings(AI_MODELS_ENABLED=False)
+    def test_disabled_process_refuses_to_load(self):
+        with self.assertRaises(ModelsDisabled):
+            self.registry.get('fake')
+        self.assertEqual(self.loads, 0)
+
+    @override_settings(AI_MODELS_ENABLED=False, AI_NLP_QUEUE='nlp')
+    def test_extraction_is_routed_to_nlp_workers_when_disabled(self):
+        result = {'exigences': [], 'contraintes': [], 'mots_cles': ['chantier'], 'themes': []}
+        with mock.patch('ai_analysis.tasks.extract_requirements_task') as task:
+            task.apply_async.return_value.get.return_value = result
+            self.assertEqual(extract_requirements([(1, 'Le titulaire doit nettoyer le chantier.')]), result)
+        task.apply_async.assert_called_once_with(
+            args=[[[1, 'Le titulaire doit nettoyer le chantier.']]], queue='nlp'
+        )
+
+
+class ModelRegistryEndpointTests(APITestCase):
+    """
+    Tests de l'endpoint des métriques du registre.
+    """
+    def test_stats_are_exposed(self):
+        user = User.objects.create_user(email='test@example.com', password='TestPass123!', role='WRITER')
+        self.client.force_authenticate(user=user)
+        response = self.client.get('/api/analysis-models/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('spacy', response.data['models'])
+        self.assertGreater(response.data['rss_bytes'], 0)
@@ -0,0 +1,47 @@
+import random
+
+from django.test import SimpleTestCase
+
+from ai_analysis.benchmarks.bench_outline import generate_outline
+from ai_analysis.outline import OutlineParser, iter_nodes, merge_outlines, parse_outline, render_outline
+
+
+class OutlineParserTests(SimpleTestCase):
+    """
+    Tests de l'analyse en une passe du plan proposé par le modèle.
+    """
+    def test_points_and_depth_are_kept(self):
+        structure = parse_outline(
+            "Voici la structure proposée :\n"
+            "1. Valeur technique (60 points)\n"
+            "   1.1. Méthodologie (30 pts)\n"
+            "      1.1.1. Organisation (2,5 points)\n"
+            "         1.1.1.1. Phasage\n"
+            "10. Prix (40 %)\n"
+            "AUCUN"
+        )
+        self.assertEqual([node['title'] for _, node in iter_nodes(structure)], [
+            '1. Valeur technique', '1.1. Méthodologie', '1.1.1. Organisation',
+            '1.1.1.1. Phasage', '2. Prix'
+        ])
+        self.assertEqual([node['points'] for _, node in iter_nodes(structure)], [60, 30, 2.5, None, 40])
+
+    def test_indented_unnumbered_lines_are_children(self):
+        parser = OutlineParser()
+        parser.feed('1. Valeur technique')
+        path, node = parser.feed('      - Moyens humains')
+        self.assertEqual(path, [0, 0])
+        self.assertEqual(node['title'], '1.1. Moyens humains')
+        self.assertIsNone(parser.feed('Texte libre non indenté'))
+
+    def test_generated_outlines_round_trip(self):
+        """Propriété : parse_outline(render_outline(arbre)) == arbre, sur des milliers d'entrées"""
+        rng = random.Random(2024)
+        for entry_count in (1, 50, 5000):
+            structure = generate_outline(rng, entry_count)
+            self.assertEqual(parse_outline(render_outline(structure)), structure)
+            self.assertEqual(sum(1 for _ in iter_nodes(structure)), entry_count)
+
+    def test_merging_an_outline_with_itself_is_identity(self):
+        structure = generate_outline(random.Random(7), 2000)
+        self.assertEqual(merge_outlines([structure, structure]), structure)
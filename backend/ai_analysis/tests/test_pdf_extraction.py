@@ -0,0 +1,76 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from ai_analysis.benchmarks.synthetic_pdf import write_synthetic_pdf
+from ai_analysis import pdf_extraction
+from ai_analysis.pdf_extraction import (
+    extract_document, iter_pages, iter_pages_parallel, join_pages, split_page_ranges
+)
+
+
+class PDFExtractionTests(SimpleTestCase):
+    """
+    Tests de l'extraction page par page et des positions de début de page.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.pdf_path = write_synthetic_pdf(os.path.join(cls.tmp_dir.name, 'doc.pdf'), 3, lines_per_page=5)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+        super().tearDownClass()
+
+    def test_iter_pages_is_lazy_and_numbered(self):
+        """Les pages sont produites à la demande, numérotées à partir de 1"""
+        pages = iter_pages(self.pdf_path)
+        page_number, text = next(pages)
+        self.assertEqual(page_number, 1)
+        self.assertIn('1.1 Prescriptions techniques', text)
+        self.assertEqual([number for number, _ in pages], [2, 3])
+
+    def test_page_offsets_map_back_to_pages(self):
+        """Chaque position du texte est rattachée à sa page d'origine"""
+        document = extract_document(self.pdf_path)
+        self.assertEqual(document.page_count, 3)
+        for page_number in (1, 2, 3):
+            start = document.page_offsets[page_number - 1]
+            self.assertEqual(document.page_for_offset(start), page_number)
+            self.assertIn(f'1.{page_number} Prescriptions', document.page_text(page_number))
+
+    def test_join_pages_matches_legacy_output(self):
+        """Le texte assemblé est identique à l'ancienne concaténation"""
+        document = join_pages([(1, 'page un'), (2, 'page deux')])
+        self.assertEqual(document.text, 'page un\npage deux\n')
+        self.assertEqual(document.page_offsets, [0, 8])
+
+    def test_missing_file_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            list(iter_pages('/nonexistent.pdf'))
+
+    def test_parallel_extraction_keeps_page_order(self):
+        """L'extraction parallèle restitue les mêmes pages, dans l'ordre"""
+        serial = list(iter_pages(self.pdf_path))
+        parallel = list(iter_pages_parallel(self.pdf_path, workers=2, min_pages=0))
+        self.assertEqual(parallel, serial)
+
+    def test_extractions_share_one_pool_without_fork(self):
+        """Les extractions successives réutilisent le pool du processus, lancé sans fork"""
+        list(iter_pages_parallel(self.pdf_path, workers=2, min_pages=0))
+        pool = pdf_extraction._get_pool()
+        list(iter_pages_parallel(self.pdf_path, workers=2, min_pages=0))
+        self.assertIs(pdf_extraction._get_pool(), pool)
+        self.assertNotEqual(pool._mp_context.get_start_method(), 'fork')
+
+    def test_split_page_ranges_covers_all_pages(self):
+        ranges = split_page_ranges(401, 8)
+        self.assertEqual(len(ranges), 16)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], 401)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+        self.assertEqual(split_page_ranges(3, 8), [(0, 1), (1, 2), (2, 3)])
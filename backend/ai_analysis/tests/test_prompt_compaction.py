@@ -0,0 +1,79 @@
+from django.test import SimpleTestCase, override_settings
+
+from ai_analysis.benchmarks.synthetic_pdf import RC_CRITERIA, generate_rc_pages
+from ai_analysis.pdf_extraction import join_pages
+from ai_analysis.prompt_compaction import PromptCompactor, compact_document
+
+HEADER = "Communauté d'agglomération du Grand Ouest"
+RUNNING_TITLE = "Marché n° 2024-015 – Règlement de consultation"
+BOILERPLATE = [
+    "Les données à caractère personnel recueillies sont traitées conformément au RGPD.",
+    "Le CCAG-Travaux approuvé par l'arrêté du 30 mars 2021 est applicable.",
+]
+DEROGATION = "Par dérogation à l'article 19 du CCAG-Travaux, les pénalités sont de 500 euros par jour."
+
+
+def build_rc(page_count=12):
+    """
+    RC synthétique avec en-tête, titre courant et pied de page numéroté sur
+    chaque page, et des clauses types en page 2
+    """
+    pages = []
+    for number, lines in enumerate(generate_rc_pages(page_count, lines_per_page=8), 1):
+        if number == 2:
+            lines = lines + BOILERPLATE + [DEROGATION]
+        pages.append((number, '\n'.join(
+            [HEADER, RUNNING_TITLE] + lines + [f'Page {number}/{page_count}']
+        )))
+    return join_pages(pages)
+
+
+class PromptCompactionTests(SimpleTestCase):
+    """
+    Tests de la compaction du texte des RC avant les appels au LLM.
+    """
+    def test_running_headers_and_page_numbers_are_removed(self):
+        text, removed = PromptCompactor().compact(build_rc())
+
+        # La première occurrence de l'en-tête est conservée
+        self.assertEqual(text.count(HEADER), 1)
+        self.assertEqual(text.count('Règlement de consultation'), 1)
+        self.assertNotIn('Page 3/12', text)
+        self.assertEqual(removed['page_numbers'], 12)
+
+    def test_grading_criteria_are_kept(self):
+        text, _ = PromptCompactor().compact(build_rc())
+        for _, criterion in RC_CRITERIA:
+            self.assertIn(criterion, text)
+
+    def test_boilerplate_clauses_are_removed_but_not_derogations(self):
+        text, removed = PromptCompactor().compact(build_rc())
+
+        for clause in BOILERPLATE:
+            self.assertNotIn(clause, text)
+        self.assertIn(DEROGATION, text)
+        self.assertEqual(removed['boilerplate'], 2)
+
+    def test_boilerplate_patterns_are_configurable(self):
+        text, _ = PromptCompactor(patterns=[]).compact(build_rc())
+        self.assertIn(BOILERPLATE[0], text)
+
+    def test_short_documents_keep_their_edge_lines(self):
+        text, removed = PromptCompactor().compact(build_rc(page_count=2))
+        self.assertEqual(text.count(HEADER), 2)
+        self.assertEqual(removed['recurring'], 0)
+
+    def test_token_reduction_is_reported(self):
+        document = build_rc()
+        text, stats = compact_document(document)
+
+        self.assertGreater(stats['tokens_before'], stats['tokens_after'])
+        self.assertGreaterEqual(stats['reduction'], 0.2)
+        self.assertEqual(stats['removed_lines']['page_numbers'], 12)
+
+    @override_settings(AI_PROMPT_COMPACTION=False)
+    def test_compaction_can_be_disabled(self):
+        document = build_rc()
+        text, stats = compact_document(document)
+        self.assertEqual(text, document.text)
+        self.assertEqual(stats['reduction'], 0.0)
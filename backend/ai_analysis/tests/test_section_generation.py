@@ -0,0 +1,152 @@
+import json
+import time
+from datetime import timedelta
+
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
+
+from users.models import User
+from core.models import GenerationGroupee, GenerationIA, Projet, Section
+from ai_analysis.ai_service import AIService, override_ai_service
+from ai_analysis.llm_backends import StubBackend
+from ai_analysis.section_generation import generate_sections, start_generation
+from ai_analysis.tests.base import UnmanagedTablesMixin
+from ai_analysis.tests.test_streaming import parse_sse
+
+LATENCY = 0.2
+
+
+@override_settings(AI_SECTION_GENERATION_CONCURRENCY=40)
+class SectionGenerationTests(UnmanagedTablesMixin, APITransactionTestCase):
+    """
+    Tests de la génération groupée des sections d'un mémoire (transactions
+    validées : les brouillons sont enregistrés par les threads de génération).
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com', password='TestPass123!', role='WRITER'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.projet = Projet.objects.create(
+            titre='Réhabilitation du groupe scolaire', description='Travaux de réhabilitation en site occupé',
+            auteur=self.user, version='1'
+        )
+        # 4 chapitres de 10 sous-sections : 40 sections feuilles
+        self.leaves = []
+        for chapter in range(4):
+            parent = Section.objects.create(
+                titre=f'Chapitre {chapter + 1}', contenu='', projet=self.projet, ordre=chapter * 100
+            )
+            for number in range(10):
+                self.leaves.append(Section.objects.create(
+                    titre=f'Sous-section {chapter + 1}.{number + 1}', contenu='', projet=self.projet,
+                    parent=parent, ordre=chapter * 100 + number + 1
+                ))
+
+    def generate(self, backend, query=''):
+        with override_ai_service(AIService(llm_backend=backend)):
+            response = self.client.post(f'/api/memoires/{self.projet.id}/generate_sections/{query}')
+            events = [(event, json.loads(data)) for event, data in
+                      parse_sse(b''.join(response.streaming_content).decode('utf-8'))]
+        return response, events
+
+    def test_sections_are_generated_concurrently(self):
+        backend = StubBackend(default='Brouillon de la section', latency=LATENCY)
+
+        started = time.perf_counter()
+        response, events = self.generate(backend)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(backend.calls, 40)
+        # Environ la durée de la section la plus lente, pas la somme des 40
+        self.assertLess(elapsed, LATENCY * 10)
+        self.assertEqual(events[0], ('status', {'lot': events[0][1]['lot'], 'total': 40, 'completed': 0, 'resumed': False}))
+        self.assertEqual([event for event, _ in events[1:]], ['section'] * 40 + ['result'])
+        self.assertEqual(events[-1][1]['statut'], 'TERMINEE')
+
+    def test_only_leaf_sections_are_generated(self):
+        self.generate(StubBackend(default='Brouillon'))
+
+        generated = set(GenerationIA.objects.values_list('section_id', flat=True))
+        self.assertEqual(generated, {section.pk for section in self.leaves})
+        lot = GenerationGroupee.objects.get(projet=self.projet)
+        self.assertEqual((lot.statut, lot.terminees, lot.total), ('TERMINEE', 40, 40))
+        self.assertIsNotNone(lot.date_fin)
+
+    def test_interrupted_lot_resumes_without_regenerating_finished_sections(self):
+        lot = GenerationGroupee.objects.create(projet=self.projet, auteur=self.user)
+        for section in self.leaves[:25]:
+            GenerationIA.objects.create(projet=self.projet, section=section, auteur=self.user, lot=lot,
+                                        prompt='prompt', contenu_genere='Déjà généré')
+        # Processus arrêté : le lot n'a plus progressé depuis le délai d'abandon
+        GenerationGroupee.objects.filter(pk=lot.pk).update(
+            date_modification=timezone.now() - timedelta(hours=1)
+        )
+
+        backend = StubBackend(default='Brouillon')
+        _, events = self.generate(backend)
+
+        self.assertEqual(backend.calls, 15)
+        self.assertEqual(events[0][1], {'lot': lot.pk, 'total': 40, 'completed': 25, 'resumed': True})
+        self.assertEqual(GenerationIA.objects.filter(lot=lot).count(), 40)
+        self.assertEqual(events[-1][1]['completed'], 40)
+
+    def test_failed_sections_leave_the_lot_incomplete(self):
+        failing = self.leaves[3].titre
+        backend = StubBackend(default='Brouillon')
+        original = backend.complete
+
+        def complete(messages, **kwargs):
+            if failing in messages[-1]['content']:
+                raise RuntimeError('délai dépassé')
+            return original(messages, **kwargs)
+
+        backend.complete = complete
+        _, events = self.generate(backend)
+
+        self.assertIn(('section_error', {'section': self.leaves[3].pk, 'titre': failing, 'error': 'délai dépassé'}), events)
+        self.assertEqual(events[-1][1]['statut'], 'INCOMPLETE')
+
+        # La reprise ne génère que la section en échec
+        backend.complete = original
+        calls = backend.calls
+        _, events = self.generate(backend)
+        self.assertEqual(backend.calls - calls, 1)
+        self.assertEqual(events[-1][1]['statut'], 'TERMINEE')
+
+    def test_disconnected_client_keeps_the_sections_in_flight(self):
+        """Les brouillons déjà demandés sont enregistrés après la déconnexion et le lot reste repris"""
+        backend = StubBackend(default='Brouillon', latency=LATENCY)
+        lot = start_generation(self.projet, self.user)
+        events = generate_sections(lot, AIService(llm_backend=backend))
+        next(events)
+        self.assertEqual(next(events)[0], 'section')
+        events.close()
+
+        self.assertEqual(GenerationGroupee.objects.get(pk=lot.pk).statut, 'INCOMPLETE')
+        # Chaque section déjà demandée au LLM est enregistrée (celles pas encore commencées sont annulées)
+        deadline = time.monotonic() + 5
+        while GenerationGroupee.objects.get(pk=lot.pk).terminees < backend.calls and time.monotonic() < deadline:
+            time.sleep(0.05)
+        started = backend.calls
+        self.assertEqual(GenerationGroupee.objects.get(pk=lot.pk).terminees, started)
+        self.assertEqual(GenerationIA.objects.filter(lot=lot).count(), started)
+
+        # La reprise ne génère que les sections annulées
+        response, events = self.generate(backend)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(backend.calls, 40)
+        self.assertEqual(events[-1][1]['statut'], 'TERMINEE')
+
+    def test_lot_in_progress_is_rejected(self):
+        GenerationGroupee.objects.create(projet=self.projet, auteur=self.user)
+
+        backend = StubBackend(default='Brouillon')
+        with override_ai_service(AIService(llm_backend=backend)):
+            response = self.client.post(f'/api/memoires/{self.projet.id}/generate_sections/')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(backend.calls, 0)
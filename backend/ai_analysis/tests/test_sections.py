@@ -0,0 +1,66 @@
+from django.test import SimpleTestCase
+
+from ai_analysis.benchmarks.bench_sections import legacy_identify_sections
+from ai_analysis.benchmarks.synthetic_pdf import generate_document_pages, generate_rc_pages
+from ai_analysis.pdf_analyzer import PDFAnalyzer, SectionIndex
+
+TEXT = (
+    "Préambule\n"
+    "1 Objet du marché\n"
+    "Le présent CCTP définit les travaux.\n"
+    "1.1 Consistance des travaux\n"
+    "Terrassements.\n"
+    "1.2 Délais\n"
+    "Six mois.\n"
+    "2 Prescriptions\n"
+    "Matériaux conformes.\n"
+)
+
+
+class SectionIndexTests(SimpleTestCase):
+    """
+    Tests de la détection des sections et de l'index de leurs positions.
+    """
+    def setUp(self):
+        self.analyzer = PDFAnalyzer()
+        # Deux pages : la seconde commence à "1.2 Délais"
+        self.page_offsets = [0, TEXT.index('1.2 Délais')]
+        self.index = self.analyzer.build_section_index(TEXT, self.page_offsets)
+
+    def test_spans_cover_section_bodies_and_subsections(self):
+        start, end, pages = self.index.span('1')
+        self.assertEqual(TEXT[start:end], TEXT[TEXT.index('1 Objet'):TEXT.index('2 Prescriptions')])
+        self.assertEqual(pages, [1, 2])
+        self.assertEqual(self.index.section_text(TEXT, '1.1'), "1.1 Consistance des travaux\nTerrassements.\n")
+        self.assertEqual(self.index.span('2')[1], len(TEXT))
+        self.assertIsNone(self.index.span('9'))
+
+    def test_section_at_returns_the_enclosing_title(self):
+        self.assertIsNone(self.index.section_at(0))
+        self.assertEqual(self.index.section_at(TEXT.index('Six mois'))['number'], '1.2')
+
+    def test_index_survives_serialization(self):
+        restored = SectionIndex([dict(section) for section in self.index.sections])
+        self.assertEqual(restored.span('1.2'), self.index.span('1.2'))
+
+    def test_detection_matches_the_legacy_patterns(self):
+        text = '\n'.join('\n'.join(lines) for lines in generate_document_pages(30, 5))
+        text += '\n  3 Titre indenté\n1.1.1.1 Trop profond\n4\n'
+        self.assertEqual(self.analyzer.identify_sections(text), legacy_identify_sections(text))
+
+    def test_split_sections_preserves_the_text(self):
+        blocks = self.analyzer.split_sections(TEXT)
+        self.assertEqual(blocks[0], 'Préambule')
+        self.assertEqual(len(blocks), 5)
+        self.assertEqual('\n'.join(blocks), TEXT)
+
+
+class SyntheticRCTests(SimpleTestCase):
+    """
+    Tests du RC synthétique des benchmarks.
+    """
+    def test_judgement_article_carries_the_criteria(self):
+        text = '\n'.join('\n'.join(lines) for lines in generate_rc_pages(8, lines_per_page=10))
+        numbers = [section['number'] for section in PDFAnalyzer().identify_sections(text)]
+        self.assertEqual([number for number in numbers if '.' not in number], [str(n) for n in range(1, 9)])
+        self.assertEqual(numbers[5:10], ['5.1', '5.1.1', '5.1.2', '5.1.3', '5.2'])
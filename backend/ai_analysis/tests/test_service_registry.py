@@ -0,0 +1,43 @@
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ai_analysis import ai_service as ai_service_module
+from ai_analysis.ai_service import AIService, get_ai_service, override_ai_service, set_ai_service
+from ai_analysis.api import DocumentAnalysisViewSet
+from ai_analysis.llm_backends import StubBackend
+
+
+class AIServiceRegistryTests(SimpleTestCase):
+    """
+    Tests du service IA partagé par les requêtes d'un worker.
+    """
+    def setUp(self):
+        self.previous = set_ai_service(None)
+
+    def tearDown(self):
+        set_ai_service(self.previous)
+
+    def test_service_is_created_once_across_threads(self):
+        services = []
+        with mock.patch.object(ai_service_module, 'get_llm_backend', return_value=StubBackend()):
+            threads = [threading.Thread(target=lambda: services.append(get_ai_service())) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len({id(service) for service in services}), 1)
+
+    def test_viewsets_share_the_process_service(self):
+        """Chaque requête instancie un viewset, mais pas de nouveau service"""
+        with mock.patch.object(ai_service_module, 'get_llm_backend', return_value=StubBackend()):
+            first, second = DocumentAnalysisViewSet(), DocumentAnalysisViewSet()
+            self.assertIs(first.ai_service, second.ai_service)
+
+    def test_override_swaps_the_service_temporarily(self):
+        stub = AIService(llm_backend=StubBackend())
+        set_ai_service(original := AIService(llm_backend=StubBackend()))
+        with override_ai_service(stub):
+            self.assertIs(DocumentAnalysisViewSet().ai_service, stub)
+        self.assertIs(get_ai_service(), original)
@@ -0,0 +1,150 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from projects.models import Project, ReferenceDocument
+from ai_analysis.ai_service import AIService, get_ai_service
+from ai_analysis.cache import compute_file_hash, store_analysis
+from ai_analysis.models import AnalysisLease
+from ai_analysis.pipeline import rc_analysis_flight
+from ai_analysis.single_flight import SingleFlight
+from ai_analysis.tests.base import UnmanagedTablesMixin
+from ai_analysis.tests.test_cache import ANALYSIS
+from ai_analysis.tests.test_streaming import parse_sse
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, AI_ANALYSIS_LEASE_POLL_SECONDS=0)
+class SingleFlightTests(UnmanagedTablesMixin, APITestCase):
+    """
+    Tests du regroupement des analyses simultanées d'un même RC.
+    L'appel concurrent est simulé par un bail pris par un autre détenteur ;
+    son travail est joué pendant l'attente (time.sleep du module).
+    """
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com', password='TestPass123!', role='WRITER'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Projet test')
+        self.rc = ReferenceDocument.objects.create(
+            project=self.project, type='RC', file=SimpleUploadedFile('rc.pdf', b'%PDF-1.4 contenu')
+        )
+        service = get_ai_service()
+        self.cache_key = (self.project.id, compute_file_hash(self.rc.file.path), service.model,
+                          service.prompt_version)
+        self.url = f'/api/analysis/{self.project.id}/analyze_rc/'
+
+    def _leader(self) -> SingleFlight:
+        """
+        Appel simultané (autre worker) qui détient le bail de l'analyse
+        """
+        leader = rc_analysis_flight(*self.cache_key)
+        self.assertTrue(leader.acquire())
+        self.addCleanup(leader.release)
+        return leader
+
+    def _analyze(self, leader_work):
+        with mock.patch('ai_analysis.text_store.iter_pages_parallel', return_value=[(1, 'texte du RC')]), \
+                mock.patch.object(AIService, 'analyze_text', return_value=ANALYSIS) as analyze_mock, \
+                mock.patch('ai_analysis.single_flight.time.sleep', side_effect=leader_work):
+            response = self.client.post(self.url)
+        return response, analyze_mock
+
+    def test_lease_is_exclusive_until_released(self):
+        first = SingleFlight('rc:test', lambda: None)
+        second = SingleFlight('rc:test', lambda: None)
+
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        first.release()
+        self.assertTrue(second.acquire())
+        second.release()
+        self.assertFalse(AnalysisLease.objects.exists())
+
+    def test_expired_lease_of_a_crashed_leader_is_taken_over(self):
+        crashed = SingleFlight('rc:test', lambda: None)
+        crashed.acquire()
+        AnalysisLease.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        successor = SingleFlight('rc:test', lambda: None)
+        self.assertTrue(successor.acquire())
+        # Le détenteur arrêté ne peut plus libérer le bail repris
+        crashed.release()
+        self.assertEqual(AnalysisLease.objects.get().owner, successor.owner)
+        successor.release()
+
+    def test_concurrent_call_shares_the_leader_result(self):
+        leader = self._leader()
+
+        def leader_work(seconds):
+            store_analysis(*self.cache_key, {'structure': ANALYSIS['structure']}, {'sections': []})
+            leader.release()
+
+        response, analyze_mock = self._analyze(leader_work)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['cached'])
+        self.assertEqual(response.data['analysis']['structure'], ANALYSIS['structure'])
+        analyze_mock.assert_not_called()
+
+    def test_waiting_call_takes_over_when_the_leader_fails(self):
+        leader = self._leader()
+
+        response, analyze_mock = self._analyze(lambda seconds: leader.release())
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['cached'])
+        self.assertEqual(analyze_mock.call_count, 1)
+        self.assertFalse(AnalysisLease.objects.exists())
+
+    @override_settings(AI_ANALYSIS_LEASE_WAIT_SECONDS=0.1)
+    def test_waiting_call_runs_the_analysis_after_the_wait_timeout(self):
+        leader = self._leader()
+
+        response, analyze_mock = self._analyze(lambda seconds: None)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['cached'])
+        self.assertEqual(analyze_mock.call_count, 1)
+        # Le bail du détenteur, toujours à l'œuvre, n'est pas touché
+        self.assertEqual(AnalysisLease.objects.get().owner, leader.owner)
+
+    def test_release_stops_the_heartbeat_before_deleting_the_lease(self):
+        flight = SingleFlight('rc:test', lambda: None, ttl=0.03)
+        self.assertTrue(flight.acquire())
+        heartbeat = flight._heartbeat
+
+        flight.release()
+
+        self.assertFalse(heartbeat.is_alive())
+        self.assertFalse(AnalysisLease.objects.exists())
+
+    def test_stream_reports_the_wait(self):
+        leader = self._leader()
+
+        def leader_work(seconds):
+            store_analysis(*self.cache_key, {'structure': ANALYSIS['structure']}, {'sections': []})
+            leader.release()
+
+        with mock.patch('ai_analysis.single_flight.time.sleep', side_effect=leader_work):
+            response = self.client.get(f'/api/analysis/{self.project.id}/analyze_rc_stream/',
+                                       HTTP_ACCEPT='text/event-stream')
+            events = parse_sse(b''.join(response.streaming_content).decode('utf-8'))
+
+        self.assertEqual(events[0], ('status', '{"step": "waiting"}'))
+        self.assertIn('"cached": true', events[-1][1])
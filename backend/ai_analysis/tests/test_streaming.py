@@ -0,0 +1,132 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from projects.models import Project, ReferenceDocument
+from ai_analysis.ai_service import AIService, override_ai_service
+from ai_analysis.llm_backends import OpenAIBackend, StubBackend
+from ai_analysis.llm_stub_server import StubServer
+from ai_analysis.models import RCAnalysis
+from ai_analysis.tests.base import UnmanagedTablesMixin
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+COMPLETION = (
+    "1. Valeur technique (60 points)\n"
+    "   1.1. Méthodologie (30 points)\n"
+    "      Organisation du chantier\n"
+    "2. Délais d'exécution (40 points)"
+)
+
+MESSAGES = [{'role': 'user', 'content': 'Analyse le RC'}]
+
+
+def parse_sse(body: str):
+    """
+    Découpe un flux Server-Sent Events en liste de (événement, données brutes)
+    """
+    events = []
+    for block in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((fields['event'], fields['data']))
+    return events
+
+
+class StreamingAnalysisTests(SimpleTestCase):
+    """
+    Tests de l'analyse en flux sur le backend local.
+    """
+    def test_stub_stream_rebuilds_the_completion(self):
+        backend = StubBackend(default=COMPLETION)
+        self.assertEqual(''.join(backend.stream(MESSAGES, model='m')), COMPLETION)
+
+    def test_structure_matches_the_non_streamed_analysis(self):
+        service = AIService(llm_backend=StubBackend(default=COMPLETION))
+        events = list(service.stream_analysis('texte du RC'))
+
+        self.assertEqual([event for event, _ in events], ['section'] * 4 + ['result'])
+        self.assertEqual(events[0][1], {'path': [0], 'number': '1', 'title': '1. Valeur technique', 'points': 60})
+        self.assertEqual([data['path'] for _, data in events[:4]], [[0], [0, 0], [0, 0, 0], [1]])
+        self.assertEqual(events[-1][1]['structure'], service._extract_structure(COMPLETION))
+
+
+class OpenAIStreamTests(SimpleTestCase):
+    """
+    Tests du flux HTTP du client asynchrone contre le serveur stub local.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = StubServer(StubBackend(default=COMPLETION, token_latency=0.01)).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def test_stream_over_http_delivers_several_chunks(self):
+        backend = OpenAIBackend(api_key='test', api_base=self.server.api_base)
+        chunks = list(backend.stream(MESSAGES, model='gpt-test'))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(''.join(chunks), COMPLETION)
+        backend.run(backend.aclose())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class AnalyzeRCStreamEndpointTests(UnmanagedTablesMixin, APITestCase):
+    """
+    Tests de l'endpoint Server-Sent Events d'analyse du RC.
+    """
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        """Création d'un projet avec son RC"""
+        self.user = User.objects.create_user(
+            email='test@example.com', password='TestPass123!', role='WRITER'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Projet test')
+        ReferenceDocument.objects.create(
+            project=self.project, type='RC',
+            file=SimpleUploadedFile('rc.pdf', b'%PDF-1.4 contenu')
+        )
+        self.url = f'/api/analysis/{self.project.id}/analyze_rc_stream/'
+
+    def _stream(self):
+        with override_ai_service(AIService(llm_backend=StubBackend(default=COMPLETION))), \
+                mock.patch('ai_analysis.text_store.iter_pages_parallel', return_value=[(1, 'texte du RC')]):
+            response = self.client.get(self.url, HTTP_ACCEPT='text/event-stream')
+            body = b''.join(response.streaming_content).decode('utf-8')
+        return response, parse_sse(body)
+
+    def test_sections_are_streamed_before_the_result(self):
+        response, events = self._stream()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/event-stream'))
+        self.assertEqual(response['X-Accel-Buffering'], 'no')
+        names = [event for event, _ in events]
+        self.assertEqual(names[:2], ['status', 'status'])
+        self.assertLess(names.index('section'), names.index('result'))
+        self.assertEqual(names[-1], 'result')
+        self.assertEqual(RCAnalysis.objects.filter(project=self.project).count(), 1)
+
+    def test_second_stream_is_served_from_cache(self):
+        self._stream()
+        _, events = self._stream()
+        self.assertNotIn('status', [event for event, _ in events])
+        self.assertIn('"cached": true', events[-1][1])
+
+    def test_missing_rc_returns_404(self):
+        ReferenceDocument.objects.filter(project=self.project).delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
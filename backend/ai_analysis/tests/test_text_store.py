@@ -0,0 +1,143 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from projects.models import Project, ReferenceDocument
+from ai_analysis.benchmarks.synthetic_pdf import build_pdf, generate_document_pages
+from ai_analysis.cache import compute_file_hash
+from ai_analysis.models import DocumentText
+from ai_analysis.pipeline import get_rc_document, get_rc_text
+from ai_analysis.tests.base import UnmanagedTablesMixin
+from ai_analysis.text_store import (
+    analyze_reference_document, compute_text_hash, normalize_text, store_document_text
+)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+class NormalizeTextTests(SimpleTestCase):
+    """
+    Tests de la normalisation du texte des pages.
+    """
+    def test_spaces_and_blank_lines_are_collapsed(self):
+        raw = 'Article  1 :\tObjet   \r\n\n\n\nSuite\n'
+        self.assertEqual(normalize_text(raw), 'Article 1 : Objet\n\nSuite')
+
+    def test_text_hash_ignores_layout_and_case(self):
+        self.assertEqual(compute_text_hash('Article 1 :\nObjet'), compute_text_hash('ARTICLE 1 : objet '))
+        self.assertNotEqual(compute_text_hash('Article 1'), compute_text_hash('Article 2'))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, AI_ANALYSIS_JOB_MODE='eager')
+class DocumentTextStoreTests(UnmanagedTablesMixin, TestCase):
+    """
+    Tests du stockage du texte extrait au dépôt des documents de référence.
+    """
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.project = Project.objects.create(name='Projet test')
+        self.pdf = build_pdf(generate_document_pages(3, lines_per_page=5))
+
+    def _upload(self, content: bytes, doc_type: str = 'RC', project=None) -> ReferenceDocument:
+        with self.captureOnCommitCallbacks(execute=True):
+            return ReferenceDocument.objects.create(
+                project=project or self.project, type=doc_type,
+                file=SimpleUploadedFile('document.pdf', content)
+            )
+
+    def test_text_is_stored_after_commit(self):
+        """L'extraction est programmée après la validation de la transaction, hors de la requête"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            document = ReferenceDocument.objects.create(
+                project=self.project, type='CCTP', file=SimpleUploadedFile('document.pdf', self.pdf)
+            )
+        self.assertFalse(DocumentText.objects.filter(document=document).exists())
+
+        with mock.patch('ai_analysis.jobs._get_executor') as executor:
+            with override_settings(AI_ANALYSIS_JOB_MODE='thread'):
+                for callback in callbacks:
+                    callback()
+        executor.return_value.submit.assert_called_once()
+
+    def test_text_is_stored_at_upload(self):
+        """Le dépôt enregistre le texte compressé, les pages et les sections"""
+        document = self._upload(self.pdf, doc_type='CCTP')
+
+        stored = DocumentText.objects.get(document=document)
+        self.assertEqual(len(stored.page_offsets), 3)
+        self.assertIn('1.1 Prescriptions techniques', stored.text)
+        self.assertEqual(stored.char_count, len(stored.text))
+        self.assertLess(len(bytes(stored.compressed_text)), stored.char_count)
+        self.assertTrue(any(section['number'] == '1.1' for section in stored.sections))
+
+    def test_pipeline_reads_stored_text_without_parsing_pdf(self):
+        """Le pipeline lit le texte stocké sans réextraire le PDF"""
+        self._upload(self.pdf)
+        rc_doc = get_rc_document(self.project.id)
+        stored = DocumentText.objects.get(document=rc_doc)
+
+        with mock.patch('ai_analysis.text_store.iter_pages_parallel') as pages:
+            document = get_rc_text(rc_doc, stored.content_hash)
+
+        pages.assert_not_called()
+        self.assertEqual(document.text, stored.text)
+        self.assertEqual(document.page_offsets, stored.page_offsets)
+
+    def test_unchanged_file_is_not_extracted_again(self):
+        document = self._upload(self.pdf)
+        with mock.patch('ai_analysis.text_store.iter_pages_parallel') as pages:
+            store_document_text(document)
+            analysis = analyze_reference_document(document)
+        pages.assert_not_called()
+        self.assertEqual(analysis['page_offsets'], DocumentText.objects.get(document=document).page_offsets)
+
+    def test_pipeline_stores_text_not_yet_extracted(self):
+        """Avant l'enregistrement différé, le pipeline extrait et enregistre le texte comme au dépôt"""
+        with self.captureOnCommitCallbacks():
+            ReferenceDocument.objects.create(
+                project=self.project, type='RC', file=SimpleUploadedFile('document.pdf', self.pdf)
+            )
+        rc_doc = get_rc_document(self.project.id)
+        self.assertFalse(DocumentText.objects.filter(document=rc_doc).exists())
+
+        document = get_rc_text(rc_doc, compute_file_hash(rc_doc.file.path))
+
+        stored = DocumentText.objects.get(document=rc_doc)
+        self.assertEqual(document.text, stored.text)
+        self.assertEqual(document.page_offsets, stored.page_offsets)
+        self.assertEqual(len(document.page_offsets), 3)
+
+    def test_identical_file_of_another_project_is_not_extracted_again(self):
+        """Le RC d'un autre lot du même appel d'offres reprend le texte déjà extrait"""
+        first = DocumentText.objects.get(document=self._upload(self.pdf))
+        with mock.patch('ai_analysis.text_store.iter_pages_parallel') as pages:
+            document = self._upload(self.pdf, project=Project.objects.create(name='Lot 2'))
+        pages.assert_not_called()
+
+        shared = DocumentText.objects.get(document=document)
+        self.assertEqual(shared.dedup_source, 'file')
+        self.assertEqual(shared.text, first.text)
+        self.assertEqual(shared.text_hash, first.text_hash)
+        self.assertEqual(shared.sections, first.sections)
+
+    def test_replaced_document_records_changed_pages_and_sections(self):
+        """Un RC modificatif relève les pages et sections modifiées"""
+        pages = generate_document_pages(3, lines_per_page=5)
+        document = self._upload(build_pdf(pages))
+
+        pages[1] = pages[1] + ['Clause ajoutée par le RC modificatif.']
+        document.file = SimpleUploadedFile('document_v2.pdf', build_pdf(pages))
+        with self.captureOnCommitCallbacks(execute=True):
+            document.save()
+
+        diff = DocumentText.objects.get(document=document).revision_diff
+        self.assertEqual(diff['pages'], {'changed': [2], 'removed': []})
+        self.assertEqual([section['number'] for section in diff['sections']['changed']], ['1.2'])
+        self.assertEqual(diff['sections']['added'], [])
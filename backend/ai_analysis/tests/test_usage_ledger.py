@@ -0,0 +1,186 @@
+import asyncio
+import json
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from projects.models import Project, ReferenceDocument
+from ai_analysis.ai_service import AIService
+from ai_analysis.llm_backends import LLMError, MeteredBackend, PolicyBackend, RateLimitedBackend, StubBackend
+from ai_analysis.llm_dispatcher import LLMDispatcher, MemoryRateStore
+from ai_analysis.llm_policy import CallPolicy, PolicyMetrics
+from ai_analysis.models import LLMUsage
+from ai_analysis.tests.base import UnmanagedTablesMixin
+from ai_analysis.tests.test_cache import ANALYSIS
+from ai_analysis.usage_ledger import estimate_cost, llm_usage, usage_totals
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+MESSAGES = [{'role': 'user', 'content': 'Analyse le RC'}]
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, AI_USAGE_LEDGER_MODE='eager')
+class UsageLedgerTests(UnmanagedTablesMixin, APITestCase):
+    """
+    Tests du registre des appels au LLM et de ses agrégats.
+    """
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com', password='TestPass123!', role='WRITER'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Groupe scolaire')
+        self.other = Project.objects.create(name='Gymnase')
+
+    def test_calls_are_recorded_with_project_and_tokens(self):
+        backend = MeteredBackend(StubBackend())
+        with llm_usage(self.project.id, 'analyze_rc'):
+            response = backend.complete(MESSAGES, model='gpt-4-turbo-preview')
+
+        usage = LLMUsage.objects.get()
+        self.assertEqual((usage.project_id, usage.operation), (self.project.id, 'analyze_rc'))
+        self.assertEqual(usage.model_name, 'gpt-4-turbo-preview')
+        self.assertEqual((usage.prompt_tokens, usage.completion_tokens),
+                         (response.prompt_tokens, response.completion_tokens))
+        self.assertAlmostEqual(usage.cost, estimate_cost('gpt-4-turbo', response.prompt_tokens,
+                                                         response.completion_tokens))
+        self.assertTrue(usage.success)
+        self.assertFalse(usage.cache_hit)
+
+    def test_failed_calls_are_recorded(self):
+        backend = MeteredBackend(StubBackend())
+        with mock.patch.object(StubBackend, 'complete', side_effect=LLMError('quota dépassé', status=429)):
+            with self.assertRaises(LLMError):
+                backend.complete(MESSAGES, model='m')
+
+        usage = LLMUsage.objects.get()
+        self.assertFalse(usage.success)
+        self.assertEqual(usage.error, 'quota dépassé')
+
+    @override_settings(AI_USAGE_LEDGER_MODE='thread')
+    def test_thread_mode_writes_after_commit_with_sqlite(self):
+        """Avec SQLite, l'entrée est écrite par le thread appelant à la validation de la transaction"""
+        backend = MeteredBackend(StubBackend())
+        with self.captureOnCommitCallbacks(execute=True):
+            backend.complete(MESSAGES, model='m')
+            self.assertFalse(LLMUsage.objects.exists())
+
+        self.assertEqual(LLMUsage.objects.count(), 1)
+        self.assertTrue(LLMUsage.objects.get().success)
+
+    def test_queue_time_of_the_dispatcher_is_recorded(self):
+        dispatcher = LLMDispatcher(MemoryRateStore(60, 100000))
+        original = dispatcher.acquire
+
+        async def acquire(tokens, priority=None):
+            await asyncio.sleep(0.05)
+            await original(tokens, priority)
+
+        dispatcher.acquire = acquire
+        backend = MeteredBackend(RateLimitedBackend(StubBackend(latency=0.02), dispatcher))
+        backend.complete(MESSAGES, model='m')
+        ''.join(backend.stream(MESSAGES, model='m'))
+
+        complete, stream = LLMUsage.objects.order_by('created_at')
+        for usage in (complete, stream):
+            self.assertGreaterEqual(usage.queue_time, 0.05)
+            self.assertGreaterEqual(usage.duration, usage.queue_time + 0.02)
+        self.assertTrue(stream.streamed)
+        self.assertGreater(stream.completion_tokens, 0)
+
+    def test_retries_and_hedges_are_recorded(self):
+        stub = StubBackend(latency=0.05, faults=[503])
+        policy = CallPolicy(deadline=5, attempt_timeout=1, max_retries=3, retry_base_delay=0.01,
+                            retry_max_delay=0.05, hedge=True, hedge_min_samples=5, fallback_model='')
+        dispatcher = LLMDispatcher(MemoryRateStore(600, 100000))
+        backend = MeteredBackend(PolicyBackend(RateLimitedBackend(stub, dispatcher), policy, PolicyMetrics()))
+        response = backend.complete(MESSAGES, model='m')
+        for _ in range(4):
+            backend.complete(MESSAGES, model='m')
+        # Première requête bloquée : le doublon lancé après le p95 répond
+        stub.faults = [5.0]
+        backend.complete(MESSAGES, model='m')
+
+        retried, *_, hedged = LLMUsage.objects.order_by('created_at', 'id')
+        self.assertEqual((retried.attempts, retried.hedges), (2, 0))
+        self.assertEqual((hedged.attempts, hedged.hedges), (2, 1))
+        # Le prompt de la requête perdante est facturé
+        self.assertEqual(hedged.prompt_tokens, 2 * response.prompt_tokens)
+        self.assertEqual(usage_totals()['attempts'], 8)
+
+    def test_cache_hits_are_recorded_without_tokens(self):
+        ReferenceDocument.objects.create(
+            project=self.project, type='RC', file=SimpleUploadedFile('rc.pdf', b'%PDF-1.4 contenu')
+        )
+        url = f'/api/analysis/{self.project.id}/analyze_rc/'
+        with mock.patch('ai_analysis.text_store.iter_pages_parallel', return_value=[(1, 'texte du RC')]), \
+                mock.patch.object(AIService, 'analyze_text', return_value=ANALYSIS):
+            self.client.post(url)
+            response = self.client.post(url)
+
+        self.assertTrue(response.data['cached'])
+        usage = LLMUsage.objects.get(cache_hit=True)
+        self.assertEqual((usage.project_id, usage.operation), (self.project.id, 'analyze_rc'))
+        self.assertEqual(usage.prompt_tokens + usage.completion_tokens, 0)
+
+    def _fill_ledger(self):
+        LLMUsage.objects.bulk_create([
+            LLMUsage(project=self.project, operation='analyze_rc', model_name='gpt-4', prompt_tokens=1000,
+                     completion_tokens=500, duration=4.0, cost=0.06),
+            LLMUsage(project=self.project, operation='analyze_rc', model_name='gpt-4', cache_hit=True),
+            LLMUsage(project=self.other, operation='analyze_rc', model_name='gpt-4', prompt_tokens=8000,
+                     completion_tokens=1000, duration=12.0, queue_time=2.0, cost=0.3),
+        ])
+
+    def test_rollup_by_project_lists_the_most_expensive_first(self):
+        self._fill_ledger()
+
+        response = self.client.get('/api/llm-usage/', {'group_by': 'project'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = response.data['rows']
+        self.assertEqual([row['project_name'] for row in rows], ['Gymnase', 'Groupe scolaire'])
+        self.assertEqual(rows[1]['calls'], 1)
+        self.assertEqual(rows[1]['cache_hit_rate'], 0.5)
+        self.assertEqual(rows[0]['total_tokens'], 9000)
+        self.assertEqual(rows[0]['avg_queue_time'], 2.0)
+
+    def test_totals_and_invalid_grouping(self):
+        self._fill_ledger()
+
+        totals = self.client.get('/api/llm-usage/totals/').data
+        self.assertEqual((totals['calls'], totals['cache_hits']), (2, 1))
+        self.assertAlmostEqual(totals['cost'], 0.36)
+        self.assertEqual((totals['total_duration'], totals['avg_duration']), (16.0, 8.0))
+        self.assertEqual(totals['total_queue_time'], 2.0)
+        self.assertEqual(self.client.get('/api/llm-usage/', {'group_by': 'tender'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    def test_report_command_rolls_up_per_day(self):
+        self._fill_ledger()
+
+        out = StringIO()
+        call_command('llm_usage_report', '--by', 'day', '--json', stdout=out)
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(len(report['rows']), 1)
+        self.assertEqual(report['rows'][0]['calls'], 2)
+        self.assertEqual(report['totals']['total_tokens'], 10500)
+        self.assertEqual(report['rows'][0]['total_duration'], 16.0)
+
+        out = StringIO()
+        call_command('llm_usage_report', '--by', 'model', stdout=out)
+        self.assertIn('durée totale (s)', out.getvalue())
@@ -0,0 +1,206 @@
+"""
+text_store.py
+Stockage du texte extrait des documents de référence
+Le texte d'un RC ou d'un CCTP est extrait une seule fois, au dépôt du
+fichier, puis enregistré compressé dans DocumentText avec les positions de
+début de page et les sections détectées. Les étapes suivantes (analyse IA,
+sommaire, analyse des sections) lisent ce texte au lieu de réanalyser le PDF.
+
+Un fichier déjà déposé dans un autre projet (lots d'un même appel
+d'offres) n'est pas réextrait : son texte est copié. L'empreinte du texte
+normalisé (text_hash) rapproche en outre deux fichiers différents au
+contenu identique, pour le partage des analyses (voir cache.py).
+
+Lorsqu'un document est remplacé (RC modificatif), les pages et sections
+modifiées par rapport au texte précédent sont enregistrées (revision_diff).
+"""
+
+import hashlib
+import logging
+import re
+import zlib
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+
+from .cache import compute_file_hash
+from .models import DocumentText
+from .pdf_analyzer import PDFAnalyzer, SectionIndex
+from .pdf_extraction import ExtractedDocument, iter_pages_parallel, join_pages
+
+logger = logging.getLogger(__name__)
+
+# Niveau de compression zlib : bon compromis entre taille et temps de compression
+COMPRESSION_LEVEL = 6
+
+HORIZONTAL_SPACE_RE = re.compile(r'[ \t\u00a0\u202f]+')
+BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalise le texte d'une page : fins de ligne unifiées, espaces
+    (y compris insécables) fusionnés, espaces de fin de ligne et lignes
+    vides successives supprimés
+    """
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    lines = [HORIZONTAL_SPACE_RE.sub(' ', line).rstrip() for line in text.split('\n')]
+    return BLANK_LINES_RE.sub('\n\n', '\n'.join(lines)).strip('\n')
+
+
+def compute_text_hash(text: str) -> str:
+    """
+    Empreinte SHA-256 du texte, insensible aux espaces, aux retours à la
+    ligne et à la casse (deux exports PDF d'un même RC ont la même empreinte)
+    """
+    canonical = ' '.join(text.split()).casefold()
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def section_hashes(text: str, sections: List[Dict]) -> Dict[str, Dict]:
+    """
+    Empreinte du texte propre de chaque section (du titre au titre suivant,
+    sous-sections exclues), par numéro : une modification ne touche ainsi
+    que la section qui la contient
+    """
+    ordered = sorted(sections, key=lambda section: section['start'])
+    ends = [section['start'] for section in ordered[1:]] + [len(text)]
+    hashes = {}
+    for section, end in zip(ordered, ends):
+        hashes.setdefault(section['number'], {
+            'title': section['title'],
+            'hash': compute_text_hash(text[section['start']:end]),
+        })
+    return hashes
+
+
+def diff_revisions(previous: ExtractedDocument, previous_sections: List[Dict],
+                   current: ExtractedDocument, current_sections: List[Dict]) -> Dict:
+    """
+    Compare deux versions d'un document page par page et section par section :
+    {'pages': {'changed': [pages nouvelles ou modifiées], 'removed': [pages
+    supprimées de la version précédente]}, 'sections': {'changed', 'added',
+    'removed': [{'number', 'title'}]}}
+    """
+    previous_pages = [compute_text_hash(previous.page_text(page)) for page in range(1, previous.page_count + 1)]
+    current_pages = [compute_text_hash(current.page_text(page)) for page in range(1, current.page_count + 1)]
+    changed_pages, removed_pages = [], []
+    matcher = SequenceMatcher(a=previous_pages, b=current_pages, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        changed_pages.extend(range(new_start + 1, new_end + 1))
+        if tag == 'delete':
+            removed_pages.extend(range(old_start + 1, old_end + 1))
+
+    before = section_hashes(previous.text, previous_sections)
+    after = section_hashes(current.text, current_sections)
+
+    def describe(numbers, hashes):
+        return [{'number': number, 'title': hashes[number]['title']} for number in numbers]
+
+    return {
+        'pages': {'changed': changed_pages, 'removed': removed_pages},
+        'sections': {
+            'changed': describe([n for n in after if n in before and after[n]['hash'] != before[n]['hash']], after),
+            'added': describe([n for n in after if n not in before], after),
+            'removed': describe([n for n in before if n not in after], before),
+        },
+    }
+
+
+def to_extracted_document(stored: DocumentText) -> ExtractedDocument:
+    """
+    Reconstitue le document extrait (texte et positions de page) depuis le stockage
+    """
+    return ExtractedDocument(stored.text, list(stored.page_offsets))
+
+
+def to_section_index(stored: DocumentText) -> SectionIndex:
+    """
+    Reconstitue l'index des sections (positions et pages) depuis le stockage
+    """
+    return SectionIndex(stored.sections)
+
+
+def store_document_text(document, file_hash: Optional[str] = None) -> DocumentText:
+    """
+    Extrait le texte d'un document de référence et l'enregistre dans DocumentText.
+    Si le texte stocké correspond déjà au fichier, il est retourné sans
+    réextraction ; un fichier identique déjà déposé ailleurs est copié.
+    """
+    path = document.file.path
+    file_hash = file_hash or compute_file_hash(path)
+
+    existing = DocumentText.objects.filter(document=document).first()
+    if existing and existing.content_hash == file_hash:
+        return existing
+
+    donor = DocumentText.objects.filter(content_hash=file_hash).exclude(document=document).first()
+    if donor:
+        text, page_offsets, sections = donor.text, donor.page_offsets, donor.sections
+        text_hash, compressed_text = donor.text_hash, donor.compressed_text
+        dedup_source = 'file'
+    else:
+        pages = ((number, normalize_text(page)) for number, page in iter_pages_parallel(path))
+        extracted = join_pages(pages)
+        text, page_offsets = extracted.text, extracted.page_offsets
+        sections = PDFAnalyzer().build_section_index(text, page_offsets).sections
+        text_hash = compute_text_hash(text)
+        compressed_text = zlib.compress(text.encode('utf-8'), COMPRESSION_LEVEL)
+        dedup_source = ''
+
+    # Document remplacé : pages et sections modifiées depuis le fichier précédent
+    revision_diff = {}
+    if existing:
+        revision_diff = {
+            'previous_hash': existing.content_hash,
+            **diff_revisions(to_extracted_document(existing), existing.sections,
+                             ExtractedDocument(text, page_offsets), sections),
+        }
+
+    stored, _ = DocumentText.objects.update_or_create(
+        document=document,
+        defaults={
+            'content_hash': file_hash,
+            'text_hash': text_hash,
+            'compressed_text': compressed_text,
+            'page_offsets': page_offsets,
+            'sections': sections,
+            'char_count': len(text),
+            'revision_diff': revision_diff,
+            'dedup_source': dedup_source,
+        }
+    )
+    if donor:
+        logger.info(f"Texte du document {document.pk} repris du document {donor.document_id} (fichier identique)")
+    else:
+        logger.info(
+            f"Texte du document {document.pk} enregistré : {len(page_offsets)} pages, "
+            f"{len(text)} caractères, {len(sections)} sections"
+        )
+    return stored
+
+
+def get_document_text(document, file_hash: Optional[str] = None) -> Optional[DocumentText]:
+    """
+    Retourne le texte stocké d'un document, ou None s'il est absent ou périmé
+    (empreinte différente de celle du fichier actuel)
+    """
+    stored = DocumentText.objects.filter(document=document).first()
+    if stored is None:
+        return None
+    file_hash = file_hash or compute_file_hash(document.file.path)
+    if stored.content_hash != file_hash:
+        return None
+    return stored
+
+
+def analyze_reference_document(document) -> Dict:
+    """
+    Analyse un document de référence (sections, contenu) à partir du texte
+    stocké, enregistré au besoin
+    """
+    stored = get_document_text(document) or store_document_text(document)
+    return PDFAnalyzer().analyze_document(
+        document.file.path, document=to_extracted_document(stored), sections=stored.sections
+    )
@@ -5,13 +5,19 @@ Configuration des URLs pour l'API d'analyse
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .api import DocumentAnalysisViewSet
+from .api import (
+    DocumentAnalysisViewSet, AnalysisJobViewSet, LLMUsageViewSet, MemoireGenerationViewSet, ModelRegistryViewSet
+)
 
 # Création du routeur
 router = DefaultRouter()
 
 # Enregistrement des routes pour l'analyse
 router.register(r'analysis', DocumentAnalysisViewSet, basename='document-analysis')
+router.register(r'analysis-jobs', AnalysisJobViewSet, basename='analysis-job')
+router.register(r'analysis-models', ModelRegistryViewSet, basename='analysis-model')
+router.register(r'memoires', MemoireGenerationViewSet, basename='memoire-generation')
+router.register(r'llm-usage', LLMUsageViewSet, basename='llm-usage')
 
 # Liste des URLs de l'application
 urlpatterns = [
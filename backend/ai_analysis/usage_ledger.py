@@ -0,0 +1,307 @@
+"""
+usage_ledger.py
+Registre des appels au LLM (modèle LLMUsage)
+Chaque appel (voir MeteredBackend dans llm_backends) est enregistré avec ses
+tokens, sa durée, son attente dans la file du répartiteur, les requêtes
+envoyées au fournisseur (nouvelles tentatives et doublons), le modèle, le
+projet et l'opération du contexte (llm_usage), et son coût estimé
+(AI_LLM_PRICING). Les analyses servies depuis le cache sont enregistrées
+sans appel (cache_hit).
+
+Les entrées sont écrites en arrière-plan pour ne jamais allonger les requêtes
+(AI_USAGE_LEDGER_MODE) :
+- 'thread' : file en mémoire vidée par lots par un thread d'écriture ;
+  avec SQLite, qui n'accepte qu'un écrivain à la fois, l'entrée est écrite
+  dans le thread appelant après la validation de sa transaction ;
+- 'eager' : écriture immédiate (tests) ;
+- 'off' : aucun enregistrement.
+Une écriture en échec est journalisée sans interrompre l'appel.
+
+usage_rollup et usage_totals agrègent le registre par jour, projet, modèle
+ou opération (endpoint llm-usage, commande llm_usage_report).
+"""
+
+import atexit
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from contextvars import Context, ContextVar, copy_context
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import LLMUsage
+
+logger = logging.getLogger(__name__)
+
+# Regroupements possibles des agrégats : champs de regroupement et tri
+ROLLUP_GROUPS = {
+    'day': (('day',), 'day'),
+    'project': (('project_id', 'project__name'), '-cost'),
+    'model': (('model_name',), '-cost'),
+    'operation': (('operation',), '-cost'),
+}
+
+# Projet et opération des appels faits dans ce contexte (transmis à la boucle des backends)
+_scope: ContextVar[Dict] = ContextVar('llm_usage_scope', default={})
+# Mesures de l'appel en cours, complétées par le répartiteur (attente dans la file)
+# et par la politique des appels (requêtes envoyées)
+_call_metrics: ContextVar[Optional[Dict]] = ContextVar('llm_call_metrics', default=None)
+
+
+@contextmanager
+def llm_usage(project_id=None, operation: str = ''):
+    """
+    Attribue les appels au LLM faits dans ce contexte à un projet et à une opération
+    """
+    token = _scope.set({'project_id': project_id, 'operation': operation})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def current_usage_scope() -> Dict:
+    return _scope.get()
+
+
+def call_context() -> Tuple[Context, Dict]:
+    """
+    Copie du contexte courant dans laquelle exécuter un appel, et ses mesures
+    que le répartiteur et la politique des appels complètent (note_queue_time,
+    note_attempt). Un appel en flux reste ainsi mesuré à part du code qui
+    consomme le flux.
+    """
+    metrics = {'queue_time': 0.0, 'attempts': 0, 'hedges': 0}
+    context = copy_context()
+    context.run(_call_metrics.set, metrics)
+    return context, metrics
+
+
+def note_queue_time(seconds: float):
+    """
+    Ajoute l'attente dans la file du répartiteur aux mesures de l'appel en cours
+    """
+    metrics = _call_metrics.get()
+    if metrics is not None:
+        metrics['queue_time'] += seconds
+
+
+def note_attempt(hedge: bool = False):
+    """
+    Compte une requête envoyée pour l'appel en cours : tentative, ou doublon
+    d'une tentative trop lente (hedge)
+    """
+    metrics = _call_metrics.get()
+    if metrics is not None:
+        metrics['attempts'] += 1
+        if hedge:
+            metrics['hedges'] += 1
+
+
+def estimate_cost(model_name: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """
+    Coût estimé d'un appel d'après AI_LLM_PRICING (prix pour 1000 tokens du
+    prompt et de la réponse, par préfixe de nom de modèle, le plus long l'emportant)
+    """
+    prefixes = [prefix for prefix in settings.AI_LLM_PRICING if model_name.startswith(prefix)]
+    if not prefixes:
+        return 0.0
+    prompt_price, completion_price = settings.AI_LLM_PRICING[max(prefixes, key=len)]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+class UsageLedger:
+    """
+    Écrit les entrées du registre, immédiatement ou par lots depuis un thread dédié
+    """
+
+    def __init__(self, mode: str = 'thread', batch_size: int = 100, flush_interval: float = 2.0):
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def record(self, entry: Dict):
+        if self.mode == 'off':
+            return
+        if self.mode == 'eager':
+            self._write([entry])
+            return
+        if connection.vendor == 'sqlite':
+            # Un thread d'écriture concurrent verrouillerait les tables de la requête en cours
+            transaction.on_commit(lambda: self._write([entry]))
+            return
+        self._queue.put(entry)
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='llm-usage-ledger', daemon=True)
+                self._thread.start()
+
+    def _drain(self, first: Optional[Dict] = None) -> List[Dict]:
+        entries = [first] if first is not None else []
+        while len(entries) < self.batch_size:
+            try:
+                entries.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return entries
+
+    def _write(self, entries: List[Dict]):
+        if not entries:
+            return
+        with self._write_lock:
+            try:
+                LLMUsage.objects.bulk_create([LLMUsage(**entry) for entry in entries])
+            except Exception as e:
+                logger.warning(f"Échec de l'écriture de {len(entries)} entrées du registre LLM : {str(e)}")
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            self._write(self._drain(first))
+            close_old_connections()
+
+    def flush(self):
+        """
+        Écrit dans le thread appelant les entrées en attente (tests, arrêt du processus)
+        """
+        entries = self._drain()
+        while entries:
+            self._write(entries)
+            entries = self._drain()
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_usage_ledger() -> UsageLedger:
+    """
+    Retourne le registre partagé du processus (créé au premier appel)
+    """
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = UsageLedger(
+                mode=settings.AI_USAGE_LEDGER_MODE,
+                batch_size=settings.AI_USAGE_LEDGER_BATCH_SIZE,
+                flush_interval=settings.AI_USAGE_LEDGER_FLUSH_SECONDS,
+            )
+            atexit.register(_ledger.flush)
+        # Le mode peut être changé à chaud (override_settings dans les tests)
+        _ledger.mode = settings.AI_USAGE_LEDGER_MODE
+        return _ledger
+
+
+def record_usage(model_name: str = '', prompt_tokens: int = 0, completion_tokens: int = 0,
+                 duration: float = 0.0, queue_time: float = 0.0, cache_hit: bool = False,
+                 streamed: bool = False, error: str = '', project_id=None, operation: Optional[str] = None,
+                 attempts: int = 1, hedges: int = 0):
+    """
+    Enregistre un appel au LLM (ou une analyse servie depuis le cache) ; le
+    projet et l'opération sont ceux du contexte (llm_usage) s'ils ne sont pas fournis
+    """
+    scope = current_usage_scope()
+    get_usage_ledger().record({
+        'project_id': project_id if project_id is not None else scope.get('project_id'),
+        'operation': operation if operation is not None else scope.get('operation', ''),
+        'model_name': model_name,
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'duration': round(duration, 4),
+        'queue_time': round(queue_time, 4),
+        'attempts': 0 if cache_hit else attempts,
+        'hedges': hedges,
+        'cost': estimate_cost(model_name, prompt_tokens, completion_tokens),
+        'cache_hit': cache_hit,
+        'streamed': streamed,
+        'success': not error,
+        'error': error[:1000],
+        'created_at': timezone.now(),
+    })
+
+
+def _filtered(since: Optional[date] = None, until: Optional[date] = None, project_id=None):
+    queryset = LLMUsage.objects.all()
+    if since:
+        queryset = queryset.filter(created_at__date__gte=since)
+    if until:
+        queryset = queryset.filter(created_at__date__lte=until)
+    if project_id:
+        queryset = queryset.filter(project_id=project_id)
+    return queryset
+
+
+def _aggregates() -> Dict:
+    llm_calls = Q(cache_hit=False)
+    return {
+        'calls': Count('id', filter=llm_calls),
+        'cache_hits': Count('id', filter=Q(cache_hit=True)),
+        'errors': Count('id', filter=Q(success=False)),
+        'attempts': Sum('attempts'),
+        'hedges': Sum('hedges'),
+        'prompt_tokens': Sum('prompt_tokens'),
+        'completion_tokens': Sum('completion_tokens'),
+        'cost': Sum('cost'),
+        # Alias distincts des champs : 'duration' masquerait le champ dans Avg('duration')
+        'total_duration': Sum('duration'),
+        'avg_duration': Avg('duration', filter=llm_calls),
+        'max_duration': Max('duration'),
+        'total_queue_time': Sum('queue_time'),
+        'avg_queue_time': Avg('queue_time', filter=llm_calls),
+    }
+
+
+def _clean(row: Dict) -> Dict:
+    row = {key: (0 if value is None and key not in ('project_id', 'project__name') else value)
+           for key, value in row.items()}
+    for key in ('cost', 'total_duration', 'avg_duration', 'max_duration', 'total_queue_time', 'avg_queue_time'):
+        row[key] = round(row[key], 4)
+    row['total_tokens'] = row['prompt_tokens'] + row['completion_tokens']
+    requests = row['calls'] + row['cache_hits']
+    row['cache_hit_rate'] = round(row['cache_hits'] / requests, 3) if requests else 0.0
+    if 'day' in row:
+        row['day'] = row['day'].isoformat()
+    if 'project__name' in row:
+        row['project_name'] = row.pop('project__name')
+    return row
+
+
+def usage_rollup(group_by: str = 'day', since: Optional[date] = None, until: Optional[date] = None,
+                 project_id=None) -> List[Dict]:
+    """
+    Agrège le registre par jour, projet, modèle ou opération : nombre d'appels
+    et d'analyses servies depuis le cache, erreurs, tokens, coût, durées et
+    attentes. Les projets sont triés du plus coûteux au moins coûteux.
+    """
+    if group_by not in ROLLUP_GROUPS:
+        raise ValueError(f"Regroupement inconnu : {group_by} (valeurs possibles : {', '.join(ROLLUP_GROUPS)})")
+    fields, ordering = ROLLUP_GROUPS[group_by]
+    queryset = _filtered(since, until, project_id)
+    if group_by == 'day':
+        queryset = queryset.annotate(day=TruncDate('created_at'))
+    rows = queryset.order_by().values(*fields).annotate(**_aggregates()).order_by(ordering)
+    return [_clean(row) for row in rows]
+
+
+def usage_totals(since: Optional[date] = None, until: Optional[date] = None, project_id=None) -> Dict:
+    """
+    Totaux du registre sur la période (mêmes agrégats que usage_rollup)
+    """
+    return _clean(_filtered(since, until, project_id).aggregate(**_aggregates()))
@@ -1,3 +1,11 @@
 """
 Package principal du projet Django
-""" 
\ No newline at end of file
+"""
+
+# Celery est optionnel : sans lui, les jobs d'analyse tournent dans un pool de threads
+try:
+    from .celery import app as celery_app
+except ImportError:
+    celery_app = None
+
+__all__ = ('celery_app',)
@@ -0,0 +1,14 @@
+"""
+Configuration Celery pour le projet MemTech
+Les workers se lancent avec : celery -A backend worker
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+app = Celery('backend')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -179,6 +179,142 @@ DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@memtech.fr')
 # Configuration OpenAI
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4-turbo-preview') 
+OPENAI_API_BASE = os.getenv('OPENAI_API_BASE', 'https://api.openai.com/v1')
+
+# Backend LLM : 'openai' (client asynchrone avec pool de connexions) ou
+# 'stub' (réponses préenregistrées rejouées localement, pour les tests et benchmarks).
+# Le pool de connexions doit couvrir les appels simultanés de la génération groupée.
+AI_LLM_BACKEND = os.getenv('AI_LLM_BACKEND', 'openai')
+AI_LLM_POOL_SIZE = int(os.getenv('AI_LLM_POOL_SIZE', '40'))
+AI_LLM_TIMEOUT = float(os.getenv('AI_LLM_TIMEOUT', '120'))
+AI_LLM_STUB_LATENCY = float(os.getenv('AI_LLM_STUB_LATENCY', '0'))
+AI_LLM_STUB_RESPONSES = os.getenv('AI_LLM_STUB_RESPONSES', '')
+
+# Politique des appels au LLM (voir ai_analysis.llm_policy) : échéance d'un appel (nouvelles
+# tentatives comprises, attente dans la file du répartiteur non comptée) et délai d'une
+# tentative, en secondes ;
+# nouvelles tentatives sur 429, 5xx et erreurs réseau avec attente exponentielle ; requête
+# dupliquée lorsqu'une tentative dépasse le percentile AI_LLM_HEDGE_PERCENTILE des latences
+# observées (après AI_LLM_HEDGE_MIN_SAMPLES appels) ; modèle de repli utilisé lorsque le
+# temps restant ne permet plus une tentative complète ('' : pas de repli)
+AI_LLM_DEADLINE = float(os.getenv('AI_LLM_DEADLINE', '180'))
+AI_LLM_ATTEMPT_TIMEOUT = float(os.getenv('AI_LLM_ATTEMPT_TIMEOUT', '90'))
+AI_LLM_MAX_RETRIES = int(os.getenv('AI_LLM_MAX_RETRIES', '3'))
+AI_LLM_RETRY_BASE_DELAY = float(os.getenv('AI_LLM_RETRY_BASE_DELAY', '1'))
+AI_LLM_RETRY_MAX_DELAY = float(os.getenv('AI_LLM_RETRY_MAX_DELAY', '20'))
+AI_LLM_HEDGE = os.getenv('AI_LLM_HEDGE', 'False') == 'True'
+AI_LLM_HEDGE_PERCENTILE = float(os.getenv('AI_LLM_HEDGE_PERCENTILE', '95'))
+AI_LLM_HEDGE_MIN_SAMPLES = int(os.getenv('AI_LLM_HEDGE_MIN_SAMPLES', '20'))
+AI_LLM_FALLBACK_MODEL = os.getenv('AI_LLM_FALLBACK_MODEL', '')
+
+# Registre des appels au LLM (voir ai_analysis.usage_ledger) : 'thread' (écriture par lots
+# depuis un thread dédié, sans allonger les requêtes), 'eager' (écriture immédiate, pour
+# les tests) ou 'off'. Les coûts sont estimés d'après les prix pour 1000 tokens du prompt
+# et de la réponse, par préfixe de nom de modèle (le plus long l'emporte).
+AI_USAGE_LEDGER_MODE = os.getenv('AI_USAGE_LEDGER_MODE', 'thread')
+AI_USAGE_LEDGER_BATCH_SIZE = int(os.getenv('AI_USAGE_LEDGER_BATCH_SIZE', '100'))
+AI_USAGE_LEDGER_FLUSH_SECONDS = float(os.getenv('AI_USAGE_LEDGER_FLUSH_SECONDS', '2'))
+AI_LLM_PRICING = {
+    'gpt-4o-mini': (0.00015, 0.0006),
+    'gpt-4o': (0.0025, 0.01),
+    'gpt-4-turbo': (0.01, 0.03),
+    'gpt-4': (0.03, 0.06),
+    'gpt-3.5-turbo': (0.0005, 0.0015),
+}
+
+# Analyse découpée (map-reduce) des RC trop longs pour un seul prompt :
+# seuil de déclenchement, taille maximale d'un extrait et nombre de requêtes simultanées
+AI_ANALYSIS_CHUNK_THRESHOLD_TOKENS = int(os.getenv('AI_ANALYSIS_CHUNK_THRESHOLD_TOKENS', '12000'))
+AI_ANALYSIS_CHUNK_MAX_TOKENS = int(os.getenv('AI_ANALYSIS_CHUNK_MAX_TOKENS', '6000'))
+AI_ANALYSIS_MAX_CONCURRENT_REQUESTS = int(os.getenv('AI_ANALYSIS_MAX_CONCURRENT_REQUESTS', '4'))
+
+# Compaction du texte des RC avant les appels au LLM (voir ai_analysis.prompt_compaction) :
+# nombre de lignes de haut et de bas de page examinées pour les en-têtes et pieds de
+# page répétés, et clauses types retirées (expressions régulières testées ligne par
+# ligne, sans tenir compte de la casse)
+AI_PROMPT_COMPACTION = os.getenv('AI_PROMPT_COMPACTION', 'True') == 'True'
+AI_PROMPT_EDGE_LINES = int(os.getenv('AI_PROMPT_EDGE_LINES', '3'))
+AI_PROMPT_BOILERPLATE_PATTERNS = [
+    r"cahier des clauses administratives g[ée]n[ée]rales",
+    r"\bCCAG\b.*\b(approuv[ée]|arr[êe]t[ée] du)\b",
+    r"r[èe]glement g[ée]n[ée]ral (sur|de) la protection des donn[ée]es",
+    r"\bRGPD\b",
+    r"r[èe]glement \(UE\) 2016/679",
+    r"loi (n° ?78-17|informatique et libert[ée]s)",
+    r"donn[ée]es [àa] caract[èe]re personnel",
+]
+
+# Index TF-IDF du corpus des RC et CCTP (voir ai_analysis.corpus_index) : nombre de
+# termes clés retournés et nombre d'appels d'offres passés proposés comme similaires
+AI_KEYWORDS_COUNT = int(os.getenv('AI_KEYWORDS_COUNT', '20'))
+AI_SIMILAR_TENDERS_COUNT = int(os.getenv('AI_SIMILAR_TENDERS_COUNT', '5'))
+
+# Génération groupée des sections d'un mémoire : appels simultanés au LLM, taille
+# maximale d'un brouillon (tokens) et délai sans progression (secondes) au-delà
+# duquel un lot en cours est considéré comme interrompu et peut être repris
+AI_SECTION_GENERATION_CONCURRENCY = int(os.getenv('AI_SECTION_GENERATION_CONCURRENCY', '40'))
+AI_SECTION_GENERATION_MAX_TOKENS = int(os.getenv('AI_SECTION_GENERATION_MAX_TOKENS', '1500'))
+AI_SECTION_GENERATION_STALE_SECONDS = float(os.getenv('AI_SECTION_GENERATION_STALE_SECONDS', '300'))
+
+# Extraction parallèle des PDF : nombre de processus et nombre de pages
+# en dessous duquel l'extraction reste séquentielle
+PDF_EXTRACTION_WORKERS = int(os.getenv('PDF_EXTRACTION_WORKERS', str(os.cpu_count() or 1)))
+PDF_EXTRACTION_PARALLEL_MIN_PAGES = int(os.getenv('PDF_EXTRACTION_PARALLEL_MIN_PAGES', '40'))
+
+# Extraction locale des exigences (spaCy) : modèle, taille des lots de nlp.pipe
+# et nombre de processus (1 = traitement dans le processus courant)
+AI_NLP_MODEL = os.getenv('AI_NLP_MODEL', 'fr_core_news_lg')
+AI_NLP_BATCH_SIZE = int(os.getenv('AI_NLP_BATCH_SIZE', '256'))
+AI_NLP_N_PROCESS = int(os.getenv('AI_NLP_N_PROCESS', '1'))
+
+# Registre des modèles (spaCy...) : modèles préchargés avant le fork des workers
+# gunicorn/Celery (noms séparés par des virgules, ex. 'spacy'), et chargement autorisé
+# ou non dans ce processus. Avec AI_MODELS_ENABLED=False (workers web sans modèles),
+# les traitements NLP sont envoyés aux workers Celery de la file AI_NLP_QUEUE.
+AI_MODELS_PRELOAD = [name for name in os.getenv('AI_MODELS_PRELOAD', '').split(',') if name]
+AI_MODELS_ENABLED = os.getenv('AI_MODELS_ENABLED', 'True') == 'True'
+AI_NLP_QUEUE = os.getenv('AI_NLP_QUEUE', 'nlp')
+AI_NLP_TASK_TIMEOUT = float(os.getenv('AI_NLP_TASK_TIMEOUT', '120'))
+
+# Recherche sémantique de la bibliothèque : modèle d'encodage transformers (CPU),
+# longueur maximale des textes encodés (en tokens) et dossier de l'index projeté
+# en mémoire (partagé par les workers de la machine ; ajouter 'embeddings' à
+# AI_MODELS_PRELOAD pour charger le modèle avant le fork)
+AI_EMBEDDING_MODEL = os.getenv('AI_EMBEDDING_MODEL', 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
+AI_EMBEDDING_MAX_LENGTH = int(os.getenv('AI_EMBEDDING_MAX_LENGTH', '256'))
+LIBRARY_INDEX_DIR = os.getenv('LIBRARY_INDEX_DIR', os.path.join(BASE_DIR, 'var', 'library_index'))
+
+# Jobs d'analyse asynchrones : 'thread' (pool de threads dans le processus, sans broker),
+# 'celery' (workers Celery via redis) ou 'eager' (exécution immédiate, pour les tests)
+AI_ANALYSIS_JOB_MODE = os.getenv('AI_ANALYSIS_JOB_MODE', 'thread')
+AI_ANALYSIS_JOB_WORKERS = int(os.getenv('AI_ANALYSIS_JOB_WORKERS', '2'))
+
+# Analyses simultanées d'un même RC (même projet, empreinte, modèle et version du prompt) :
+# la première est menée sous un bail en base (partagé par tous les workers) renouvelé
+# pendant l'analyse, les suivantes attendent son résultat en interrogeant le cache toutes
+# les AI_ANALYSIS_LEASE_POLL_SECONDS. Un bail non renouvelé pendant AI_ANALYSIS_LEASE_SECONDS
+# (processus arrêté) est repris par l'appel suivant. Un appel qui attend plus de
+# AI_ANALYSIS_LEASE_WAIT_SECONDS (par défaut l'échéance d'un appel au LLM) mène l'analyse lui-même.
+AI_ANALYSIS_LEASE_SECONDS = float(os.getenv('AI_ANALYSIS_LEASE_SECONDS', '60'))
+AI_ANALYSIS_LEASE_POLL_SECONDS = float(os.getenv('AI_ANALYSIS_LEASE_POLL_SECONDS', '0.5'))
+AI_ANALYSIS_LEASE_WAIT_SECONDS = float(os.getenv('AI_ANALYSIS_LEASE_WAIT_SECONDS', str(AI_LLM_DEADLINE)))
+
+# Configuration Celery (utilisée uniquement en mode 'celery')
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
+
+# Répartiteur des appels au LLM : budgets du fournisseur (requêtes et tokens par
+# minute), longueur maximale de la file (au-delà, les analyses sont refusées avec
+# la position dans la file) et attente maximale d'un appel en file (secondes).
+# Store 'redis' (par défaut hors DEBUG) : file et budgets partagés par tous les
+# workers ; 'memory' (par défaut en développement) : un seul processus ; 'none' :
+# appels non limités.
+AI_LLM_RATE_LIMIT_STORE = os.getenv('AI_LLM_RATE_LIMIT_STORE', 'memory' if DEBUG else 'redis')
+AI_LLM_RATE_LIMIT_REDIS_URL = os.getenv('AI_LLM_RATE_LIMIT_REDIS_URL', CELERY_BROKER_URL)
+AI_LLM_REQUESTS_PER_MINUTE = float(os.getenv('AI_LLM_REQUESTS_PER_MINUTE', '500'))
+AI_LLM_TOKENS_PER_MINUTE = float(os.getenv('AI_LLM_TOKENS_PER_MINUTE', '150000'))
+AI_LLM_MAX_QUEUE = int(os.getenv('AI_LLM_MAX_QUEUE', '50'))
+AI_LLM_QUEUE_TIMEOUT = float(os.getenv('AI_LLM_QUEUE_TIMEOUT', '300'))
 
 # Clé secrète OnlyOffice pour le JWT (à synchroniser avec la configuration du conteneur OnlyOffice)
 ONLYOFFICE_JWT_SECRET = "MaSuperCleJWTUltraSecrete2025!"  # À changer si le conteneur OnlyOffice est recréé 
\ No newline at end of file
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class BibliothequeMtConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bibliotheque_mt'
+
+    def ready(self):
+        """
+        Enregistre les signaux de mise à jour de l'index de recherche
+        """
+        from . import signals  # noqa: F401
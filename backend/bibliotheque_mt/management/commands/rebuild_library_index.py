@@ -0,0 +1,24 @@
+"""
+Reconstruit l'index de recherche sémantique de la bibliothèque
+Utilisation : python manage.py rebuild_library_index [--batch-size 256]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from bibliotheque_mt.semantic_index import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Réencode tous les éléments de la bibliothèque dans l'index de recherche sémantique"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=256)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} éléments indexés en {time.perf_counter() - started:.1f} s"
+        ))
@@ -0,0 +1,34 @@
+# Le champ 'contenu' existe déjà dans les bases créées avant 0002 (voir la
+# migration 0002) mais manquait à l'état des migrations : il est ajouté à
+# l'état, et la colonne n'est créée que dans les bases qui ne l'ont pas.
+
+from django.db import migrations, models
+
+
+def add_missing_contenu_column(apps, schema_editor):
+    model = apps.get_model('bibliotheque_mt', 'BibliothequeMemoireTechnique')
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        columns = [column.name for column in connection.introspection.get_table_description(cursor, model._meta.db_table)]
+    if 'contenu' not in columns:
+        schema_editor.add_field(model, model._meta.get_field('contenu'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bibliotheque_mt', '0003_update_sous_categorie'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='bibliothequememoiretechnique',
+                    name='contenu',
+                    field=models.TextField(blank=True, null=True, verbose_name='Contenu'),
+                ),
+            ],
+        ),
+        migrations.RunPython(add_missing_contenu_column, migrations.RunPython.noop),
+    ]
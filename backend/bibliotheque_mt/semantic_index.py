@@ -0,0 +1,409 @@
+"""
+semantic_index.py
+Recherche sémantique dans la bibliothèque des Mémoires Techniques
+Le titre et le contenu de chaque élément sont encodés en vecteur par un
+modèle transformers exécuté sur CPU (AI_EMBEDDING_MODEL). Les vecteurs,
+normalisés, sont rangés dans une matrice float32 contiguë projetée en
+mémoire depuis le disque (LIBRARY_INDEX_DIR) :
+- vectors.f32 : une ligne par élément indexé
+- ids.i64     : identifiant de l'élément de chaque ligne
+- header.i64  : nombre de lignes utilisées, capacité, dimension et
+                génération (incrémentée à chaque modification de l'index)
+
+Une recherche est un unique produit matrice-vecteur (similarité cosinus,
+les vecteurs étant normalisés) suivi d'une sélection partielle des k
+meilleurs scores. L'index est tenu à jour à chaque enregistrement ou
+suppression d'un élément (voir signals.py) ; les fichiers sont partagés
+par les workers d'une même machine, les écritures étant sérialisées par
+un verrou de fichier.
+
+Reconstruction complète : python manage.py rebuild_library_index
+"""
+
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ai_analysis.conf import setting
+from ai_analysis.model_registry import registry
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou limité aux threads du processus
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Modèle multilingue compact (384 dimensions), adapté au français sur CPU
+DEFAULT_EMBEDDING_MODEL = 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'
+DEFAULT_MAX_LENGTH = 256
+DEFAULT_BATCH_SIZE = 32
+# Capacité initiale de la matrice, doublée lorsqu'elle est pleine
+INITIAL_CAPACITY = 1024
+# Champs de header.i64 : lignes utilisées, capacité, dimension, génération
+HEADER_FIELDS = 4
+MAX_RESULTS = 50
+
+
+class EmbeddingUnavailable(Exception):
+    """
+    Levée lorsque transformers/torch ou le modèle d'encodage ne peut pas être chargé
+    """
+
+
+class TextEmbedder:
+    """
+    Encode des textes en vecteurs normalisés (moyenne des états cachés du
+    modèle, pondérée par le masque d'attention)
+    """
+
+    def __init__(self, model_name: Optional[str] = None, max_length: Optional[int] = None,
+                 batch_size: Optional[int] = None):
+        try:
+            import torch
+            from transformers import AutoModel, AutoTokenizer
+        except ImportError as e:
+            raise EmbeddingUnavailable(f"transformers/torch ne sont pas installés : {str(e)}")
+
+        self.model_name = model_name or setting('AI_EMBEDDING_MODEL', DEFAULT_EMBEDDING_MODEL)
+        self.max_length = max_length or setting('AI_EMBEDDING_MAX_LENGTH', DEFAULT_MAX_LENGTH)
+        self.batch_size = batch_size or setting('AI_EMBEDDING_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        try:
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self.model = AutoModel.from_pretrained(self.model_name).eval()
+        except OSError as e:
+            raise EmbeddingUnavailable(f"Modèle d'encodage {self.model_name} indisponible : {str(e)}")
+        self._torch = torch
+        self.dim = self.model.config.hidden_size
+
+    def embed(self, texts: Sequence[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """
+        Retourne la matrice (len(texts), dim) des vecteurs normalisés, par
+        lots de batch_size textes (une seule passe si batch_size >= len(texts))
+        """
+        torch = self._torch
+        batch_size = max(1, batch_size or self.batch_size)
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        with torch.inference_mode():
+            for start in range(0, len(texts), batch_size):
+                batch = list(texts[start:start + batch_size])
+                inputs = self.tokenizer(
+                    batch, padding=True, truncation=True,
+                    max_length=self.max_length, return_tensors='pt'
+                )
+                hidden = self.model(**inputs).last_hidden_state
+                mask = inputs['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                vectors[start:start + len(batch)] = pooled.numpy()
+        return normalize(vectors)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Normalise les vecteurs (lignes) pour que le produit scalaire soit la similarité cosinus
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+registry.register('embeddings', TextEmbedder)
+
+
+def get_embedder() -> TextEmbedder:
+    """
+    Retourne le modèle d'encodage du processus (chargé une seule fois, voir model_registry)
+    """
+    return registry.get('embeddings')
+
+
+class EmbeddingIndex:
+    """
+    Matrice des vecteurs des éléments, projetée en mémoire depuis directory.
+    Les lignes [0, count) sont occupées ; une suppression déplace la
+    dernière ligne à la place de la ligne supprimée, la matrice reste donc
+    contiguë et entièrement parcourue par chaque recherche.
+    """
+
+    def __init__(self, directory: str, dim: Optional[int] = None):
+        """
+        dim : dimension des vecteurs du modèle d'encodage ; sans dimension
+        (processus sans modèles), celle de l'index existant est reprise
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._lock_file = open(os.path.join(directory, 'index.lock'), 'a+')
+        self._capacity = 0
+        self._vectors: Optional[np.memmap] = None
+        self._ids: Optional[np.memmap] = None
+
+        header_path = os.path.join(directory, 'header.i64')
+        with self._locked(exclusive=True):
+            if not os.path.exists(header_path) or os.path.getsize(header_path) != HEADER_FIELDS * 8:
+                if dim is None:
+                    raise EmbeddingUnavailable(f"Aucun index dans {directory}")
+                np.array([0, 0, dim, 0], dtype=np.int64).tofile(header_path)
+            self._header = np.memmap(header_path, dtype=np.int64, mode='r+', shape=(HEADER_FIELDS,))
+            self.dim = dim = dim or int(self._header[2])
+            if int(self._header[2]) != dim:
+                # Modèle d'encodage changé : les vecteurs existants ne sont plus comparables
+                logger.warning(f"Dimension de l'index {int(self._header[2])} différente de {dim} : index vidé")
+                self._header[:] = [0, 0, dim, int(self._header[3]) + 1]
+                self._header.flush()
+            self._remap()
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """
+        Verrou des threads du processus, puis verrou de fichier partagé
+        entre processus (exclusif pour les écritures)
+        """
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _remap(self):
+        """
+        Projette à nouveau les fichiers si un autre processus a agrandi l'index
+        """
+        capacity = int(self._header[1])
+        if capacity == self._capacity and self._vectors is not None:
+            return
+        self._capacity = capacity
+        if capacity == 0:
+            self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+            self._ids = np.zeros(0, dtype=np.int64)
+            return
+        self._vectors = np.memmap(self._path('vectors.f32'), dtype=np.float32, mode='r+', shape=(capacity, self.dim))
+        self._ids = np.memmap(self._path('ids.i64'), dtype=np.int64, mode='r+', shape=(capacity,))
+
+    def _grow(self, needed: int):
+        capacity = max(needed, 2 * self._capacity, INITIAL_CAPACITY)
+        for name, row_bytes in (('vectors.f32', 4 * self.dim), ('ids.i64', 8)):
+            with open(self._path(name), 'ab') as handle:
+                handle.truncate(capacity * row_bytes)
+        self._header[1] = capacity
+        self._header.flush()
+        self._remap()
+
+    def __len__(self) -> int:
+        return int(self._header[0])
+
+    @property
+    def generation(self) -> int:
+        """
+        Version de l'index, modifiée par chaque ajout, mise à jour ou suppression
+        """
+        return int(self._header[3])
+
+    def ids(self) -> np.ndarray:
+        with self._locked(exclusive=False):
+            self._remap()
+            return np.array(self._ids[:int(self._header[0])])
+
+    def upsert(self, ids: Sequence[int], vectors: np.ndarray):
+        """
+        Ajoute ou remplace les vecteurs des éléments indiqués
+        """
+        vectors = normalize(np.asarray(vectors).reshape(len(ids), self.dim))
+        with self._locked(exclusive=True):
+            self._remap()
+            count = int(self._header[0])
+            rows = {int(element_id): row for row, element_id in enumerate(self._ids[:count].tolist())}
+            new_ids = [element_id for element_id in dict.fromkeys(int(i) for i in ids) if element_id not in rows]
+            if count + len(new_ids) > self._capacity:
+                self._grow(count + len(new_ids))
+            for element_id in new_ids:
+                rows[element_id] = count
+                self._ids[count] = element_id
+                count += 1
+            for element_id, vector in zip(ids, vectors):
+                self._vectors[rows[int(element_id)]] = vector
+            self._commit(count)
+
+    def remove(self, ids: Iterable[int]):
+        """
+        Retire les éléments indiqués (la dernière ligne comble chaque trou)
+        """
+        with self._locked(exclusive=True):
+            self._remap()
+            count = int(self._header[0])
+            for element_id in ids:
+                rows = np.flatnonzero(self._ids[:count] == int(element_id))
+                if not len(rows):
+                    continue
+                row, last = int(rows[0]), count - 1
+                if row != last:
+                    self._vectors[row] = self._vectors[last]
+                    self._ids[row] = self._ids[last]
+                count -= 1
+            self._commit(count)
+
+    def clear(self):
+        with self._locked(exclusive=True):
+            self._commit(0)
+
+    def _commit(self, count: int):
+        """
+        Écrit les lignes modifiées puis publie le nouveau nombre de lignes et la génération
+        """
+        if isinstance(self._vectors, np.memmap):
+            self._vectors.flush()
+            self._ids.flush()
+        self._header[0] = count
+        self._header[3] += 1
+        self._header.flush()
+
+    def search(self, vector: np.ndarray, k: int = 10,
+               allowed_ids: Optional[Iterable[int]] = None) -> List[Tuple[int, float]]:
+        """
+        Retourne les k éléments les plus proches : [(identifiant, similarité cosinus)],
+        par similarité décroissante, éventuellement limités à allowed_ids
+        """
+        return self.search_many(np.asarray(vector).reshape(1, self.dim), k, allowed_ids)[0]
+
+    def search_many(self, vectors: np.ndarray, k: int = 10,
+                    allowed_ids: Optional[Iterable[int]] = None) -> List[List[Tuple[int, float]]]:
+        """
+        Variante par lot de search : les scores de toutes les requêtes sont
+        calculés par un seul produit matriciel (requêtes x éléments)
+        """
+        queries = normalize(vectors).reshape(-1, self.dim)
+        with self._locked(exclusive=False):
+            self._remap()
+            count = int(self._header[0])
+            if count == 0 or k <= 0:
+                return [[] for _ in range(len(queries))]
+            ids = self._ids[:count]
+            scores = queries @ self._vectors[:count].T
+            if allowed_ids is not None:
+                allowed = np.fromiter(allowed_ids, dtype=np.int64)
+                scores = np.where(np.isin(ids, allowed), scores, -np.inf)
+            k = min(k, count)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            return [
+                [(int(ids[row]), float(score)) for row, score in zip(rows, row_scores) if score > -np.inf]
+                for rows, row_scores in zip(top, top_scores)
+            ]
+
+
+_index: Optional[EmbeddingIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> EmbeddingIndex:
+    """
+    Retourne l'index partagé du processus (ouvert au premier appel)
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            directory = setting('LIBRARY_INDEX_DIR', os.path.join('var', 'library_index'))
+            dim = get_embedder().dim if registry.is_enabled() else None
+            _index = EmbeddingIndex(str(directory), dim)
+        return _index
+
+
+def element_text(element) -> str:
+    """
+    Texte encodé pour un élément : titre puis contenu (sans balises HTML)
+    """
+    from django.utils.html import strip_tags
+
+    return f"{element.titre}\n{strip_tags(element.contenu or '')}".strip()
+
+
+@lru_cache(maxsize=1024)
+def embed_query(query: str) -> np.ndarray:
+    """
+    Encode une requête (les requêtes fréquentes ne sont encodées qu'une fois)
+    """
+    vector = embed_texts([query])[0]
+    vector.flags.writeable = False
+    return vector
+
+
+def embed_texts(texts: Sequence[str], batch_size: Optional[int] = None) -> np.ndarray:
+    """
+    Encode des textes avec le modèle du processus, ou dans un worker NLP
+    dédié si ce processus ne charge pas de modèles
+    """
+    if registry.is_enabled():
+        return get_embedder().embed(texts, batch_size=batch_size)
+    return np.asarray(embed_texts_remote(list(texts)), dtype=np.float32).reshape(len(texts), -1)
+
+
+def embed_texts_remote(texts: List[str]) -> List[List[float]]:
+    """
+    Envoie l'encodage à la file Celery des workers NLP et attend les vecteurs
+    """
+    from .tasks import embed_texts_task
+
+    try:
+        result = embed_texts_task.apply_async(args=[texts], queue=setting('AI_NLP_QUEUE', 'nlp'))
+        return result.get(timeout=setting('AI_NLP_TASK_TIMEOUT', 120))
+    except Exception as e:
+        raise EmbeddingUnavailable(f"Worker NLP indisponible : {str(e)}")
+
+
+def index_elements(elements: Sequence):
+    """
+    Encode et enregistre (ou met à jour) les éléments dans l'index
+    """
+    if not elements:
+        return
+    vectors = get_embedder().embed([element_text(element) for element in elements])
+    get_index().upsert([element.pk for element in elements], vectors)
+
+
+def remove_elements(ids: Iterable[int]):
+    get_index().remove(ids)
+
+
+def rebuild_index(batch_size: int = 256) -> int:
+    """
+    Réindexe toute la bibliothèque ; retourne le nombre d'éléments indexés
+    """
+    from .models import BibliothequeMemoireTechnique
+
+    index = get_index()
+    index.clear()
+    batch = []
+    total = 0
+    for element in BibliothequeMemoireTechnique.objects.only('id', 'titre', 'contenu').iterator(chunk_size=batch_size):
+        batch.append(element)
+        if len(batch) == batch_size:
+            index_elements(batch)
+            total += len(batch)
+            batch = []
+    index_elements(batch)
+    return total + len(batch)
+
+
+def search_elements(query: str, k: int = 10, allowed_ids: Optional[Iterable[int]] = None) -> List[Tuple[int, float]]:
+    """
+    Retourne les k éléments les plus proches de la requête : [(identifiant, score)]
+    """
+    query = ' '.join(query.split())
+    if not query:
+        return []
+    return get_index().search(embed_query(query), k=min(k, MAX_RESULTS), allowed_ids=allowed_ids)
@@ -0,0 +1,59 @@
+"""
+Ce fichier tient à jour l'index de recherche sémantique de la bibliothèque
+(voir semantic_index.py) : chaque élément enregistré est (ré)encodé, chaque
+élément supprimé est retiré de l'index.
+La mise à jour a lieu après la validation de la transaction ; dans un
+processus sans modèles (AI_MODELS_ENABLED=False), elle est confiée aux
+workers Celery de la file AI_NLP_QUEUE.
+"""
+
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ai_analysis.conf import setting
+from ai_analysis.model_registry import registry
+
+from .models import BibliothequeMemoireTechnique
+from . import semantic_index
+
+logger = logging.getLogger(__name__)
+
+# Champs encodés : un enregistrement limité à d'autres champs (ex. 'recent') ne réindexe pas
+INDEXED_FIELDS = {'titre', 'contenu'}
+
+
+def _update_index(element_id, deleted=False):
+    try:
+        if not registry.is_enabled():
+            from .tasks import update_library_index_task
+            update_library_index_task.apply_async(args=[element_id, deleted], queue=setting('AI_NLP_QUEUE', 'nlp'))
+        elif deleted:
+            semantic_index.remove_elements([element_id])
+        else:
+            element = BibliothequeMemoireTechnique.objects.filter(pk=element_id).first()
+            if element is not None:
+                semantic_index.index_elements([element])
+    except Exception as e:
+        logger.warning(f"Impossible de mettre à jour l'index de la bibliothèque pour l'élément {element_id} : {str(e)}")
+
+
+@receiver(post_save, sender=BibliothequeMemoireTechnique)
+def index_library_element(sender, instance, update_fields=None, **kwargs):
+    """
+    Encode l'élément enregistré dans l'index de recherche
+    """
+    if update_fields is not None and not INDEXED_FIELDS.intersection(update_fields):
+        return
+    transaction.on_commit(lambda: _update_index(instance.pk))
+
+
+@receiver(post_delete, sender=BibliothequeMemoireTechnique)
+def remove_library_element(sender, instance, **kwargs):
+    """
+    Retire l'élément supprimé de l'index de recherche
+    """
+    element_id = instance.pk
+    transaction.on_commit(lambda: _update_index(element_id, deleted=True))
@@ -0,0 +1,120 @@
+"""
+suggestions.py
+Suggestions d'éléments de la bibliothèque pour chaque section du plan de mémoire
+Tous les intitulés du plan (chapitres et sous-sections, précédés de
+l'intitulé parent pour le contexte) sont encodés en une seule passe du
+modèle, puis comparés à toute la bibliothèque par un seul produit
+matriciel (voir EmbeddingIndex.search_many).
+
+Les suggestions sont mises en cache par (empreinte du plan, génération de
+l'index) : une modification de la bibliothèque invalide donc le cache.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Dict, List
+
+from django.core.cache import cache
+
+from ai_analysis.model_registry import ModelsDisabled
+from ai_analysis.outline import iter_nodes, strip_number
+
+from .models import BibliothequeMemoireTechnique
+from . import semantic_index
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUGGESTIONS_PER_SECTION = 5
+# Similarité minimale pour qu'un élément soit suggéré
+MIN_SCORE = 0.3
+CACHE_TIMEOUT = 24 * 3600
+
+
+def section_headings(structure: List[Dict]) -> List[Dict]:
+    """
+    Intitulés du plan dans l'ordre du document : chemin, numéro, intitulé et
+    texte encodé ("Intitulé parent : intitulé" pour les sous-sections)
+    """
+    headings = []
+    titles = {}
+    for path, node in iter_nodes(structure):
+        title = strip_number(node.get('title') or '')
+        titles[tuple(path)] = title
+        parent = titles.get(tuple(path[:-1]))
+        headings.append({
+            'path': path,
+            'number': node.get('number'),
+            'title': node.get('title') or '',
+            'text': f"{parent} : {title}" if parent else title,
+        })
+    return headings
+
+
+def outline_hash(headings: List[Dict]) -> str:
+    payload = json.dumps([heading['text'] for heading in headings], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def suggest_for_outline(structure: List[Dict], k: int = DEFAULT_SUGGESTIONS_PER_SECTION) -> List[Dict]:
+    """
+    Retourne pour chaque section du plan les k éléments les plus proches :
+    [{'path', 'number', 'title', 'elements': [{'id', 'titre', 'categorie', 'score'}]}]
+    """
+    # Bibliothèque vide : inutile de parcourir le plan ni de charger le modèle d'encodage
+    if not BibliothequeMemoireTechnique.objects.exists():
+        return []
+    headings = section_headings(structure)
+    if not headings:
+        return []
+
+    index = semantic_index.get_index()
+    cache_key = f"library-suggestions:{outline_hash(headings)}:{index.generation}:{k}"
+    suggestions = cache.get(cache_key)
+    if suggestions is not None:
+        return suggestions
+
+    texts = [heading['text'] for heading in headings]
+    vectors = semantic_index.embed_texts(texts, batch_size=len(texts))
+    matches = index.search_many(vectors, k=k)
+
+    elements = BibliothequeMemoireTechnique.objects.only('id', 'titre', 'categorie').in_bulk(
+        {element_id for results in matches for element_id, _ in results}
+    )
+    suggestions = []
+    for heading, results in zip(headings, matches):
+        suggestions.append({
+            'path': heading['path'],
+            'number': heading['number'],
+            'title': heading['title'],
+            'elements': [
+                {
+                    'id': element_id,
+                    'titre': elements[element_id].titre,
+                    'categorie': elements[element_id].categorie,
+                    'score': round(score, 4),
+                }
+                for element_id, score in results
+                if score >= MIN_SCORE and element_id in elements
+            ],
+        })
+
+    cache.set(cache_key, suggestions, CACHE_TIMEOUT)
+    return suggestions
+
+
+def attach_suggestions(summary: Dict) -> Dict:
+    """
+    Retourne une copie du sommaire complétée des suggestions de la
+    bibliothèque ('suggestions' vide si la recherche est indisponible ou
+    échoue : les suggestions ne doivent jamais faire échouer l'analyse)
+    """
+    try:
+        suggestions = suggest_for_outline(summary.get('structure') or [])
+    except (semantic_index.EmbeddingUnavailable, ModelsDisabled) as e:
+        logger.warning(f"Suggestions de la bibliothèque indisponibles : {str(e)}")
+        suggestions = []
+    except Exception as e:
+        logger.error(f"Erreur lors des suggestions de la bibliothèque : {str(e)}")
+        suggestions = []
+    return {**summary, 'suggestions': suggestions}
@@ -0,0 +1,31 @@
+"""
+Ce fichier définit les tâches Celery de la bibliothèque des Mémoires Techniques.
+Elles sont exécutées par les workers NLP (file AI_NLP_QUEUE) pour les
+processus web qui ne chargent pas de modèles (AI_MODELS_ENABLED=False).
+"""
+
+from celery import shared_task
+
+from .models import BibliothequeMemoireTechnique
+from . import semantic_index
+
+
+@shared_task(name='bibliotheque_mt.update_library_index')
+def update_library_index_task(element_id, deleted=False):
+    """
+    Met à jour l'index de recherche pour un élément enregistré ou supprimé
+    """
+    if deleted:
+        semantic_index.remove_elements([element_id])
+        return
+    element = BibliothequeMemoireTechnique.objects.filter(pk=element_id).first()
+    if element is not None:
+        semantic_index.index_elements([element])
+
+
+@shared_task(name='bibliotheque_mt.embed_texts')
+def embed_texts_task(texts):
+    """
+    Encode des textes (requêtes de recherche, intitulés du plan) en une passe : liste de vecteurs
+    """
+    return semantic_index.get_embedder().embed(texts, batch_size=len(texts)).tolist()
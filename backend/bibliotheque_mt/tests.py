@@ -1,3 +1,221 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import zlib
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+from bibliotheque_mt import semantic_index
+from bibliotheque_mt.models import BibliothequeMemoireTechnique
+from bibliotheque_mt.semantic_index import INITIAL_CAPACITY, EmbeddingIndex
+from bibliotheque_mt.suggestions import attach_suggestions, suggest_for_outline
+
+
+class HashingEmbedder:
+    """
+    Encodeur de test : sac de mots projeté par hachage (sans modèle transformers)
+    """
+    dim = 64
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed(self, texts, batch_size=None):
+        self.calls += 1
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode('utf-8')) % self.dim] += 1
+        return semantic_index.normalize(vectors)
+
+
+class EmbeddingIndexTests(SimpleTestCase):
+    """
+    Tests de l'index des vecteurs projeté en mémoire.
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.index = EmbeddingIndex(self.directory, dim=8)
+        self.vectors = np.random.default_rng(0).standard_normal((5, 8)).astype(np.float32)
+        self.index.upsert([10, 11, 12, 13, 14], self.vectors)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_batch_search_matches_single_searches(self):
+        batch = self.index.search_many(self.vectors[:3], k=2)
+        for results, vector in zip(batch, self.vectors[:3]):
+            single = self.index.search(vector, k=2)
+            self.assertEqual([element_id for element_id, _ in results], [element_id for element_id, _ in single])
+            for (_, score), (_, single_score) in zip(results, single):
+                self.assertAlmostEqual(score, single_score, places=5)
+
+    def test_nearest_element_comes_first(self):
+        results = self.index.search(self.vectors[2], k=3)
+        self.assertEqual(results[0][0], 12)
+        self.assertAlmostEqual(results[0][1], 1.0, places=5)
+        self.assertEqual(len(results), 3)
+        self.assertGreaterEqual(results[1][1], results[2][1])
+
+    def test_removed_element_is_no_longer_returned(self):
+        self.index.remove([12])
+        self.assertEqual(len(self.index), 4)
+        self.assertNotIn(12, [element_id for element_id, _ in self.index.search(self.vectors[2], k=10)])
+        # La dernière ligne a comblé le trou : son vecteur est toujours retrouvé
+        self.assertEqual(self.index.search(self.vectors[4], k=1)[0][0], 14)
+
+    def test_upsert_replaces_the_vector(self):
+        self.index.upsert([11], self.vectors[3:4])
+        self.assertEqual(len(self.index), 5)
+        self.assertEqual({element_id for element_id, _ in self.index.search(self.vectors[3], k=2)}, {11, 13})
+
+    def test_search_can_be_restricted_to_some_elements(self):
+        results = self.index.search(self.vectors[2], k=3, allowed_ids=[13, 14])
+        self.assertEqual({element_id for element_id, _ in results}, {13, 14})
+
+    def test_index_is_reopened_from_disk_and_grows(self):
+        reopened = EmbeddingIndex(self.directory)
+        self.assertEqual(reopened.dim, 8)
+        self.assertEqual(sorted(reopened.ids().tolist()), [10, 11, 12, 13, 14])
+
+        generation = reopened.generation
+        count = INITIAL_CAPACITY + 10
+        reopened.upsert(range(100, 100 + count), np.ones((count, 8), dtype=np.float32))
+        # Agrandi par un autre objet : l'index d'origine reprojette les fichiers
+        self.assertEqual(len(self.index.ids()), count + 5)
+        self.assertEqual(self.index.search(self.vectors[0], k=1)[0][0], 10)
+        self.assertGreater(self.index.generation, generation)
+
+
+class LibraryIndexMixin:
+    """
+    Index temporaire et encodeur de test à la place du modèle transformers
+    """
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            email='test@example.com', password='TestPass123!', role='WRITER'
+        )
+        self.directory = tempfile.mkdtemp()
+        self.embedder = HashingEmbedder()
+        self.index = EmbeddingIndex(self.directory, self.embedder.dim)
+        semantic_index.embed_query.cache_clear()
+        cache.clear()
+        for patcher in (mock.patch.object(semantic_index, 'get_embedder', return_value=self.embedder),
+                        mock.patch.object(semantic_index, 'get_index', return_value=self.index)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def _create(self, titre, contenu, categorie='texte'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return BibliothequeMemoireTechnique.objects.create(
+                titre=titre, contenu=contenu, categorie=categorie, auteur=self.user
+            )
+
+
+class SemanticSearchEndpointTests(LibraryIndexMixin, APITestCase):
+    """
+    Tests de l'endpoint de recherche sémantique et de la mise à jour de l'index.
+    """
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user)
+
+    def _search(self, **params):
+        return self.client.get('/api/elements/recherche/', params)
+
+    def test_closest_element_is_returned_first(self):
+        self._create('Sécurité', 'port du casque obligatoire sur le chantier')
+        expected = self._create('Gestion des déchets', 'tri des déchets et recyclage des gravats')
+        self._create('Planning', 'phasage des travaux et délais')
+
+        response = self._search(q='recyclage des déchets', k=2)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(response.data[0]['id'], expected.id)
+        self.assertGreater(response.data[0]['score'], response.data[1]['score'])
+
+    def test_saved_and_deleted_elements_update_the_index(self):
+        element = self._create('Sécurité', 'port du casque')
+        with self.captureOnCommitCallbacks(execute=True):
+            element.contenu = 'tri des déchets'
+            element.save()
+        self.assertEqual(self._search(q='déchets', k=1).data[0]['id'], element.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            element.delete()
+        self.assertEqual(len(self.index), 0)
+        self.assertEqual(self._search(q='déchets').data, [])
+
+    def test_search_can_be_filtered_by_category(self):
+        self._create('Tableau des déchets', 'déchets', categorie='tableau')
+        texte = self._create('Texte', 'gestion des déchets')
+        response = self._search(q='déchets', categorie='texte')
+        self.assertEqual([result['id'] for result in response.data], [texte.id])
+
+    def test_empty_query_is_rejected(self):
+        self.assertEqual(self._search(q=' ').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+OUTLINE = [
+    {'number': '1', 'title': '1. Sécurité du chantier', 'points': 40, 'subsections': [
+        {'number': '1.1', 'title': '1.1. Port du casque', 'points': None, 'subsections': []},
+    ]},
+    {'number': '2', 'title': '2. Gestion des déchets', 'points': 20, 'subsections': []},
+]
+
+
+class OutlineSuggestionsTests(LibraryIndexMixin, TestCase):
+    """
+    Tests des suggestions de la bibliothèque pour les sections du plan.
+    """
+    def setUp(self):
+        super().setUp()
+        self.securite = self._create('Sécurité du chantier', 'port du casque et sécurité')
+        self.dechets = self._create('Déchets', 'gestion et tri des déchets')
+
+    def test_each_section_gets_its_closest_elements_in_one_pass(self):
+        self.embedder.calls = 0
+        suggestions = suggest_for_outline(OUTLINE, k=1)
+
+        self.assertEqual(self.embedder.calls, 1)
+        self.assertEqual([suggestion['path'] for suggestion in suggestions], [[0], [0, 0], [1]])
+        self.assertEqual(
+            [[element['id'] for element in suggestion['elements']] for suggestion in suggestions],
+            [[self.securite.id], [self.securite.id], [self.dechets.id]]
+        )
+
+    def test_suggestions_are_cached_until_the_library_changes(self):
+        suggest_for_outline(OUTLINE)
+        self.embedder.calls = 0
+        suggest_for_outline(OUTLINE)
+        self.assertEqual(self.embedder.calls, 0)
+
+        self._create('Tri sélectif', 'bennes de tri des déchets')
+        self.embedder.calls = 0
+        suggestions = suggest_for_outline(OUTLINE)
+        self.assertEqual(self.embedder.calls, 1)
+        self.assertEqual(len(suggestions[2]['elements']), 2)
+
+    def test_summary_is_returned_with_suggestions(self):
+        summary = {'title': 'Sommaire', 'structure': OUTLINE}
+        completed = attach_suggestions(summary)
+        self.assertNotIn('suggestions', summary)
+        self.assertEqual(len(completed['suggestions']), 3)
+
+    def test_sections_without_number_are_suggested(self):
+        suggestions = suggest_for_outline([{'title': 'Sécurité du chantier', 'subsections': []}], k=1)
+        self.assertEqual(suggestions[0]['number'], None)
+        self.assertEqual([element['id'] for element in suggestions[0]['elements']], [self.securite.id])
+
+    def test_failed_suggestions_do_not_fail_the_summary(self):
+        with mock.patch('bibliotheque_mt.suggestions.suggest_for_outline', side_effect=RuntimeError('index')):
+            completed = attach_suggestions({'structure': OUTLINE})
+        self.assertEqual(completed['suggestions'], [])
@@ -6,12 +6,14 @@ Chaque classe est commentée pour faciliter la compréhension.
 """
 
 from django.shortcuts import render
-from rest_framework import viewsets, permissions
+from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Tag, Commentaire, Note, BibliothequeMemoireTechnique, BibliothequeImage
 from .serializers import TagSerializer, CommentaireSerializer, NoteSerializer, BibliothequeMemoireTechniqueSerializer, BibliothequeImageSerializer
 from rest_framework.permissions import BasePermission
+from ai_analysis.model_registry import ModelsDisabled
+from .semantic_index import EmbeddingUnavailable, search_elements
 
 # -----------------------------------------------------------------------------
 # ViewSet : Tag
@@ -58,6 +60,40 @@ class BibliothequeMemoireTechniqueViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(textes, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def recherche(self, request):
+        """
+        Recherche sémantique dans la bibliothèque : ?q=texte recherché
+        &k=nombre de résultats (10 par défaut) &categorie=filtre optionnel.
+        Les éléments sont retournés du plus proche au moins proche, avec leur score.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'Le paramètre q est requis'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            k = int(request.query_params.get('k', 10))
+        except ValueError:
+            return Response({'error': 'Le paramètre k doit être un entier'}, status=status.HTTP_400_BAD_REQUEST)
+
+        allowed_ids = None
+        categorie = request.query_params.get('categorie')
+        if categorie:
+            allowed_ids = BibliothequeMemoireTechnique.objects.filter(categorie=categorie).values_list('id', flat=True)
+
+        try:
+            results = search_elements(query, k=k, allowed_ids=allowed_ids)
+        except (EmbeddingUnavailable, ModelsDisabled) as e:
+            return Response({'error': f"Recherche sémantique indisponible : {str(e)}"},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        elements = BibliothequeMemoireTechnique.objects.in_bulk([element_id for element_id, _ in results])
+        data = []
+        # Les éléments supprimés entre-temps sont ignorés
+        for element_id, score in results:
+            if element_id in elements:
+                data.append({**self.get_serializer(elements[element_id]).data, 'score': round(score, 4)})
+        return Response(data)
+
     # L'endpoint create_test_photos a été supprimé : les photos doivent être uploadées en BLOB, pas par URL.
 
 # -----------------------------------------------------------------------------
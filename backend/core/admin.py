@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Template, Projet, Section, ContenuReutilisable, GenerationIA
+from .models import Template, Projet, Section, ContenuReutilisable, GenerationIA, GenerationGroupee
 
 @admin.register(Template)
 class TemplateAdmin(admin.ModelAdmin):
@@ -50,3 +50,13 @@ class GenerationIAAdmin(admin.ModelAdmin):
     search_fields = ('prompt', 'contenu_genere', 'projet__titre')
     list_filter = ('date_generation', 'auteur')
     ordering = ('-date_generation',)
+
+@admin.register(GenerationGroupee)
+class GenerationGroupeeAdmin(admin.ModelAdmin):
+    """
+    Interface d'administration pour les générations groupées des sections
+    """
+    list_display = ('projet', 'auteur', 'statut', 'terminees', 'total', 'date_creation', 'date_fin')
+    search_fields = ('projet__titre',)
+    list_filter = ('statut', 'date_creation')
+    ordering = ('-date_creation',)
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.3 on 2026-10-17 18:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationGroupee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('statut', models.CharField(choices=[('EN_COURS', 'En cours'), ('INCOMPLETE', 'Incomplète'), ('TERMINEE', 'Terminée'), ('ABANDONNEE', 'Abandonnée')], default='EN_COURS', max_length=20, verbose_name='Statut')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Nombre de sections')),
+                ('terminees', models.PositiveIntegerField(default=0, verbose_name='Sections générées')),
+                ('date_creation', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('date_modification', models.DateTimeField(auto_now=True, verbose_name='Date de modification')),
+                ('date_fin', models.DateTimeField(blank=True, null=True, verbose_name='Date de fin')),
+                ('auteur', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='generations_groupees', to=settings.AUTH_USER_MODEL, verbose_name='Auteur')),
+                ('projet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='generations_groupees', to='core.projet', verbose_name='Projet')),
+            ],
+            options={
+                'verbose_name': 'génération groupée',
+                'verbose_name_plural': 'générations groupées',
+                'ordering': ['-date_creation'],
+            },
+        ),
+        migrations.AddField(
+            model_name='generationia',
+            name='lot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='generations', to='core.generationgroupee', verbose_name='Génération groupée'),
+        ),
+    ]
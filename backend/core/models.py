@@ -128,6 +128,36 @@ class ContenuReutilisable(models.Model):
     def __str__(self):
         return self.titre
 
+class GenerationGroupee(models.Model):
+    """
+    Modèle représentant la génération groupée des brouillons de toutes les
+    sections d'un projet. Les générations déjà enregistrées du lot permettent
+    de reprendre un lot interrompu sans régénérer les sections terminées.
+    """
+    STATUT_CHOICES = [
+        ('EN_COURS', _('En cours')),
+        ('INCOMPLETE', _('Incomplète')),
+        ('TERMINEE', _('Terminée')),
+        ('ABANDONNEE', _('Abandonnée')),
+    ]
+
+    projet = models.ForeignKey(Projet, on_delete=models.CASCADE, related_name='generations_groupees', verbose_name=_('Projet'))
+    auteur = models.ForeignKey(User, on_delete=models.PROTECT, related_name='generations_groupees', verbose_name=_('Auteur'))
+    statut = models.CharField(_('Statut'), max_length=20, choices=STATUT_CHOICES, default='EN_COURS')
+    total = models.PositiveIntegerField(_('Nombre de sections'), default=0)
+    terminees = models.PositiveIntegerField(_('Sections générées'), default=0)
+    date_creation = models.DateTimeField(_('Date de création'), auto_now_add=True)
+    date_modification = models.DateTimeField(_('Date de modification'), auto_now=True)
+    date_fin = models.DateTimeField(_('Date de fin'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('génération groupée')
+        verbose_name_plural = _('générations groupées')
+        ordering = ['-date_creation']
+
+    def __str__(self):
+        return f"Génération groupée pour {self.projet.titre} ({self.terminees}/{self.total})"
+
 class GenerationIA(models.Model):
     """
     Modèle représentant une génération IA
@@ -137,6 +167,7 @@ class GenerationIA(models.Model):
     auteur = models.ForeignKey(User, on_delete=models.PROTECT, related_name='generations', verbose_name=_('Auteur'))
     prompt = models.TextField(_('Prompt'))
     contenu_genere = models.TextField(_('Contenu généré'))
+    lot = models.ForeignKey(GenerationGroupee, on_delete=models.SET_NULL, null=True, blank=True, related_name='generations', verbose_name=_('Génération groupée'))
     date_generation = models.DateTimeField(_('Date de génération'), auto_now_add=True)
 
     class Meta:
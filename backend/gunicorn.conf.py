@@ -0,0 +1,43 @@
+"""
+Configuration gunicorn pour le projet MemTech
+Lancement : gunicorn -c gunicorn.conf.py backend.wsgi
+
+L'application est chargée dans le processus maître (preload_app) ; les
+modèles listés dans AI_MODELS_PRELOAD y sont chargés avant le fork, puis
+partagés par les workers en copie sur écriture.
+Pour des workers web sans modèles : AI_MODELS_ENABLED=False et
+AI_MODELS_PRELOAD vide (les traitements NLP partent vers la file Celery
+AI_NLP_QUEUE).
+"""
+
+import gc
+import os
+
+bind = os.getenv('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', '3'))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+# Les flux Server-Sent Events d'analyse restent ouverts pendant la génération
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '300'))
+preload_app = True
+
+
+def when_ready(server):
+    """
+    Précharge les modèles dans le maître, puis gèle le ramasse-miettes pour
+    que les objets chargés ne soient pas recopiés dans chaque worker
+    """
+    from django.conf import settings
+    from ai_analysis.llm_dispatcher import check_worker_store
+    from ai_analysis.model_registry import registry
+
+    if settings.AI_MODELS_PRELOAD and registry.is_enabled():
+        registry.preload(settings.AI_MODELS_PRELOAD)
+        server.log.info(f"Modèles préchargés : {registry.stats()['models']}")
+    check_worker_store(server.cfg.workers)
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from ai_analysis.model_registry import current_rss
+
+    server.log.info(f"Worker {worker.pid} démarré (RSS {current_rss() // (1024 * 1024)} Mo)")
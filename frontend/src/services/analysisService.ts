@@ -5,6 +5,47 @@
 
 import api from './api';
 
+export interface OutlineNode {
+  number: string;
+  title: string;
+  points: number | null;
+  subsections: OutlineNode[];
+}
+
+// Éléments de la bibliothèque suggérés pour une section du plan
+export interface SectionSuggestion {
+  path: number[];
+  number: string;
+  title: string;
+  elements: Array<{
+    id: number;
+    titre: string;
+    categorie: string;
+    score: number;
+  }>;
+}
+
+// Modifications d'un RC modificatif par rapport à la version précédente
+export interface RevisionChanges {
+  previous_hash?: string;
+  pages?: { changed: number[]; removed: number[] };
+  sections?: {
+    changed: Array<{ number: string; title: string }>;
+    added: Array<{ number: string; title: string }>;
+    removed: Array<{ number: string; title: string }>;
+  };
+  fragments?: number;
+  reanalysed_fragments?: number;
+}
+
+// Réduction du prompt (en-têtes, pieds de page et clauses types retirés)
+export interface PromptCompaction {
+  tokens_before: number;
+  tokens_after: number;
+  reduction: number;
+  removed_lines: { recurring?: number; page_numbers?: number; boilerplate?: number };
+}
+
 export interface AnalysisResult {
   analysis: {
     token_count: number;
@@ -14,10 +55,9 @@ export interface AnalysisResult {
       level: number;
     }>;
     keywords: string[];
-    structure: Array<{
-      title: string;
-      subsections: string[];
-    }>;
+    structure: OutlineNode[];
+    changes?: RevisionChanges;
+    compaction?: PromptCompaction;
   };
   summary: {
     title: string;
@@ -34,9 +74,24 @@ export interface AnalysisResult {
       }>;
     };
     recommendations: string[];
+    suggestions: SectionSuggestion[];
   };
 }
 
+export interface AnalysisJob {
+  id: string;
+  project: number;
+  status: 'queued' | 'extracting' | 'analyzing' | 'done' | 'failed';
+  status_display: string;
+  progress: number;
+  error: string;
+  cached: boolean;
+  created_at: string;
+  updated_at: string;
+  finished_at: string | null;
+  result: Pick<AnalysisResult, 'analysis' | 'summary'> | null;
+}
+
 class AnalysisService {
   /**
    * Lance l'analyse du RC d'un projet
@@ -46,6 +101,22 @@ class AnalysisService {
     return response.data;
   }
 
+  /**
+   * Programme l'analyse du RC en tâche de fond et retourne l'identifiant du job
+   */
+  static async analyzeRCAsync(projectId: number): Promise<{ job_id: string; status: string; status_url: string }> {
+    const response = await api.post(`/api/analysis/${projectId}/analyze_rc_async/`);
+    return response.data;
+  }
+
+  /**
+   * Récupère l'état d'un job d'analyse
+   */
+  static async getJob(jobId: string): Promise<AnalysisJob> {
+    const response = await api.get(`/api/analysis-jobs/${jobId}/`);
+    return response.data;
+  }
+
   /**
    * Récupère le sommaire généré
    */
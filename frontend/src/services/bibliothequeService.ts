@@ -43,6 +43,21 @@ export async function searchBibliothequeElements(query: string): Promise<Bibliot
   return response.data;
 }
 
+// Résultat de la recherche sémantique : élément et similarité avec la requête (0 à 1)
+export type BibliothequeSearchResult = BibliothequeMemoireTechnique & { score: number };
+
+// Recherche sémantique : éléments les plus proches du texte saisi, du plus au moins pertinent
+export async function searchBibliothequeSemantique(
+  query: string,
+  k: number = 10,
+  categorie?: string
+): Promise<BibliothequeSearchResult[]> {
+  const response = await api.get<BibliothequeSearchResult[]>(`${API_URL}recherche/`, {
+    params: { q: query, k, categorie }
+  });
+  return response.data;
+}
+
 // Récupère un élément précis de la bibliothèque par son ID
 export async function getBibliothequeElement(id: number): Promise<BibliothequeMemoireTechnique> {
   console.log('Appel API getBibliothequeElement avec id:', id);